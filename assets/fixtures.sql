@@ -18,9 +18,13 @@ VALUES
     -- PNG data represents a 1x1 pixel image with a white pixel
 
 -- Insert sample window_events
-INSERT INTO window_event (recording_timestamp, timestamp, state, title, left, top, width, height, window_id)
+INSERT INTO window_state (hash, state)
 VALUES
-    (1689889605.9053426, 1690042703.7413292, '{"title": "recording.txt - openadapt - Visual Studio Code", "left": -9, "top": -9, "width": 1938, "height": 1048, "meta": {"class_name": "Chrome_WidgetWin_1", "control_id": 0, "rectangle": {"left": 0, "top": 0, "right": 1920, "bottom": 1030}, "is_visible": true, "is_enabled": true, "control_count": 0}}', 'recording.txt - openadapt - Visual Studio Code', -9, -9, 1938, 1048, '0');
+    ('164d757ababf24afed5814e9201c0549a4bbc3a5c4626ab575061cdc27a3f8cb', '{"title": "recording.txt - openadapt - Visual Studio Code", "left": -9, "top": -9, "width": 1938, "height": 1048, "meta": {"class_name": "Chrome_WidgetWin_1", "control_id": 0, "rectangle": {"left": 0, "top": 0, "right": 1920, "bottom": 1030}, "is_visible": true, "is_enabled": true, "control_count": 0}}');
+
+INSERT INTO window_event (recording_timestamp, timestamp, state_hash, title, left, top, width, height, window_id)
+VALUES
+    (1689889605.9053426, 1690042703.7413292, '164d757ababf24afed5814e9201c0549a4bbc3a5c4626ab575061cdc27a3f8cb', 'recording.txt - openadapt - Visual Studio Code', -9, -9, 1938, 1048, '0');
 
 -- Insert sample performance_stats
 INSERT INTO performance_stat (recording_timestamp, event_type, start_time, end_time, window_id)
@@ -4,6 +4,7 @@ This module provides the environment configuration for Alembic.
 """
 
 from logging.config import fileConfig
+from typing import Any
 
 from sqlalchemy import engine_from_config, pool
 
@@ -43,6 +44,24 @@ def process_revision_directives(context, revision, directives):
     script.imports.add("import openadapt")
 
 
+def include_object(
+    object: Any, name: str, type_: str, reflected: bool, compare_to: Any
+) -> bool:
+    """Exclude the search table and its shadow tables from autogenerate.
+
+    Args:
+        object (Any): The schema object.
+        name (str): The name of the object.
+        type_ (str): The type of the object, e.g. "table".
+        reflected (bool): Whether the object was reflected from the database.
+        compare_to (Any): The object it is compared to, if any.
+
+    Returns:
+        bool: Whether to include the object.
+    """
+    return not (type_ == "table" and name.startswith(db.SEARCH_TABLE_PREFIX))
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -62,6 +81,7 @@ def run_migrations_offline() -> None:
         dialect_opts={"paramstyle": "named"},
         render_as_batch=True,
         process_revision_directives=process_revision_directives,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -88,6 +108,7 @@ def run_migrations_online() -> None:
             target_metadata=target_metadata,
             render_as_batch=True,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
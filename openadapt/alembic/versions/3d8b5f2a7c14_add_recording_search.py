@@ -0,0 +1,29 @@
+"""add recording_search full-text search table
+
+Existing recordings are indexed with `python -m openadapt.db.search reindex`.
+
+Revision ID: 3d8b5f2a7c14
+Revises: 9a4c2e7f1b36
+Create Date: 2026-10-19 20:03:27.519384
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3d8b5f2a7c14"
+down_revision = "9a4c2e7f1b36"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS recording_search USING fts5("
+        "content, kind UNINDEXED, recording_id UNINDEXED, timestamp UNINDEXED,"
+        " tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS recording_search")
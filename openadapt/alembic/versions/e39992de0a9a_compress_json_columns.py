@@ -0,0 +1,88 @@
+"""compress_json_columns
+
+Revision ID: e39992de0a9a
+Revises: a743aa8f634f
+Create Date: 2026-10-19 11:02:17.318406
+
+"""
+
+from typing import Any, Callable
+
+from alembic import op
+from sqlalchemy import text
+import orjson
+import sqlalchemy as sa
+
+import openadapt
+from openadapt.db import compression
+
+# revision identifiers, used by Alembic.
+revision = "e39992de0a9a"
+down_revision = "a743aa8f634f"
+branch_labels = None
+depends_on = None
+
+# table -> (column, dictionary name)
+COMPRESSED_COLUMNS = {
+    "action_event": ("element_state", "action_event.element_state"),
+    "window_event": ("state", "window_event.state"),
+    "browser_event": ("message", "browser_event.message"),
+}
+CHUNK_SIZE = 1000
+
+
+def convert_rows(table: str, column: str, convert_fn: Callable[[Any], Any]) -> None:
+    """Convert the non-null values of a column in chunks."""
+    session = sa.orm.Session(bind=op.get_bind())
+    last_id = 0
+    while True:
+        rows = session.execute(
+            text(
+                f"SELECT id, {column} FROM {table}"
+                f" WHERE id > :last_id AND {column} IS NOT NULL"
+                " ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": CHUNK_SIZE},
+        ).all()
+        if not rows:
+            break
+        session.execute(
+            text(f"UPDATE {table} SET {column} = :value WHERE id = :id"),
+            [{"id": row_id, "value": convert_fn(value)} for row_id, value in rows],
+        )
+        last_id = rows[-1][0]
+    session.commit()
+
+
+def upgrade() -> None:
+    for table, (column, dictionary_name) in COMPRESSED_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(
+                column,
+                existing_type=sa.JSON(),
+                type_=openadapt.models.CompressedJSON(dictionary_name),
+                existing_nullable=True,
+            )
+        convert_rows(
+            table,
+            column,
+            lambda value, dictionary_name=dictionary_name: compression.compress_json(
+                compression.decompress_json(value), dictionary_name
+            ),
+        )
+
+
+def downgrade() -> None:
+    for table, (column, dictionary_name) in COMPRESSED_COLUMNS.items():
+        convert_rows(
+            table,
+            column,
+            lambda value: orjson.dumps(compression.decompress_json(value)).decode(),
+        )
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(
+                column,
+                existing_type=openadapt.models.CompressedJSON(dictionary_name),
+                type_=sa.JSON(),
+                existing_nullable=True,
+            )
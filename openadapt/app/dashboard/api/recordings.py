@@ -5,12 +5,12 @@ import json
 from fastapi import APIRouter, WebSocket
 
 from openadapt.custom_logger import logger
-from openadapt.db import crud
+from openadapt.db import crud, serialization
 from openadapt.deprecated.app import cards
 from openadapt.events import get_events
 from openadapt.models import Recording
 from openadapt.plotting import display_event
-from openadapt.utils import image2utf8, row2dict
+from openadapt.utils import image2utf8
 
 
 class RecordingsAPI:
@@ -29,15 +29,26 @@ class RecordingsAPI:
         self.app.add_api_route("/start", self.start_recording)
         self.app.add_api_route("/stop", self.stop_recording)
         self.app.add_api_route("/status", self.recording_status)
+        self.app.add_api_route("/search", self.search_recordings)
         self.recording_detail_route()
         return self.app
 
     @staticmethod
-    def get_recordings() -> dict[str, list[Recording]]:
+    def get_recordings() -> dict[str, list[dict]]:
         """Get all recordings."""
         session = crud.get_new_session(read_only=True)
         recordings = crud.get_all_recordings(session)
-        return {"recordings": recordings}
+        return {
+            "recordings": [
+                {
+                    **recording.asdict(exclude=["config"]),
+                    "summary": (
+                        recording.summary.asdict() if recording.summary else None
+                    ),
+                }
+                for recording in recordings
+            ]
+        }
 
     @staticmethod
     def get_scrubbed_recordings() -> dict[str, list[Recording]]:
@@ -63,6 +74,13 @@ class RecordingsAPI:
         """Get the recording status."""
         return {"recording": cards.is_recording()}
 
+    @staticmethod
+    def search_recordings(q: str, limit: int = 20) -> dict[str, list[dict]]:
+        """Search the task descriptions, typed text and window titles of recordings."""
+        with crud.get_new_session(read_only=True) as session:
+            results = crud.search_recordings(session, q, limit)
+        return {"results": results}
+
     def recording_detail_route(self) -> None:
         """Add the recording detail route as a websocket."""
 
@@ -74,10 +92,18 @@ class RecordingsAPI:
             recording = crud.get_recording_by_id(session, recording_id)
 
             await websocket.send_json(
-                {"type": "recording", "value": recording.asdict()}
+                {
+                    "type": "recording",
+                    "value": {
+                        **recording.asdict(),
+                        "summary": (
+                            recording.summary.asdict() if recording.summary else None
+                        ),
+                    },
+                }
             )
 
-            action_events = get_events(session, recording)
+            action_events = get_events(session, recording, load_profile="dashboard")
 
             await websocket.send_json(
                 {"type": "num_events", "value": len(action_events)}
@@ -98,20 +124,8 @@ class RecordingsAPI:
                 words_with_timestamps = []
             word_index = 0
 
-            def convert_to_str(event_dict: dict) -> dict:
-                """Convert the keys to strings."""
-                if "key" in event_dict:
-                    event_dict["key"] = str(event_dict["key"])
-                if "canonical_key" in event_dict:
-                    event_dict["canonical_key"] = str(event_dict["canonical_key"])
-                if "reducer_names" in event_dict:
-                    event_dict["reducer_names"] = list(event_dict["reducer_names"])
-                if "children" in event_dict:
-                    for child_event in event_dict["children"]:
-                        convert_to_str(child_event)
-
             for action_event in action_events:
-                event_dict = row2dict(action_event)
+                event_dict = serialization.row2dict(action_event, jsonable=True)
                 try:
                     image = display_event(action_event)
                     width, height = image.size
@@ -134,7 +148,10 @@ class RecordingsAPI:
                     words.append(words_with_timestamps[word_index]["word"])
                     word_index += 1
                 event_dict["words"] = words
-                convert_to_str(event_dict)
-                await websocket.send_json({"type": "action_event", "value": event_dict})
+                await websocket.send_text(
+                    serialization.dumps(
+                        {"type": "action_event", "value": event_dict}
+                    ).decode()
+                )
 
             await websocket.close()
@@ -33,6 +33,9 @@ export const RawRecordings = () => {
                 {name: 'Description', accessor: 'task_description'},
                 {name: 'Start time', accessor: (recording: Recording) => recording.video_start_time ? timeStampToDateString(recording.video_start_time) : 'N/A'},
                 {name: 'Timestamp', accessor: (recording: Recording) => recording.timestamp ? timeStampToDateString(recording.timestamp) : 'N/A'},
+                {name: 'Action Events', accessor: (recording: Recording) => recording.summary ? recording.summary.num_action_events : 'N/A'},
+                {name: 'Duration (s)', accessor: (recording: Recording) => recording.summary ? recording.summary.duration.toFixed(1) : 'N/A'},
+                {name: 'Archived', accessor: (recording: Recording) => recording.archive_path ? 'Yes' : 'No'},
                 {name: 'Monitor Width/Height', accessor: (recording: Recording) => `${recording.monitor_width}/${recording.monitor_height}`},
                 {name: 'Double Click Interval Seconds/Pixels', accessor: (recording: Recording) => `${recording.double_click_interval_seconds}/${recording.double_click_distance_pixels}`},
             ]}
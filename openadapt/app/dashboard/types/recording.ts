@@ -9,6 +9,23 @@ export type Recording = {
     task_description: string;
     video_start_time: number | null;
     original_recording_id: number | null;
+    archive_path?: string | null;
+    video_segments?: { start_time: number }[] | null;
+    summary?: RecordingSummary | null;
+}
+
+export type RecordingSummary = {
+    id: number;
+    recording_id: number;
+    num_action_events: number;
+    num_screenshots: number;
+    num_window_events: number;
+    num_browser_events: number;
+    duration: number;
+    db_bytes: number;
+    video_bytes: number;
+    scrubbed: boolean;
+    updated_timestamp: number;
 }
 
 export enum RecordingStatus {
@@ -477,6 +477,8 @@ class SystemTrayIcon:
                     recording.timestamp
                 ).strftime("%Y-%m-%d %H:%M:%S")
                 action_text = f"{formatted_timestamp}: {recording.task_description}"
+                if recording.summary:
+                    action_text += f" ({recording.summary.duration:.0f}s)"
                 recording_action = TrackedQAction(
                     action_text, tracking_text=f"{action_type.title()} recording"
                 )
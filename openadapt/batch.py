@@ -0,0 +1,185 @@
+"""Processes the events of many recordings in a pool of worker processes.
+
+Productivity metrics, dataset exports and evaluation scripts process recordings one
+after another, and are dominated by the CPU time of events.get_events. Here the
+recordings are fanned out to a pool of worker processes instead. Each worker opens
+its own database engine, since connections can't be shared between processes, and
+processes each recording in a new read-only session (see crud.get_new_session).
+The results are returned in the order of the recordings.
+
+Usage:
+
+    from openadapt import batch, productivity
+
+    for recording_id, metrics in batch.process_recordings(
+        recording_ids, process_fn=productivity.get_metrics
+    ):
+        ...
+"""
+
+from functools import partial
+from typing import Any, Callable, Iterator
+import multiprocessing
+import os
+
+from sqlalchemy.orm import Session as SaSession
+from tqdm import tqdm
+import psutil
+import sqlalchemy as sa
+
+from openadapt import events, utils
+from openadapt.config import config
+from openadapt.custom_logger import logger
+from openadapt.db import crud, db
+from openadapt.models import Recording
+
+try:
+    import resource
+except ImportError:
+    # e.g. on Windows
+    resource = None
+
+# memory each worker may allocate, in addition to the memory it starts with
+MAX_WORKER_MEMORY_BYTES = 4 * 1024**3
+# number of recordings processed by a worker before it is replaced, which releases
+# the memory it holds on to
+MAX_RECORDINGS_PER_WORKER = 10
+
+# the database engine of the worker process (see init_worker)
+worker_engine: sa.engine.Engine | None = None
+
+
+def get_event_dicts(session: SaSession, recording: Recording) -> list[dict]:
+    """Get the processed action events of a recording as dictionaries.
+
+    The default process_fn of process_recordings.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+
+    Returns:
+        list[dict]: The processed action events, with their children.
+    """
+    action_events = events.get_events(session, recording)
+    return utils.rows2dicts(action_events, drop_empty=False, drop_constant=False)
+
+
+def set_memory_limit(max_memory_bytes: int) -> None:
+    """Limit the memory the current process may allocate.
+
+    Allocations past the limit raise MemoryError, instead of the process being
+    killed by the operating system.
+
+    Args:
+        max_memory_bytes (int): The memory the process may allocate, in addition to
+            the memory it uses already (e.g. inherited from the parent process).
+    """
+    if resource is None:
+        logger.warning("Limiting the memory of workers is not supported")
+        return
+    limit = psutil.Process().memory_info().vms + max_memory_bytes
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+    if hard_limit != resource.RLIM_INFINITY:
+        limit = min(limit, hard_limit)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard_limit))
+    except (ValueError, OSError) as exc:
+        # e.g. on macOS
+        logger.warning(f"Failed to limit the memory of worker: {exc}")
+
+
+def init_worker(db_url: str, max_memory_bytes: int | None) -> None:
+    """Initialize a worker process of process_recordings.
+
+    Args:
+        db_url (str): The URL of the database.
+        max_memory_bytes (int | None): The memory the worker may allocate (see
+            set_memory_limit), or None for no limit.
+    """
+    global worker_engine
+
+    # the connections of the parent's engine may have been inherited by forking
+    db.engine.dispose(close=False)
+    worker_engine = sa.create_engine(db_url, connect_args={"check_same_thread": False})
+    if max_memory_bytes is not None:
+        set_memory_limit(max_memory_bytes)
+
+
+def process_recording(
+    recording_id: int, process_fn: Callable[[SaSession, Recording], Any]
+) -> Any:
+    """Process a recording in a worker process.
+
+    Args:
+        recording_id (int): The id of the recording.
+        process_fn (Callable): The function processing the recording.
+
+    Returns:
+        Any: The result of process_fn, or the exception it raised.
+    """
+    try:
+        with crud.get_new_session(read_only=True, engine=worker_engine) as session:
+            recording = crud.get_recording_by_id(session, recording_id)
+            if recording is None:
+                raise ValueError(f"No recording with {recording_id=}")
+            return process_fn(session, recording)
+    except Exception as exc:
+        # including MemoryError, past the limit of the worker
+        logger.exception(f"Failed to process {recording_id=}: {exc}")
+        return exc
+
+
+def process_recordings(
+    recording_ids: list[int],
+    process_fn: Callable[[SaSession, Recording], Any] = get_event_dicts,
+    num_workers: int | None = None,
+    max_memory_bytes: int | None = MAX_WORKER_MEMORY_BYTES,
+    max_recordings_per_worker: int | None = MAX_RECORDINGS_PER_WORKER,
+    db_url: str | None = None,
+    show_progress: bool = True,
+) -> Iterator[tuple[int, Any]]:
+    """Process recordings in a pool of worker processes.
+
+    Processed events are stored by events.get_events in the workers as usual (see
+    openadapt.db.events_cache), in a separate transaction of the read-only session.
+
+    Args:
+        recording_ids (list[int]): The ids of the recordings.
+        process_fn (Callable): The function processing a recording, given a
+            read-only session and the recording. It must be picklable (e.g. defined
+            at the top level of a module), and so must its result. Defaults to
+            get_event_dicts.
+        num_workers (int | None): The number of worker processes. Defaults to the
+            number of CPUs.
+        max_memory_bytes (int | None): The memory each worker may allocate (see
+            set_memory_limit), or None for no limit.
+        max_recordings_per_worker (int | None): The number of recordings processed
+            by a worker before it is replaced, or None to keep workers.
+        db_url (str | None): The URL of the database. Defaults to config.DB_URL.
+        show_progress (bool): Whether to show a progress bar.
+
+    Yields:
+        tuple[int, Any]: The id of each recording and the result of process_fn, or
+            the exception it raised, in the order of recording_ids.
+    """
+    if not recording_ids:
+        return
+    num_workers = min(num_workers or os.cpu_count() or 1, len(recording_ids))
+    logger.info(f"{len(recording_ids)=} {num_workers=}")
+    with multiprocessing.Pool(
+        num_workers,
+        initializer=init_worker,
+        initargs=(db_url or config.DB_URL, max_memory_bytes),
+        maxtasksperchild=max_recordings_per_worker,
+    ) as pool:
+        results = pool.imap(
+            partial(process_recording, process_fn=process_fn), recording_ids
+        )
+        progress = tqdm(
+            results,
+            total=len(recording_ids),
+            desc="Processing recordings",
+            disable=not show_progress,
+        )
+        yield from zip(recording_ids, progress)
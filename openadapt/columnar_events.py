@@ -0,0 +1,889 @@
+"""Columnar implementation of the action event reducers in events.py.
+
+The reducers in events.py walk lists of ActionEvent objects, calling closures per
+event and creating parent events as they go. Here the action events are instead
+loaded once into a NumPy structured array (one row per top-level event), and each
+reducer is applied to the whole array at once: the runs of consecutive target
+events, the groups merged into parents and the rows discarded are found with
+vectorized operations, and the accumulated time removed by merging (the "dt" of
+the list reducers) is a cumulative sum. Parent events are only recorded as the
+ids of their children, and ActionEvent objects are created for them (with
+events.make_parent_event) once all reducers have been applied.
+
+The output is identical to that of the list reducers: the same events, with the
+same timestamps, children and reducer_names.
+
+The events of a recording may also be reduced in consecutive parts (see
+openadapt.live_events): EventTable.get_dt_offsets gets the dt accumulated by each
+reducer before an event, with which the events from that event on are reduced as
+they would be with all the events before them.
+
+Usage:
+
+    action_events = columnar_events.reduce_events(action_events, events.PROCESS_FNS)
+
+Module: columnar_events.py
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+
+from pynput import keyboard
+import numpy as np
+
+from openadapt import common, events, models
+from openadapt.custom_logger import logger
+
+NAME_CODES = {name: code for code, name in enumerate(common.ALL_EVENTS)}
+MOVE = NAME_CODES["move"]
+CLICK = NAME_CODES["click"]
+SCROLL = NAME_CODES["scroll"]
+PRESS = NAME_CODES["press"]
+RELEASE = NAME_CODES["release"]
+SINGLECLICK = NAME_CODES["singleclick"]
+DOUBLECLICK = NAME_CODES["doubleclick"]
+# mouse_pressed of None, False and True
+PRESSED_CODES = {None: -1, False: 0, True: 1}
+INVALID_KEY_CHAR = "<0>"
+
+EVENT_DTYPE = np.dtype(
+    [
+        # the index of the event in EventTable.nodes
+        ("node", np.int64),
+        ("name", np.int8),
+        ("timestamp", np.float64),
+        # NaN if None
+        ("mouse_x", np.float64),
+        ("mouse_y", np.float64),
+        ("mouse_dx", np.float64),
+        ("mouse_dy", np.float64),
+        ("left_button", np.bool_),
+        ("mouse_pressed", np.int8),
+        # index into EventTable.keys of the named key, -1 if None
+        ("key_name", np.int32),
+        # whether ActionEvent.key is set
+        ("has_key", np.bool_),
+        # whether str(ActionEvent.key) is "<0>"
+        ("invalid_key", np.bool_),
+    ]
+)
+
+# the reducer names added to ActionEvent.reducer_names, by bit
+REDUCER_NAMES = (
+    "mouse_move",
+    "mouse_scroll",
+    "mouse_click",
+    "keyboard",
+    "redundant_mouse_move",
+    "remove_move_before_click",
+)
+
+
+@dataclass
+class ParentEvent:
+    """A parent event created by a reducer, not yet an ActionEvent.
+
+    Attributes:
+        name (str): The name of the event.
+        children (np.ndarray): The nodes of the children.
+    """
+
+    name: str
+    children: np.ndarray
+
+
+class EventTable:
+    """The top-level events being reduced, as a structured array.
+
+    Every event ever in the table is a node: the loaded action events are nodes 0
+    to N - 1, and parent events are appended as they are created.
+
+    Attributes:
+        action_events (list[models.ActionEvent]): The loaded action events.
+        rows (np.ndarray): The top-level events, of dtype EVENT_DTYPE.
+        parents (list[ParentEvent]): The parent events, from node N on.
+        timestamps (np.ndarray): The latest timestamp of each node.
+        reducer_bits (np.ndarray): The bits of the reducer names of each node.
+        children (dict[int, np.ndarray]): Replaced children, by node.
+        keys (list[keyboard.Key]): The named keys encoded by the key_name field.
+        first_nodes (np.ndarray): The first loaded action event of each node, i.e.
+            the node itself or its first descendant.
+        dt_offsets (dict[str, float]): The dt of each reducer before the first
+            action event.
+        dts (dict[str, tuple[np.ndarray, np.ndarray]]): The first nodes of the rows
+            each reducer was applied to, and the dt of each row, by reducer name.
+    """
+
+    def __init__(
+        self,
+        action_events: list[models.ActionEvent],
+        dt_offsets: dict[str, float] | None = None,
+    ) -> None:
+        """Load action events.
+
+        Args:
+            action_events (list[models.ActionEvent]): The action events.
+            dt_offsets (dict[str, float] | None): The dt of each reducer before the
+                first action event (see get_dt_offsets), if any.
+        """
+        for event in action_events:
+            assert event.name in NAME_CODES, event
+        self.action_events = action_events
+        self.parents = []
+        self.children = {}
+        self.dt_offsets = dict(dt_offsets or {})
+        self.dts = {}
+        key_codes = {}
+        num_events = len(action_events)
+
+        rows = np.empty(num_events, dtype=EVENT_DTYPE)
+        rows["node"] = np.arange(num_events)
+        rows["name"] = [NAME_CODES[event.name] for event in action_events]
+        for field in ("timestamp", "mouse_x", "mouse_y", "mouse_dx", "mouse_dy"):
+            # None is converted to NaN
+            rows[field] = np.array(
+                [getattr(event, field) for event in action_events], dtype=np.float64
+            )
+        rows["left_button"] = [
+            event.mouse_button_name == "left" for event in action_events
+        ]
+        rows["mouse_pressed"] = [
+            PRESSED_CODES[event.mouse_pressed] for event in action_events
+        ]
+        # keys rather than key names, which may be aliases of the same key
+        rows["key_name"] = [
+            (
+                key_codes.setdefault(keyboard.Key[event.key_name], len(key_codes))
+                if event.key_name
+                else -1
+            )
+            for event in action_events
+        ]
+        self.keys = list(key_codes)
+        rows["has_key"] = [
+            bool(event.key_name or event.key_char or event.key_vk)
+            for event in action_events
+        ]
+        rows["invalid_key"] = [
+            not event.key_name
+            and (
+                event.key_char == INVALID_KEY_CHAR
+                if event.key_char
+                else bool(event.key_vk) and int(event.key_vk) == 0
+            )
+            for event in action_events
+        ]
+        self.rows = rows
+        self.timestamps = rows["timestamp"].copy()
+        self.reducer_bits = np.zeros(num_events, dtype=np.int64)
+        self.first_nodes = np.arange(num_events)
+
+    def add_parents(self, parents: list[ParentEvent]) -> np.ndarray:
+        """Add parent events as nodes.
+
+        Args:
+            parents (list[ParentEvent]): The parent events.
+
+        Returns:
+            np.ndarray: The nodes of the parent events.
+        """
+        num_nodes = len(self.timestamps)
+        self.parents += parents
+        self.timestamps = np.concatenate([self.timestamps, np.zeros(len(parents))])
+        self.reducer_bits = np.concatenate(
+            [self.reducer_bits, np.zeros(len(parents), dtype=np.int64)]
+        )
+        self.first_nodes = np.concatenate(
+            [
+                self.first_nodes,
+                self.first_nodes[
+                    np.array([parent.children[0] for parent in parents], dtype=np.int64)
+                ],
+            ]
+        )
+        return np.arange(num_nodes, num_nodes + len(parents))
+
+    def get_dt(self, reducer_name: str, inc: np.ndarray) -> np.ndarray:
+        """Get the time removed by a reducer from the timestamp of each row.
+
+        Args:
+            reducer_name (str): The name of the reducer.
+            inc (np.ndarray): The time removed by the reducer at each row, from the
+                timestamps of all following rows.
+
+        Returns:
+            np.ndarray: The accumulated time removed at each row (the "dt").
+        """
+        dt = self.dt_offsets.get(reducer_name, 0.0) + np.cumsum(inc)
+        self.dts[reducer_name] = (self.first_nodes[self.rows["node"]], dt)
+        return dt
+
+    def get_dt_offsets(self, node: int) -> dict[str, float]:
+        """Get the dt of each reducer before a loaded action event.
+
+        The events from the action event on are reduced as they are here if they
+        are loaded with these dt_offsets, provided that no parent has children on
+        both sides of the action event.
+
+        Args:
+            node (int): The node of the action event.
+
+        Returns:
+            dict[str, float]: The dt of each reducer before the action event.
+        """
+        dt_offsets = dict(self.dt_offsets)
+        for reducer_name, (first_nodes, dt) in self.dts.items():
+            num_rows_before = int(np.searchsorted(first_nodes, node))
+            if num_rows_before:
+                dt_offsets[reducer_name] = float(dt[num_rows_before - 1])
+        return dt_offsets
+
+    def update(
+        self,
+        rows: np.ndarray,
+        reducer_name: str | None = None,
+        reduced: np.ndarray | None = None,
+    ) -> None:
+        """Replace the rows, and record the timestamps and reducer of their nodes.
+
+        Args:
+            rows (np.ndarray): The new rows.
+            reducer_name (str | None): The name of the reducer.
+            reduced (np.ndarray | None): Whether each row was returned by the
+                reducer (rather than passed through it), if any.
+        """
+        self.rows = rows
+        self.timestamps[rows["node"]] = rows["timestamp"]
+        if reducer_name is not None:
+            self.reducer_bits[rows["node"][reduced]] |= 1 << REDUCER_NAMES.index(
+                reducer_name
+            )
+
+    def materialize(self) -> list[models.ActionEvent]:
+        """Apply the changes to the action events and create the parent events.
+
+        Returns:
+            list[models.ActionEvent]: The top-level events.
+        """
+        num_events = len(self.action_events)
+        nodes = list(self.action_events)
+        changed_idxs = np.flatnonzero(
+            self.timestamps[:num_events]
+            != np.array(
+                [event.timestamp for event in self.action_events], dtype=np.float64
+            )
+        )
+        for idx in changed_idxs.tolist():
+            nodes[idx].timestamp = float(self.timestamps[idx])
+        for node, parent in enumerate(self.parents, num_events):
+            children = [nodes[child] for child in parent.children.tolist()]
+            nodes.append(
+                events.make_parent_event(
+                    children[0],
+                    {
+                        "name": parent.name,
+                        **get_parent_attrs(parent.name, children),
+                        "timestamp": float(self.timestamps[node]),
+                        "children": children,
+                    },
+                )
+            )
+        for node, children in self.children.items():
+            nodes[node].children = [nodes[child] for child in children.tolist()]
+        for node in np.flatnonzero(self.reducer_bits).tolist():
+            reducer_bits = int(self.reducer_bits[node])
+            nodes[node].reducer_names.update(
+                reducer_name
+                for bit, reducer_name in enumerate(REDUCER_NAMES)
+                if reducer_bits & (1 << bit)
+            )
+        return [nodes[node] for node in self.rows["node"].tolist()]
+
+
+def get_parent_attrs(
+    name: str, children: list[models.ActionEvent]
+) -> dict[str, float | str | None]:
+    """Get the attributes a reducer sets on a parent event, from its children.
+
+    Args:
+        name (str): The name of the parent event.
+        children (list[models.ActionEvent]): The children.
+
+    Returns:
+        dict: The attributes, as set by the reducer creating the parent.
+    """
+    first_child = children[0]
+    if name == "move":
+        return {"mouse_x": children[-1].mouse_x, "mouse_y": children[-1].mouse_y}
+    if name == "scroll":
+        return {
+            "mouse_x": first_child.mouse_x,
+            "mouse_y": first_child.mouse_y,
+            "mouse_dx": sum(child.mouse_dx for child in children),
+            "mouse_dy": sum(child.mouse_dy for child in children),
+        }
+    if name in ("singleclick", "doubleclick"):
+        return {
+            "mouse_x": first_child.mouse_x,
+            "mouse_y": first_child.mouse_y,
+            "mouse_button_name": first_child.mouse_button_name,
+        }
+    return {}
+
+
+def get_runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Get the runs of consecutive True values.
+
+    Args:
+        mask (np.ndarray): The boolean array.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The start (inclusive) and end (exclusive)
+            index of each run.
+    """
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def get_run_ids(mask: np.ndarray) -> np.ndarray:
+    """Get the run of consecutive True values of each index.
+
+    Args:
+        mask (np.ndarray): The boolean array.
+
+    Returns:
+        np.ndarray: The index of the run of each True value, and -1 elsewhere.
+    """
+    prev_mask = np.zeros(len(mask), dtype=bool)
+    prev_mask[1:] = mask[:-1]
+    return np.where(mask, np.cumsum(mask & ~prev_mask) - 1, -1)
+
+
+def is_equal(values: np.ndarray, other_values: np.ndarray) -> np.ndarray:
+    """Compare values elementwise, with NaN (i.e. None) equal to NaN.
+
+    Args:
+        values (np.ndarray): The values.
+        other_values (np.ndarray): The other values.
+
+    Returns:
+        np.ndarray: Whether each pair of values is equal.
+    """
+    return (values == other_values) | (np.isnan(values) & np.isnan(other_values))
+
+
+def merge_groups(
+    table: EventTable,
+    reducer_name: str,
+    parent_name: str,
+    target: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    min_parent_size: int = 2,
+) -> None:
+    """Merge groups of consecutive target events into parent events.
+
+    As in events.merge_consecutive_action_events, the duration of each parent
+    (from its first to its last child) is removed from the timestamps of all
+    following events. Target events outside of the groups are discarded.
+
+    Args:
+        table (EventTable): The events.
+        reducer_name (str): The name of the reducer.
+        parent_name (str): The name of the parent events.
+        target (np.ndarray): Whether each row is a target event.
+        starts (np.ndarray): The start index of each group, in order.
+        ends (np.ndarray): The end index (exclusive) of each group.
+        min_parent_size (int): The minimum size of the groups merged into a
+            parent; smaller groups are kept as is.
+    """
+    rows = table.rows
+    timestamps = rows["timestamp"]
+    is_parent = ends - starts >= min_parent_size
+    parent_starts = starts[is_parent]
+    parent_ends = ends[is_parent]
+    inc = np.zeros(len(rows))
+    inc[parent_ends - 1] = timestamps[parent_ends - 1] - timestamps[parent_starts]
+    # the duration of a parent is removed after its first child (at its last)
+    dt = table.get_dt(reducer_name, inc)
+
+    # rows of non-target events, and the first of each group
+    keep = ~target
+    keep[starts] = True
+    new_rows = rows.copy()
+    new_rows["timestamp"] = timestamps - dt
+    reduced = np.zeros(len(rows), dtype=bool)
+    reduced[starts] = True
+
+    parent_rows = new_rows[parent_starts]
+    parent_rows["node"] = table.add_parents(
+        [
+            ParentEvent(parent_name, rows["node"][start:end])
+            for start, end in zip(parent_starts.tolist(), parent_ends.tolist())
+        ]
+    )
+    parent_rows["name"] = NAME_CODES[parent_name]
+    for field in ("mouse_x", "mouse_y", "mouse_dx", "mouse_dy"):
+        parent_rows[field] = np.nan
+    parent_rows["left_button"] = False
+    parent_rows["mouse_pressed"] = PRESSED_CODES[None]
+    parent_rows["key_name"] = -1
+    parent_rows["has_key"] = False
+    parent_rows["invalid_key"] = False
+    if parent_name == "move":
+        parent_rows["mouse_x"] = rows["mouse_x"][parent_ends - 1]
+        parent_rows["mouse_y"] = rows["mouse_y"][parent_ends - 1]
+    elif parent_name == "scroll":
+        parent_rows["mouse_x"] = rows["mouse_x"][parent_starts]
+        parent_rows["mouse_y"] = rows["mouse_y"][parent_starts]
+        bounds = np.stack([parent_starts, parent_ends], axis=1).ravel()
+        for field in ("mouse_dx", "mouse_dy"):
+            parent_rows[field] = np.add.reduceat(np.append(rows[field], 0), bounds)[::2]
+    new_rows[parent_starts] = parent_rows
+    table.update(new_rows[keep], reducer_name, reduced[keep])
+
+
+def remove_invalid_keyboard_events(table: EventTable) -> None:
+    """Remove invalid keyboard events (see events.remove_invalid_keyboard_events).
+
+    Args:
+        table (EventTable): The events.
+    """
+    table.update(table.rows[~table.rows["invalid_key"]])
+
+
+def merge_consecutive_mouse_move_events(table: EventTable) -> None:
+    """Merge consecutive mouse move events into a single move event.
+
+    See events.merge_consecutive_mouse_move_events (without by_diff_distance).
+
+    Args:
+        table (EventTable): The events.
+    """
+    target = table.rows["name"] == MOVE
+    starts, ends = get_runs(target)
+    merge_groups(table, "mouse_move", "move", target, starts, ends)
+
+
+def merge_consecutive_mouse_scroll_events(table: EventTable) -> None:
+    """Merge consecutive mouse scroll events into a single scroll event.
+
+    See events.merge_consecutive_mouse_scroll_events.
+
+    Args:
+        table (EventTable): The events.
+    """
+    target = table.rows["name"] == SCROLL
+    starts, ends = get_runs(target)
+    merge_groups(
+        table, "mouse_scroll", "scroll", target, starts, ends, min_parent_size=1
+    )
+
+
+def get_keyboard_groups(
+    rows: np.ndarray, target: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Split runs of keyboard events into groups in which named keys are pressed.
+
+    See get_group_idx_tups in events.merge_consecutive_keyboard_events: a group
+    starts when a named key is pressed while none are, and ends when the last
+    pressed named key is released. Pressing a pressed key, or releasing a
+    released key, does not change which keys are pressed, so the number of
+    pressed keys is the cumulative sum of the changes in the state of each key.
+
+    Args:
+        rows (np.ndarray): The events.
+        target (np.ndarray): Whether each row is a keyboard event.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The start and end index (exclusive) of each
+            group.
+    """
+    num_rows = len(rows)
+    starts, ends = get_runs(target)
+    if not len(starts):
+        return starts, ends
+    run_ids = get_run_ids(target)
+    names = rows["name"][target]
+    assert np.all((names == PRESS) | (names == RELEASE)), rows[target]
+
+    # the state (pressed or not) of the named key of each event after it, and
+    # before it (from the previous event of the same key in the run)
+    named_idxs = np.flatnonzero(target & (rows["key_name"] >= 0))
+    key_names = rows["key_name"][named_idxs]
+    order = np.lexsort((named_idxs, key_names, run_ids[named_idxs]))
+    sorted_idxs = named_idxs[order]
+    states = (rows["name"][sorted_idxs] == PRESS).astype(np.int64)
+    prev_states = np.zeros(len(sorted_idxs), dtype=np.int64)
+    same_key = (key_names[order][1:] == key_names[order][:-1]) & (
+        run_ids[sorted_idxs[1:]] == run_ids[sorted_idxs[:-1]]
+    )
+    prev_states[1:] = np.where(same_key, states[:-1], 0)
+    changes = np.zeros(num_rows, dtype=np.int64)
+    changes[sorted_idxs] = states - prev_states
+
+    # the number of pressed keys after each event, counted from its run start
+    num_pressed = np.cumsum(changes)
+    num_pressed_before_runs = num_pressed[starts] - changes[starts]
+    num_pressed[target] -= np.repeat(num_pressed_before_runs, ends - starts)
+    is_pressed = target & (num_pressed > 0)
+    was_pressed = np.zeros(num_rows, dtype=bool)
+    was_pressed[1:] = is_pressed[:-1]
+    was_pressed[starts] = False
+    group_start = is_pressed & ~was_pressed
+    group_end = was_pressed & ~is_pressed & target
+
+    # the boundaries of the groups of each run, from the run start
+    boundaries = np.unique(
+        np.stack(
+            [
+                np.concatenate(
+                    [
+                        np.arange(len(starts)),
+                        run_ids[group_start],
+                        run_ids[group_end],
+                    ]
+                ),
+                np.concatenate(
+                    [starts, np.flatnonzero(group_start), np.flatnonzero(group_end) + 1]
+                ),
+            ],
+            axis=1,
+        ),
+        axis=0,
+    ).reshape(-1, 2)
+    is_same_run = boundaries[1:, 0] == boundaries[:-1, 0]
+    group_starts = boundaries[:-1, 1][is_same_run]
+    group_ends = boundaries[1:, 1][is_same_run]
+    # the events after the last boundary of a run are a group, unless there is
+    # only one of them (as in get_group_idx_tups)
+    last_boundaries = boundaries[np.append(~is_same_run, True), 1]
+    is_last_group = last_boundaries < ends - 1
+    group_starts = np.concatenate([group_starts, last_boundaries[is_last_group]])
+    group_ends = np.concatenate([group_ends, ends[is_last_group]])
+    order = np.argsort(group_starts, kind="stable")
+    return group_starts[order], group_ends[order]
+
+
+def merge_consecutive_keyboard_events(
+    table: EventTable,
+    group_named_keys: bool = events.KEYBOARD_EVENTS_MERGE_GROUP_NAMED_KEYS,
+) -> None:
+    """Merge consecutive keyboard events into type events.
+
+    See events.merge_consecutive_keyboard_events.
+
+    Args:
+        table (EventTable): The events.
+        group_named_keys (bool): Whether to group events by the named keys
+            pressed, rather than merging each run of keyboard events.
+    """
+    target = table.rows["has_key"].copy()
+    if group_named_keys:
+        starts, ends = get_keyboard_groups(table.rows, target)
+    else:
+        starts, ends = get_runs(target)
+    merge_groups(table, "keyboard", "type", target, starts, ends)
+
+
+def remove_mouse_move_events(
+    table: EventTable,
+    reducer_name: str,
+    target: np.ndarray,
+    discard: np.ndarray,
+) -> None:
+    """Discard mouse move events, as children of the next kept target event.
+
+    See remove_redundant_mouse_move_events and remove_move_before_click in
+    events.py: the time from the previous event in the run (or to the next one,
+    for the first event of a run) is removed from the timestamps of all following
+    events, and discarded events after the last kept event of a run are dropped.
+
+    Args:
+        table (EventTable): The events.
+        reducer_name (str): The name of the reducer.
+        target (np.ndarray): Whether each row is a target event.
+        discard (np.ndarray): Whether each (target) row is discarded.
+    """
+    rows = table.rows
+    num_rows = len(rows)
+    timestamps = rows["timestamp"]
+    run_ids = get_run_ids(target)
+    has_prev = np.zeros(num_rows, dtype=bool)
+    has_prev[1:] = target[1:] & (run_ids[1:] == run_ids[:-1])
+    prev_dts = np.zeros(num_rows)
+    prev_dts[1:] = timestamps[1:] - timestamps[:-1]
+    next_dts = np.zeros(num_rows)
+    next_dts[:-1] = timestamps[1:] - timestamps[:-1]
+    inc = np.where(discard, np.where(has_prev, prev_dts, next_dts), 0)
+    dt = table.get_dt(reducer_name, inc)
+    kept_target = target & ~discard
+
+    # the next kept target event of each discarded event, in the same run
+    idxs = np.arange(num_rows)
+    next_kept_idxs = np.minimum.accumulate(np.where(kept_target, idxs, num_rows)[::-1])[
+        ::-1
+    ]
+    discarded_idxs = np.flatnonzero(discard)
+    parent_idxs = next_kept_idxs[discarded_idxs]
+    has_parent = parent_idxs < num_rows
+    has_parent[has_parent] = (
+        run_ids[parent_idxs[has_parent]] == run_ids[discarded_idxs[has_parent]]
+    )
+    discarded_idxs = discarded_idxs[has_parent]
+    parent_idxs = parent_idxs[has_parent]
+    if len(parent_idxs):
+        split_idxs = np.flatnonzero(np.diff(parent_idxs)) + 1
+        for parent_idx, child_idxs in zip(
+            parent_idxs[np.concatenate([[0], split_idxs])].tolist(),
+            np.split(discarded_idxs, split_idxs),
+        ):
+            parent_node = int(rows["node"][parent_idx])
+            table.children[parent_node] = rows["node"][child_idxs]
+            table.first_nodes[parent_node] = table.first_nodes[
+                rows["node"][child_idxs[0]]
+            ]
+
+    new_rows = rows.copy()
+    new_rows["timestamp"] = timestamps - dt
+    keep = ~discard
+    table.update(new_rows[keep], reducer_name, kept_target[keep])
+
+
+def remove_redundant_mouse_move_events(table: EventTable) -> None:
+    """Remove mouse move events that don't change the mouse position.
+
+    See events.remove_redundant_mouse_move_events.
+
+    Args:
+        table (EventTable): The events.
+    """
+    rows = table.rows
+    target = np.isin(rows["name"], (MOVE, CLICK))
+    run_ids = get_run_ids(target)
+    same_as_prev = np.zeros(len(rows), dtype=bool)
+    same_as_prev[1:] = (
+        target[1:]
+        & (run_ids[1:] == run_ids[:-1])
+        & is_equal(rows["mouse_x"][1:], rows["mouse_x"][:-1])
+        & is_equal(rows["mouse_y"][1:], rows["mouse_y"][:-1])
+    )
+    same_as_next = np.zeros(len(rows), dtype=bool)
+    same_as_next[:-1] = same_as_prev[1:]
+    discard = (rows["name"] == MOVE) & target & (same_as_prev | same_as_next)
+    remove_mouse_move_events(table, "redundant_mouse_move", target, discard)
+
+
+def remove_move_before_click(table: EventTable) -> None:
+    """Remove mouse moves immediately followed by a click in the same location.
+
+    See events.remove_move_before_click.
+
+    Args:
+        table (EventTable): The events.
+    """
+    rows = table.rows
+    target = np.isin(rows["name"], (MOVE, CLICK, SINGLECLICK, DOUBLECLICK))
+    run_ids = get_run_ids(target)
+    threshold = events.MOUSE_MOVE_EVENT_MERGE_CLICK_DISTANCE_THRESHOLD
+    same_as_next = np.zeros(len(rows), dtype=bool)
+    same_as_next[:-1] = (
+        target[1:]
+        & (run_ids[1:] == run_ids[:-1])
+        & ~(np.abs(rows["mouse_x"][1:] - rows["mouse_x"][:-1]) > threshold)
+        & ~(np.abs(rows["mouse_y"][1:] - rows["mouse_y"][:-1]) > threshold)
+    )
+    discard = (rows["name"] == MOVE) & same_as_next
+    remove_mouse_move_events(table, "remove_move_before_click", target, discard)
+
+
+def merge_consecutive_mouse_click_events(table: EventTable) -> None:
+    """Merge consecutive mouse click events into singleclick and doubleclick events.
+
+    See events.merge_consecutive_mouse_click_events. Clicks are few, so the
+    presses and releases of each run are paired in Python, on the columns.
+
+    Args:
+        table (EventTable): The events.
+    """
+    rows = table.rows
+    target = (rows["name"] == CLICK) & rows["left_button"]
+    starts, ends = get_runs(target)
+    inc = np.zeros(len(rows))
+    keep = np.ones(len(rows), dtype=bool)
+    # the first press, release timestamp, name and children of each parent
+    parent_idxs = []
+    parent_release_timestamps = []
+    parent_names = []
+    parent_children = []
+    timestamps = rows["timestamp"].tolist()
+    mouse_xs = rows["mouse_x"].tolist()
+    mouse_ys = rows["mouse_y"].tolist()
+    is_pressed = (rows["mouse_pressed"] == PRESSED_CODES[True]).tolist()
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        first_event = table.action_events[int(rows["node"][start])]
+        double_click_distance = get_recording_attr(
+            first_event,
+            "double_click_distance_pixels",
+            events.utils.get_double_click_distance_pixels,
+        )
+        double_click_interval = get_recording_attr(
+            first_event,
+            "double_click_interval_seconds",
+            events.utils.get_double_click_interval_seconds,
+        )
+        press_to_press_t = {}
+        press_to_release_t = {}
+        prev_pressed_idx = None
+        for idx in range(start, end):
+            if is_pressed[idx]:
+                if prev_pressed_idx is not None:
+                    if (
+                        timestamps[idx] - timestamps[prev_pressed_idx]
+                        <= double_click_interval
+                        and abs(mouse_xs[idx] - mouse_xs[prev_pressed_idx])
+                        <= double_click_distance
+                        and abs(mouse_ys[idx] - mouse_ys[prev_pressed_idx])
+                        <= double_click_distance
+                    ):
+                        press_to_press_t[timestamps[prev_pressed_idx]] = timestamps[idx]
+                prev_pressed_idx = idx
+            elif prev_pressed_idx is not None:
+                press_to_release_t[timestamps[prev_pressed_idx]] = timestamps[idx]
+
+        t_to_idx = {timestamps[idx]: idx for idx in range(start, end)}
+        skip_timestamps = set()
+        for idx in range(start, end):
+            timestamp = timestamps[idx]
+            if timestamp in skip_timestamps:
+                keep[idx] = False
+                continue
+            if timestamp in press_to_press_t:
+                release_t = press_to_release_t[timestamp]
+                next_press_t = press_to_press_t[timestamp]
+                next_release_t = press_to_release_t[next_press_t]
+                skip_timestamps.update((release_t, next_press_t, next_release_t))
+                parent_names.append("doubleclick")
+                parent_children.append(
+                    [idx, t_to_idx[release_t], t_to_idx[next_press_t]]
+                    + [t_to_idx[next_release_t]]
+                )
+            elif timestamp in press_to_release_t:
+                release_t = next_release_t = press_to_release_t[timestamp]
+                skip_timestamps.add(release_t)
+                parent_names.append("singleclick")
+                parent_children.append([idx, t_to_idx[release_t]])
+            else:
+                continue
+            inc[idx] = next_release_t - timestamp
+            parent_idxs.append(idx)
+            parent_release_timestamps.append(next_release_t)
+
+    dt = table.get_dt("mouse_click", inc)
+    new_rows = rows.copy()
+    new_rows["timestamp"] = rows["timestamp"] - dt
+    parent_idxs = np.array(parent_idxs, dtype=np.int64)
+    if len(parent_idxs):
+        parent_rows = new_rows[parent_idxs]
+        parent_rows["node"] = table.add_parents(
+            [
+                ParentEvent(name, rows["node"][children])
+                for name, children in zip(parent_names, parent_children)
+            ]
+        )
+        parent_rows["name"] = [NAME_CODES[name] for name in parent_names]
+        parent_rows["timestamp"] = np.array(parent_release_timestamps) - dt[parent_idxs]
+        parent_rows["mouse_dx"] = np.nan
+        parent_rows["mouse_dy"] = np.nan
+        parent_rows["mouse_pressed"] = PRESSED_CODES[None]
+        parent_rows["key_name"] = -1
+        parent_rows["has_key"] = False
+        parent_rows["invalid_key"] = False
+        new_rows[parent_idxs] = parent_rows
+    table.update(new_rows[keep], "mouse_click", target[keep])
+
+
+def get_recording_attr(
+    event: models.ActionEvent, attr_name: str, fallback: Callable[[], float]
+) -> float:
+    """Get an attribute of the recording of an event, or a fallback value.
+
+    Args:
+        event (models.ActionEvent): The event.
+        attr_name (str): The name of the recording attribute.
+        fallback (Callable[[], float]): Returns the fallback value.
+
+    Returns:
+        float: The attribute value.
+    """
+    attr = getattr(event.recording, attr_name) if event.recording else None
+    if attr is None:
+        fallback_value = fallback()
+        logger.warning(f"{attr=} for {attr_name=}; using {fallback_value=}")
+        attr = fallback_value
+    return attr
+
+
+# the columnar reducer of each list reducer in events.py
+REDUCERS = {
+    events.remove_invalid_keyboard_events: remove_invalid_keyboard_events,
+    events.remove_redundant_mouse_move_events: remove_redundant_mouse_move_events,
+    events.merge_consecutive_keyboard_events: merge_consecutive_keyboard_events,
+    events.merge_consecutive_mouse_move_events: merge_consecutive_mouse_move_events,
+    events.merge_consecutive_mouse_scroll_events: (
+        merge_consecutive_mouse_scroll_events
+    ),
+    events.merge_consecutive_mouse_click_events: (merge_consecutive_mouse_click_events),
+    events.remove_move_before_click: remove_move_before_click,
+}
+
+
+def is_supported(process_fns: list[Callable]) -> bool:
+    """Whether all list reducers have a columnar reducer.
+
+    Args:
+        process_fns (list[Callable]): The list reducers, from events.py.
+
+    Returns:
+        bool: Whether reduce_events supports the reducers.
+    """
+    return not events.USE_SCREENSHOT_DIFFS and all(
+        process_fn in REDUCERS for process_fn in process_fns
+    )
+
+
+def reduce_table(table: EventTable, process_fns: list[Callable]) -> None:
+    """Apply the columnar equivalent of list reducers to the events of a table.
+
+    Args:
+        table (EventTable): The events.
+        process_fns (list[Callable]): The list reducers, from events.py.
+    """
+    assert is_supported(process_fns), process_fns
+    for process_fn in process_fns:
+        num_events_before = len(table.rows)
+        REDUCERS[process_fn](table)
+        num_events_removed = num_events_before - len(table.rows)
+        logger.info(f"name={process_fn.__name__} {num_events_removed=}")
+        # merged events take the timestamps of their children, e.g. of the first
+        # press, so the rows may be out of order without the events being invalid
+        if np.any(np.diff(table.rows["timestamp"]) < 0):
+            logger.debug(f"timestamps out of order after {process_fn.__name__}")
+
+
+def reduce_events(
+    action_events: list[models.ActionEvent], process_fns: list[Callable]
+) -> list[models.ActionEvent]:
+    """Apply the columnar equivalent of list reducers to action events.
+
+    Args:
+        action_events (list[models.ActionEvent]): The action events.
+        process_fns (list[Callable]): The list reducers, from events.py.
+
+    Returns:
+        list[models.ActionEvent]: The reduced events, as returned by applying the
+            list reducers in turn.
+    """
+    table = EventTable(action_events)
+    reduce_table(table, process_fns)
+    return table.materialize()
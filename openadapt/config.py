@@ -29,6 +29,7 @@ CAPTURE_DIR_PATH = (DATA_DIR_PATH / "captures").absolute()
 VIDEO_DIR_PATH = DATA_DIR_PATH / "videos"
 DATABASE_FILE_PATH = (DATA_DIR_PATH / "openadapt.db").absolute()
 DATABASE_LOCK_FILE_PATH = DATA_DIR_PATH / "openadapt.db.lock"
+ARCHIVE_DIR_PATH = (DATA_DIR_PATH / "archive").absolute()
 
 STOP_STRS = [
     "oa.stop",
@@ -143,12 +144,19 @@ class Config(BaseSettings):
     # if false, only write video events corresponding to screenshots
     RECORD_FULL_VIDEO: bool
     RECORD_IMAGES: bool
+    # codec of recorded screenshot images: png, webp, qoi (with the qoi extra) or
+    # raw; unavailable codecs fall back to png (see image_codec.validate_codec)
+    SCREENSHOT_IMAGE_CODEC: str = "png"
+    # store recorded screenshot images as deduplicated tiles (see db.tiles)
+    RECORD_IMAGE_TILES: bool = False
     # useful for debugging but expensive computationally
     LOG_MEMORY: bool
     REPLAY_STRIP_ELEMENT_STATE: bool = True
     VIDEO_ENCODING: str = "libx264"
     VIDEO_PIXEL_FORMAT: str = "yuv444p"
     VIDEO_DIR_PATH: str = str(VIDEO_DIR_PATH)
+    # duration in seconds of each video file of a recording (0 for a single file)
+    VIDEO_SEGMENT_DURATION: float = 300
     # sequences that when typed, will stop the recording of ActionEvents in record.py
     STOP_SEQUENCES: list[list[str]] = [
         list(stop_str) for stop_str in STOP_STRS
@@ -0,0 +1,488 @@
+"""Moves old recordings out of the main database into per-recording archive files.
+
+An archived recording keeps its row (and its summary) in the main database, with
+Recording.archive_path pointing to a SQLite file holding the rest of its rows (see
+db.copy_recording_data). Its video files are moved next to the archive file.
+Archived recordings are restored into the main database ("rehydrated"), under the
+database lock, when they or their rows are requested through crud (e.g.
+crud.get_recording or crud.get_action_events).
+
+Usage:
+    python -m openadapt.db.archive [--min-age-days <days> | --id <recording_id>] \
+        [--restore] [--yes]
+"""
+
+from sys import stdout
+import itertools
+import os
+import shutil
+import threading
+import time
+
+from sqlalchemy.orm import Session as SaSession
+import click
+import sqlalchemy as sa
+
+from openadapt import video
+from openadapt.config import ARCHIVE_DIR_PATH
+from openadapt.custom_logger import logger
+from openadapt.db import crud, db
+from openadapt.models import (
+    ActionEvent,
+    AudioInfo,
+    BrowserEvent,
+    CompressionDictionary,
+    MemoryStat,
+    PerformanceStat,
+    ProcessedEvents,
+    Recording,
+    RecordingSummary,
+    Screenshot,
+    ScreenshotTile,
+    WindowEvent,
+    WindowState,
+)
+
+# tables whose rows are moved into the archive, in the order in which they are
+# restored (i.e. tables referenced by other tables first)
+ARCHIVED_TABLES = (
+    ScreenshotTile,
+    Screenshot,
+    WindowEvent,
+    BrowserEvent,
+    AudioInfo,
+    PerformanceStat,
+    MemoryStat,
+    ActionEvent,
+)
+SECONDS_PER_DAY = 24 * 60 * 60
+
+rehydrate_lock = threading.Lock()
+
+
+def get_archive_path(recording_timestamp: float) -> str:
+    """Get the path of the archive file of a recording.
+
+    Args:
+        recording_timestamp (float): The timestamp of the recording.
+
+    Returns:
+        str: The path of the archive file.
+    """
+    return os.path.join(ARCHIVE_DIR_PATH, f"oa_recording-{recording_timestamp}.db")
+
+
+def get_archived_video_file_path(video_file_path: str) -> str:
+    """Get the path of a video file of a recording once it is archived.
+
+    Args:
+        video_file_path (str): The path of the video file (see
+            video.get_video_file_path).
+
+    Returns:
+        str: The path of the video file in the archive directory.
+    """
+    return os.path.join(ARCHIVE_DIR_PATH, os.path.basename(video_file_path))
+
+
+def get_archived_video_file_paths(recording_timestamp: float) -> list[str]:
+    """Get the paths of the archived video files of a recording, in segment order.
+
+    Args:
+        recording_timestamp (float): The timestamp of the recording.
+
+    Returns:
+        list[str]: The paths of the video files in the archive directory.
+    """
+    archived_video_file_paths = []
+    for segment_idx in itertools.count():
+        archived_video_file_path = get_archived_video_file_path(
+            video.get_video_file_path(recording_timestamp, segment_idx)
+        )
+        if not os.path.exists(archived_video_file_path):
+            break
+        archived_video_file_paths.append(archived_video_file_path)
+    return archived_video_file_paths
+
+
+def select_recordings(
+    session: SaSession,
+    min_age_days: float,
+    now: float | None = None,
+) -> list[Recording]:
+    """Select the finished, unarchived recordings older than min_age_days.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        min_age_days (float): The minimum age of the recordings in days.
+        now (float, optional): The current timestamp. Defaults to time.time().
+
+    Returns:
+        list[Recording]: The recordings, oldest first.
+    """
+    now = time.time() if now is None else now
+    return (
+        session.query(Recording)
+        .filter(
+            Recording.archive_path == None,  # noqa: E711
+            Recording.timestamp < now - min_age_days * SECONDS_PER_DAY,
+            Recording.id.in_(sa.select(RecordingSummary.recording_id)),
+        )
+        .order_by(Recording.timestamp)
+        .all()
+    )
+
+
+def _count_rows(connection: sa.engine.Connection, recording_id: int) -> dict:
+    """Count the rows of a recording in each archived table."""
+    return {
+        table.__tablename__: connection.execute(
+            sa.text(
+                f"SELECT COUNT(*) FROM {table.__tablename__}"
+                " WHERE recording_id = :recording_id"
+            ),
+            {"recording_id": recording_id},
+        ).scalar()
+        for table in ARCHIVED_TABLES
+    }
+
+
+def archive_recording(session: SaSession, recording: Recording) -> str:
+    """Move the rows and video files of a recording into its archive.
+
+    Args:
+        session (sa.orm.Session): A read-and-write database session.
+        recording (Recording): The recording to archive.
+
+    Returns:
+        str: The path of the archive file.
+    """
+    assert not recording.archive_path, recording.archive_path
+    start_time = time.perf_counter()
+    session.commit()
+    os.makedirs(ARCHIVE_DIR_PATH, exist_ok=True)
+    archive_path = get_archive_path(recording.timestamp)
+    if os.path.exists(archive_path):
+        os.remove(archive_path)
+
+    archive_engine = sa.create_engine(f"sqlite:///{archive_path}")
+    try:
+        source_engine = session.get_bind()
+        if not db.copy_recording_data(source_engine, archive_engine, recording.id):
+            raise RuntimeError(f"Failed to copy {recording.id=} to {archive_path=}")
+        with source_engine.connect() as connection:
+            num_rows = _count_rows(connection, recording.id)
+        with archive_engine.connect() as connection:
+            num_archived_rows = _count_rows(connection, recording.id)
+        if num_rows != num_archived_rows:
+            raise RuntimeError(
+                f"Archive is incomplete: {num_rows=} {num_archived_rows=}"
+            )
+    except Exception:
+        archive_engine.dispose()
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+        raise
+    archive_engine.dispose()
+
+    try:
+        # the processed events refer to the ids of the archived rows, which change
+        # when they are restored
+        crud.delete_recording_rows(
+            session,
+            recording.id,
+            [
+                table
+                for table in crud.RECORDING_TABLES
+                if table in ARCHIVED_TABLES or table is ProcessedEvents
+            ],
+        )
+        recording.archive_path = archive_path
+        session.commit()
+    except Exception:
+        session.rollback()
+        os.remove(archive_path)
+        raise
+
+    for video_file_path in video.get_video_file_paths(recording.timestamp):
+        shutil.move(video_file_path, get_archived_video_file_path(video_file_path))
+
+    logger.info(
+        f"Archived {recording.id=} to {archive_path} in"
+        f" {time.perf_counter() - start_time:.2f}s"
+    )
+    return archive_path
+
+
+def _restore_rows(
+    session: SaSession,
+    archive_connection: sa.engine.Connection,
+    recording_id: int,
+) -> None:
+    """Insert the rows of an archived recording into the main database.
+
+    Rows keep their ids unless ids in the same range have been reused in the main
+    database since the recording was archived, in which case the ids of the table
+    and the foreign keys referencing it are shifted past the largest id.
+
+    Args:
+        session (sa.orm.Session): A read-and-write session of the main database.
+        archive_connection (sa.engine.Connection): A connection to the archive.
+        recording_id (int): The id of the recording.
+    """
+    id_offsets = {}
+    for table in ARCHIVED_TABLES:
+        table_name = table.__tablename__
+        # select and insert raw values, bypassing type processing
+        rows = [
+            dict(row._mapping)
+            for row in archive_connection.execute(
+                sa.text(
+                    f"SELECT * FROM {table_name} WHERE recording_id = :recording_id"
+                ),
+                {"recording_id": recording_id},
+            )
+        ]
+        if not rows:
+            continue
+        ids = [row["id"] for row in rows]
+        num_conflicts = session.execute(
+            sa.select(sa.func.count(table.id)).where(
+                table.id.between(min(ids), max(ids))
+            )
+        ).scalar()
+        id_offset = 0
+        if num_conflicts:
+            max_id = session.execute(sa.select(sa.func.max(table.id))).scalar()
+            id_offset = max_id + 1 - min(ids)
+        id_offsets[table_name] = id_offset
+
+        fk_offsets = {
+            fk.parent.name: id_offsets.get(fk.column.table.name, 0)
+            for fk in table.__table__.foreign_keys
+            if fk.column.table.name != Recording.__tablename__
+        }
+        # self-referencing foreign keys (e.g. ActionEvent.parent_id)
+        for fk in table.__table__.foreign_keys:
+            if fk.column.table.name == table_name:
+                fk_offsets[fk.parent.name] = id_offset
+        for row in rows:
+            row["id"] += id_offset
+            for column_name, fk_offset in fk_offsets.items():
+                if row.get(column_name) is not None:
+                    row[column_name] += fk_offset
+
+        columns = [sa.column(column_name) for column_name in rows[0]]
+        session.execute(sa.insert(sa.table(table_name, *columns)), rows)
+
+    window_state_rows = [
+        dict(row._mapping)
+        for row in archive_connection.execute(
+            sa.text(f"SELECT hash, state FROM {WindowState.__tablename__}")
+        )
+    ]
+    if window_state_rows:
+        # existing states are ignored (see WindowState)
+        session.execute(
+            sa.insert(
+                sa.table(
+                    WindowState.__tablename__, sa.column("hash"), sa.column("state")
+                )
+            ),
+            window_state_rows,
+        )
+
+    # the dictionaries of compressed values (see openadapt.db.compression)
+    dictionary_table = CompressionDictionary.__table__
+    if not sa.inspect(archive_connection).has_table(dictionary_table.name):
+        return
+    existing_dict_ids = set(
+        session.execute(sa.select(dictionary_table.c.dict_id)).scalars()
+    )
+    dictionary_rows = [
+        {key: value for key, value in row._mapping.items() if key != "id"}
+        for row in archive_connection.execute(dictionary_table.select())
+        if row.dict_id not in existing_dict_ids
+    ]
+    if dictionary_rows:
+        session.execute(sa.insert(dictionary_table), dictionary_rows)
+
+
+def _restore_recording(session: SaSession, recording_id: int) -> str | None:
+    """Restore the rows of an archived recording into the main database.
+
+    Args:
+        session (sa.orm.Session): The database session the recording belongs to.
+        recording_id (int): The id of the archived recording.
+
+    Returns:
+        str | None: The path of the archive file, or None if the recording was
+            restored concurrently.
+    """
+    with SaSession(bind=session.get_bind()) as write_session:
+        # claim the recording first, so that it is only restored once
+        archive_path = write_session.execute(
+            sa.select(Recording.archive_path).where(Recording.id == recording_id)
+        ).scalar()
+        num_claimed = write_session.execute(
+            sa.update(Recording)
+            .where(
+                Recording.id == recording_id,
+                Recording.archive_path.is_not(None),
+            )
+            .values(archive_path=None)
+        ).rowcount
+        if not num_claimed:
+            return None
+
+        archive_engine = sa.create_engine(f"sqlite:///{archive_path}")
+        try:
+            with archive_engine.connect() as archive_connection:
+                _restore_rows(write_session, archive_connection, recording_id)
+            write_session.commit()
+        except Exception:
+            write_session.rollback()
+            raise
+        finally:
+            archive_engine.dispose()
+    return archive_path
+
+
+def rehydrate_recording(session: SaSession, recording: Recording) -> float | None:
+    """Restore the rows and video files of an archived recording.
+
+    Args:
+        session (sa.orm.Session): The database session the recording belongs to.
+            May be read-only; the recording is restored in a separate session and
+            expired in this one.
+        recording (Recording): The archived recording.
+
+    Returns:
+        float | None: The time taken to restore the recording in seconds, or None
+            if the recording was restored concurrently.
+
+    Raises:
+        RuntimeError: If the database lock could not be acquired.
+    """
+    start_time = time.perf_counter()
+    recording_id = recording.id
+    recording_timestamp = recording.timestamp
+    with rehydrate_lock:
+        # the database lock may already be held by this thread, e.g. in main;
+        # if another thread holds it, wait for it to be released
+        acquire_lock = not crud.is_db_lock_held()
+        if acquire_lock and not crud.acquire_db_lock():
+            raise RuntimeError(
+                f"Failed to acquire database lock to rehydrate {recording_id=}."
+            )
+        try:
+            archive_path = _restore_recording(session, recording_id)
+        finally:
+            if acquire_lock:
+                crud.release_db_lock()
+    if archive_path is None:
+        session.expire(recording)
+        return None
+
+    for segment_idx, archived_video_file_path in enumerate(
+        get_archived_video_file_paths(recording_timestamp)
+    ):
+        shutil.move(
+            archived_video_file_path,
+            video.get_video_file_path(recording_timestamp, segment_idx),
+        )
+    os.remove(archive_path)
+    session.expire(recording)
+
+    duration = time.perf_counter() - start_time
+    logger.info(f"Rehydrated {recording_id=} from {archive_path} in {duration:.2f}s")
+    return duration
+
+
+def delete_archive(archive_path: str, recording_timestamp: float) -> None:
+    """Delete the archive file and the archived video files of a recording.
+
+    Args:
+        archive_path (str): The path of the archive file.
+        recording_timestamp (float): The timestamp of the recording.
+    """
+    for file_path in [
+        archive_path,
+        *get_archived_video_file_paths(recording_timestamp),
+    ]:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            logger.info(f"Deleted archived file: {file_path}")
+
+
+@click.command()
+@click.option("--min-age-days", type=float, help="Archive recordings older than this.")
+@click.option("--id", "recording_id", type=int, help="Archive recording by ID.")
+@click.option("--restore", is_flag=True, help="Restore instead of archive.")
+@click.option("--yes", is_flag=True, help="Do not ask for confirmation.")
+def main(
+    min_age_days: float | None,
+    recording_id: int | None,
+    restore: bool,
+    yes: bool,
+) -> int:
+    """Archives (or restores) recordings."""
+    logger.remove()
+    logger.add(
+        stdout,
+        colorize=True,
+        format="<blue>[DB]          </blue><yellow>{message}</yellow>",
+    )
+    if (min_age_days is None) == (recording_id is None):
+        logger.error("Specify exactly one of --min-age-days and --id.")
+        return 1
+
+    # the database lock is held while recording
+    if not crud.acquire_db_lock(timeout=5):
+        logger.error("Failed to acquire database lock. Is a recording in progress?")
+        return 1
+
+    try:
+        with crud.get_new_session(read_and_write=True) as session:
+            if recording_id is not None:
+                recordings = (
+                    session.query(Recording).filter(Recording.id == recording_id).all()
+                )
+            elif restore:
+                recordings = (
+                    session.query(Recording)
+                    .filter(
+                        Recording.archive_path != None,  # noqa: E711
+                        Recording.timestamp
+                        < time.time() - min_age_days * SECONDS_PER_DAY,
+                    )
+                    .all()
+                )
+            else:
+                recordings = select_recordings(session, min_age_days)
+            recordings = [
+                recording
+                for recording in recordings
+                if bool(recording.archive_path) == restore
+            ]
+            if not recordings:
+                logger.info("No recordings to process.")
+                return 0
+            action = "restore" if restore else "archive"
+            if not yes and not click.confirm(
+                f"Are you sure you want to {action} {len(recordings)} recordings?"
+            ):
+                logger.info("Aborting...")
+                return 0
+            for recording in recordings:
+                if restore:
+                    rehydrate_recording(session, recording)
+                else:
+                    archive_recording(session, recording)
+    finally:
+        crud.release_db_lock()
+    return 0
+
+
+if __name__ == "__main__":
+    main()
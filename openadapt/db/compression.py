@@ -0,0 +1,260 @@
+"""Compression of JSON column values.
+
+Values are serialized with orjson and compressed with zstd. Compressed values are
+identified by their leading bytes, so plain JSON written before compression was
+introduced can always be read back, as can zlib compressed values.
+
+Compression of small values (e.g. accessibility trees) improves considerably with
+a zstd dictionary trained on samples of the column. Dictionaries are optional:
+once trained with train_dictionary, a dictionary is stored in the
+compression_dictionary table of the database (see models.CompressionDictionary)
+and used for all values subsequently written to the column. Values compressed
+with a dictionary cannot be read without it, so dictionaries are copied with the
+data of recordings (see db.copy_recording_data and archive.archive_recording).
+
+Module: compression.py
+"""
+
+from typing import Any
+import hashlib
+import threading
+import time
+import zlib
+
+import orjson
+import sqlalchemy as sa
+import zstandard
+
+from openadapt.custom_logger import logger
+from openadapt.db import db
+
+ZSTD_LEVEL = 3
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# first byte of a zlib stream with the default 32K window (0x78 is "x", which
+# cannot start a JSON document)
+ZLIB_MAGIC = b"\x78"
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+_dictionaries_by_name = {}
+_dictionaries_by_id = {}
+_dictionaries_loaded = False
+_dictionaries_lock = threading.Lock()
+# zstd (de)compressors are not thread safe, so they are cached per thread
+_local = threading.local()
+
+
+def _add_dictionary(name: str, data: bytes) -> zstandard.ZstdCompressionDict:
+    dictionary = zstandard.ZstdCompressionDict(data)
+    _dictionaries_by_name[name] = dictionary
+    _dictionaries_by_id[dictionary.dict_id()] = dictionary
+    return dictionary
+
+
+def load_dictionaries(engine: sa.engine.Engine | None = None) -> None:
+    """Load the dictionaries stored in a database.
+
+    Args:
+        engine (sa.engine.Engine | None): The engine of the database. Defaults to
+            the engine of the main database.
+    """
+    global _dictionaries_loaded
+
+    # avoid circular import
+    from openadapt.models import CompressionDictionary
+
+    table = CompressionDictionary.__table__
+    query = sa.select(table.c.name, table.c.data).order_by(table.c.id)
+    with _dictionaries_lock:
+        try:
+            with (engine or db.engine).connect() as connection:
+                rows = connection.execute(query).all()
+        except sa.exc.OperationalError as exc:
+            # e.g. a database which has not been migrated yet
+            logger.warning(f"Failed to load compression dictionaries: {exc}")
+            rows = []
+        # the latest dictionary of each name is used for compression
+        for name, data in rows:
+            _add_dictionary(name, data)
+        if engine is None:
+            _dictionaries_loaded = True
+
+
+def _load_dictionaries() -> None:
+    """Load the dictionaries of the main database (once per process)."""
+    if not _dictionaries_loaded:
+        load_dictionaries()
+
+
+def get_dictionary(name: str | None) -> zstandard.ZstdCompressionDict | None:
+    """Get the stored zstd dictionary with the given name, if any.
+
+    Args:
+        name (str | None): The name of the dictionary, e.g. "window_event.state".
+
+    Returns:
+        zstandard.ZstdCompressionDict | None: The dictionary, or None if no
+            dictionary has been trained for the name.
+    """
+    if name is None:
+        return None
+    _load_dictionaries()
+    return _dictionaries_by_name.get(name)
+
+
+def train_dictionary(
+    name: str,
+    samples: list[Any],
+    dict_size: int = 112640,
+    save: bool = True,
+    engine: sa.engine.Engine | None = None,
+) -> zstandard.ZstdCompressionDict:
+    """Train a zstd dictionary on sample values of a column.
+
+    Args:
+        name (str): The name of the dictionary, e.g. "window_event.state".
+        samples (list): Sample (deserialized) values of the column.
+        dict_size (int): The maximum size of the dictionary in bytes.
+        save (bool): Whether to store the dictionary so that it is used for values
+            subsequently written to the column.
+        engine (sa.engine.Engine | None): The engine of the database storing the
+            dictionary. Defaults to the engine of the main database.
+
+    Returns:
+        zstandard.ZstdCompressionDict: The trained dictionary.
+    """
+    # avoid circular import
+    from openadapt.models import CompressionDictionary
+
+    _load_dictionaries()
+    dictionary = zstandard.train_dictionary(
+        dict_size,
+        [orjson.dumps(sample, option=ORJSON_OPTIONS) for sample in samples],
+    )
+    if save:
+        data = dictionary.as_bytes()
+        with (engine or db.engine).begin() as connection:
+            connection.execute(
+                sa.insert(CompressionDictionary),
+                {
+                    "name": name,
+                    "dict_id": dictionary.dict_id(),
+                    "timestamp": time.time(),
+                    "data": data,
+                },
+            )
+        with _dictionaries_lock:
+            dictionary = _add_dictionary(name, data)
+        _local.__dict__.clear()
+        logger.info(f"Saved {name=} {dictionary.dict_id()=}")
+    return dictionary
+
+
+def _get_compressor(
+    dictionary: zstandard.ZstdCompressionDict | None,
+) -> zstandard.ZstdCompressor:
+    key = ("compressor", dictionary.dict_id() if dictionary else None)
+    compressor = _local.__dict__.get(key)
+    if compressor is None:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+        _local.__dict__[key] = compressor
+    return compressor
+
+
+def _get_decompressor(dict_id: int) -> zstandard.ZstdDecompressor:
+    key = ("decompressor", dict_id)
+    decompressor = _local.__dict__.get(key)
+    if decompressor is None:
+        dictionary = None
+        if dict_id:
+            _load_dictionaries()
+            if dict_id not in _dictionaries_by_id:
+                # e.g. trained in another process
+                load_dictionaries()
+            dictionary = _dictionaries_by_id.get(dict_id)
+            if dictionary is None:
+                raise ValueError(f"Missing compression dictionary {dict_id=}")
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        _local.__dict__[key] = decompressor
+    return decompressor
+
+
+def compress_bytes(
+    data: bytes,
+    dictionary: zstandard.ZstdCompressionDict | None = None,
+) -> bytes:
+    """Compress bytes with zstd.
+
+    Args:
+        data (bytes): The data to compress.
+        dictionary (zstandard.ZstdCompressionDict | None): The dictionary to use.
+
+    Returns:
+        bytes: The compressed data.
+    """
+    return _get_compressor(dictionary).compress(data)
+
+
+def decompress_bytes(data: bytes) -> bytes:
+    """Decompress bytes compressed with compress_bytes.
+
+    Args:
+        data (bytes): The compressed data. Data that is neither zstd nor zlib
+            compressed is returned as is.
+
+    Returns:
+        bytes: The decompressed data.
+    """
+    if data.startswith(ZSTD_MAGIC):
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        return _get_decompressor(dict_id).decompress(data)
+    if data.startswith(ZLIB_MAGIC):
+        return zlib.decompress(data)
+    return data
+
+
+def compress_json(
+    value: Any,
+    dictionary_name: str | None = None,
+    dictionary: zstandard.ZstdCompressionDict | None = None,
+) -> bytes:
+    """Serialize and compress a JSON value.
+
+    Args:
+        value (Any): The value to compress.
+        dictionary_name (str | None): The name of the dictionary to use, if one has
+            been trained.
+        dictionary (zstandard.ZstdCompressionDict | None): A dictionary to use
+            instead of the one saved under dictionary_name.
+
+    Returns:
+        bytes: The compressed value.
+    """
+    data = orjson.dumps(value, option=ORJSON_OPTIONS)
+    return compress_bytes(data, dictionary or get_dictionary(dictionary_name))
+
+
+def decompress_json(data: bytes | str) -> Any:
+    """Decompress and deserialize a JSON value.
+
+    Args:
+        data (bytes | str): The compressed value, or uncompressed JSON.
+
+    Returns:
+        Any: The value.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = decompress_bytes(bytes(data))
+    return orjson.loads(data)
+
+
+def hash_json(value: Any) -> str:
+    """Get a hash of a JSON value that does not depend on the order of its keys.
+
+    Args:
+        value (Any): The value to hash.
+
+    Returns:
+        str: The hex digest of the SHA-256 hash of the serialized value.
+    """
+    data = orjson.dumps(value, option=ORJSON_OPTIONS | orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(data).hexdigest()
@@ -5,18 +5,28 @@ Module: crud.py
 
 from typing import Any, TypeVar
 import asyncio
+import atexit
+import functools
 import json
 import os
+import threading
 import time
 
 from sqlalchemy.orm import Session as SaSession
-from sqlalchemy.orm import joinedload, subqueryload
-import psutil
+from sqlalchemy.orm import joinedload, selectinload, subqueryload
 import sqlalchemy as sa
 
+try:
+    import fcntl
+except ImportError:
+    # windows
+    fcntl = None
+    import msvcrt
+
 from openadapt import utils
 from openadapt.config import DATABASE_LOCK_FILE_PATH, config
 from openadapt.custom_logger import logger
+from openadapt.db import compression, instrumentation, search, tiles
 from openadapt.db.db import Session, get_read_only_session_maker
 from openadapt.models import (
     ActionEvent,
@@ -24,67 +34,314 @@ from openadapt.models import (
     BrowserEvent,
     MemoryStat,
     PerformanceStat,
+    ProcessedEvents,
     Recording,
+    RecordingSummary,
     Screenshot,
+    ScreenshotTile,
     ScrubbedRecording,
     WindowEvent,
+    WindowState,
     copy_sa_instance,
 )
 from openadapt.privacy.base import ScrubbingProvider
 
-BATCH_SIZE = 1
+# maximum number of rows buffered per table before they are inserted
+BATCH_SIZE = 100
+# maximum number of screenshots (or screenshot tiles) buffered before they are
+# inserted, since their rows hold image data
+SCREENSHOT_BATCH_SIZE = 10
+# maximum number of seconds a buffered row may wait before it is inserted
+BATCH_MAX_DELAY_SECONDS = 1
 
 lock = asyncio.Event()
 lock.set()
-action_events = []
-screenshots = []
-window_events = []
-browser_events = []
-performance_stats = []
-memory_stats = []
+
+DB_LOCK_MIN_POLL_INTERVAL = 0.001
+DB_LOCK_MAX_POLL_INTERVAL = 0.1
+# (file descriptor, ident of the acquiring thread, shared) of each database lock
+# held by this process, in the order in which they were acquired
+db_locks: list[tuple[int, int, bool]] = []
+db_lock_mutex = threading.Lock()
+db_lock_stats = {
+    "num_attempts": 0,
+    "num_contended": 0,
+    "num_timeouts": 0,
+    "total_wait_time": 0.0,
+    "max_wait_time": 0.0,
+}
+
+# tables whose rows belong to a recording, in the order in which they are deleted
+# (i.e. tables referencing other tables first)
+RECORDING_TABLES = (
+    ActionEvent,
+    Screenshot,
+    ScreenshotTile,
+    WindowEvent,
+    BrowserEvent,
+    AudioInfo,
+    PerformanceStat,
+    MemoryStat,
+    ScrubbedRecording,
+    RecordingSummary,
+    ProcessedEvents,
+)
+
+# RecordingSummary attribute -> table whose rows it counts
+SUMMARY_EVENT_TABLES = {
+    "num_action_events": ActionEvent,
+    "num_screenshots": Screenshot,
+    "num_window_events": WindowEvent,
+    "num_browser_events": BrowserEvent,
+}
+# columns that make up the bulk of a recording's size in the database
+SUMMARY_DATA_COLUMNS = (
+    ActionEvent.element_state,
+    Screenshot.png_data,
+    Screenshot.png_diff_data,
+    Screenshot.png_diff_mask_data,
+    Screenshot.tile_grid,
+    Screenshot.thumbnail_data,
+    ScreenshotTile.data,
+    BrowserEvent.message,
+    AudioInfo.flac_data,
+)
+
+# relationships loaded with the events of a recording, by consumer (see
+# get_action_events): events loads what the events pipeline uses, dashboard what the
+# recording detail page displays, and replay what strategies read while replaying.
+# The event that references a window or browser event is known, so the action
+# events referencing a window or browser event (e.g. WindowEvent.action_events) are
+# never loaded: they would load the recording's action events a second time.
+_load_recording = selectinload(ActionEvent.recording)
+# children of merged events, and their children (e.g. presses and releases)
+_load_children = selectinload(ActionEvent.children).selectinload(ActionEvent.children)
+LOAD_PROFILES = {
+    "events": {
+        ActionEvent: (
+            _load_recording,
+            joinedload(ActionEvent.screenshot),
+            joinedload(ActionEvent.window_event),
+            joinedload(ActionEvent.browser_event),
+            _load_children,
+        ),
+        WindowEvent: (selectinload(WindowEvent.recording),),
+        BrowserEvent: (selectinload(BrowserEvent.recording),),
+    },
+    "dashboard": {
+        ActionEvent: (
+            _load_recording,
+            joinedload(ActionEvent.screenshot),
+            joinedload(ActionEvent.window_event),
+            _load_children,
+        ),
+        WindowEvent: (selectinload(WindowEvent.recording),),
+        BrowserEvent: (selectinload(BrowserEvent.recording),),
+    },
+    "replay": {
+        ActionEvent: (
+            _load_recording,
+            joinedload(ActionEvent.screenshot),
+            joinedload(ActionEvent.window_event).selectinload(WindowEvent.window_state),
+            joinedload(ActionEvent.browser_event),
+            _load_children,
+        ),
+        WindowEvent: (selectinload(WindowEvent.recording),),
+        BrowserEvent: (selectinload(BrowserEvent.recording),),
+    },
+}
+
+
+class InsertBuffer:
+    """Rows waiting to be inserted into a single table.
+
+    Attributes:
+        rows (list[dict]): The buffered rows.
+        session (sa.orm.Session): The session of the most recently buffered row,
+            used to flush the buffer.
+        table (sa.Table): The table the rows are inserted into.
+        first_row_time (float | None): When the oldest buffered row was added.
+        depends_on (InsertBuffer | None): A buffer holding rows referenced by this
+            buffer's rows, which is flushed first.
+        batch_size (int | None): The maximum number of buffered rows, or None for
+            BATCH_SIZE.
+    """
+
+    def __init__(
+        self,
+        depends_on: "InsertBuffer | None" = None,
+        batch_size: int | None = None,
+    ) -> None:
+        """Initialize an empty buffer.
+
+        Args:
+            depends_on (InsertBuffer, optional): A buffer to flush before this one.
+            batch_size (int, optional): The maximum number of buffered rows.
+                Defaults to BATCH_SIZE.
+        """
+        self.rows = []
+        self.session = None
+        self.table = None
+        self.first_row_time = None
+        self.depends_on = depends_on
+        self.batch_size = batch_size
+
+    def add(self, session: SaSession, table: sa.Table, row: dict[str, Any]) -> None:
+        """Add a row to the buffer.
+
+        Args:
+            session (sa.orm.Session): The database session.
+            table (sa.Table): The SQLAlchemy table to insert the row into.
+            row (dict): The row to insert.
+        """
+        if not self.rows:
+            self.first_row_time = time.perf_counter()
+        self.session = session
+        self.table = table
+        self.rows.append(row)
+
+    def is_full(self) -> bool:
+        """Whether the buffer holds its maximum number of rows."""
+        return len(self.rows) >= (self.batch_size or BATCH_SIZE)
+
+    def is_stale(self) -> bool:
+        """Whether the oldest row has waited at least BATCH_MAX_DELAY_SECONDS."""
+        return (
+            bool(self.rows)
+            and time.perf_counter() - self.first_row_time >= BATCH_MAX_DELAY_SECONDS
+        )
+
+    def flush(self) -> sa.engine.Result | None:
+        """Insert all buffered rows with a single executemany and commit.
+
+        The rows of the buffer this buffer depends on are inserted first.
+
+        Returns:
+            sa.engine.Result | None: The SQLAlchemy Result object, or None if the
+              buffer was empty.
+        """
+        if self.depends_on is not None:
+            self.depends_on.flush()
+        if not self.rows:
+            return None
+        _, insert_stmt = _get_insert_spec(self.table)
+        result = self.session.execute(insert_stmt, self.rows)
+        self.session.commit()
+        self.rows = []
+        self.first_row_time = None
+        return result
+
+
+# (database url, hash) of window states inserted by this process
+inserted_window_states = set()
+MAX_INSERTED_WINDOW_STATES = 10000
+# (database url, recording id, hash) of screenshot tiles inserted by this process
+inserted_screenshot_tiles = set()
+MAX_INSERTED_SCREENSHOT_TILES = 100000
+
+action_events = InsertBuffer()
+screenshot_tiles = InsertBuffer(batch_size=SCREENSHOT_BATCH_SIZE)
+screenshots = InsertBuffer(
+    depends_on=screenshot_tiles, batch_size=SCREENSHOT_BATCH_SIZE
+)
+window_states = InsertBuffer()
+window_events = InsertBuffer(depends_on=window_states)
+browser_events = InsertBuffer()
+performance_stats = InsertBuffer()
+memory_stats = InsertBuffer()
+insert_buffers = (
+    action_events,
+    screenshot_tiles,
+    screenshots,
+    window_states,
+    window_events,
+    browser_events,
+    performance_stats,
+    memory_stats,
+)
+
+
+@functools.cache
+def _get_insert_spec(table: sa.Table) -> tuple[tuple[str, ...], sa.Insert]:
+    """Get the column names and the Core insert statement for a table.
+
+    Computed once per table so that building a row does not iterate over the
+    table's column objects for every event.
+
+    Args:
+        table (sa.Table): The SQLAlchemy table (or mapped class).
+
+    Returns:
+        tuple: The column names and the insert statement.
+    """
+    columns = tuple(column.name for column in table.__table__.columns)
+    return columns, sa.insert(table)
 
 
 def _insert(
     session: SaSession,
     event_data: dict[str, Any],
     table: sa.Table,
-    buffer: list[dict[str, Any]] | None = None,
+    buffer: InsertBuffer | None = None,
 ) -> sa.engine.Result | None:
     """Insert using Core API for improved performance (no rows are returned).
 
+    Buffered rows are inserted with a single executemany once the buffer holds its
+    batch size of rows (see InsertBuffer) or its oldest row has waited
+    BATCH_MAX_DELAY_SECONDS. Remaining rows are inserted by flush_inserts, which also
+    runs at process exit.
+
     Args:
         session (sa.orm.Session): The database session.
-        event_data (dict): The event data to be inserted.
+        event_data (dict): The event data to be inserted. Keys are consumed.
         table (sa.Table): The SQLAlchemy table to insert the data into.
-        buffer (list, optional): A buffer list to store the inserted objects
+        buffer (InsertBuffer, optional): A buffer to store the inserted rows
             before committing. Defaults to None.
 
     Returns:
-        sa.engine.Result | None: The SQLAlchemy Result object if a buffer is
-          not provided. None if a buffer is provided.
+        sa.engine.Result | None: The SQLAlchemy Result object if rows were
+          inserted, otherwise None.
     """
-    db_obj = {column.name: None for column in table.__table__.columns}
-    for key in db_obj:
-        if key in event_data:
-            val = event_data[key]
-            db_obj[key] = val
-            del event_data[key]
+    columns, insert_stmt = _get_insert_spec(table)
+    db_obj = {column: event_data.pop(column, None) for column in columns}
 
     # make sure all event data was saved
     assert not event_data, event_data
 
-    if buffer is not None:
-        buffer.append(db_obj)
-
-    if buffer is None or len(buffer) >= BATCH_SIZE:
-        to_insert = buffer or [db_obj]
-        result = session.execute(sa.insert(table), to_insert)
+    if buffer is None:
+        result = session.execute(insert_stmt, [db_obj])
         session.commit()
-        if buffer:
-            buffer.clear()
         # Note: this does not contain the inserted row(s)
         return result
 
+    buffer.add(session, table, db_obj)
+    if buffer.is_full() or buffer.is_stale():
+        return buffer.flush()
+
+
+def flush_inserts(stale_only: bool = False) -> None:
+    """Insert the rows remaining in this process's insert buffers.
+
+    Args:
+        stale_only (bool): Whether to only flush buffers whose oldest row has waited
+            BATCH_MAX_DELAY_SECONDS. Defaults to False.
+    """
+    for buffer in insert_buffers:
+        if stale_only and not buffer.is_stale():
+            continue
+        buffer.flush()
+
+
+def _flush_inserts_at_exit() -> None:
+    """Insert the rows remaining in the insert buffers when the process exits."""
+    try:
+        flush_inserts()
+    except Exception as exc:
+        logger.exception(exc)
+
+
+atexit.register(_flush_inserts_at_exit)
+
 
 def insert_action_event(
     session: SaSession,
@@ -117,6 +374,10 @@ def insert_screenshot(
 ) -> None:
     """Insert a screenshot into the database.
 
+    The tiles of a screenshot stored as tiles (i.e. with "tile_grid" and "tiles"
+    from tiles.split_image in event_data) are stored in the screenshot_tile table,
+    once per distinct tile of the recording.
+
     Args:
         session (sa.orm.Session): The database session.
         recording (Recording): The recording object.
@@ -129,6 +390,26 @@ def insert_screenshot(
         "recording_id": recording.id,
         "recording_timestamp": recording.timestamp,
     }
+    url = str(session.get_bind().url)
+    for tile_hash, tile in event_data.pop("tiles", {}).items():
+        key = (url, recording.id, tile_hash)
+        if key in inserted_screenshot_tiles:
+            continue
+        # inserting a tile that already exists is ignored by the database
+        _insert(
+            session,
+            {
+                "recording_id": recording.id,
+                "recording_timestamp": recording.timestamp,
+                "hash": tile_hash,
+                "data": tiles.compress_tile(tile),
+            },
+            ScreenshotTile,
+            screenshot_tiles,
+        )
+        if len(inserted_screenshot_tiles) >= MAX_INSERTED_SCREENSHOT_TILES:
+            inserted_screenshot_tiles.clear()
+        inserted_screenshot_tiles.add(key)
     _insert(session, event_data, Screenshot, screenshots)
 
 
@@ -140,6 +421,9 @@ def insert_window_event(
 ) -> None:
     """Insert a window event into the database.
 
+    The state of the window is stored in the window_state table, once per distinct
+    state, and referenced from the window event by its hash.
+
     Args:
         session (sa.orm.Session): The database session.
         recording (Recording): The recording object.
@@ -152,6 +436,22 @@ def insert_window_event(
         "recording_id": recording.id,
         "recording_timestamp": recording.timestamp,
     }
+    state = event_data.pop("state", None)
+    if state is not None:
+        state_hash = compression.hash_json(state)
+        key = (str(session.get_bind().url), state_hash)
+        if key not in inserted_window_states:
+            # inserting a state that already exists is ignored by the database
+            _insert(
+                session,
+                {"hash": state_hash, "state": state},
+                WindowState,
+                window_states,
+            )
+            if len(inserted_window_states) >= MAX_INSERTED_WINDOW_STATES:
+                inserted_window_states.clear()
+            inserted_window_states.add(key)
+        event_data["state_hash"] = state_hash
     _insert(session, event_data, WindowEvent, window_events)
 
 
@@ -204,6 +504,32 @@ def insert_perf_stat(
     _insert(session, event_perf_stat, PerformanceStat, performance_stats)
 
 
+def insert_query_stats(
+    session: SaSession,
+    recording: Recording,
+    query_stats: instrumentation.QueryStats,
+) -> None:
+    """Insert the statistics of the statements of an operation as a performance stat.
+
+    The event type of the performance stat is "sql:<name of the operation>".
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording object.
+        query_stats (instrumentation.QueryStats): The statistics of the operation.
+    """
+    perf_stat = {
+        "recording_timestamp": recording.timestamp,
+        "recording_id": recording.id,
+        "event_type": f"sql:{query_stats.name}",
+        "start_time": query_stats.start_time,
+        "end_time": query_stats.end_time,
+        "num_statements": query_stats.num_statements,
+        "num_rows": query_stats.num_rows,
+    }
+    _insert(session, perf_stat, PerformanceStat, performance_stats)
+
+
 def get_perf_stats(
     session: SaSession,
     recording: Recording,
@@ -217,6 +543,7 @@ def get_perf_stats(
     Returns:
         list[PerformanceStat]: A list of performance stats for the recording.
     """
+    _rehydrate(session, recording)
     return (
         session.query(PerformanceStat)
         .filter(PerformanceStat.recording_id == recording.id)
@@ -262,6 +589,7 @@ def get_memory_stats(
         list[MemoryStat]: A list of memory stats for the recording.
 
     """
+    _rehydrate(session, recording)
     return (
         session.query(MemoryStat)
         .filter(MemoryStat.recording_id == recording.id)
@@ -287,27 +615,122 @@ def insert_recording(session: SaSession, recording_data: dict) -> Recording:
     return db_obj
 
 
-def delete_recording(session: SaSession, recording: Recording) -> None:
-    """Remove the recording from the db.
+def delete_recording_rows(
+    session: SaSession,
+    recording_id: int,
+    tables: tuple = RECORDING_TABLES,
+) -> dict[str, int]:
+    """Delete the rows of a recording from the given tables, without committing.
+
+    Rows are deleted with one DELETE statement per table (i.e. without loading
+    them into the session). Window states only referenced by deleted window events
+    are deleted as well.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording_id (int): The id of the recording.
+        tables (tuple): The tables, in the order of RECORDING_TABLES.
+
+    Returns:
+        dict[str, int]: The number of deleted rows per table.
+    """
+    num_deleted_window_states = 0
+    if WindowEvent in tables:
+        # delete the states only referenced by the recording while its window events
+        # exist, with subqueries (a recording may have more distinct states than
+        # SQLite allows parameters in a statement)
+        recording_state_hashes = sa.select(WindowEvent.state_hash).where(
+            WindowEvent.recording_id == recording_id
+        )
+        other_state_hashes = sa.select(WindowEvent.state_hash).where(
+            WindowEvent.recording_id.is_distinct_from(recording_id),
+            WindowEvent.state_hash.is_not(None),
+        )
+        num_deleted_window_states = session.execute(
+            sa.delete(WindowState).where(
+                WindowState.hash.in_(recording_state_hashes),
+                WindowState.hash.not_in(other_state_hashes),
+            )
+        ).rowcount
+    num_deleted_rows = {}
+    for table in tables:
+        num_deleted_rows[table.__tablename__] = session.execute(
+            sa.delete(table).where(table.recording_id == recording_id)
+        ).rowcount
+    if ScreenshotTile in tables:
+        # the id of the recording may be reused (e.g. by SQLite for the latest one)
+        inserted_screenshot_tiles.clear()
+    if num_deleted_window_states:
+        # the deleted states may be inserted again
+        inserted_window_states.clear()
+    num_deleted_rows[WindowState.__tablename__] = num_deleted_window_states
+    return num_deleted_rows
+
+
+def delete_recording(session: SaSession, recording: Recording) -> dict[str, int]:
+    """Remove the recording, its rows in all tables and its files.
+
+    Rows are deleted with delete_recording_rows within a single transaction, and
+    copies of the recording (e.g. scrubbed copies) become original recordings.
 
     Args:
         session (sa.orm.Session): The database session.
         recording (Recording): The recording object.
+
+    Returns:
+        dict[str, int]: The number of deleted rows per table.
     """
+    start_time = time.perf_counter()
+    recording_id = recording.id
     recording_timestamp = recording.timestamp
-    session.query(Recording).filter(Recording.id == recording.id).delete()
-    session.commit()
+    archive_path = recording.archive_path
+    try:
+        num_deleted_rows = delete_recording_rows(session, recording_id)
+        session.execute(
+            sa.update(Recording)
+            .where(Recording.original_recording_id == recording_id)
+            .values(original_recording_id=None)
+        )
+        num_deleted_rows[search.SEARCH_TABLE] = search.delete_documents(
+            session, recording_id
+        )
+        num_deleted_rows[Recording.__tablename__] = session.execute(
+            sa.delete(Recording).where(Recording.id == recording_id)
+        ).rowcount
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    session.expire_all()
 
     utils.delete_performance_plot(recording_timestamp)
 
-    from openadapt.video import delete_video_file
+    if archive_path:
+        from openadapt.db.archive import delete_archive
+
+        delete_archive(archive_path, recording_timestamp)
+    else:
+        from openadapt.video import delete_video_file
 
-    delete_video_file(recording_timestamp)
+        delete_video_file(recording_timestamp)
+
+    logger.info(
+        f"Deleted {recording_id=} in {time.perf_counter() - start_time:.2f}s: "
+        + ", ".join(
+            f"{num_rows} {table_name}"
+            for table_name, num_rows in num_deleted_rows.items()
+            if num_rows
+        )
+    )
+    return num_deleted_rows
 
 
 def get_all_recordings(session: SaSession) -> list[Recording]:
     """Get all recordings.
 
+    Recording.config is deferred and Recording.summary is loaded in the same query,
+    so listing recordings does not load their configs or events.
+
     Args:
         session (sa.orm.Session): The database session.
 
@@ -316,12 +739,120 @@ def get_all_recordings(session: SaSession) -> list[Recording]:
     """
     return (
         session.query(Recording)
+        .options(
+            sa.orm.defer(Recording.config),
+            joinedload(Recording.summary),
+        )
         .filter(Recording.original_recording_id == None)  # noqa: E711
         .order_by(sa.desc(Recording.timestamp))
         .all()
     )
 
 
+def update_recording_summary(
+    session: SaSession,
+    recording: Recording,
+) -> RecordingSummary:
+    """Create or update the summary of a finished recording.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording to summarize.
+
+    Returns:
+        RecordingSummary: The updated summary.
+    """
+    summary = (
+        session.query(RecordingSummary).filter_by(recording_id=recording.id).first()
+    )
+    summary = get_recording_summary(session, recording, summary)
+    session.add(summary)
+    session.commit()
+    return summary
+
+
+def get_recording_summary(
+    session: SaSession,
+    recording: Recording,
+    summary: RecordingSummary | None = None,
+) -> RecordingSummary:
+    """Compute the summary of a recording, without adding it to the session.
+
+    Args:
+        session (sa.orm.Session): The database session, which is only read.
+        recording (Recording): The recording to summarize.
+        summary (RecordingSummary, optional): The summary to update. Defaults to a
+            new summary.
+
+    Returns:
+        RecordingSummary: The summary.
+    """
+    # avoid circular import
+    from openadapt.video import get_video_file_paths
+
+    if summary is None:
+        summary = RecordingSummary(recording_id=recording.id)
+
+    min_timestamps = []
+    max_timestamps = []
+    for attr_name, table in SUMMARY_EVENT_TABLES.items():
+        count, min_timestamp, max_timestamp = (
+            session.query(
+                sa.func.count(table.id),
+                sa.func.min(table.timestamp),
+                sa.func.max(table.timestamp),
+            )
+            .filter(table.recording_id == recording.id)
+            .one()
+        )
+        setattr(summary, attr_name, count)
+        if count:
+            min_timestamps.append(min_timestamp)
+            max_timestamps.append(max_timestamp)
+    summary.duration = (
+        max(max_timestamps) - min(min_timestamps) if min_timestamps else 0
+    )
+
+    db_bytes = 0
+    for column in SUMMARY_DATA_COLUMNS:
+        table = column.class_
+        column_bytes = (
+            session.query(sa.func.sum(sa.func.length(column)))
+            .filter(table.recording_id == recording.id)
+            .scalar()
+        )
+        db_bytes += column_bytes or 0
+    # window states may be shared with other recordings
+    window_state_bytes = (
+        session.query(sa.func.sum(sa.func.length(WindowState.state)))
+        .filter(
+            WindowState.hash.in_(
+                session.query(WindowEvent.state_hash).filter(
+                    WindowEvent.recording_id == recording.id
+                )
+            )
+        )
+        .scalar()
+    )
+    db_bytes += window_state_bytes or 0
+    summary.db_bytes = db_bytes
+
+    summary.video_bytes = sum(
+        os.path.getsize(video_file_path)
+        for video_file_path in get_video_file_paths(recording.timestamp)
+    )
+    summary.scrubbed = session.query(
+        session.query(ScrubbedRecording)
+        .filter(
+            ScrubbedRecording.recording_id == recording.id,
+            ScrubbedRecording.scrubbed == True,  # noqa: E712
+        )
+        .exists()
+    ).scalar()
+    summary.updated_timestamp = time.time()
+    return summary
+
+
 def get_all_scrubbed_recordings(
     session: SaSession,
 ) -> list[ScrubbedRecording]:
@@ -336,9 +867,30 @@ def get_all_scrubbed_recordings(
     return session.query(ScrubbedRecording).all()
 
 
+def _rehydrate(session: SaSession, recording: Recording | None) -> Recording | None:
+    """Restore the rows of a recording if it has been archived.
+
+    Called by the recording getters and by the getters of the archived rows, so that
+    recordings obtained otherwise (e.g. via get_all_recordings or relationships)
+    are restored before their rows are queried.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording | None): The recording.
+
+    Returns:
+        Recording | None: The recording.
+    """
+    if recording is not None and recording.archive_path:
+        from openadapt.db.archive import rehydrate_recording
+
+        rehydrate_recording(session, recording)
+    return recording
+
+
 def get_latest_recording(session: SaSession) -> Recording:
     """Get the latest recording with preloaded relationships."""
-    return (
+    query = (
         session.query(Recording)
         .options(
             sa.orm.joinedload(Recording.screenshots),
@@ -348,8 +900,13 @@ def get_latest_recording(session: SaSession) -> Recording:
             sa.orm.joinedload(Recording.window_events),
         )
         .order_by(sa.desc(Recording.timestamp))
-        .first()
     )
+    recording = query.first()
+    if recording is not None and recording.archive_path:
+        _rehydrate(session, recording)
+        # reload the restored relationships
+        recording = query.populate_existing().first()
+    return recording
 
 
 def get_recording_by_id(session: SaSession, recording_id: int) -> Recording:
@@ -362,7 +919,9 @@ def get_recording_by_id(session: SaSession, recording_id: int) -> Recording:
     Returns:
         Recording: The latest recording object.
     """
-    return session.query(Recording).filter_by(id=recording_id).first()
+    return _rehydrate(
+        session, session.query(Recording).filter_by(id=recording_id).first()
+    )
 
 
 def get_recording(session: SaSession, timestamp: float) -> Recording:
@@ -375,16 +934,46 @@ def get_recording(session: SaSession, timestamp: float) -> Recording:
     Returns:
         Recording: The recording object.
     """
-    return session.query(Recording).filter(Recording.timestamp == timestamp).first()
+    return _rehydrate(
+        session,
+        session.query(Recording).filter(Recording.timestamp == timestamp).first(),
+    )
 
 
 BaseModelType = TypeVar("BaseModelType")
 
 
+def _filter_time_range(
+    query: sa.orm.Query,
+    table: BaseModelType,
+    start_time: float | None,
+    end_time: float | None,
+) -> sa.orm.Query:
+    """Restrict a query to the rows within a time range.
+
+    Args:
+        query (sa.orm.Query): The query.
+        table (BaseModel): The queried table.
+        start_time (float | None): The start of the time range, if any.
+        end_time (float | None): The end of the time range (exclusive), if any,
+            e.g. from Recording.get_video_segment_time_range.
+
+    Returns:
+        sa.orm.Query: The filtered query.
+    """
+    if start_time is not None:
+        query = query.filter(table.timestamp >= start_time)
+    if end_time is not None:
+        query = query.filter(table.timestamp < end_time)
+    return query
+
+
 def _get(
     session: SaSession,
     table: BaseModelType,
     recording_id: int,
+    start_time: float | None = None,
+    end_time: float | None = None,
 ) -> list[BaseModelType]:
     """Retrieve records from the database table based on the recording timestamp.
 
@@ -392,14 +981,16 @@ def _get(
         session (sa.orm.Session): The database session.
         table (BaseModel): The database table to query.
         recording_id (int): The recording id.
+        start_time (float | None): Only retrieve records from this time on.
+        end_time (float | None): Only retrieve records before this time.
 
     Returns:
         list[BaseModel]: A list of records retrieved from the database table,
           ordered by timestamp.
     """
+    query = session.query(table).filter(table.recording_id == recording_id)
     return (
-        session.query(table)
-        .filter(table.recording_id == recording_id)
+        _filter_time_range(query, table, start_time, end_time)
         .order_by(table.timestamp)
         .all()
     )
@@ -408,28 +999,32 @@ def _get(
 def get_action_events(
     session: SaSession,
     recording: Recording,
+    start_time: float | None = None,
+    end_time: float | None = None,
+    load_profile: str = "events",
 ) -> list[ActionEvent]:
     """Get action events for a given recording.
 
     Args:
         session (sa.orm.Session): The database session.
         recording (Recording): The recording object.
+        start_time (float | None): Only get action events from this time on.
+        end_time (float | None): Only get action events before this time.
+        load_profile (str): The relationships to load with the action events, one
+            of LOAD_PROFILES.
 
     Returns:
         list[ActionEvent]: A list of action events for the recording.
     """
     assert recording, "Invalid recording."
-    action_events = (
+    _rehydrate(session, recording)
+    query = (
         session.query(ActionEvent)
         .filter(ActionEvent.recording_id == recording.id)
-        .options(
-            joinedload(ActionEvent.recording),
-            joinedload(ActionEvent.screenshot),
-            joinedload(ActionEvent.browser_event),
-            subqueryload(ActionEvent.window_event).joinedload(
-                WindowEvent.action_events
-            ),
-        )
+        .options(*LOAD_PROFILES[load_profile][ActionEvent])
+    )
+    action_events = (
+        _filter_time_range(query, ActionEvent, start_time, end_time)
         .order_by(ActionEvent.timestamp)
         .all()
     )
@@ -561,17 +1156,23 @@ def get_screenshots(
     session: SaSession,
     recording: Recording,
     save_diff: bool = False,
+    start_time: float | None = None,
+    end_time: float | None = None,
 ) -> list[Screenshot]:
     """Get screenshots for a given recording.
 
     Args:
         session (sa.orm.Session): The database session.
         recording (Recording): The recording object.
+        save_diff (bool): Whether to save the screenshot diffs.
+        start_time (float | None): Only get screenshots from this time on.
+        end_time (float | None): Only get screenshots before this time.
 
     Returns:
         list[Screenshot]: A list of screenshots for the recording.
     """
-    screenshots = (
+    _rehydrate(session, recording)
+    query = (
         session.query(Screenshot)
         .filter(Screenshot.recording_id == recording.id)
         .options(
@@ -579,6 +1180,9 @@ def get_screenshots(
             subqueryload(Screenshot.action_event).subqueryload(ActionEvent.screenshot),
             subqueryload(Screenshot.recording),
         )
+    )
+    screenshots = (
+        _filter_time_range(query, Screenshot, start_time, end_time)
         .order_by(Screenshot.timestamp)
         .all()
     )
@@ -596,44 +1200,88 @@ def get_screenshots(
 def get_window_events(
     session: SaSession,
     recording: Recording,
+    start_time: float | None = None,
+    end_time: float | None = None,
+    load_profile: str | None = None,
 ) -> list[WindowEvent]:
     """Get window events for a given recording.
 
     Args:
 
         recording (Recording): The recording object.
+        start_time (float | None): Only get window events from this time on.
+        end_time (float | None): Only get window events before this time.
+        load_profile (str | None): The relationships to load with the window events,
+            one of LOAD_PROFILES. Defaults to the recording, and the action events
+            referencing each window event with their screenshots.
 
     Returns:
         list[WindowEvent]: A list of window events for the recording.
     """
-    return (
+    _rehydrate(session, recording)
+    query = (
         session.query(WindowEvent)
         .filter(WindowEvent.recording_id == recording.id)
         .options(
-            joinedload(WindowEvent.recording),
-            subqueryload(WindowEvent.action_events).joinedload(ActionEvent.screenshot),
+            *(
+                LOAD_PROFILES[load_profile][WindowEvent]
+                if load_profile
+                else (
+                    joinedload(WindowEvent.recording),
+                    subqueryload(WindowEvent.action_events).joinedload(
+                        ActionEvent.screenshot
+                    ),
+                )
+            )
         )
+    )
+    return (
+        _filter_time_range(query, WindowEvent, start_time, end_time)
         .order_by(WindowEvent.timestamp)
         .all()
     )
 
 
-def get_browser_events(session: SaSession, recording: Recording) -> list[BrowserEvent]:
+def get_browser_events(
+    session: SaSession,
+    recording: Recording,
+    start_time: float | None = None,
+    end_time: float | None = None,
+    load_profile: str | None = None,
+) -> list[BrowserEvent]:
     """Get browser events for a given recording.
 
     Args:
         session (sa.orm.Session): The database session
         recording (Recording): recording object
+        start_time (float | None): Only get browser events from this time on.
+        end_time (float | None): Only get browser events before this time.
+        load_profile (str | None): The relationships to load with the browser events,
+            one of LOAD_PROFILES. Defaults to the recording, and the action events
+            referencing each browser event with their screenshots.
+
     Returns:
         List[BrowserEvent]: list of browser events
     """
-    return (
+    _rehydrate(session, recording)
+    query = (
         session.query(BrowserEvent)
         .filter(BrowserEvent.recording_id == recording.id)
         .options(
-            joinedload(BrowserEvent.recording),
-            subqueryload(BrowserEvent.action_events).joinedload(ActionEvent.screenshot),
+            *(
+                LOAD_PROFILES[load_profile][BrowserEvent]
+                if load_profile
+                else (
+                    joinedload(BrowserEvent.recording),
+                    subqueryload(BrowserEvent.action_events).joinedload(
+                        ActionEvent.screenshot
+                    ),
+                )
+            )
         )
+    )
+    return (
+        _filter_time_range(query, BrowserEvent, start_time, end_time)
         .order_by(BrowserEvent.timestamp)
         .all()
     )
@@ -661,6 +1309,7 @@ def get_new_session(
     read_only: bool = False,
     read_and_write: bool = False,
     allow_add_on_read_only: bool = True,
+    engine: sa.engine.Engine | None = None,
 ) -> sa.orm.Session:
     """Get a new database session.
 
@@ -669,6 +1318,8 @@ def get_new_session(
         read_and_write (bool): Whether to open the session in read-and-write mode.
         allow_add_on_read_only (bool): Whether to allow session.add on read_only
             (write to memory, but not to disk).
+        engine (sa.engine.Engine | None): The engine to bind the session to.
+            Defaults to the engine of openadapt.db.
 
     Returns:
         sa.orm.Session: A new database session.
@@ -678,7 +1329,7 @@ def get_new_session(
     ), "Cannot be both read-only and read-and-write."
     assert read_only or read_and_write, "Must be either read-only or read-and-write."
     if read_only:
-        session = get_read_only_session_maker()()
+        session = get_read_only_session_maker(engine)()
 
         def raise_error_on_write(*args: Any, **kwargs: Any) -> None:
             """Raise an error when trying to write to a read-only session."""
@@ -691,6 +1342,8 @@ def get_new_session(
         session.flush = raise_error_on_write
 
         return session
+    if engine is not None:
+        return Session(bind=engine)
     return Session()
 
 
@@ -727,6 +1380,30 @@ def update_video_start_time(
     )
 
 
+def add_video_segment(
+    session: SaSession, recording: Recording, start_time: float
+) -> None:
+    """Append a video segment to the manifest of a recording.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording object to update.
+        start_time (float): The timestamp at which the video file of the segment
+            starts.
+    """
+    recording = session.query(Recording).filter(Recording.id == recording.id).one()
+    # assign a new list so that the change is detected
+    recording.video_segments = [
+        *(recording.video_segments or []),
+        {"start_time": start_time},
+    ]
+    session.commit()
+    logger.info(
+        f"Started video segment {len(recording.video_segments) - 1} of recording"
+        f" {recording.timestamp} at {start_time}."
+    )
+
+
 def insert_audio_info(
     session: SaSession,
     audio_data: bytes,
@@ -773,6 +1450,7 @@ def get_audio_info(
     Returns:
         AudioInfo: Audio info for the recording.
     """
+    _rehydrate(session, recording)
     audio_infos = _get(session, AudioInfo, recording.id)
     return audio_infos[0] if audio_infos else None
 
@@ -809,7 +1487,33 @@ def post_process_events(session: SaSession, recording: Recording) -> None:
         action_event.browser_event_id = browser_event_timestamp_to_id_map.get(
             action_event.browser_event_timestamp
         )
+    # the processed events refer to the events as they were
+    session.execute(
+        sa.delete(ProcessedEvents).where(ProcessedEvents.recording_id == recording.id)
+    )
     session.commit()
+    search.index_recording(session, recording)
+
+
+def search_recordings(
+    session: SaSession,
+    query: str,
+    limit: int = 20,
+    kinds: tuple[str, ...] | None = None,
+) -> list[dict[str, Any]]:
+    """Search the task descriptions, typed text and window titles of recordings.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        query (str): The text to search for.
+        limit (int): The maximum number of results.
+        kinds (tuple[str, ...] | None): Only search text of these kinds (see
+            openadapt.db.search).
+
+    Returns:
+        list[dict]: The best matching documents (see search.search).
+    """
+    return search.search(session, query, limit, kinds)
 
 
 def copy_recording(session: SaSession, recording_id: int) -> int:
@@ -840,7 +1544,7 @@ def copy_recording(session: SaSession, recording_id: int) -> int:
                 new_action_event.children.append(new_child)
             return new_action_event
 
-        read_only_session = get_new_session(read_only=True)
+        read_only_session = get_new_session(read_only=True, engine=session.get_bind())
         action_events = get_events(read_only_session, recording)
         new_action_events = [
             copy_action_event(action_event, recording_id=new_recording.id)
@@ -858,12 +1562,25 @@ def copy_recording(session: SaSession, recording_id: int) -> int:
             action_event.window_event = copy_sa_instance(
                 window_events[i], recording_id=new_recording.id
             )
-            action_event.browser_event = copy_sa_instance(
-                browser_events[i], recording_id=new_recording.id
-            )
+            if browser_events[i] is not None:
+                action_event.browser_event = copy_sa_instance(
+                    browser_events[i], recording_id=new_recording.id
+                )
 
             session.add(action_event)
 
+        # screenshots stored as tiles reference the tiles of their recording
+        session.execute(
+            sa.insert(ScreenshotTile).from_select(
+                ["recording_timestamp", "recording_id", "hash", "data"],
+                sa.select(
+                    sa.literal(new_recording.timestamp),
+                    sa.literal(new_recording.id),
+                    ScreenshotTile.hash,
+                    ScreenshotTile.data,
+                ).where(ScreenshotTile.recording_id == recording.id),
+            )
+        )
         session.commit()
 
         return new_recording.id
@@ -914,55 +1631,190 @@ def insert_scrubbed_recording(
 
 
 def mark_scrubbing_complete(session: SaSession, scrubbed_recording_id: int) -> None:
-    """Mark scrubbing as complete for a recording."""
+    """Mark scrubbing as complete for a recording.
+
+    The screenshot tiles of the recording are deleted, since they hold the
+    unscrubbed images (scrubbed screenshots are stored without tiles).
+
+    Args:
+        session (sa.orm.Session): The database session.
+        scrubbed_recording_id (int): The id of the scrubbed recording.
+    """
     scrubbed_recording = session.query(ScrubbedRecording).get(scrubbed_recording_id)
     scrubbed_recording.scrubbed = True
+    delete_recording_rows(session, scrubbed_recording.recording_id, (ScreenshotTile,))
     session.commit()
+    update_recording_summary(session, scrubbed_recording.recording)
 
 
-def acquire_db_lock(timeout: int = 60) -> bool:
-    """Check if the database is locked.
+def _lock_file(fd: int, shared: bool, blocking: bool) -> bool:
+    """Apply an OS-level advisory lock to an open file descriptor.
 
     Args:
-        timeout (int): The timeout in seconds. Defaults to 60.
-        Set to a negative value to wait indefinitely.
+        fd (int): The file descriptor of the lock file.
+        shared (bool): Whether to take a shared (reader) lock instead of an
+            exclusive (writer) lock.
+        blocking (bool): Whether to block until the lock is available.
 
     Returns:
-        bool: True if acquired the lock, False otherwise.
+        bool: True if the lock was applied, False if it is held elsewhere.
     """
-    start = time.time()
-    while True:
-        if timeout > 0 and time.time() - start > timeout:
-            logger.error("Failed to acquire database lock.")
+    if fcntl is not None:
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, operation)
+        except BlockingIOError:
             return False
-        if os.path.exists(DATABASE_LOCK_FILE_PATH):
-            with open(DATABASE_LOCK_FILE_PATH, "r") as lock_file:
-                lock_info = json.load(lock_file)
-            # check if the process is still running
-            if psutil.pid_exists(lock_info["pid"]):
-                logger.info("Database is locked. Waiting...")
-                time.sleep(1)
-            else:
-                release_db_lock(raise_exception=False)
+        return True
+
+    # msvcrt has no shared locks, so readers are serialized like writers
+    mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+    while True:
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, mode, 1)
+        except OSError:
+            if not blocking:
+                return False
+            # LK_LOCK gives up after ~10 seconds; keep waiting
+            continue
+        return True
+
+
+def _unlock_file(fd: int) -> None:
+    """Remove the OS-level advisory lock from an open file descriptor.
+
+    Args:
+        fd (int): The file descriptor of the lock file.
+    """
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def acquire_db_lock(timeout: float = 60, shared: bool = False) -> bool:
+    """Acquire the database lock.
+
+    The lock is an OS-level advisory lock on DATABASE_LOCK_FILE_PATH, so it is
+    released automatically if the holding process dies.
+
+    Args:
+        timeout (float): The timeout in seconds. Defaults to 60.
+        Set to a non-positive value to wait indefinitely.
+        shared (bool): Whether to acquire a shared (reader) lock, which may be held
+            by several processes at once but excludes writers. Defaults to False.
+
+    Returns:
+        bool: True if acquired the lock, False otherwise.
+    """
+    start = time.perf_counter()
+    fd = os.open(DATABASE_LOCK_FILE_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+    acquired = _lock_file(fd, shared, blocking=False)
+    contended = not acquired
+    if contended:
+        logger.info("Database is locked. Waiting...")
+        if timeout > 0:
+            delay = DB_LOCK_MIN_POLL_INTERVAL
+            deadline = start + timeout
+            while not acquired and time.perf_counter() < deadline:
+                time.sleep(min(delay, max(deadline - time.perf_counter(), 0)))
+                delay = min(delay * 2, DB_LOCK_MAX_POLL_INTERVAL)
+                acquired = _lock_file(fd, shared, blocking=False)
         else:
-            with open(DATABASE_LOCK_FILE_PATH, "w") as lock_file:
-                lock_file.write(json.dumps({"pid": os.getpid(), "time": time.time()}))
-                logger.info("Database lock acquired.")
-            break
+            acquired = _lock_file(fd, shared, blocking=True)
+    wait_time = time.perf_counter() - start
+
+    with db_lock_mutex:
+        db_lock_stats["num_attempts"] += 1
+        db_lock_stats["total_wait_time"] += wait_time
+        db_lock_stats["max_wait_time"] = max(db_lock_stats["max_wait_time"], wait_time)
+        if contended:
+            db_lock_stats["num_contended"] += 1
+        if not acquired:
+            db_lock_stats["num_timeouts"] += 1
+
+    if not acquired:
+        os.close(fd)
+        logger.error("Failed to acquire database lock.")
+        return False
+
+    if not shared:
+        lock_info = json.dumps({"pid": os.getpid(), "time": time.time()}).encode()
+        # informational only; the OS lock is the source of truth
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, lock_info)
+    with db_lock_mutex:
+        db_locks.append((fd, threading.get_ident(), shared))
+    logger.info(
+        f"Database {'read' if shared else 'write'} lock acquired"
+        f" ({wait_time=:.4f}s)."
+    )
     return True
 
 
+def is_db_lock_held(shared: bool = False) -> bool:
+    """Check whether the database lock is held by the calling thread.
+
+    Args:
+        shared (bool): Whether a shared (reader) lock suffices. Defaults to False.
+
+    Returns:
+        bool: True if the calling thread holds the lock, False otherwise (e.g. if
+            only another thread of this process holds it).
+    """
+    thread_ident = threading.get_ident()
+    with db_lock_mutex:
+        return any(
+            lock_thread_ident == thread_ident and (shared or not lock_shared)
+            for _, lock_thread_ident, lock_shared in db_locks
+        )
+
+
 def release_db_lock(raise_exception: bool = True) -> None:
     """Release the database lock.
 
+    Releases the lock last acquired by the calling thread, or else the lock last
+    acquired by this process (e.g. when a lock is released by a completion
+    callback running in another thread).
+
     Args:
-        raise_exception (bool): Whether to raise an exception if the lock file is
-        not found.
+        raise_exception (bool): Whether to raise an exception if the lock is not
+        held by this process.
     """
-    try:
-        os.remove(DATABASE_LOCK_FILE_PATH)
-    except FileNotFoundError:
+    thread_ident = threading.get_ident()
+    fd = None
+    with db_lock_mutex:
+        if db_locks:
+            idx = next(
+                (
+                    idx
+                    for idx in reversed(range(len(db_locks)))
+                    if db_locks[idx][1] == thread_ident
+                ),
+                len(db_locks) - 1,
+            )
+            fd, _, _ = db_locks.pop(idx)
+    if fd is None:
         if raise_exception:
-            logger.error("Database lock file not found.")
-            raise
+            logger.error("Database lock not held.")
+            raise RuntimeError("Database lock not held.")
+        return
+    _unlock_file(fd)
+    os.close(fd)
     logger.info("Database lock released.")
+
+
+def get_db_lock_stats() -> dict[str, float]:
+    """Get contention statistics for the database lock in this process.
+
+    Returns:
+        dict[str, float]: The number of attempts, contended attempts and timeouts,
+            and the total and maximum time spent waiting, in seconds.
+    """
+    with db_lock_mutex:
+        return dict(db_lock_stats)
@@ -25,6 +25,9 @@ NAMING_CONVENTION = {
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
     "pk": "pk_%(table_name)s",
 }
+# the full-text search table (see openadapt.db.search) and its shadow tables, which
+# are not copied with recording data
+SEARCH_TABLE_PREFIX = "recording_search"
 
 
 class BaseModel(DictableModel):
@@ -90,6 +93,19 @@ def get_read_only_session_maker(_engine: Optional["engine"] = None) -> sessionma
     return sessionmaker(bind=_engine, autoflush=False, autocommit=False)
 
 
+def is_copied_table(table_name: str, metadata: MetaData) -> bool:
+    """Whether a table is copied by copy_recording_data.
+
+    Args:
+        table_name (str): The name of the table.
+        metadata (MetaData): The metadata being reflected.
+
+    Returns:
+        bool: Whether the table is copied.
+    """
+    return not table_name.startswith(SEARCH_TABLE_PREFIX)
+
+
 def copy_recording_data(
     source_engine: sa.engine,
     target_engine: sa.engine,
@@ -122,8 +138,8 @@ def copy_recording_data(
                     allow_nulltype=True
                 )
 
-            tgt_metadata.reflect(bind=target_engine)
-            src_metadata.reflect(bind=source_engine)
+            tgt_metadata.reflect(bind=target_engine, only=is_copied_table)
+            src_metadata.reflect(bind=source_engine, only=is_copied_table)
 
             # Drop all tables in target database (except excluded tables)
             for table in reversed(tgt_metadata.sorted_tables):
@@ -132,8 +148,8 @@ def copy_recording_data(
                     table.drop(bind=target_engine)
 
             tgt_metadata.clear()
-            tgt_metadata.reflect(bind=target_engine)
-            src_metadata.reflect(bind=source_engine)
+            tgt_metadata.reflect(bind=target_engine, only=is_copied_table)
+            src_metadata.reflect(bind=source_engine, only=is_copied_table)
 
             # Create all tables in target database (except excluded tables)
             for table in src_metadata.sorted_tables:
@@ -142,7 +158,7 @@ def copy_recording_data(
 
             # Refresh metadata before copying data
             tgt_metadata.clear()
-            tgt_metadata.reflect(bind=target_engine)
+            tgt_metadata.reflect(bind=target_engine, only=is_copied_table)
 
             # Get the source recording table
             src_recording_table = src_metadata.tables["recording"]
@@ -171,9 +187,36 @@ def copy_recording_data(
 
                     # Insert data into target table
                     tgt_table = tgt_metadata.tables[table.name]
-                    for row in src_rows:
-                        tgt_insert = tgt_table.insert().values(**row._asdict())
-                        tgt_conn.execute(tgt_insert)
+                    if src_rows:
+                        tgt_conn.execute(
+                            tgt_table.insert(), [row._asdict() for row in src_rows]
+                        )
+
+            # Copy the window states referenced by the recording's window events
+            if "window_state" in src_metadata.tables:
+                src_window_state_table = src_metadata.tables["window_state"]
+                src_window_event_table = src_metadata.tables["window_event"]
+                src_select = src_window_state_table.select().where(
+                    src_window_state_table.c.hash.in_(
+                        sa.select(src_window_event_table.c.state_hash).where(
+                            src_window_event_table.c.recording_id == recording_id
+                        )
+                    )
+                )
+                tgt_table = tgt_metadata.tables["window_state"]
+                for row in src_conn.execute(src_select).fetchall():
+                    tgt_conn.execute(tgt_table.insert().values(**row._asdict()))
+
+            # Copy the compression dictionaries, without which the compressed
+            # values of the recording cannot be read (see openadapt.db.compression)
+            if "compression_dictionary" in src_metadata.tables:
+                src_select = src_metadata.tables["compression_dictionary"].select()
+                src_rows = src_conn.execute(src_select).fetchall()
+                tgt_table = tgt_metadata.tables["compression_dictionary"]
+                if src_rows:
+                    tgt_conn.execute(
+                        tgt_table.insert(), [row._asdict() for row in src_rows]
+                    )
 
             # Copy data from alembic_version table
             src_alembic_version_table = src_metadata.tables["alembic_version"]
@@ -0,0 +1,431 @@
+"""Persists the processed action events of recordings.
+
+Processing the action events of a recording (see events.get_events) takes seconds
+for long recordings, and is repeated by every consumer of the recording (e.g. the
+dashboard, visualize, replay strategies and productivity). The processed event
+trees are therefore stored in the processed_events table, one row per recording,
+with a cache key hashing everything the result depends on:
+
+- the source of the modules processing the events, and their settings,
+- the double click settings of the recording,
+- the ids of the raw action events, which change when events are disabled or
+  added.
+
+A row whose cache key differs is ignored, and replaced once the events have been
+processed again. A row referencing events that no longer exist (e.g. with ids
+changed by archiving and restoring the recording) is deleted. Rows are also
+deleted when the events of a recording are post-processed (see
+crud.post_process_events) or archived (see archive.archive_recording).
+
+Rows are written holding the database lock of crud, like other writers (e.g.
+openadapt.record). The lock is waited for at most DB_LOCK_TIMEOUT seconds, and
+the events are not stored (or deleted) if it is not acquired, since they are
+processed again on the next call.
+"""
+
+from typing import Any, Iterable, Iterator
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import time
+
+from sqlalchemy.orm import Session as SaSession
+import sqlalchemy as sa
+
+from openadapt import utils
+from openadapt.custom_logger import logger
+from openadapt.db import crud
+from openadapt.models import (
+    ActionEvent,
+    BrowserEvent,
+    ProcessedEvents,
+    Recording,
+    Screenshot,
+    WindowEvent,
+)
+
+# settings of openadapt.events the processed events depend on
+EVENTS_SETTING_NAMES = (
+    "MAX_PROCESS_ITERS",
+    "MOUSE_MOVE_EVENT_MERGE_CLICK_DISTANCE_THRESHOLD",
+    "MOUSE_MOVE_EVENT_MERGE_DIFF_DISTANCE_THRESHOLD",
+    "MOUSE_MOVE_EVENT_MERGE_MIN_IDX_DELTA",
+    "KEYBOARD_EVENTS_MERGE_GROUP_NAMED_KEYS",
+    "USE_SCREENSHOT_DIFFS",
+)
+# relationship -> model of the events referenced by processed action events
+RELATED_MODELS = {
+    "window_event": WindowEvent,
+    "screenshot": Screenshot,
+    "browser_event": BrowserEvent,
+}
+# columns of raw action events changed by processing
+CHANGED_COLUMN_NAMES = (
+    "timestamp",
+    "window_event_timestamp",
+    "window_event_id",
+    "browser_event_timestamp",
+    "browser_event_id",
+)
+# columns of action events not stored for parent events, which are not in the db
+PARENT_EXCLUDED_COLUMN_NAMES = (
+    "id",
+    "parent_id",
+    "recording_id",
+    "screenshot_id",
+    "window_event_id",
+    "browser_event_id",
+)
+# maximum number of ids in the IN clause of a query
+MAX_IDS_PER_QUERY = 500
+# maximum number of seconds to wait for the database lock before not writing
+DB_LOCK_TIMEOUT = 1
+
+
+@functools.lru_cache()
+def get_events_version() -> str:
+    """Get a hash of the code and settings processing action events.
+
+    Returns:
+        str: The hexadecimal hash.
+    """
+    # avoid circular import
+    from openadapt import browser, columnar_events, events, streaming_events
+
+    version = hashlib.sha256()
+    for module in (events, columnar_events, streaming_events, browser):
+        version.update(inspect.getsource(module).encode())
+    version.update(
+        json.dumps(
+            {
+                "settings": {
+                    name: getattr(events, name) for name in EVENTS_SETTING_NAMES
+                },
+                "process_fns": [
+                    process_fn.__name__ for process_fn in events.PROCESS_FNS
+                ],
+            },
+            sort_keys=True,
+        ).encode()
+    )
+    return version.hexdigest()
+
+
+def get_cache_key(recording: Recording, action_events: list[ActionEvent]) -> str:
+    """Get the cache key of the processed action events of a recording.
+
+    Args:
+        recording (Recording): The recording.
+        action_events (list[ActionEvent]): The raw action events to process.
+
+    Returns:
+        str: The hexadecimal cache key.
+    """
+    double_click_interval_seconds = recording.double_click_interval_seconds
+    if double_click_interval_seconds is None:
+        double_click_interval_seconds = utils.get_double_click_interval_seconds()
+    double_click_distance_pixels = recording.double_click_distance_pixels
+    if double_click_distance_pixels is None:
+        double_click_distance_pixels = utils.get_double_click_distance_pixels()
+    cache_key = hashlib.sha256(get_events_version().encode())
+    cache_key.update(
+        f"{double_click_interval_seconds}:{double_click_distance_pixels}:".encode()
+    )
+    cache_key.update(",".join(str(event.id) for event in action_events).encode())
+    return cache_key.hexdigest()
+
+
+def dump_events(action_events: list[ActionEvent]) -> dict[str, list]:
+    """Convert processed action events to JSON-serializable data.
+
+    Each event of the trees is a node, [id, values, related ids, reducer names,
+    child nodes], in post-order (i.e. after its children). The id of a raw event
+    is stored with the values of its columns changed by processing, and a parent
+    event has no id and stores the values of all its columns.
+
+    Args:
+        action_events (list[ActionEvent]): The top-level processed action events.
+
+    Returns:
+        dict[str, list]: The nodes and the top-level nodes.
+    """
+    parent_column_names = [
+        column_name
+        for column_name in sa.inspect(ActionEvent).column_attrs.keys()
+        if column_name not in PARENT_EXCLUDED_COLUMN_NAMES
+    ]
+    nodes = []
+
+    def add_node(event: ActionEvent) -> int:
+        child_nodes = [add_node(child) for child in event.children]
+        if event.id is None:
+            column_names = parent_column_names
+        else:
+            column_names = CHANGED_COLUMN_NAMES
+        values = {
+            column_name: value
+            for column_name in column_names
+            if (value := getattr(event, column_name)) is not None
+        }
+        related_ids = [
+            related.id if (related := getattr(event, relationship_name)) else None
+            for relationship_name in RELATED_MODELS
+        ]
+        nodes.append(
+            [event.id, values, related_ids, sorted(event.reducer_names), child_nodes]
+        )
+        return len(nodes) - 1
+
+    top_level_nodes = [add_node(event) for event in action_events]
+    return {"nodes": nodes, "events": top_level_nodes}
+
+
+def get_related_events(
+    session: SaSession,
+    model: type,
+    ids: Iterable[int],
+    load_profile: str,
+) -> dict[int, Any]:
+    """Get events by id, from the session's identity map or else the database.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        model (type): The model of the events.
+        ids (Iterable[int]): The ids of the events.
+        load_profile (str): The relationships to load with the events, one of
+            crud.LOAD_PROFILES.
+
+    Returns:
+        dict[int, Any]: The events by id.
+    """
+    mapper = sa.inspect(model)
+    related_events = {}
+    missing_ids = []
+    for related_id in ids:
+        related_event = session.identity_map.get(
+            mapper.identity_key_from_primary_key((related_id,))
+        )
+        if related_event is None:
+            missing_ids.append(related_id)
+        else:
+            related_events[related_id] = related_event
+    options = crud.LOAD_PROFILES[load_profile].get(model, ())
+    for idx in range(0, len(missing_ids), MAX_IDS_PER_QUERY):
+        query = (
+            session.query(model)
+            .filter(model.id.in_(missing_ids[idx : idx + MAX_IDS_PER_QUERY]))
+            .options(*options)
+        )
+        related_events.update({related.id: related for related in query})
+    return related_events
+
+
+def load_events(
+    session: SaSession,
+    recording: Recording,
+    action_events: list[ActionEvent],
+    data: dict[str, list],
+    load_profile: str = "events",
+) -> list[ActionEvent] | None:
+    """Rebuild processed action events from the data of dump_events.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+        action_events (list[ActionEvent]): The raw action events of the recording.
+        data (dict[str, list]): The data of the processed action events.
+        load_profile (str): The relationships to load with related events, one of
+            crud.LOAD_PROFILES.
+
+    Returns:
+        list[ActionEvent] | None: The top-level processed action events, or None if
+            any of the events they reference does not exist.
+    """
+    nodes = data["nodes"]
+    related_events_by_name = {}
+    for idx, (relationship_name, model) in enumerate(RELATED_MODELS.items()):
+        related_ids = {node[2][idx] for node in nodes} - {None}
+        related_events = get_related_events(session, model, related_ids, load_profile)
+        if len(related_events) != len(related_ids):
+            logger.warning(
+                f"Missing {model.__name__} ids:"
+                f" {sorted(related_ids - related_events.keys())[:10]}"
+            )
+            return None
+        related_events_by_name[relationship_name] = related_events
+    action_events_by_id = {event.id: event for event in action_events}
+    event_ids = {node[0] for node in nodes} - {None}
+    if not event_ids <= action_events_by_id.keys():
+        logger.warning(
+            "Missing ActionEvent ids:"
+            f" {sorted(event_ids - action_events_by_id.keys())[:10]}"
+        )
+        return None
+
+    events = []
+    for event_id, values, related_ids, reducer_names, child_nodes in nodes:
+        related = {
+            relationship_name: related_events_by_name[relationship_name][related_id]
+            for relationship_name, related_id in zip(RELATED_MODELS, related_ids)
+            if related_id is not None
+        }
+        if event_id is None:
+            event = ActionEvent(recording=recording, **values, **related)
+        else:
+            event = action_events_by_id[event_id]
+            for name, value in {**values, **related}.items():
+                setattr(event, name, value)
+        if child_nodes:
+            event.children = [events[child_node] for child_node in child_nodes]
+        event.reducer_names.update(reducer_names)
+        events.append(event)
+    return [events[node] for node in data["events"]]
+
+
+def get_events(
+    session: SaSession,
+    recording: Recording,
+    action_events: list[ActionEvent],
+    cache_key: str,
+    meta: dict | None = None,
+    load_profile: str = "events",
+) -> list[ActionEvent] | None:
+    """Get the stored processed action events of a recording.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+        action_events (list[ActionEvent]): The raw action events of the recording.
+        cache_key (str): The cache key (see get_cache_key).
+        meta (dict | None): Metadata dictionary to populate with the stored meta of
+            events.get_events.
+        load_profile (str): The relationships to load with related events, one of
+            crud.LOAD_PROFILES.
+
+    Returns:
+        list[ActionEvent] | None: The top-level processed action events, or None if
+            none are stored with the cache key, or the stored events are stale.
+    """
+    processed_events = (
+        session.query(ProcessedEvents)
+        .filter(
+            ProcessedEvents.recording_id == recording.id,
+            ProcessedEvents.cache_key == cache_key,
+        )
+        .first()
+    )
+    if processed_events is None:
+        return None
+    stored_action_events = load_events(
+        session, recording, action_events, processed_events.data, load_profile
+    )
+    if stored_action_events is None:
+        delete_events(session, recording)
+        return None
+    if meta is not None:
+        meta.update(processed_events.meta or {})
+    return stored_action_events
+
+
+@contextlib.contextmanager
+def hold_db_lock() -> Iterator[bool]:
+    """Hold the database lock of crud, unless the calling thread already holds it.
+
+    Yields:
+        bool: Whether the lock is held, i.e. it was acquired within DB_LOCK_TIMEOUT
+            seconds or was already held.
+    """
+    acquire_lock = not crud.is_db_lock_held()
+    if acquire_lock and not crud.acquire_db_lock(timeout=DB_LOCK_TIMEOUT):
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        if acquire_lock:
+            crud.release_db_lock()
+
+
+def delete_events(session: SaSession, recording: Recording) -> bool:
+    """Delete the stored processed action events of a recording.
+
+    The events are deleted in a separate transaction, since the session may be read
+    only (see crud.get_new_session), holding the database lock (see hold_db_lock).
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+
+    Returns:
+        bool: Whether the events were deleted.
+    """
+    try:
+        with hold_db_lock() as locked:
+            if not locked:
+                logger.warning("Database is locked, not deleting processed events")
+                return False
+            with sa.orm.Session(bind=session.get_bind()) as write_session:
+                write_session.execute(
+                    sa.delete(ProcessedEvents).where(
+                        ProcessedEvents.recording_id == recording.id
+                    )
+                )
+                write_session.commit()
+    except sa.exc.OperationalError as exc:
+        # e.g. the database is locked by another writer
+        logger.warning(f"Failed to delete processed events: {exc}")
+        return False
+    return True
+
+
+def store_events(
+    session: SaSession,
+    recording: Recording,
+    action_events: list[ActionEvent],
+    cache_key: str,
+    meta: dict | None = None,
+) -> bool:
+    """Store the processed action events of a recording.
+
+    The events are stored in a separate transaction, since the session may be read
+    only (see crud.get_new_session), holding the database lock (see hold_db_lock).
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+        action_events (list[ActionEvent]): The top-level processed action events.
+        cache_key (str): The cache key (see get_cache_key).
+        meta (dict | None): The meta of events.get_events.
+
+    Returns:
+        bool: Whether the events were stored.
+    """
+    data = dump_events(action_events)
+    try:
+        with hold_db_lock() as locked:
+            if not locked:
+                logger.warning("Database is locked, not storing processed events")
+                return False
+            with sa.orm.Session(bind=session.get_bind()) as write_session:
+                write_session.execute(
+                    sa.delete(ProcessedEvents).where(
+                        ProcessedEvents.recording_id == recording.id
+                    )
+                )
+                write_session.add(
+                    ProcessedEvents(
+                        recording_id=recording.id,
+                        cache_key=cache_key,
+                        timestamp=time.time(),
+                        meta=meta,
+                        data=data,
+                    )
+                )
+                write_session.commit()
+    except sa.exc.OperationalError as exc:
+        # e.g. the database is locked by another writer
+        logger.warning(f"Failed to store processed events: {exc}")
+        return False
+    return True
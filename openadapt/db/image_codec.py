@@ -0,0 +1,162 @@
+"""Lossless encoding of screenshot images.
+
+Screenshot images are stored with one of the following codecs, selected with
+config.SCREENSHOT_IMAGE_CODEC:
+
+- png: PNG, as written by PIL (the default, readable by any image viewer).
+- webp: lossless WebP, which is smaller than PNG and faster to encode.
+- qoi: QOI, which is much faster to encode and decode than PNG at a similar size.
+  Requires the qoi package.
+- raw: the raw pixels compressed with zstd (see compression.compress_bytes),
+  which is the fastest to encode.
+
+Every codec is identified by the leading bytes of the encoded data, so decoding
+does not depend on the codec that was configured when the image was written.
+Images in modes a codec does not support (e.g. "L" for qoi) are stored raw.
+A configured codec that is not available (e.g. qoi without the qoi extra) falls
+back to png (see validate_codec).
+
+Module: image_codec.py
+"""
+
+import functools
+import io
+import struct
+
+from PIL import Image
+import numpy as np
+
+from openadapt.custom_logger import logger
+from openadapt.db import compression
+
+try:
+    import qoi
+except ImportError:
+    qoi = None
+
+PNG = "png"
+WEBP = "webp"
+QOI = "qoi"
+RAW = "raw"
+CODECS = (PNG, WEBP, QOI, RAW)
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+QOI_MAGIC = b"qoif"
+RAW_MAGIC = b"OAIM"
+# magic, mode, width, height
+RAW_HEADER = struct.Struct("<4s4sII")
+# lossless WebP effort: the fastest method, with a quality (i.e. effort) that
+# barely slows down encoding
+WEBP_METHOD = 0
+WEBP_QUALITY = 50
+# modes supported by codecs other than png and raw
+RGB_MODES = ("RGB", "RGBA")
+
+
+def get_available_codecs() -> list[str]:
+    """Get the codecs that can be used in this environment.
+
+    Returns:
+        list[str]: The names of the codecs.
+    """
+    return [codec for codec in CODECS if codec != QOI or qoi is not None]
+
+
+@functools.lru_cache()
+def validate_codec(codec: str) -> str:
+    """Check that a codec (e.g. config.SCREENSHOT_IMAGE_CODEC) can be used.
+
+    Args:
+        codec (str): The name of the codec.
+
+    Returns:
+        str: The codec if it is available, otherwise png.
+    """
+    available_codecs = get_available_codecs()
+    if codec in available_codecs:
+        return codec
+    logger.warning(
+        f"Image codec {codec!r} is not available ({available_codecs=}), using"
+        f" {PNG!r}. Install the qoi extra to use {QOI!r}."
+        if codec == QOI
+        else f"Unknown image codec {codec!r} ({available_codecs=}), using {PNG!r}."
+    )
+    return PNG
+
+
+def get_codec(data: bytes) -> str | None:
+    """Get the codec of encoded image data from its leading bytes.
+
+    Args:
+        data (bytes): The encoded image.
+
+    Returns:
+        str | None: The name of the codec, or None if it is not one of CODECS.
+    """
+    if data.startswith(PNG_MAGIC):
+        return PNG
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return WEBP
+    if data.startswith(QOI_MAGIC):
+        return QOI
+    if data.startswith(RAW_MAGIC):
+        return RAW
+    return None
+
+
+def encode_image(image: Image.Image, codec: str = PNG) -> bytes:
+    """Encode an image losslessly.
+
+    Args:
+        image (Image.Image): The image.
+        codec (str): The name of the codec, one of CODECS.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    assert codec in CODECS, (codec, CODECS)
+    if codec in (WEBP, QOI) and image.mode not in RGB_MODES:
+        codec = RAW
+    if codec == QOI:
+        assert qoi is not None, "Encoding QOI requires qoi."
+        return qoi.encode(np.asarray(image))
+    if codec == RAW:
+        header = RAW_HEADER.pack(
+            RAW_MAGIC, image.mode.encode().ljust(4), image.width, image.height
+        )
+        return header + compression.compress_bytes(image.tobytes())
+    buffer = io.BytesIO()
+    if codec == WEBP:
+        image.save(
+            buffer,
+            format="WEBP",
+            lossless=True,
+            # keep the color of transparent pixels
+            exact=True,
+            method=WEBP_METHOD,
+            quality=WEBP_QUALITY,
+        )
+    else:
+        image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def decode_image(data: bytes) -> Image.Image:
+    """Decode an image encoded with encode_image (or in any format PIL reads).
+
+    Args:
+        data (bytes): The encoded image.
+
+    Returns:
+        Image.Image: The image.
+    """
+    data = bytes(data)
+    codec = get_codec(data)
+    if codec == QOI:
+        assert qoi is not None, "Decoding QOI requires qoi."
+        return Image.fromarray(qoi.decode(data))
+    if codec == RAW:
+        _, mode, width, height = RAW_HEADER.unpack_from(data)
+        pixels = compression.decompress_bytes(data[RAW_HEADER.size :])
+        return Image.frombytes(mode.decode().strip(), (width, height), pixels)
+    return Image.open(io.BytesIO(data))
@@ -0,0 +1,93 @@
+"""Summaries of screenshot images, computed once when a screenshot is written.
+
+Screenshots store the size of their image, a small thumbnail and a 64-bit
+difference hash (dHash) of the image, so that comparing screenshots or reading
+their size does not require decoding the full image (see Screenshot.size,
+Screenshot.thumbnail and Screenshot.get_hash_distance).
+
+The dHash of an image is computed from its thumbnail: the thumbnail is reduced to
+9x8 grayscale pixels, and each bit of the hash is set if a pixel is brighter than
+its right neighbor. Images that look alike have hashes differing in few bits.
+
+Module: image_hash.py
+"""
+
+from typing import Any
+
+from PIL import Image
+import numpy as np
+
+from openadapt.db import image_codec
+
+# maximum width and height of thumbnails, in pixels
+THUMBNAIL_SIZE = 128
+HASH_BITS = 64
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+# hashes of images that look alike differ in at most this many bits
+MAX_SIMILAR_HASH_DISTANCE = 10
+
+
+def get_thumbnail(image: Image.Image) -> Image.Image:
+    """Get a thumbnail of an image, preserving its aspect ratio.
+
+    Args:
+        image (Image.Image): The image.
+
+    Returns:
+        Image.Image: The thumbnail.
+    """
+    thumbnail = image.convert("RGB")
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.BILINEAR)
+    return thumbnail
+
+
+def get_dhash(image: Image.Image) -> int:
+    """Get the difference hash of an image.
+
+    Args:
+        image (Image.Image): The image (or its thumbnail, which is faster).
+
+    Returns:
+        int: The hash, as a signed 64-bit integer (as stored by SQLite).
+    """
+    pixels = np.asarray(
+        image.convert("L").resize((HASH_WIDTH, HASH_HEIGHT), Image.Resampling.BILINEAR),
+        dtype=np.int16,
+    )
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    if value >= 1 << (HASH_BITS - 1):
+        value -= 1 << HASH_BITS
+    return value
+
+
+def get_hash_distance(image_hash: int, other_image_hash: int) -> int:
+    """Get the number of bits in which two image hashes differ.
+
+    Args:
+        image_hash (int): The hash of an image.
+        other_image_hash (int): The hash of another image.
+
+    Returns:
+        int: The Hamming distance between the hashes, from 0 to 64.
+    """
+    return ((image_hash ^ other_image_hash) & ((1 << HASH_BITS) - 1)).bit_count()
+
+
+def get_image_summary(image: Image.Image) -> dict[str, Any]:
+    """Get the summary columns of a screenshot image.
+
+    Args:
+        image (Image.Image): The image.
+
+    Returns:
+        dict: The width, height, image_hash and thumbnail_data of the image.
+    """
+    thumbnail = get_thumbnail(image)
+    return {
+        "width": image.width,
+        "height": image.height,
+        "image_hash": get_dhash(thumbnail),
+        "thumbnail_data": image_codec.encode_image(thumbnail),
+    }
@@ -0,0 +1,252 @@
+"""Instrumentation of the SQL statements executed by logical operations.
+
+Wrapping an operation in instrument() counts the statements it executes, their
+duration and the rows they return (as ORM instances loaded, or rows changed by
+DML), grouped by statement shape: the statement text with bound parameters, with
+whitespace and expanded IN lists collapsed. A shape executed many times (e.g. a
+lazy load of ActionEvent.screenshot inside a loop over action events) is reported
+as an N+1 suspect.
+
+Usage:
+
+    with instrumentation.instrument("get_events") as query_stats:
+        events.get_events(session, recording)
+    logger.info(query_stats.format_report())
+
+    # in tests
+    with instrumentation.query_budget(max_statements=10):
+        crud.get_action_events(session, recording)
+
+Only statements executed by the thread that entered the context are counted.
+
+Module: instrumentation.py
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+import re
+import threading
+import time
+
+import sqlalchemy as sa
+
+from openadapt.custom_logger import logger
+from openadapt.db import db
+
+# statement shapes executed at least this many times are N+1 suspects
+N_PLUS_ONE_MIN_REPEATS = 10
+IN_LIST_REGEX = re.compile(r"\(\?(?:, \?)+\)|\(__\[POSTCOMPILE_\w+\]\)")
+WHITESPACE_REGEX = re.compile(r"\s+")
+# the selected columns, omitted from reports
+SELECT_COLUMNS_REGEX = re.compile(r"^SELECT .+? FROM ")
+
+
+def get_statement_shape(statement: str) -> str:
+    """Get the shape of a statement, shared by executions with other parameters.
+
+    Args:
+        statement (str): The SQL statement.
+
+    Returns:
+        str: The statement, with whitespace and IN lists of parameters collapsed.
+    """
+    statement = WHITESPACE_REGEX.sub(" ", statement).strip()
+    return IN_LIST_REGEX.sub("(?)", statement)
+
+
+@dataclass
+class StatementStats:
+    """Statistics of the executions of a statement shape.
+
+    Attributes:
+        shape (str): The statement shape (see get_statement_shape).
+        num_executions (int): The number of executions.
+        duration (float): The total duration of the executions in seconds.
+        num_rows (int): The number of rows loaded or changed by the executions.
+    """
+
+    shape: str
+    num_executions: int = 0
+    duration: float = 0
+    num_rows: int = 0
+
+
+@dataclass
+class QueryStats:
+    """Statistics of the statements executed by a logical operation.
+
+    Attributes:
+        name (str): The name of the operation.
+        start_time (float): When the operation started (from time.time()).
+        end_time (float | None): When the operation ended, if it did.
+        statement_stats (dict[str, StatementStats]): The statistics by shape, in
+            order of first execution.
+    """
+
+    name: str
+    start_time: float = field(default_factory=time.time)
+    end_time: float | None = None
+    statement_stats: dict[str, StatementStats] = field(default_factory=dict)
+
+    @property
+    def num_statements(self) -> int:
+        """Get the number of statements executed."""
+        return sum(stats.num_executions for stats in self.statement_stats.values())
+
+    @property
+    def duration(self) -> float:
+        """Get the total duration of the statements in seconds."""
+        return sum(stats.duration for stats in self.statement_stats.values())
+
+    @property
+    def num_rows(self) -> int:
+        """Get the number of rows loaded or changed by the statements."""
+        return sum(stats.num_rows for stats in self.statement_stats.values())
+
+    def get_n_plus_one_suspects(
+        self, min_repeats: int = N_PLUS_ONE_MIN_REPEATS
+    ) -> list[StatementStats]:
+        """Get the statement shapes executed repeatedly.
+
+        Args:
+            min_repeats (int): The minimum number of executions of a suspect shape.
+
+        Returns:
+            list[StatementStats]: The statistics of the suspect shapes, most
+                executed first.
+        """
+        return sorted(
+            (
+                stats
+                for stats in self.statement_stats.values()
+                if stats.num_executions >= min_repeats
+            ),
+            key=lambda stats: stats.num_executions,
+            reverse=True,
+        )
+
+    def format_report(self) -> str:
+        """Format the statistics for logging.
+
+        Returns:
+            str: The report, with one line per statement shape.
+        """
+        lines = [
+            f"{self.name}: {self.num_statements} statements, {self.num_rows} rows,"
+            f" {self.duration * 1000:.1f} ms"
+        ]
+        suspects = self.get_n_plus_one_suspects()
+        for stats in sorted(
+            self.statement_stats.values(),
+            key=lambda stats: stats.duration,
+            reverse=True,
+        ):
+            lines.append(
+                f"  {'N+1? ' if stats in suspects else ''}{stats.num_executions}x"
+                f" {stats.num_rows} rows {stats.duration * 1000:.1f} ms:"
+                f" {SELECT_COLUMNS_REGEX.sub('SELECT ... FROM ', stats.shape)}"
+            )
+        return "\n".join(lines)
+
+
+@contextmanager
+def instrument(
+    name: str,
+    engine: sa.engine.Engine | None = None,
+    warn_n_plus_one: bool = True,
+) -> Iterator[QueryStats]:
+    """Collect statistics of the statements executed within the context.
+
+    Args:
+        name (str): The name of the operation.
+        engine (sa.engine.Engine | None): The engine executing the statements.
+            Defaults to db.engine.
+        warn_n_plus_one (bool): Whether to log a warning on exit if statement
+            shapes were executed repeatedly.
+
+    Yields:
+        QueryStats: The statistics, updated as statements are executed.
+    """
+    engine = engine or db.engine
+    query_stats = QueryStats(name)
+    thread_id = threading.get_ident()
+    # statistics and start time of the statement being executed
+    current = {}
+
+    def before_cursor_execute(
+        conn: sa.engine.Connection,
+        cursor: Any,
+        statement: str,
+        *args: tuple,
+    ) -> None:
+        if threading.get_ident() != thread_id:
+            return
+        shape = get_statement_shape(statement)
+        if shape not in query_stats.statement_stats:
+            query_stats.statement_stats[shape] = StatementStats(shape)
+        current["stats"] = query_stats.statement_stats[shape]
+        current["start_time"] = time.perf_counter()
+
+    def after_cursor_execute(
+        conn: sa.engine.Connection,
+        cursor: Any,
+        *args: tuple,
+    ) -> None:
+        if threading.get_ident() != thread_id or "stats" not in current:
+            return
+        stats = current["stats"]
+        stats.num_executions += 1
+        stats.duration += time.perf_counter() - current["start_time"]
+        # -1 for SELECT statements, whose rows are counted as they are loaded
+        if cursor.rowcount > 0:
+            stats.num_rows += cursor.rowcount
+
+    def load(instance: db.BaseModel, context: sa.orm.QueryContext) -> None:
+        if threading.get_ident() == thread_id and "stats" in current:
+            current["stats"].num_rows += 1
+
+    sa.event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    sa.event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    sa.event.listen(db.Base, "load", load, propagate=True)
+    try:
+        yield query_stats
+    finally:
+        sa.event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        sa.event.remove(engine, "after_cursor_execute", after_cursor_execute)
+        sa.event.remove(db.Base, "load", load)
+        query_stats.end_time = time.time()
+    if warn_n_plus_one and query_stats.get_n_plus_one_suspects():
+        logger.warning(f"N+1 suspects in {query_stats.format_report()}")
+
+
+@contextmanager
+def query_budget(
+    max_statements: int,
+    max_repeats: int | None = None,
+    name: str = "query_budget",
+    engine: sa.engine.Engine | None = None,
+) -> Iterator[QueryStats]:
+    """Assert that the statements executed within the context stay within a budget.
+
+    Args:
+        max_statements (int): The maximum number of statements.
+        max_repeats (int | None): The maximum number of executions of a statement
+            shape, if any.
+        name (str): The name of the operation.
+        engine (sa.engine.Engine | None): The engine executing the statements.
+            Defaults to db.engine.
+
+    Yields:
+        QueryStats: The statistics, updated as statements are executed.
+    """
+    with instrument(name, engine, warn_n_plus_one=False) as query_stats:
+        yield query_stats
+    assert (
+        query_stats.num_statements <= max_statements
+    ), f"over budget of {max_statements} statements: {query_stats.format_report()}"
+    if max_repeats is not None:
+        assert not query_stats.get_n_plus_one_suspects(max_repeats + 1), (
+            f"over budget of {max_repeats} repeats per statement:"
+            f" {query_stats.format_report()}"
+        )
@@ -26,8 +26,15 @@ def main() -> None:
         logger.info("No recordings found.")
 
     for idx, recording in enumerate(recordings[::-1], start=1):
+        summary = recording.summary
         logger.info(
             f"[{idx}]: {recording.task_description} | {recording.timestamp}"
+            + (
+                f" | {summary.num_action_events} action events"
+                f" | {summary.duration:.1f}s"
+                if summary
+                else ""
+            )
             + (" [latest]" if idx == len(recordings) else "")
         )
 
@@ -3,7 +3,9 @@
 Usage: python -m openadapt.db.remove [--all | --latest | --id <recording_id>]
 """
 
+from collections import Counter
 from sys import stdout
+import time
 
 import click
 
@@ -56,11 +58,16 @@ def remove(all: str, latest: str, recording_id: int) -> int:
 
     if all:
         if click.confirm("Are you sure you want to delete all recordings?"):
+            start_time = time.perf_counter()
+            num_deleted_rows = Counter()
             with crud.get_new_session(read_and_write=True) as write_session:
                 for r in recordings:
                     logger.info(f"Deleting {r.task_description} | {r.timestamp}...")
-                    crud.delete_recording(write_session, r)
-            logger.info("All recordings deleted.")
+                    num_deleted_rows.update(crud.delete_recording(write_session, r))
+            logger.info(
+                f"All recordings deleted in {time.perf_counter() - start_time:.2f}s"
+                f" ({sum(num_deleted_rows.values())} rows)."
+            )
         else:
             logger.info("Aborting...")
         return cleanup(0)
@@ -79,7 +86,6 @@ def remove(all: str, latest: str, recording_id: int) -> int:
     ):
         with crud.get_new_session(read_and_write=True) as write_session:
             crud.delete_recording(write_session, recording_to_delete)
-        crud.release_db_lock()
         logger.info("Recording deleted.")
     else:
         logger.info("Aborting...")
@@ -0,0 +1,515 @@
+"""Reclaims disk space used by recordings according to retention policies.
+
+Recordings are selected for deletion by age, by a budget on the total size of all
+recordings (oldest first), and/or by keeping only scrubbed recordings. Afterwards,
+rows left behind by deleted recordings, window states, video files and performance
+plots that are no longer referenced are removed, and the database file is shrunk
+with VACUUM.
+
+Must not be run while recording: the database lock is held for the duration.
+
+Usage:
+    python -m openadapt.db.retention [--max-age-days <days>] \
+        [--max-size-mb <megabytes>] [--keep-scrubbed-only] [--prune-unreferenced] \
+        [--vacuum full|incremental|none] [--dry-run] [--yes]
+"""
+
+from sys import stdout
+import os
+import re
+import time
+
+from sqlalchemy.orm import Session as SaSession
+import click
+import sqlalchemy as sa
+
+from openadapt import video
+from openadapt.config import PERFORMANCE_PLOTS_DIR_PATH, config
+from openadapt.custom_logger import logger
+from openadapt.db import crud, search
+from openadapt.models import (
+    ActionEvent,
+    Recording,
+    RecordingSummary,
+    Screenshot,
+    ScrubbedRecording,
+    WindowEvent,
+    WindowState,
+)
+
+VIDEO_FILE_NAME_REGEX = re.compile(r"oa_recording-(?P<timestamp>[\d.]+)(-\d+)?\.mp4")
+PERFORMANCE_PLOT_FILE_NAME_REGEX = re.compile(r"performance-(?P<timestamp>[\d.]+)\.png")
+VACUUM_MODES = ("full", "incremental", "none")
+SQLITE_AUTO_VACUUM_INCREMENTAL = 2
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def get_recording_size(
+    session: SaSession, recording: Recording, dry_run: bool = False
+) -> int:
+    """Get the number of bytes of data and video stored for a recording.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+        dry_run (bool): Whether to compute a missing summary of the recording
+            without storing it.
+
+    Returns:
+        int: The size of the recording in bytes.
+    """
+    summary = recording.summary
+    if summary is None:
+        if dry_run:
+            summary = crud.get_recording_summary(session, recording)
+        else:
+            summary = crud.update_recording_summary(session, recording)
+    return (summary.db_bytes or 0) + (summary.video_bytes or 0)
+
+
+def select_recordings(
+    session: SaSession,
+    max_age_days: float | None = None,
+    max_total_bytes: int | None = None,
+    keep_scrubbed_only: bool = False,
+    now: float | None = None,
+    dry_run: bool = False,
+) -> list[Recording]:
+    """Select the recordings to delete according to the retention policies.
+
+    A recording is selected if any of the policies selects it.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        max_age_days (float, optional): Select recordings older than this.
+        max_total_bytes (int, optional): Select the oldest recordings until the
+            remaining recordings fit into this many bytes.
+        keep_scrubbed_only (bool): Select all recordings that have not been
+            scrubbed.
+        now (float, optional): The current timestamp. Defaults to time.time().
+        dry_run (bool): Whether to leave the database unchanged, i.e. not store the
+            missing summaries of recordings (see get_recording_size).
+
+    Returns:
+        list[Recording]: The selected recordings, oldest first.
+    """
+    recordings = (
+        session.query(Recording)
+        .options(sa.orm.defer(Recording.config))
+        .order_by(Recording.timestamp)
+        .all()
+    )
+    selected_ids = set()
+
+    if max_age_days is not None:
+        now = time.time() if now is None else now
+        min_timestamp = now - max_age_days * SECONDS_PER_DAY
+        selected_ids |= {
+            recording.id
+            for recording in recordings
+            if recording.timestamp < min_timestamp
+        }
+
+    if max_total_bytes is not None:
+        total_bytes = 0
+        for recording in reversed(recordings):
+            total_bytes += get_recording_size(session, recording, dry_run)
+            if total_bytes > max_total_bytes:
+                selected_ids.add(recording.id)
+
+    if keep_scrubbed_only:
+        scrubbed_recording_ids = {
+            recording_id
+            for (recording_id,) in session.query(ScrubbedRecording.recording_id).filter(
+                ScrubbedRecording.scrubbed == True  # noqa: E712
+            )
+        }
+        selected_ids |= {
+            recording.id
+            for recording in recordings
+            if recording.id not in scrubbed_recording_ids
+        }
+
+    return [recording for recording in recordings if recording.id in selected_ids]
+
+
+def delete_orphaned_rows(session: SaSession) -> dict[str, int]:
+    """Delete rows belonging to recordings that no longer exist.
+
+    Also deletes window states that are no longer referenced by any window event.
+
+    Args:
+        session (sa.orm.Session): The database session.
+
+    Returns:
+        dict[str, int]: The number of deleted rows per table.
+    """
+    recording_ids = sa.select(Recording.id)
+    num_deleted_rows = {}
+    for table in crud.RECORDING_TABLES:
+        num_deleted_rows[table.__tablename__] = (
+            session.query(table)
+            .filter(
+                table.recording_id.is_not(None),
+                table.recording_id.not_in(recording_ids),
+            )
+            .delete(synchronize_session=False)
+        )
+    if search.has_search_table(session):
+        num_deleted_rows[search.SEARCH_TABLE] = session.execute(
+            sa.text(
+                f"DELETE FROM {search.SEARCH_TABLE}"
+                " WHERE recording_id NOT IN (SELECT id FROM recording)"
+            )
+        ).rowcount
+    num_deleted_rows[WindowState.__tablename__] = (
+        session.query(WindowState)
+        .filter(
+            WindowState.hash.not_in(
+                sa.select(WindowEvent.state_hash).where(
+                    WindowEvent.state_hash.is_not(None)
+                )
+            )
+        )
+        .delete(synchronize_session=False)
+    )
+    if num_deleted_rows[WindowState.__tablename__]:
+        # the deleted states may be inserted again
+        crud.inserted_window_states.clear()
+    session.commit()
+    return num_deleted_rows
+
+
+def delete_unreferenced_events(session: SaSession) -> dict[str, int]:
+    """Delete screenshots and window events not referenced by any action event.
+
+    Only finished recordings (i.e. those with a RecordingSummary) are pruned.
+    Summaries of pruned recordings are updated.
+
+    Args:
+        session (sa.orm.Session): The database session.
+
+    Returns:
+        dict[str, int]: The number of deleted rows per table.
+    """
+    finished_recording_ids = sa.select(RecordingSummary.recording_id)
+    pruned_recording_ids = set()
+    num_deleted_rows = {}
+    for table, action_event_fk in (
+        (Screenshot, ActionEvent.screenshot_id),
+        (WindowEvent, ActionEvent.window_event_id),
+    ):
+        unreferenced = sa.and_(
+            table.recording_id.in_(finished_recording_ids),
+            table.id.not_in(
+                sa.select(action_event_fk).where(action_event_fk.is_not(None))
+            ),
+        )
+        pruned_recording_ids |= {
+            recording_id
+            for (recording_id,) in session.query(table.recording_id)
+            .filter(unreferenced)
+            .distinct()
+        }
+        num_deleted_rows[table.__tablename__] = (
+            session.query(table).filter(unreferenced).delete(synchronize_session=False)
+        )
+    session.commit()
+    for recording in (
+        session.query(Recording).filter(Recording.id.in_(pruned_recording_ids)).all()
+    ):
+        crud.update_recording_summary(session, recording)
+    return num_deleted_rows
+
+
+def get_orphaned_files(session: SaSession) -> list[str]:
+    """Get the video files and performance plots of recordings that do not exist.
+
+    Args:
+        session (sa.orm.Session): The database session.
+
+    Returns:
+        list[str]: The paths of the orphaned files.
+    """
+    recording_timestamps = {
+        timestamp for (timestamp,) in session.query(Recording.timestamp)
+    }
+    file_paths = []
+    for dir_path, file_name_regex in (
+        (config.VIDEO_DIR_PATH, VIDEO_FILE_NAME_REGEX),
+        (PERFORMANCE_PLOTS_DIR_PATH, PERFORMANCE_PLOT_FILE_NAME_REGEX),
+    ):
+        if not os.path.isdir(dir_path):
+            continue
+        for file_name in sorted(os.listdir(dir_path)):
+            match = file_name_regex.fullmatch(file_name)
+            if match and float(match["timestamp"]) not in recording_timestamps:
+                file_paths.append(os.path.join(dir_path, file_name))
+    return file_paths
+
+
+def get_table_sizes(session: SaSession) -> dict[str, int]:
+    """Get the number of bytes used by each table and index in the database.
+
+    Args:
+        session (sa.orm.Session): The database session.
+
+    Returns:
+        dict[str, int]: The size of each table and index, or an empty dict if the
+            SQLite library was compiled without the dbstat virtual table.
+    """
+    try:
+        rows = session.execute(
+            sa.text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")
+        ).all()
+    except sa.exc.OperationalError as exc:
+        logger.warning(f"Unable to get table sizes: {exc}")
+        session.rollback()
+        return {}
+    return dict(rows)
+
+
+def get_database_size(session: SaSession) -> int:
+    """Get the size of the database in bytes, excluding free pages.
+
+    Args:
+        session (sa.orm.Session): The database session.
+
+    Returns:
+        int: The size of the database.
+    """
+    page_size = session.execute(sa.text("PRAGMA page_size")).scalar()
+    page_count = session.execute(sa.text("PRAGMA page_count")).scalar()
+    freelist_count = session.execute(sa.text("PRAGMA freelist_count")).scalar()
+    return page_size * (page_count - freelist_count)
+
+
+def vacuum(session: SaSession, mode: str = "incremental") -> None:
+    """Return the free pages of the database to the file system.
+
+    Incremental vacuuming requires auto_vacuum=INCREMENTAL, which is enabled (with
+    a full VACUUM) the first time it is requested.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        mode (str): One of VACUUM_MODES.
+    """
+    assert mode in VACUUM_MODES, mode
+    if mode == "none":
+        return
+    session.commit()
+    # VACUUM cannot run within a transaction
+    with session.get_bind().connect() as connection:
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        auto_vacuum = connection.execute(sa.text("PRAGMA auto_vacuum")).scalar()
+        if mode == "incremental" and auto_vacuum == SQLITE_AUTO_VACUUM_INCREMENTAL:
+            logger.info("Running incremental vacuum...")
+            connection.execute(sa.text("PRAGMA incremental_vacuum"))
+        else:
+            if mode == "incremental":
+                logger.info("Enabling incremental auto_vacuum...")
+                connection.execute(sa.text("PRAGMA auto_vacuum = INCREMENTAL"))
+            logger.info("Running VACUUM...")
+            connection.execute(sa.text("VACUUM"))
+
+
+def apply_retention(
+    session: SaSession,
+    max_age_days: float | None = None,
+    max_total_bytes: int | None = None,
+    keep_scrubbed_only: bool = False,
+    prune_unreferenced: bool = False,
+    vacuum_mode: str = "incremental",
+    dry_run: bool = False,
+) -> dict:
+    """Apply the retention policies and reclaim the space they free up.
+
+    Args:
+        session (sa.orm.Session): A read-and-write database session.
+        max_age_days (float, optional): Delete recordings older than this.
+        max_total_bytes (int, optional): Delete the oldest recordings until the
+            remaining recordings fit into this many bytes.
+        keep_scrubbed_only (bool): Delete all recordings that have not been
+            scrubbed.
+        prune_unreferenced (bool): Delete the screenshots and window events of
+            finished recordings that are not referenced by any action event.
+        vacuum_mode (str): One of VACUUM_MODES.
+        dry_run (bool): Only report the recordings that would be deleted, without
+            changing the database.
+
+    Returns:
+        dict: A report with the keys "recordings" (the deleted recordings),
+            "deleted_rows" (the number of deleted rows per table),
+            "deleted_files" (the number of bytes per deleted file),
+            "reclaimed_table_bytes" (the number of bytes reclaimed per table and
+            index) and "reclaimed_file_bytes" (the number of bytes by which the
+            database file shrunk).
+    """
+    recordings = select_recordings(
+        session, max_age_days, max_total_bytes, keep_scrubbed_only, dry_run=dry_run
+    )
+    report = {
+        "recordings": [
+            {
+                "id": recording.id,
+                "timestamp": recording.timestamp,
+                "task_description": recording.task_description,
+            }
+            for recording in recordings
+        ],
+        "deleted_rows": {},
+        "deleted_files": {},
+        "reclaimed_table_bytes": {},
+        "reclaimed_file_bytes": 0,
+    }
+    if dry_run:
+        return report
+
+    db_file_path = session.get_bind().url.database
+    file_size_before = os.path.getsize(db_file_path) if db_file_path else 0
+    table_sizes_before = get_table_sizes(session)
+
+    recording_timestamps = [recording.timestamp for recording in recordings]
+    video_bytes = {
+        file_path: os.path.getsize(file_path)
+        for recording_timestamp in recording_timestamps
+        for file_path in video.get_video_file_paths(recording_timestamp)
+    }
+    deleted_rows_by_step = []
+    for recording in recordings:
+        deleted_rows_by_step.append(crud.delete_recording(session, recording))
+    report["deleted_files"].update(video_bytes)
+    if prune_unreferenced:
+        deleted_rows_by_step.append(delete_unreferenced_events(session))
+    # window states may be orphaned by pruning window events, so this runs last
+    deleted_rows_by_step.append(delete_orphaned_rows(session))
+
+    deleted_rows = {}
+    for step_deleted_rows in deleted_rows_by_step:
+        for table_name, num_rows in step_deleted_rows.items():
+            deleted_rows[table_name] = deleted_rows.get(table_name, 0) + num_rows
+    report["deleted_rows"] = {
+        table_name: num_rows
+        for table_name, num_rows in deleted_rows.items()
+        if num_rows
+    }
+
+    for file_path in get_orphaned_files(session):
+        report["deleted_files"][file_path] = os.path.getsize(file_path)
+        os.remove(file_path)
+        logger.info(f"Deleted orphaned file: {file_path}")
+
+    vacuum(session, vacuum_mode)
+
+    table_sizes_after = get_table_sizes(session)
+    report["reclaimed_table_bytes"] = {
+        name: size - table_sizes_after.get(name, 0)
+        for name, size in table_sizes_before.items()
+        if size != table_sizes_after.get(name, 0)
+    }
+    file_size_after = os.path.getsize(db_file_path) if db_file_path else 0
+    report["reclaimed_file_bytes"] = file_size_before - file_size_after
+    return report
+
+
+@click.command()
+@click.option("--max-age-days", type=float, help="Delete recordings older than this.")
+@click.option(
+    "--max-size-mb",
+    type=float,
+    help="Delete the oldest recordings until the rest fit into this many megabytes.",
+)
+@click.option(
+    "--keep-scrubbed-only",
+    is_flag=True,
+    help="Delete all recordings that have not been scrubbed.",
+)
+@click.option(
+    "--prune-unreferenced",
+    is_flag=True,
+    help="Delete screenshots and window events not referenced by action events.",
+)
+@click.option(
+    "--vacuum",
+    "vacuum_mode",
+    type=click.Choice(VACUUM_MODES),
+    default="incremental",
+    help="How to shrink the database file.",
+)
+@click.option("--dry-run", is_flag=True, help="Only list what would be deleted.")
+@click.option("--yes", is_flag=True, help="Do not ask for confirmation.")
+def main(
+    max_age_days: float | None,
+    max_size_mb: float | None,
+    keep_scrubbed_only: bool,
+    prune_unreferenced: bool,
+    vacuum_mode: str,
+    dry_run: bool,
+    yes: bool,
+) -> int:
+    """Applies the retention policies to the database."""
+    logger.remove()
+    logger.add(
+        stdout,
+        colorize=True,
+        format="<blue>[DB]          </blue><yellow>{message}</yellow>",
+    )
+
+    # the database lock is held while recording
+    if not crud.acquire_db_lock(timeout=5):
+        logger.error("Failed to acquire database lock. Is a recording in progress?")
+        return 1
+
+    try:
+        max_total_bytes = None if max_size_mb is None else int(max_size_mb * 1e6)
+        with crud.get_new_session(read_and_write=True) as session:
+            policy_kwargs = {
+                "max_age_days": max_age_days,
+                "max_total_bytes": max_total_bytes,
+                "keep_scrubbed_only": keep_scrubbed_only,
+            }
+            report = apply_retention(session, **policy_kwargs, dry_run=True)
+            for recording in report["recordings"]:
+                logger.info(
+                    f"Selected {recording['task_description']} |"
+                    f" {recording['timestamp']}"
+                )
+            if dry_run:
+                return 0
+            if (
+                report["recordings"]
+                and not yes
+                and not click.confirm(
+                    f"Are you sure you want to delete {len(report['recordings'])}"
+                    " recordings?"
+                )
+            ):
+                logger.info("Aborting...")
+                return 0
+            start_time = time.perf_counter()
+            report = apply_retention(
+                session,
+                **policy_kwargs,
+                prune_unreferenced=prune_unreferenced,
+                vacuum_mode=vacuum_mode,
+            )
+            duration = time.perf_counter() - start_time
+    finally:
+        crud.release_db_lock()
+
+    for table_name, num_rows in report["deleted_rows"].items():
+        logger.info(f"Deleted {num_rows} rows from {table_name}")
+    for file_path, num_bytes in report["deleted_files"].items():
+        logger.info(f"Deleted {file_path} ({num_bytes / 1e6:.1f} MB)")
+    for name, num_bytes in report["reclaimed_table_bytes"].items():
+        logger.info(f"Reclaimed {num_bytes / 1e6:.1f} MB from {name}")
+    logger.info(
+        "Database file shrunk by"
+        f" {report['reclaimed_file_bytes'] / 1e6:.1f} MB in"
+        f" {duration:.1f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    main()
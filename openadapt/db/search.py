@@ -0,0 +1,317 @@
+"""Full-text search over recordings.
+
+The text of a recording is stored in the recording_search SQLite FTS5 table, one
+row (document) per piece of text, of one of these kinds:
+
+- task: the task description of the recording.
+- text: text typed by the user, reduced from key presses (with backspaces applied),
+  in chunks ending at a click, enter or tab, or a change of window.
+- window: the title of a window the user interacted with.
+- browser: the URL and title of a web page the user interacted with.
+
+A recording is indexed when its events are post-processed (see
+crud.post_process_events), and its documents are deleted with its rows. Searching
+returns the best matching documents, ranked by BM25, with a snippet of each.
+
+Usage:
+    python -m openadapt.db.search reindex
+    python -m openadapt.db.search query <text> [--limit <int>]
+"""
+
+from typing import Any
+import re
+
+from sqlalchemy.orm import Session as SaSession
+import click
+import sqlalchemy as sa
+
+from openadapt.custom_logger import logger
+from openadapt.db import db
+from openadapt.models import ActionEvent, BrowserEvent, Recording, WindowEvent
+
+SEARCH_TABLE = db.SEARCH_TABLE_PREFIX
+CREATE_SEARCH_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "content, kind UNINDEXED, recording_id UNINDEXED, timestamp UNINDEXED,"
+    " tokenize = 'unicode61 remove_diacritics 2')"
+)
+TASK = "task"
+TEXT = "text"
+WINDOW = "window"
+BROWSER = "browser"
+# key names ending a chunk of typed text, and those typing a character
+CHUNK_END_KEY_NAMES = ("enter", "tab")
+KEY_NAME_CHARS = {"space": " "}
+BACKSPACE_KEY_NAME = "backspace"
+TITLE_REGEX = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+SNIPPET_MAX_TOKENS = 12
+
+# created with the other tables (e.g. by create_all in tests)
+sa.event.listen(
+    db.Base.metadata,
+    "after_create",
+    sa.DDL(CREATE_SEARCH_TABLE_SQL).execute_if(dialect="sqlite"),
+)
+
+
+def get_typed_text_chunks(
+    action_events: list[ActionEvent],
+) -> list[tuple[float, str]]:
+    """Reduce the key presses of action events to chunks of typed text.
+
+    Args:
+        action_events (list[ActionEvent]): The action events, ordered by timestamp.
+
+    Returns:
+        list[tuple[float, str]]: The timestamp of the first key press and the text
+            of each chunk.
+    """
+    chunks = []
+    chars = []
+    chunk_timestamp = None
+    window_event_timestamp = None
+
+    def end_chunk() -> None:
+        text = "".join(chars).strip()
+        if text:
+            chunks.append((chunk_timestamp, text))
+        chars.clear()
+
+    for action_event in action_events:
+        if action_event.window_event_timestamp != window_event_timestamp:
+            end_chunk()
+            window_event_timestamp = action_event.window_event_timestamp
+        if action_event.name == "click":
+            end_chunk()
+        if action_event.name != "press":
+            continue
+        if not chars:
+            chunk_timestamp = action_event.timestamp
+        if action_event.key_char:
+            chars.append(action_event.key_char)
+        elif action_event.key_name in KEY_NAME_CHARS:
+            chars.append(KEY_NAME_CHARS[action_event.key_name])
+        elif action_event.key_name == BACKSPACE_KEY_NAME:
+            if chars:
+                chars.pop()
+        elif action_event.key_name in CHUNK_END_KEY_NAMES:
+            end_chunk()
+    end_chunk()
+    return chunks
+
+
+def get_documents(session: SaSession, recording: Recording) -> list[dict[str, Any]]:
+    """Get the documents of a recording.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+
+    Returns:
+        list[dict]: The documents, with their content, kind, recording_id and
+            timestamp.
+    """
+    documents = []
+    if recording.task_description:
+        documents.append((TASK, recording.timestamp, recording.task_description))
+
+    action_events = (
+        session.query(ActionEvent)
+        .filter(
+            ActionEvent.recording_id == recording.id,
+            ActionEvent.name.in_(("press", "click")),
+        )
+        .order_by(ActionEvent.timestamp)
+        .all()
+    )
+    documents += [
+        (TEXT, timestamp, text)
+        for timestamp, text in get_typed_text_chunks(action_events)
+    ]
+
+    # each distinct title once, at its first occurrence
+    window_titles = (
+        session.query(WindowEvent.title, sa.func.min(WindowEvent.timestamp))
+        .filter(
+            WindowEvent.recording_id == recording.id,
+            WindowEvent.title.is_not(None),
+            WindowEvent.title != "",
+        )
+        .group_by(WindowEvent.title)
+    )
+    documents += [(WINDOW, timestamp, title) for title, timestamp in window_titles]
+
+    browser_pages = {}
+    browser_events = (
+        session.query(BrowserEvent)
+        .filter(BrowserEvent.recording_id == recording.id)
+        .order_by(BrowserEvent.timestamp)
+        .yield_per(100)
+    )
+    for browser_event in browser_events:
+        message = browser_event.message or {}
+        url = message.get("url")
+        if not url:
+            continue
+        title_match = TITLE_REGEX.search(message.get("visibleHTMLString") or "")
+        title = title_match.group(1).strip() if title_match else ""
+        browser_pages.setdefault((url, title), browser_event.timestamp)
+    documents += [
+        (BROWSER, timestamp, f"{title} {url}".strip())
+        for (url, title), timestamp in browser_pages.items()
+    ]
+    return [
+        {
+            "content": content,
+            "kind": kind,
+            "recording_id": recording.id,
+            "timestamp": timestamp,
+        }
+        for kind, timestamp, content in documents
+    ]
+
+
+def has_search_table(session: SaSession) -> bool:
+    """Whether the database has the search table.
+
+    Args:
+        session (sa.orm.Session): The database session.
+
+    Returns:
+        bool: Whether the search table exists.
+    """
+    return sa.inspect(session.connection()).has_table(SEARCH_TABLE)
+
+
+def delete_documents(session: SaSession, recording_id: int) -> int:
+    """Delete the documents of a recording, without committing.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording_id (int): The id of the recording.
+
+    Returns:
+        int: The number of deleted documents.
+    """
+    if not has_search_table(session):
+        return 0
+    return session.execute(
+        sa.text(f"DELETE FROM {SEARCH_TABLE} WHERE recording_id = :recording_id"),
+        {"recording_id": recording_id},
+    ).rowcount
+
+
+def index_recording(session: SaSession, recording: Recording) -> int:
+    """Replace the documents of a recording, and commit.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+
+    Returns:
+        int: The number of documents.
+    """
+    documents = get_documents(session, recording)
+    session.execute(sa.text(CREATE_SEARCH_TABLE_SQL))
+    delete_documents(session, recording.id)
+    if documents:
+        session.execute(
+            sa.text(
+                f"INSERT INTO {SEARCH_TABLE} (content, kind, recording_id, timestamp)"
+                " VALUES (:content, :kind, :recording_id, :timestamp)"
+            ),
+            documents,
+        )
+    session.commit()
+    return len(documents)
+
+
+def get_match_query(query: str) -> str:
+    """Convert text to an FTS5 query matching documents containing all its words.
+
+    The last word also matches words it is a prefix of, e.g. while typing.
+
+    Args:
+        query (str): The text.
+
+    Returns:
+        str: The FTS5 query, or an empty string if the text has no words.
+    """
+    phrases = ['"' + word.replace('"', '""') + '"' for word in query.split()]
+    if phrases:
+        phrases[-1] += "*"
+    return " ".join(phrases)
+
+
+def search(
+    session: SaSession,
+    query: str,
+    limit: int = 20,
+    kinds: tuple[str, ...] | None = None,
+) -> list[dict[str, Any]]:
+    """Search the documents of all recordings.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        query (str): The text to search for.
+        limit (int): The maximum number of documents.
+        kinds (tuple[str, ...] | None): Only search documents of these kinds.
+
+    Returns:
+        list[dict]: The best matching documents, with their recording_id, kind,
+            timestamp, content and snippet (with matches in [brackets]).
+    """
+    match_query = get_match_query(query)
+    if not match_query or not has_search_table(session):
+        return []
+    kind_filter = ""
+    params = {"query": match_query, "limit": limit}
+    if kinds:
+        kind_filter = " AND kind IN :kinds"
+        params["kinds"] = kinds
+    statement = sa.text(
+        "SELECT recording_id, kind, timestamp, content,"
+        f" snippet({SEARCH_TABLE}, 0, '[', ']', '...', {SNIPPET_MAX_TOKENS})"
+        f" AS snippet FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query"
+        f"{kind_filter} ORDER BY rank LIMIT :limit"
+    )
+    if kinds:
+        statement = statement.bindparams(sa.bindparam("kinds", expanding=True))
+    return [dict(row._mapping) for row in session.execute(statement, params)]
+
+
+@click.group()
+def main() -> None:
+    """Index and search the text of recordings."""
+
+
+@main.command()
+def reindex() -> None:
+    """Index all recordings."""
+    # avoid circular import
+    from openadapt.db import crud
+
+    with crud.get_new_session(read_and_write=True) as session:
+        for recording in session.query(Recording).order_by(Recording.id):
+            num_documents = index_recording(session, recording)
+            logger.info(f"indexed {recording.id=} {num_documents=}")
+
+
+@main.command()
+@click.argument("text")
+@click.option("--limit", default=20, help="The maximum number of results.")
+def query(text: str, limit: int) -> None:
+    """Search the text of recordings."""
+    # avoid circular import
+    from openadapt.db import crud
+
+    with crud.get_new_session(read_only=True) as session:
+        for document in search(session, text, limit):
+            click.echo(
+                f"{document['recording_id']}\t{document['kind']}\t"
+                f"{document['snippet']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Converts database rows to dicts and JSON, e.g. for the dashboard and visualize.
+
+Rows used to be converted with dictalchemy (see DictableModel.asdict), which
+inspects the mapper of the row and resolves its attribute names on every call, and
+deep copies the arguments of followed relationships for every child. Here the
+attribute names of each model are resolved once into an extractor (see
+get_extractor), producing the same dicts. JSON is encoded to bytes by orjson,
+which serializes numpy arrays, datetimes and dataclasses natively.
+"""
+
+from typing import Any, Callable
+import base64
+import functools
+import operator
+
+from dictalchemy import DictableModel
+from pynput import keyboard
+import orjson
+import sqlalchemy as sa
+
+# properties of rows included in their dicts, if they have them (but not in the
+# dicts of their children)
+INCLUDED_ATTR_NAMES = (
+    "key",
+    "text",
+    "canonical_key",
+    "canonical_text",
+    "reducer_names",
+)
+# attributes which are large or slow to load, e.g. to exclude from payloads
+HEAVY_ATTR_NAMES = (
+    "element_state",
+    "state",
+    "png_data",
+    "png_diff_data",
+    "png_diff_mask_data",
+    "tile_grid",
+    "thumbnail_data",
+)
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+@functools.lru_cache()
+def get_extractor(
+    model: type,
+    include: tuple[str, ...] = (),
+    exclude: tuple[str, ...] = (),
+) -> Callable[[DictableModel], dict]:
+    """Get a function converting the rows of a model to dicts, as asdict would.
+
+    Args:
+        model (type): The model.
+        include (tuple[str, ...]): The names of properties to include.
+        exclude (tuple[str, ...]): The names of attributes to exclude.
+
+    Returns:
+        Callable[[DictableModel], dict]: The function.
+    """
+    mapper = sa.inspect(model)
+    exclude = set(exclude) | set(getattr(model, "dictalchemy_exclude", None) or ())
+    if getattr(model, "dictalchemy_exclude_underscore", True):
+        exclude |= {attr.key for attr in mapper.attrs if attr.key.startswith("_")}
+    include = list(include) + list(
+        getattr(
+            model,
+            "dictalchemy_asdict_include",
+            getattr(model, "dictalchemy_include", None),
+        )
+        or ()
+    )
+    attr_names = [
+        attr_name
+        for attr_name in (
+            [column_attr.key for column_attr in mapper.column_attrs]
+            + [synonym.key for synonym in mapper.synonyms]
+            + include
+        )
+        if attr_name not in exclude
+    ]
+    get_values = operator.attrgetter(*attr_names)
+    if len(attr_names) == 1:
+        return lambda row: {attr_names[0]: get_values(row)}
+    return lambda row: dict(zip(attr_names, get_values(row)))
+
+
+def row2dict(
+    row: dict | DictableModel,
+    follow: bool = True,
+    exclude: tuple[str, ...] = (),
+    jsonable: bool = False,
+) -> dict:
+    """Convert a row to a dict (see utils.row2dict).
+
+    Args:
+        row (dict | DictableModel): The row.
+        follow (bool): Whether to include the children of the row, recursively.
+        exclude (tuple[str, ...]): The names of attributes to exclude, e.g.
+            HEAVY_ATTR_NAMES.
+        jsonable (bool): Whether to convert keys to strings and reducer names to a
+            list, for serialization.
+
+    Returns:
+        dict: The row as a dict.
+    """
+    if not row:
+        return {}
+    if isinstance(row, dict):
+        return row
+    if type(row).asdict is not DictableModel.asdict:
+        # e.g. ScrubbedRecording
+        return row.asdict()
+    include = tuple(
+        attr_name for attr_name in INCLUDED_ATTR_NAMES if hasattr(row, attr_name)
+    )
+    row_dict = get_extractor(type(row), include, exclude)(row)
+    if follow and hasattr(row, "children"):
+        row_dict["children"] = [
+            get_child_dict(child, exclude) for child in row.children
+        ]
+    if jsonable:
+        # keys are enums, which orjson would serialize by value
+        for attr_name in ("key", "canonical_key"):
+            if row_dict.get(attr_name) is not None:
+                row_dict[attr_name] = str(row_dict[attr_name])
+        if "reducer_names" in row_dict:
+            row_dict["reducer_names"] = sorted(row_dict["reducer_names"])
+    return row_dict
+
+
+def get_child_dict(row: DictableModel, exclude: tuple[str, ...]) -> dict:
+    """Convert a child row to a dict, with its children but without properties.
+
+    Args:
+        row (DictableModel): The child row.
+        exclude (tuple[str, ...]): The names of attributes to exclude.
+
+    Returns:
+        dict: The row as a dict.
+    """
+    row_dict = get_extractor(type(row), (), exclude)(row)
+    row_dict["children"] = [get_child_dict(child, exclude) for child in row.children]
+    return row_dict
+
+
+def default(value: Any, exclude: tuple[str, ...] = ()) -> Any:
+    """Convert a value orjson does not serialize, e.g. rows and keys.
+
+    Args:
+        value (Any): The value.
+        exclude (tuple[str, ...]): The names of attributes of rows to exclude.
+
+    Returns:
+        Any: The value, serializable by orjson.
+    """
+    if isinstance(value, DictableModel):
+        return row2dict(value, exclude=exclude, jsonable=True)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, keyboard.KeyCode):
+        # keyboard.Key is an enum, serialized by orjson by value (see row2dict)
+        return str(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any, exclude: tuple[str, ...] = ()) -> bytes:
+    """Serialize a value to JSON, including rows (see row2dict).
+
+    Args:
+        value (Any): The value, e.g. a dict of rows, or dicts of rows.
+        exclude (tuple[str, ...]): The names of attributes of rows to exclude, e.g.
+            HEAVY_ATTR_NAMES.
+
+    Returns:
+        bytes: The JSON.
+    """
+    return orjson.dumps(
+        value,
+        default=functools.partial(default, exclude=exclude),
+        option=ORJSON_OPTIONS,
+    )
@@ -0,0 +1,183 @@
+"""Tile-based storage of screenshot images.
+
+Consecutive screenshots of a desktop usually differ in small regions only. With
+config.RECORD_IMAGE_TILES, screenshot images are split into square tiles of
+TILE_SIZE pixels, and each distinct tile is stored once per recording (in the
+screenshot_tile table), compressed with zstd. A screenshot then only stores its
+tile grid: a short header followed by the hash of each of its tiles, in row-major
+order. Images are reassembled from their tiles with NumPy.
+
+Module: tiles.py
+"""
+
+from collections import OrderedDict
+from typing import Callable
+import hashlib
+import struct
+import threading
+
+from PIL import Image
+import numpy as np
+
+from openadapt.db import compression
+
+TILE_SIZE = 64
+HASH_SIZE = 16
+GRID_MAGIC = b"OATG"
+# magic, mode, width, height, tile size
+GRID_HEADER = struct.Struct("<4s4sIIH")
+CHANNELS_BY_MODE = {"L": 1, "RGB": 3, "RGBA": 4}
+# decompressed tiles, shared by the screenshots of a recording
+MAX_CACHED_TILES = 4096
+
+_tile_cache = OrderedDict()
+_tile_cache_lock = threading.Lock()
+
+
+def hash_tile(tile: bytes) -> str:
+    """Get the hash of the pixels of a tile.
+
+    Args:
+        tile (bytes): The pixels of the tile.
+
+    Returns:
+        str: The hash.
+    """
+    return hashlib.blake2b(tile, digest_size=HASH_SIZE).hexdigest()
+
+
+def split_image(
+    image: Image.Image, tile_size: int = TILE_SIZE
+) -> tuple[bytes, dict[str, bytes]]:
+    """Split an image into tiles.
+
+    Images whose size is not a multiple of tile_size are padded with zeros.
+
+    Args:
+        image (Image.Image): The image, in mode "L", "RGB" or "RGBA".
+        tile_size (int): The width and height of the tiles in pixels.
+
+    Returns:
+        tuple[bytes, dict[str, bytes]]: The tile grid of the image, and the pixels
+            of each distinct tile by hash.
+    """
+    assert image.mode in CHANNELS_BY_MODE, image.mode
+    num_channels = CHANNELS_BY_MODE[image.mode]
+    pixels = np.asarray(image).reshape(image.height, image.width, num_channels)
+    num_rows = -(-image.height // tile_size)
+    num_cols = -(-image.width // tile_size)
+    pixels = np.pad(
+        pixels,
+        (
+            (0, num_rows * tile_size - image.height),
+            (0, num_cols * tile_size - image.width),
+            (0, 0),
+        ),
+    )
+    # (rows, tile_size, cols, tile_size, channels) -> one tile per row
+    tile_pixels = np.ascontiguousarray(
+        pixels.reshape(num_rows, tile_size, num_cols, tile_size, num_channels)
+        .swapaxes(1, 2)
+        .reshape(num_rows * num_cols, -1)
+    )
+    tiles = {}
+    digests = []
+    for tile in tile_pixels:
+        tile_bytes = tile.tobytes()
+        tile_hash = hash_tile(tile_bytes)
+        tiles[tile_hash] = tile_bytes
+        digests.append(bytes.fromhex(tile_hash))
+    header = GRID_HEADER.pack(
+        GRID_MAGIC, image.mode.encode().ljust(4), image.width, image.height, tile_size
+    )
+    return header + b"".join(digests), tiles
+
+
+def compress_tile(tile: bytes) -> bytes:
+    """Compress the pixels of a tile for storage.
+
+    Args:
+        tile (bytes): The pixels of the tile.
+
+    Returns:
+        bytes: The compressed tile.
+    """
+    return compression.compress_bytes(tile)
+
+
+def get_tile_hashes(tile_grid: bytes) -> list[str]:
+    """Get the hashes of the tiles of a tile grid, in row-major order.
+
+    Args:
+        tile_grid (bytes): The tile grid.
+
+    Returns:
+        list[str]: The hashes.
+    """
+    digests = memoryview(tile_grid)[GRID_HEADER.size :]
+    return [
+        digests[offset : offset + HASH_SIZE].hex()
+        for offset in range(0, len(digests), HASH_SIZE)
+    ]
+
+
+def assemble_image(
+    tile_grid: bytes,
+    load_tiles: Callable[[list[str]], dict[str, bytes]],
+) -> Image.Image:
+    """Reassemble an image from its tiles.
+
+    Args:
+        tile_grid (bytes): The tile grid of the image (see split_image).
+        load_tiles (Callable): A function returning the compressed tiles with the
+            given hashes, by hash. Only called for tiles that are not cached.
+
+    Returns:
+        Image.Image: The image.
+    """
+    magic, mode, width, height, tile_size = GRID_HEADER.unpack_from(tile_grid)
+    assert magic == GRID_MAGIC, magic
+    mode = mode.decode().strip()
+    num_channels = CHANNELS_BY_MODE[mode]
+    num_rows = -(-height // tile_size)
+    num_cols = -(-width // tile_size)
+
+    tile_hashes = get_tile_hashes(tile_grid)
+    unique_hashes = list(dict.fromkeys(tile_hashes))
+    with _tile_cache_lock:
+        tiles = {
+            tile_hash: _tile_cache[tile_hash]
+            for tile_hash in unique_hashes
+            if tile_hash in _tile_cache
+        }
+    missing_hashes = [
+        tile_hash for tile_hash in unique_hashes if tile_hash not in tiles
+    ]
+    if missing_hashes:
+        loaded_tiles = load_tiles(missing_hashes)
+        for tile_hash in missing_hashes:
+            tiles[tile_hash] = np.frombuffer(
+                compression.decompress_bytes(loaded_tiles[tile_hash]), dtype=np.uint8
+            )
+        with _tile_cache_lock:
+            for tile_hash in missing_hashes:
+                _tile_cache[tile_hash] = tiles[tile_hash]
+            while len(_tile_cache) > MAX_CACHED_TILES:
+                _tile_cache.popitem(last=False)
+
+    unique_tiles = np.stack([tiles[tile_hash] for tile_hash in unique_hashes])
+    idx_by_hash = {tile_hash: idx for idx, tile_hash in enumerate(unique_hashes)}
+    tile_idxs = np.fromiter(
+        (idx_by_hash[tile_hash] for tile_hash in tile_hashes),
+        dtype=np.intp,
+        count=len(tile_hashes),
+    )
+    pixels = (
+        unique_tiles[tile_idxs]
+        .reshape(num_rows, num_cols, tile_size, tile_size, num_channels)
+        .swapaxes(1, 2)
+        .reshape(num_rows * tile_size, num_cols * tile_size, num_channels)
+    )[:height, :width]
+    if num_channels == 1:
+        pixels = pixels[:, :, 0]
+    return Image.fromarray(np.ascontiguousarray(pixels), mode)
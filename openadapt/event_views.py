@@ -0,0 +1,385 @@
+"""Lightweight read-only views of the events of recordings.
+
+Loading events as ORM objects is costly for long recordings: each row goes through
+the identity map, attribute instrumentation and relationship loading, and each key
+object is parsed from the key columns whenever the key or text of an event is read.
+Consumers which only read events (e.g. productivity metrics) can load views instead:
+frozen dataclasses with slots, populated from the rows of a Core select, whose keys
+and texts are computed on first access and cached.
+
+The views have the attributes of the models read by such consumers, so functions
+written for models also accept views. They are detached from any session, and
+picklable (e.g. as results of openadapt.batch). Heavy columns (element_state, the
+state of window events and the image data of screenshots) are not loaded; ORM
+objects remain the way to read them, and to change or persist events.
+
+Usage:
+
+    action_events = event_views.get_action_events(session, recording)
+    window_events = event_views.get_window_events(session, recording)
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Iterable
+import functools
+
+from pynput import keyboard
+from sqlalchemy.orm import Session as SaSession
+import sqlalchemy as sa
+
+from openadapt.config import config
+from openadapt.db import crud
+from openadapt.models import ActionEvent, Recording, Screenshot, WindowEvent
+
+# maximum number of ids in the IN clause of a query
+MAX_IDS_PER_QUERY = 500
+
+
+@dataclass(frozen=True, slots=True)
+class WindowEventView:
+    """A read-only view of a window event, without its state."""
+
+    id: int
+    recording_timestamp: float | None
+    recording_id: int | None
+    timestamp: float | None
+    title: str | None
+    left: int | None
+    top: int | None
+    width: int | None
+    height: int | None
+    window_id: str | None
+
+    @classmethod
+    def from_event(
+        cls: type["WindowEventView"], event: WindowEvent
+    ) -> "WindowEventView":
+        """Get a view of a window event.
+
+        Args:
+            event (WindowEvent): The window event.
+
+        Returns:
+            WindowEventView: The view.
+        """
+        return cls(*(getattr(event, name) for name in get_column_names(cls)))
+
+
+@dataclass(frozen=True, slots=True)
+class ScreenshotView:
+    """A read-only view of a screenshot, without its image."""
+
+    id: int
+    recording_timestamp: float | None
+    recording_id: int | None
+    timestamp: float | None
+    width: int | None
+    height: int | None
+    image_hash: int | None
+
+    @classmethod
+    def from_event(cls: type["ScreenshotView"], event: Screenshot) -> "ScreenshotView":
+        """Get a view of a screenshot.
+
+        Args:
+            event (Screenshot): The screenshot.
+
+        Returns:
+            ScreenshotView: The view.
+        """
+        return cls(*(getattr(event, name) for name in get_column_names(cls)))
+
+
+@dataclass(frozen=True, slots=True)
+class ActionEventView:
+    """A read-only view of an action event and its children, without element_state.
+
+    The id of a parent event created by processing is None.
+    """
+
+    id: int | None
+    name: str | None
+    timestamp: float | None
+    recording_timestamp: float | None
+    recording_id: int | None
+    screenshot_timestamp: float | None
+    screenshot_id: int | None
+    window_event_timestamp: float | None
+    window_event_id: int | None
+    browser_event_timestamp: float | None
+    browser_event_id: int | None
+    mouse_x: float | None
+    mouse_y: float | None
+    mouse_dx: float | None
+    mouse_dy: float | None
+    active_segment_description: str | None
+    mouse_button_name: str | None
+    mouse_pressed: bool | None
+    key_name: str | None
+    key_char: str | None
+    key_vk: str | None
+    canonical_key_name: str | None
+    canonical_key_char: str | None
+    canonical_key_vk: str | None
+    parent_id: int | None
+    disabled: bool | None
+    scrubbed_text: str | None
+    scrubbed_canonical_text: str | None
+    window_event: WindowEventView | None = None
+    screenshot: ScreenshotView | None = None
+    children: tuple["ActionEventView", ...] = ()
+    reducer_names: frozenset[str] = frozenset()
+    # values computed on first access, by name
+    _cache: dict[str, Any] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def _get_cached(self, name: str, get_value: Callable[[], Any]) -> Any:
+        """Get a value computed on first access.
+
+        Args:
+            name (str): The name of the value.
+            get_value (Callable[[], Any]): The function computing the value.
+
+        Returns:
+            Any: The value.
+        """
+        if name not in self._cache:
+            self._cache[name] = get_value()
+        return self._cache[name]
+
+    # the key and text methods of ActionEvent only read attributes of the event
+
+    @property
+    def key(self) -> keyboard.Key | keyboard.KeyCode | str | None:
+        """Get the key associated with the action event."""
+        return self._get_cached(
+            "key",
+            lambda: ActionEvent._key(self, self.key_name, self.key_char, self.key_vk),
+        )
+
+    @property
+    def canonical_key(self) -> keyboard.Key | keyboard.KeyCode | str | None:
+        """Get the canonical key associated with the action event."""
+        return self._get_cached(
+            "canonical_key",
+            lambda: ActionEvent._key(
+                self,
+                self.canonical_key_name,
+                self.canonical_key_char,
+                self.canonical_key_vk,
+            ),
+        )
+
+    @property
+    def text(self) -> str:
+        """Get the text representation of the action event."""
+        if self.scrubbed_text:
+            return self.scrubbed_text
+        return self._get_cached("text", lambda: ActionEvent._text(self))
+
+    @property
+    def canonical_text(self) -> str:
+        """Get the canonical text representation of the action event."""
+        if self.scrubbed_canonical_text:
+            return self.scrubbed_canonical_text
+        return self._get_cached(
+            "canonical_text", lambda: ActionEvent._text(self, canonical=True)
+        )
+
+    @property
+    def raw_text(self) -> str:
+        """Return a string containing the raw action text (without separators)."""
+        return "".join(self.text.split(config.ACTION_TEXT_SEP))
+
+    @classmethod
+    def from_event(
+        cls: type["ActionEventView"], event: ActionEvent
+    ) -> "ActionEventView":
+        """Get a view of an action event, e.g. processed by events.get_events.
+
+        Args:
+            event (ActionEvent): The action event.
+
+        Returns:
+            ActionEventView: The view, with views of the related events and children.
+        """
+        return cls(
+            *(getattr(event, name) for name in get_column_names(cls)),
+            window_event=(
+                WindowEventView.from_event(event.window_event)
+                if event.window_event
+                else None
+            ),
+            screenshot=(
+                ScreenshotView.from_event(event.screenshot)
+                if event.screenshot
+                else None
+            ),
+            children=tuple(cls.from_event(child) for child in event.children),
+            reducer_names=frozenset(event.reducer_names),
+        )
+
+
+# view -> model of the rows of its columns
+MODELS = {
+    ActionEventView: ActionEvent,
+    WindowEventView: WindowEvent,
+    ScreenshotView: Screenshot,
+}
+
+
+@functools.lru_cache()
+def get_column_names(view_cls: type) -> tuple[str, ...]:
+    """Get the names of the columns of a view, in order.
+
+    Args:
+        view_cls (type): The class of the view, one of MODELS.
+
+    Returns:
+        tuple[str, ...]: The names of the columns.
+    """
+    table = MODELS[view_cls].__table__
+    return tuple(
+        view_field.name for view_field in fields(view_cls) if view_field.name in table.c
+    )
+
+
+def select_rows(view_cls: type) -> sa.Select:
+    """Select the columns of a view.
+
+    Args:
+        view_cls (type): The class of the view, one of MODELS.
+
+    Returns:
+        sa.Select: The select statement, from the table of the model of the view.
+    """
+    table = MODELS[view_cls].__table__
+    return sa.select(*(table.c[name] for name in get_column_names(view_cls)))
+
+
+def get_time_range_clauses(
+    model: type, start_time: float | None, end_time: float | None
+) -> list[sa.ColumnElement]:
+    """Get the clauses restricting rows to a time range (see crud.get_action_events).
+
+    Args:
+        model (type): The model of the rows.
+        start_time (float | None): The start of the time range, if any.
+        end_time (float | None): The end of the time range (exclusive), if any.
+
+    Returns:
+        list[sa.ColumnElement]: The clauses.
+    """
+    clauses = []
+    if start_time is not None:
+        clauses.append(model.timestamp >= start_time)
+    if end_time is not None:
+        clauses.append(model.timestamp < end_time)
+    return clauses
+
+
+def get_views_by_id(
+    session: SaSession, view_cls: type, ids: Iterable[int]
+) -> dict[int, Any]:
+    """Get views of the rows with ids.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        view_cls (type): The class of the views, one of MODELS.
+        ids (Iterable[int]): The ids of the rows.
+
+    Returns:
+        dict[int, Any]: The views, by id.
+    """
+    ids = sorted(set(ids) - {None})
+    table = MODELS[view_cls].__table__
+    views_by_id = {}
+    for idx in range(0, len(ids), MAX_IDS_PER_QUERY):
+        rows = session.execute(
+            select_rows(view_cls).where(
+                table.c.id.in_(ids[idx : idx + MAX_IDS_PER_QUERY])
+            )
+        )
+        views_by_id.update((row.id, view_cls(*row)) for row in rows)
+    return views_by_id
+
+
+def get_window_events(
+    session: SaSession,
+    recording: Recording,
+    start_time: float | None = None,
+    end_time: float | None = None,
+) -> list[WindowEventView]:
+    """Get views of the window events of a recording (see crud.get_window_events).
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+        start_time (float | None): Only get window events from this time on.
+        end_time (float | None): Only get window events before this time.
+
+    Returns:
+        list[WindowEventView]: The window events, in order of timestamp.
+    """
+    query = select_rows(WindowEventView).where(
+        WindowEvent.recording_id == recording.id,
+        *get_time_range_clauses(WindowEvent, start_time, end_time),
+    )
+    rows = session.execute(query.order_by(WindowEvent.timestamp))
+    return [WindowEventView(*row) for row in rows]
+
+
+def get_action_events(
+    session: SaSession,
+    recording: Recording,
+    start_time: float | None = None,
+    end_time: float | None = None,
+) -> list[ActionEventView]:
+    """Get views of the action events of a recording (see crud.get_action_events).
+
+    The action events of copies of recordings, which are processed, are nested in
+    their parent events as children (see events.get_events).
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+        start_time (float | None): Only get action events from this time on.
+        end_time (float | None): Only get action events before this time.
+
+    Returns:
+        list[ActionEventView]: The top-level action events, in order of timestamp,
+            with their window events and screenshots.
+    """
+    assert recording, "Invalid recording."
+    query = select_rows(ActionEventView).where(
+        ActionEvent.recording_id == recording.id,
+        *get_time_range_clauses(ActionEvent, start_time, end_time),
+    )
+    rows = session.execute(query.order_by(ActionEvent.timestamp)).all()
+    window_events_by_id = get_views_by_id(
+        session, WindowEventView, (row.window_event_id for row in rows)
+    )
+    screenshots_by_id = get_views_by_id(
+        session, ScreenshotView, (row.screenshot_id for row in rows)
+    )
+    rows_by_parent_id = defaultdict(list)
+    for row in rows:
+        rows_by_parent_id[row.parent_id].append(row)
+
+    def get_view(row: sa.Row) -> ActionEventView:
+        return ActionEventView(
+            *row,
+            window_event=window_events_by_id.get(row.window_event_id),
+            screenshot=screenshots_by_id.get(row.screenshot_id),
+            children=tuple(
+                get_view(child_row) for child_row in rows_by_parent_id.get(row.id, ())
+            ),
+        )
+
+    action_events = [get_view(row) for row in rows_by_parent_id[None]]
+    action_events = crud.filter_disabled_action_events(action_events)
+    # filter out stop sequences listed in STOP_SEQUENCES and Ctrl + C
+    crud.filter_stop_sequences(action_events)
+    return action_events
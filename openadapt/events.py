@@ -1,15 +1,15 @@
 """This module provides functionality for aggregating events."""
 
+from functools import partial
 from pprint import pformat
 from typing import Any, Callable, Optional
 import time
 
-from scipy.spatial import distance
 import numpy as np
 
 from openadapt import browser, common, models, utils
 from openadapt.custom_logger import logger
-from openadapt.db import crud
+from openadapt.db import crud, events_cache
 
 MAX_PROCESS_ITERS = 1
 MOUSE_MOVE_EVENT_MERGE_CLICK_DISTANCE_THRESHOLD = 5
@@ -17,6 +17,10 @@ MOUSE_MOVE_EVENT_MERGE_DIFF_DISTANCE_THRESHOLD = 1
 MOUSE_MOVE_EVENT_MERGE_MIN_IDX_DELTA = 5
 KEYBOARD_EVENTS_MERGE_GROUP_NAMED_KEYS = True
 USE_SCREENSHOT_DIFFS = False
+# how merge_events applies the reducers, with the same output: "list" (the
+# reducers below, in turn), "columnar" (columnar_events) or "streaming" (fused
+# into a single pass by streaming_events, the fastest)
+REDUCER_ENGINE = "streaming"
 
 
 def get_events(
@@ -24,9 +28,14 @@ def get_events(
     recording: models.Recording,
     process: bool = True,
     meta: dict = None,
-) -> list[models.ActionEvent]:
+    load_profile: str = "events",
+    use_cache: bool = True,
+) -> models.EventList:
     """Retrieve events for a recording.
 
+    Processed events are stored with openadapt.db.events_cache, and read from it
+    while the events and the code processing them are unchanged.
+
     Args:
         recording (models.Recording): The recording object.
         process (bool): Whether to process the events by merging and discarding certain
@@ -34,18 +43,43 @@ def get_events(
         meta (dict): Metadata dictionary to populate with information
           about the processing. Default is None.
         session (Any): The database session. Default is None.
+        load_profile (str): The relationships to load with the events, one of
+          crud.LOAD_PROFILES. Default is "events".
+        use_cache (bool): Whether to read and store processed events with
+          events_cache. Default is True.
 
     Returns:
-        list: A list of action events.
+        models.EventList: A list of action events, with an index of their positions
+            (see models.EventIndex).
     """
     posthog = utils.get_posthog_instance()
     posthog.capture(
         event="get_events.started", properties={"recording_id": recording.id}
     )
     start_time = time.time()
-    action_events = crud.get_action_events(db, recording)
-    window_events = crud.get_window_events(db, recording)
-    browser_events = crud.get_browser_events(db, recording)
+    action_events = crud.get_action_events(db, recording, load_profile=load_profile)
+
+    # copies of recordings are processed when they are created
+    cache_key = None
+    if process and use_cache and not recording.original_recording_id:
+        cache_key = events_cache.get_cache_key(recording, action_events)
+        cached_action_events = events_cache.get_events(
+            db, recording, action_events, cache_key, meta, load_profile
+        )
+        if cached_action_events is not None:
+            duration = time.time() - start_time
+            logger.info(f"cached {duration=}")
+            posthog.capture(
+                event="get_events.completed",
+                properties={"recording_id": recording.id, "cached": True},
+            )
+            return models.EventList(cached_action_events)
+        if meta is None:
+            # stored with the events
+            meta = {}
+
+    window_events = crud.get_window_events(db, recording, load_profile=load_profile)
+    browser_events = crud.get_browser_events(db, recording, load_profile=load_profile)
     screenshots = crud.get_screenshots(db, recording)
 
     browser_stats = browser.assign_browser_events(db, action_events, browser_events)
@@ -57,7 +91,9 @@ def get_events(
         posthog.capture(
             event="get_events.completed", properties={"recording_id": recording.id}
         )
-        return [event for event in action_events if event.parent_id is None]
+        return models.EventList(
+            event for event in action_events if event.parent_id is None
+        )
 
     raw_action_event_dicts = utils.rows2dicts(action_events)
     logger.debug(f"raw_action_event_dicts=\n{pformat(raw_action_event_dicts)}")
@@ -138,6 +174,9 @@ def get_events(
             assert duration > 0, duration
         meta["duration"] = format_num(duration, duration_raw)
 
+    if cache_key:
+        events_cache.store_events(db, recording, action_events, cache_key, meta)
+
     end_time = time.time()
     duration = end_time - start_time
     logger.info(f"{duration=}")
@@ -145,7 +184,8 @@ def get_events(
         event="get_events.completed", properties={"recording_id": recording.id}
     )
 
-    return action_events  # , window_events, screenshots, browser_events
+    # , window_events, screenshots, browser_events
+    return models.EventList(action_events)
 
 
 def make_parent_event(
@@ -189,6 +229,39 @@ def make_parent_event(
     return action_event
 
 
+def get_diff_distances(action_events: list[models.ActionEvent]) -> np.ndarray:
+    """Get the distances from the cursor to the diff of the screenshot of events.
+
+    The positions of the events of each screenshot are looked up at once in its
+    diff distance field (see models.Screenshot.get_diff_distances), which is
+    computed once per screenshot.
+
+    Args:
+        action_events (list[models.ActionEvent]): The mouse events.
+
+    Returns:
+        np.ndarray: The distance of each event, in screenshot pixels.
+    """
+    distances = np.full(len(action_events), np.inf)
+    if not action_events:
+        return distances
+    width_ratio, height_ratio = utils.get_scale_ratios(action_events[0])
+    idxs_by_screenshot = {}
+    for idx, action_event in enumerate(action_events):
+        idxs_by_screenshot.setdefault(action_event.screenshot, []).append(idx)
+    for screenshot, idxs in idxs_by_screenshot.items():
+        positions = [
+            (
+                action_events[idx].mouse_x * width_ratio,
+                action_events[idx].mouse_y * height_ratio,
+            )
+            for idx in idxs
+        ]
+        distances[idxs] = screenshot.get_diff_distances(np.array(positions))
+    logger.debug(f"{distances=}")
+    return distances
+
+
 def merge_consecutive_mouse_move_events(
     events: list[models.ActionEvent],
     by_diff_distance: bool = USE_SCREENSHOT_DIFFS,
@@ -198,14 +271,13 @@ def merge_consecutive_mouse_move_events(
     Args:
         events (list): The list of events to process.
         by_diff_distance (bool): Whether to compute the distance from the mouse to
-          the screenshot diff. This is computationally expensive but keeps more useful
-          events. Default is False.
+          the screenshot diff (see get_diff_distances). This requires the diff of
+          each screenshot but keeps more useful events. Default is False.
 
     Returns:
         list: The merged list of events.
 
     """
-    _all_slowdowns = []
 
     def is_target_event(event: models.ActionEvent, state: dict[str, Any]) -> bool:
         return event.name == "move"
@@ -226,53 +298,8 @@ def merge_consecutive_mouse_move_events(
         # (inclusive, exclusive)
         group_idx_tups = [(0, N)]
         if by_diff_distance:
-            width_ratio, height_ratio = utils.get_scale_ratios(to_merge[0])
-            close_idxs = []
-            # TODO: improve performance, e.g. vectorization, resizing
-            _all_dts = []
-            for idx, event in enumerate(to_merge):
-                cursor_position = (
-                    event.mouse_y * height_ratio,
-                    event.mouse_x * width_ratio,
-                )
-                diff_mask = event.screenshot.diff_mask
-
-                _ts = [time.perf_counter()]
-                # ~99x slowdown
-                if np.any(diff_mask):
-                    _ts.append(time.perf_counter())
-
-                    # TODO: compare with
-                    # https://logicatcore.github.io/2020-08-13-sparse-image-coordinates/
-
-                    # ~247x slowdown
-                    diff_positions = np.argwhere(diff_mask)
-                    _ts.append(time.perf_counter())
-
-                    # ~6x slowdown
-                    distances = distance.cdist(
-                        [cursor_position],
-                        diff_positions,
-                    )
-                    _ts.append(time.perf_counter())
-
-                    # ~1x slowdown
-                    min_distance = distances.min()
-                    _ts.append(time.perf_counter())
-                    _dts = np.diff(_ts)
-                    _all_dts.append(_dts)
-
-                    logger.info(f"{min_distance=}")
-                    if min_distance <= distance_threshold:
-                        close_idxs.append(idx)
-
-            if _all_dts:
-                _all_dts = np.array(_all_dts)
-                _slowdowns = _all_dts.mean(axis=0) / _all_dts.mean(axis=0).min()
-                _all_slowdowns.append(_slowdowns)
-                _mean_slowdowns = np.mean(_all_slowdowns, axis=0)
-                logger.info(f"{_mean_slowdowns=}")
-
+            diff_distances = get_diff_distances(to_merge)
+            close_idxs = np.flatnonzero(diff_distances <= distance_threshold).tolist()
             if close_idxs:
                 idx_deltas = np.diff(close_idxs)
                 min_idx_delta_idxs = (
@@ -829,6 +856,30 @@ def discard_unused_events(
     return referred_events
 
 
+def is_valid_window_event(
+    window_event: models.WindowEvent | None,
+    min_width: int = 100,
+    min_height: int = 100,
+) -> bool:
+    """Whether a window event is valid, i.e. of a large enough window.
+
+    Args:
+        window_event (models.WindowEvent | None): The window event.
+        min_width (int): Minimum allowable width for a valid window event.
+            Default is 100.
+        min_height (int): Minimum allowable height for a valid window event.
+            Default is 100.
+
+    Returns:
+        bool: Whether the window event is valid.
+    """
+    return bool(
+        window_event
+        and window_event.width >= min_width
+        and window_event.height >= min_height
+    )
+
+
 def filter_invalid_window_events(
     db: crud.SaSession,
     action_events: list[models.ActionEvent],
@@ -851,15 +902,11 @@ def filter_invalid_window_events(
     Returns:
         list[models.WindowEvent]: A list of valid window events.
     """
-
-    def is_valid_window_event(event: models.WindowEvent) -> bool:
-        return event and event.width >= min_width and event.height >= min_height
-
     prev_valid_window = None
     valid_window_events = []
 
     for action in action_events:
-        if is_valid_window_event(action.window_event):
+        if is_valid_window_event(action.window_event, min_width, min_height):
             prev_valid_window = action.window_event
             valid_window_events.append(action.window_event)
         else:
@@ -875,6 +922,20 @@ def filter_invalid_window_events(
     return valid_window_events
 
 
+# the reducers applied by merge_events, in order
+PROCESS_FNS = [
+    remove_invalid_keyboard_events,
+    remove_redundant_mouse_move_events,
+    merge_consecutive_keyboard_events,
+    merge_consecutive_mouse_move_events,
+    merge_consecutive_mouse_scroll_events,
+    merge_consecutive_mouse_click_events,
+    # this causes clicks to fail to be registered in NaiveReplayStrategy
+    # TODO: remove
+    # remove_move_before_click,
+]
+
+
 def merge_events(
     db: crud.SaSession,
     action_events: list[models.ActionEvent],
@@ -910,17 +971,19 @@ def merge_events(
         f" {num_screenshots=} {num_browser_events=} "
         f"{num_total=}"
     )
-    process_fns = [
-        remove_invalid_keyboard_events,
-        remove_redundant_mouse_move_events,
-        merge_consecutive_keyboard_events,
-        merge_consecutive_mouse_move_events,
-        merge_consecutive_mouse_scroll_events,
-        merge_consecutive_mouse_click_events,
-        # this causes clicks to fail to be registered in NaiveReplayStrategy
-        # TODO: remove
-        # remove_move_before_click,
-    ]
+    process_fns = PROCESS_FNS
+    if REDUCER_ENGINE != "list":
+        # avoid circular import
+        from openadapt import columnar_events, streaming_events
+
+        engine = {
+            "columnar": columnar_events,
+            "streaming": streaming_events,
+        }[REDUCER_ENGINE]
+        if engine.is_supported(process_fns):
+            # referred events are discarded once, after all reducers, which keeps the
+            # same ones since merging action events only removes referred timestamps
+            process_fns = [partial(engine.reduce_events, process_fns=process_fns)]
     for process_fn in process_fns:
         action_events = process_fn(action_events)
         # TODO: keep events in which window_event_timestamp is updated
@@ -0,0 +1,351 @@
+"""Reduces the action events of a recording while it is being recorded.
+
+events.get_events reduces the action events of a finished recording. LiveEvents
+instead reads the events written since its last update, and reduces the events
+that are not final yet (the "tail") with the columnar reducers (see
+openadapt.columnar_events). Reduced events are final once they start at least
+LIVE_EVENTS_DELAY_SECONDS before the latest event, and reducing the tail from the
+following event on gives the same events: they are then returned, and removed
+from the tail. The tail only holds the events that may still be merged (e.g. a
+pending double click or keyboard sequence), so the cost of an update does not
+grow with the length of the recording.
+
+Final events are the events get_events returns, except that browser events are
+not assigned to them.
+
+Usage:
+
+    live_events = LiveEvents(recording)
+    while is_recording:
+        action_events = live_events.update(session)
+        ...
+    action_events = live_events.finish()
+
+Module: live_events.py
+"""
+
+from typing import Callable
+
+from openadapt import columnar_events, events
+from openadapt.db import crud
+from openadapt.models import ActionEvent, Recording, Screenshot, WindowEvent
+
+# minimum age of final events, relative to the latest event
+LIVE_EVENTS_DELAY_SECONDS = 2
+# maximum number of tail splits checked per update
+MAX_SPLIT_ATTEMPTS = 3
+# number of digits of the timestamps compared when checking a split
+NUM_TIMESTAMP_DIGITS = 6
+
+
+class LiveEvents:
+    """The reduced action events of a recording being recorded.
+
+    Attributes:
+        recording (Recording): The recording.
+        process_fns (list[Callable]): The reducers, from events.py.
+        delay_seconds (float): The minimum age of final events.
+        action_events (list[ActionEvent]): The final top-level events.
+        pending_action_events (list[ActionEvent]): The top-level events reduced
+            from the tail, which may still change.
+        tail (list[ActionEvent]): The action events not in final events.
+        tail_timestamps (list[float]): The timestamps of the action events of the
+            tail as loaded, before reducing them changes them.
+        dt_offsets (dict[str, float]): The dt of each reducer before the tail (see
+            columnar_events.EventTable.get_dt_offsets).
+        window_events (dict[float, WindowEvent]): The window events, by timestamp.
+        screenshots (dict[float, Screenshot]): The screenshots, by timestamp.
+        prev_valid_window_event (WindowEvent | None): The window event of the last
+            final event with a valid window event.
+        last_ids (dict[type, int]): The id of the last row read from each table.
+        last_timestamps (dict[type, float]): The timestamp of the last row read
+            from each table.
+    """
+
+    def __init__(
+        self,
+        recording: Recording,
+        process_fns: list[Callable] | None = None,
+        delay_seconds: float = LIVE_EVENTS_DELAY_SECONDS,
+    ) -> None:
+        """Initialize the live events of a recording.
+
+        Args:
+            recording (Recording): The recording.
+            process_fns (list[Callable] | None): The reducers, from events.py.
+                Defaults to events.PROCESS_FNS.
+            delay_seconds (float): The minimum age of final events.
+        """
+        if process_fns is None:
+            process_fns = events.PROCESS_FNS
+        assert columnar_events.is_supported(process_fns), process_fns
+        self.recording = recording
+        self.process_fns = process_fns
+        self.delay_seconds = delay_seconds
+        self.action_events = []
+        self.pending_action_events = []
+        self.tail = []
+        self.tail_timestamps = []
+        self.dt_offsets = {}
+        self.window_events = {}
+        self.screenshots = {}
+        self.prev_valid_window_event = None
+        self.last_ids = {}
+        self.last_timestamps = {}
+
+    def get_new_rows(
+        self,
+        session: crud.SaSession,
+        model: type,
+        get_rows: Callable,
+    ) -> list:
+        """Get the rows of a table written since they were last read.
+
+        Args:
+            session (sa.orm.Session): The database session.
+            model (type): The model of the table.
+            get_rows (Callable): Gets the rows of the recording from a start time,
+                e.g. crud.get_action_events.
+
+        Returns:
+            list: The new rows, ordered by timestamp.
+        """
+        rows = get_rows(
+            session, self.recording, start_time=self.last_timestamps.get(model)
+        )
+        last_id = self.last_ids.get(model, 0)
+        rows = [row for row in rows if row.id > last_id]
+        if rows:
+            self.last_ids[model] = max(row.id for row in rows)
+            self.last_timestamps[model] = rows[-1].timestamp
+        return rows
+
+    def update(self, session: crud.SaSession) -> list[ActionEvent]:
+        """Read the events written since the last update, and reduce the tail.
+
+        The session should be read only (see crud.get_new_session), since reducing
+        events changes them.
+
+        Args:
+            session (sa.orm.Session): The database session.
+
+        Returns:
+            list[ActionEvent]: The new final top-level events.
+        """
+        window_events = self.get_new_rows(session, WindowEvent, crud.get_window_events)
+        screenshots = self.get_new_rows(session, Screenshot, crud.get_screenshots)
+        action_events = self.get_new_rows(session, ActionEvent, crud.get_action_events)
+        return self.add(
+            action_events,
+            window_events,
+            screenshots,
+            max(self.last_timestamps.values(), default=None),
+        )
+
+    def add(
+        self,
+        action_events: list[ActionEvent],
+        window_events: list[WindowEvent] = (),
+        screenshots: list[Screenshot] = (),
+        latest_timestamp: float | None = None,
+    ) -> list[ActionEvent]:
+        """Add new events, and reduce the tail.
+
+        Args:
+            action_events (list[ActionEvent]): The new action events, ordered by
+                timestamp.
+            window_events (list[WindowEvent]): The new window events.
+            screenshots (list[Screenshot]): The new screenshots.
+            latest_timestamp (float | None): The timestamp of the latest event of
+                any kind. Defaults to that of the last action event.
+
+        Returns:
+            list[ActionEvent]: The new final top-level events.
+        """
+        for window_event in window_events:
+            self.window_events[window_event.timestamp] = window_event
+        for screenshot in screenshots:
+            self.screenshots[screenshot.timestamp] = screenshot
+        self.tail += action_events
+        self.tail_timestamps += [event.timestamp for event in action_events]
+        if not self.tail:
+            return []
+        if latest_timestamp is None:
+            latest_timestamp = self.tail_timestamps[-1]
+        return self.reduce(latest_timestamp - self.delay_seconds)
+
+    def finish(self) -> list[ActionEvent]:
+        """Reduce the tail once the recording has stopped, making all events final.
+
+        Returns:
+            list[ActionEvent]: The new final top-level events.
+        """
+        if not self.tail:
+            return []
+        return self.reduce(None)
+
+    def get_reduced_end(self, horizon: float) -> int:
+        """Get the end of the action events of the tail that can be reduced.
+
+        A left click press not followed by its release yet may not be merged into
+        a click (see events.merge_consecutive_mouse_click_events), so it is only
+        reduced, with the following events, once it is released or final.
+
+        Args:
+            horizon (float): The time before which reduced events may be final.
+
+        Returns:
+            int: The index (exclusive) of the last action event to reduce.
+        """
+        for idx in range(len(self.tail) - 1, -1, -1):
+            event = self.tail[idx]
+            if event.name == "click" and event.mouse_button_name == "left":
+                if event.mouse_pressed and self.tail_timestamps[idx] > horizon:
+                    return idx
+                break
+        return len(self.tail)
+
+    def reduce_tail(self, start: int, end: int, dt_offsets: dict[str, float]) -> tuple:
+        """Reduce the action events of the tail within a range.
+
+        Args:
+            start (int): The index of the first action event.
+            end (int): The index (exclusive) of the last action event.
+            dt_offsets (dict[str, float]): The dt of each reducer before the first
+                action event.
+
+        Returns:
+            tuple: The reduced events (a columnar_events.EventTable) and the
+                top-level events.
+        """
+        for event, timestamp in zip(self.tail[start:], self.tail_timestamps[start:]):
+            # undo previous reductions
+            event.timestamp = timestamp
+            if event.children:
+                event.children = []
+            event.reducer_names.clear()
+        table = columnar_events.EventTable(self.tail[start:end], dt_offsets)
+        columnar_events.reduce_table(table, self.process_fns)
+        return table, table.materialize()
+
+    def reduce(self, horizon: float | None) -> list[ActionEvent]:
+        """Reduce the tail, and make the events starting before a time final.
+
+        Args:
+            horizon (float | None): The time before which reduced events may be
+                final, or None to make all of them final.
+
+        Returns:
+            list[ActionEvent]: The new final top-level events.
+        """
+        if horizon is None:
+            end = len(self.tail)
+        else:
+            end = self.get_reduced_end(horizon)
+        table, pending_action_events = self.reduce_tail(0, end, self.dt_offsets)
+        if horizon is None:
+            final_action_events = pending_action_events
+            self.tail = []
+            self.tail_timestamps = []
+            self.pending_action_events = []
+            return self.add_final_events(final_action_events)
+
+        # the index in the tail of the first action event of each top-level event
+        starts = table.first_nodes[table.rows["node"]].tolist()
+        # split before the last top-level events starting before the horizon,
+        # keeping at least one top-level event in the tail
+        splits = [
+            split
+            for split in range(len(starts) - 1, 0, -1)
+            if self.tail_timestamps[starts[split]] <= horizon
+        ][:MAX_SPLIT_ATTEMPTS]
+        node_idxs = {id(event): node for node, event in enumerate(self.tail)}
+        signatures = [
+            get_signature(event, node_idxs) for event in pending_action_events
+        ]
+        for split in splits:
+            start = starts[split]
+            dt_offsets = table.get_dt_offsets(start)
+            split_table, split_action_events = self.reduce_tail(start, end, dt_offsets)
+            if [
+                get_signature(event, node_idxs) for event in split_action_events
+            ] == signatures[split:]:
+                self.tail = self.tail[start:]
+                self.tail_timestamps = self.tail_timestamps[start:]
+                self.dt_offsets = dt_offsets
+                self.pending_action_events = split_action_events
+                return self.add_final_events(pending_action_events[:split])
+        if splits:
+            # undo the reductions of the checked splits
+            table, pending_action_events = self.reduce_tail(0, end, self.dt_offsets)
+        self.pending_action_events = pending_action_events
+        return []
+
+    def add_final_events(
+        self, final_action_events: list[ActionEvent]
+    ) -> list[ActionEvent]:
+        """Assign window events and screenshots to final events, and add them.
+
+        As in events.filter_invalid_window_events, the window event of an event
+        with an invalid window event is the previous valid window event.
+
+        Args:
+            final_action_events (list[ActionEvent]): The new final top-level events.
+
+        Returns:
+            list[ActionEvent]: The new final top-level events.
+        """
+        for event in final_action_events:
+            self.assign_related_events(event)
+            if events.is_valid_window_event(event.window_event):
+                self.prev_valid_window_event = event.window_event
+            elif self.prev_valid_window_event:
+                event.window_event_id = self.prev_valid_window_event.id
+                event.window_event_timestamp = self.prev_valid_window_event.timestamp
+                event.window_event = self.prev_valid_window_event
+        self.action_events += final_action_events
+        return final_action_events
+
+    def assign_related_events(self, event: ActionEvent) -> None:
+        """Assign window events and screenshots to an event and its descendants.
+
+        The window event and screenshot of an action event are only assigned by id
+        once the recording is post-processed (see crud.post_process_events).
+
+        Args:
+            event (ActionEvent): The event.
+        """
+        if event.window_event is None:
+            event.window_event = self.window_events.get(event.window_event_timestamp)
+        if event.screenshot is None:
+            event.screenshot = self.screenshots.get(event.screenshot_timestamp)
+        for child in event.children:
+            self.assign_related_events(child)
+
+
+def get_signature(event: ActionEvent, node_idxs: dict[int, int]) -> tuple:
+    """Get the attributes of a reduced event and its descendants, for comparison.
+
+    Args:
+        event (ActionEvent): The event.
+        node_idxs (dict[int, int]): The index in the tail of each action event, by
+            object id; parent events are not in the tail.
+
+    Returns:
+        tuple: The attributes of the event, ending with those of its children.
+    """
+    return (
+        node_idxs.get(id(event)),
+        event.name,
+        round(event.timestamp, NUM_TIMESTAMP_DIGITS),
+        event.mouse_x,
+        event.mouse_y,
+        event.mouse_dx,
+        event.mouse_dy,
+        event.mouse_button_name,
+        event.key_name,
+        event.key_char,
+        event.key_vk,
+        sorted(event.reducer_names),
+        [get_signature(child, node_idxs) for child in event.children],
+    )
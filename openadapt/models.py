@@ -3,22 +3,24 @@
 from collections import OrderedDict
 from copy import deepcopy
 from itertools import zip_longest
-from typing import Any, Type, Union
+from typing import Any, Callable, Type, Union
+import bisect
 import copy
-import io
+import functools
 import sys
 import textwrap
 
 from bs4 import BeautifulSoup
-from pynput import keyboard
 from PIL import Image, ImageChops
+from pynput import keyboard
+from scipy import ndimage
 import numpy as np
 import sqlalchemy as sa
 
 from openadapt.config import config
 from openadapt.custom_logger import logger
+from openadapt.db import compression, db, image_codec, image_hash, tiles
 from openadapt.drivers import anthropic
-from openadapt.db import db
 from openadapt.privacy.base import ScrubbingProvider, TextScrubbingMixin
 from openadapt.privacy.providers import ScrubProvider
 
@@ -43,6 +45,271 @@ class ForceFloat(sa.TypeDecorator):
         return value
 
 
+class CompressedJSON(sa.TypeDecorator):
+    """Custom SQLAlchemy type decorator for compressed JSON values.
+
+    Values are stored as compressed bytes (see openadapt.db.compression). Values
+    stored as plain JSON are still read.
+    """
+
+    impl = sa.LargeBinary
+    cache_ok = True
+
+    def __init__(self, dictionary_name: str | None = None) -> None:
+        """Initialize the type.
+
+        Args:
+            dictionary_name (str | None): The name of the zstd dictionary to use
+                for compression, if one has been trained.
+        """
+        super().__init__()
+        self.dictionary_name = dictionary_name
+
+    def process_bind_param(self, value: Any, dialect: str) -> bytes | None:
+        """Compress the value."""
+        if value is not None:
+            value = compression.compress_json(value, self.dictionary_name)
+        return value
+
+    def process_result_value(self, value: bytes | str | None, dialect: str) -> Any:
+        """Decompress the value."""
+        if value is not None:
+            value = compression.decompress_json(value)
+        return value
+
+
+class EventIndex:
+    """The positions of events in a list, and in the children of its events.
+
+    Positions are keyed by the identity of the events, since the parent events
+    created by processing have no ids. Each lookup checks that the position of the
+    event (and of its parents) is current, and rebuilds the index otherwise, so the
+    index stays valid when the list or the children of its events are changed or
+    rebuilt, e.g. by the reducers of openadapt.events. Looking up an event which is
+    not indexed (e.g. a raw event dropped by a reducer) rebuilds the index only if
+    the events may have changed since it was built, i.e. the indexed events, if they
+    are an EventList (see EventList.version), or the children of any action event
+    (see children_version). Other lists (e.g. the raw action events of a recording)
+    are rebuilt on each lookup of an event which is not indexed.
+    """
+
+    # incremented whenever the children of an action event are changed (see
+    # on_children_changed)
+    children_version = 0
+
+    def __init__(self, events: list, include_children: bool = True) -> None:
+        """Initialize the index, which is built on first lookup.
+
+        Args:
+            events (list): The events, e.g. processed action events.
+            include_children (bool): Whether to index the children of the events,
+                recursively. Children which are not loaded are not indexed.
+        """
+        self.events = events
+        self.include_children = include_children
+        # id of event -> (parent event, or None for self.events, index)
+        self._positions: dict[int, tuple[Any, int]] = {}
+        # the version of the events when the index was built (see _get_version)
+        self._version: tuple | None = None
+
+    def _get_siblings(self, parent: Any) -> list:
+        """Get the list of events of a parent.
+
+        Args:
+            parent (Any): The parent event, or None for the indexed events.
+
+        Returns:
+            list: The events.
+        """
+        return self.events if parent is None else parent.children
+
+    def _get_version(self) -> tuple | None:
+        """Get a version of the events, which changes when events may be added.
+
+        Returns:
+            tuple | None: The version, or None if changes to the events can not be
+                detected.
+        """
+        if not isinstance(self.events, EventList):
+            return None
+        return EventIndex.children_version, self.events.version
+
+    def _build(self) -> None:
+        """Index the events, breadth first, so top-level positions take precedence.
+
+        The raw action events of copies of recordings contain their children.
+        """
+        self._version = self._get_version()
+        positions = {}
+        parents = [None]
+        while parents:
+            next_parents = []
+            for parent in parents:
+                for idx, event in enumerate(self._get_siblings(parent)):
+                    if id(event) in positions:
+                        continue
+                    positions[id(event)] = (parent, idx)
+                    # avoid lazy loading the children of each event
+                    if self.include_children and event.__dict__.get("children"):
+                        next_parents.append(event)
+            parents = next_parents
+        self._positions = positions
+
+    def _is_current(self, event: Any) -> bool:
+        """Check whether the indexed position of an event is current.
+
+        Args:
+            event (Any): The event.
+
+        Returns:
+            bool: Whether the event is at its position, in its (current) parents.
+        """
+        position = self._positions.get(id(event))
+        if position is None:
+            return False
+        parent, idx = position
+        siblings = self._get_siblings(parent)
+        if idx >= len(siblings) or siblings[idx] is not event:
+            return False
+        return parent is None or self._is_current(parent)
+
+    def get_position(self, event: Any) -> tuple[list, int] | None:
+        """Get the position of an event.
+
+        Args:
+            event (Any): The event.
+
+        Returns:
+            tuple[list, int] | None: The list containing the event (the indexed
+                events, or the children of their events) and the index of the event
+                in it, or None if the event is not indexed.
+        """
+        if not self._is_current(event):
+            version = self._get_version()
+            if (
+                id(event) not in self._positions
+                and version is not None
+                and self._version == version
+            ):
+                # not indexed when nothing had changed
+                return None
+            self._build()
+            if id(event) not in self._positions:
+                return None
+        parent, idx = self._positions[id(event)]
+        return self._get_siblings(parent), idx
+
+    def get_neighborhood(
+        self, event: Any, num_before: int = 1, num_after: int = 1
+    ) -> list:
+        """Get the events around an event, in the list containing it.
+
+        Args:
+            event (Any): The event.
+            num_before (int): The maximum number of events before the event.
+            num_after (int): The maximum number of events after the event.
+
+        Returns:
+            list: The events, including the event, or an empty list if the event is
+                not indexed.
+        """
+        position = self.get_position(event)
+        if position is None:
+            return []
+        siblings, idx = position
+        return siblings[max(idx - num_before, 0) : idx + num_after + 1]
+
+    def get_prev(self, event: Any) -> Any:
+        """Get the event before an event, in the list containing it.
+
+        Args:
+            event (Any): The event.
+
+        Returns:
+            Any: The previous event, or None if there is none.
+        """
+        position = self.get_position(event)
+        if position is None or position[1] == 0:
+            return None
+        siblings, idx = position
+        return siblings[idx - 1]
+
+    def get_next(self, event: Any) -> Any:
+        """Get the event after an event, in the list containing it.
+
+        Args:
+            event (Any): The event.
+
+        Returns:
+            Any: The next event, or None if there is none.
+        """
+        position = self.get_position(event)
+        if position is None:
+            return None
+        siblings, idx = position
+        return siblings[idx + 1] if idx + 1 < len(siblings) else None
+
+
+class EventList(list):
+    """A list of events with an EventIndex, e.g. processed action events.
+
+    Usage:
+
+        action_events = events.get_events(session, recording)
+        next_event = action_events.event_index.get_next(action_event)
+    """
+
+    @property
+    def event_index(self) -> EventIndex:
+        """Get the index of the events and their children."""
+        if "_event_index" not in self.__dict__:
+            self._event_index = EventIndex(self)
+        return self._event_index
+
+    # incremented whenever the events are changed (see EventIndex._get_version)
+    version = 0
+
+    def __reduce_ex__(self, protocol: int) -> tuple:
+        """Pickle the events without the index, which is keyed by identity."""
+        return type(self), (list(self),)
+
+
+def _count_changes(name: str) -> Callable:
+    """Wrap a method of list which changes the list to count the changes.
+
+    Args:
+        name (str): The name of the method.
+
+    Returns:
+        Callable: The method of EventList.
+    """
+    method = getattr(list, name)
+
+    @functools.wraps(method)
+    def wrapper(self: EventList, *args: Any, **kwargs: Any) -> Any:
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(EventList, _name, _count_changes(_name))
+
+
 class Recording(db.Base):
     """Class representing a recording in the database."""
 
@@ -59,6 +326,10 @@ class Recording(db.Base):
     task_description = sa.Column(sa.String)
     video_start_time = sa.Column(ForceFloat)
     config = sa.Column(sa.JSON)
+    # path of the archive file holding the rows of an archived recording
+    archive_path = sa.Column(sa.String)
+    # manifest of the video files of the recording (see get_video_segment)
+    video_segments = sa.Column(sa.JSON)
 
     original_recording_id = sa.Column(sa.ForeignKey("recording.id"))
     original_recording = sa.orm.relationship(
@@ -100,23 +371,108 @@ class Recording(db.Base):
     audio_info = sa.orm.relationship(
         "AudioInfo", back_populates="recording", cascade="all, delete-orphan"
     )
+    summary = sa.orm.relationship(
+        "RecordingSummary",
+        back_populates="recording",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+    processed_events = sa.orm.relationship(
+        "ProcessedEvents",
+        back_populates="recording",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
 
     _processed_action_events = None
+    _action_event_index = None
 
     @property
-    def processed_action_events(self) -> list:
+    def processed_action_events(self) -> "EventList":
         """Get the processed action events for the recording."""
         from openadapt import events
         from openadapt.db import crud
 
         if not self._processed_action_events:
             session = crud.get_new_session(read_only=True)
-            self._processed_action_events = events.get_events(session, self)
+            self._processed_action_events = events.get_events(
+                session, self, load_profile="replay"
+            )
             # Preload screenshots to avoid lazy loading later
             for event in self._processed_action_events:
                 event.screenshot
         return self._processed_action_events
 
+    def get_action_event_index(self, event: "ActionEvent") -> EventIndex:
+        """Get the index of the events neighboring an action event.
+
+        Args:
+            event (ActionEvent): The action event.
+
+        Returns:
+            EventIndex: The index of the processed action events, if they are loaded
+                and contain the event (or its parents), otherwise the index of the
+                raw action events.
+        """
+        if self._processed_action_events:
+            event_index = self._processed_action_events.event_index
+            if event_index.get_position(event) is not None:
+                return event_index
+        if (
+            self._action_event_index is None
+            or self._action_event_index.events is not self.action_events
+        ):
+            # the children of raw action events are raw action events
+            self._action_event_index = EventIndex(
+                self.action_events, include_children=False
+            )
+        return self._action_event_index
+
+    @property
+    def video_segment_start_times(self) -> list[float]:
+        """Get the timestamps at which the video files of the recording start.
+
+        Long recordings are split into video segments of config.VIDEO_SEGMENT_DURATION
+        seconds, each with its own video file (see video.get_video_file_path).
+        Segment i covers the events from its start time until the start time of
+        segment i + 1. Recordings without video_segments have a single segment.
+        """
+        if self.video_segments:
+            return [segment["start_time"] for segment in self.video_segments]
+        return [self.video_start_time]
+
+    def get_video_segment(self, timestamp: float) -> tuple[int, float]:
+        """Get the video segment containing a timestamp.
+
+        Args:
+            timestamp (float): The timestamp, e.g. of a screenshot.
+
+        Returns:
+            tuple[int, float]: The index of the segment and the timestamp at which
+                its video file starts.
+        """
+        start_times = self.video_segment_start_times
+        segment_idx = max(bisect.bisect_right(start_times, timestamp) - 1, 0)
+        return segment_idx, start_times[segment_idx]
+
+    def get_video_segment_time_range(
+        self, segment_idx: int
+    ) -> tuple[float, float | None]:
+        """Get the time range covered by a video segment.
+
+        Args:
+            segment_idx (int): The index of the segment.
+
+        Returns:
+            tuple[float, float | None]: The start time and the end time (exclusive),
+                or None for the last segment.
+        """
+        start_times = self.video_segment_start_times
+        end_time = (
+            start_times[segment_idx + 1] if segment_idx + 1 < len(start_times) else None
+        )
+        return start_times[segment_idx], end_time
+
     def scrub(self, scrubber: ScrubbingProvider) -> None:
         """Scrub the recording.
 
@@ -130,6 +486,10 @@ class ActionEvent(db.Base):
     """Class representing an action event in the database."""
 
     __tablename__ = "action_event"
+    # for reading the rows of a time range (e.g. a video segment) of a recording
+    __table_args__ = (
+        sa.Index("ix_action_event_recording_id_timestamp", "recording_id", "timestamp"),
+    )
     _repr_ignore_attrs = ["reducer_names"]
 
     _segment_description_separator = ";"
@@ -163,7 +523,7 @@ class ActionEvent(db.Base):
     canonical_key_char = sa.Column(sa.String)
     canonical_key_vk = sa.Column(sa.String)
     parent_id = sa.Column(sa.Integer, sa.ForeignKey("action_event.id"))
-    element_state = sa.Column(sa.JSON)
+    element_state = sa.Column(CompressedJSON("action_event.element_state"))
     disabled = sa.Column(sa.Boolean, default=False)
 
     scrubbed_text = sa.Column(sa.String)
@@ -539,21 +899,51 @@ class ActionEvent(db.Base):
         """
         return action_dict
 
+    @property
+    def prev_event(self) -> Union["ActionEvent", None]:
+        """Get the previous ActionEvent chronologically in the same recording.
+
+        Events are looked up in the processed action events of the recording if they
+        are loaded and contain this event, among its siblings if it is a child,
+        otherwise in the raw action events (see Recording.get_action_event_index).
+
+        Returns:
+            ActionEvent | None: The previous ActionEvent, or None if this is the first
+                event.
+        """
+        if not self.recording:
+            return None
+        return self.recording.get_action_event_index(self).get_prev(self)
+
     @property
     def next_event(self) -> Union["ActionEvent", None]:
         """Get the next ActionEvent chronologically in the same recording.
 
+        Events are looked up as in prev_event.
+
         Returns:
             ActionEvent | None: The next ActionEvent, or None if this is the last event.
         """
-        if not self.recording or not self.recording.action_events:
+        if not self.recording:
             return None
+        return self.recording.get_action_event_index(self).get_next(self)
+
+    def get_neighborhood(
+        self, num_before: int = 1, num_after: int = 1
+    ) -> list["ActionEvent"]:
+        """Get the ActionEvents around this event, looked up as in prev_event.
 
-        current_index = self.recording.action_events.index(self)
-        if current_index < len(self.recording.action_events) - 1:
-            return self.recording.action_events[current_index + 1]
+        Args:
+            num_before (int): The maximum number of events before this event.
+            num_after (int): The maximum number of events after this event.
 
-        return None
+        Returns:
+            list[ActionEvent]: The events, including this event.
+        """
+        if not self.recording:
+            return [self]
+        event_index = self.recording.get_action_event_index(self)
+        return event_index.get_neighborhood(self, num_before, num_after) or [self]
 
     def prompt_for_description(self, return_image: bool = False) -> str:
         """Use the Anthropic API to describe what is happening in the action event.
@@ -626,16 +1016,28 @@ class ActionEvent(db.Base):
             return description
 
 
+@sa.event.listens_for(ActionEvent.children, "append")
+@sa.event.listens_for(ActionEvent.children, "remove")
+@sa.event.listens_for(ActionEvent.children, "bulk_replace")
+def on_children_changed(target: ActionEvent, value: Any, initiator: Any) -> None:
+    """Count the changes of the children of action events (see EventIndex)."""
+    EventIndex.children_version += 1
+
+
 class WindowEvent(db.Base):
     """Class representing a window event in the database."""
 
     __tablename__ = "window_event"
+    # for reading the rows of a time range (e.g. a video segment) of a recording
+    __table_args__ = (
+        sa.Index("ix_window_event_recording_id_timestamp", "recording_id", "timestamp"),
+    )
 
     id = sa.Column(sa.Integer, primary_key=True)
     recording_timestamp = sa.Column(ForceFloat)
     recording_id = sa.Column(sa.ForeignKey("recording.id"))
     timestamp = sa.Column(ForceFloat)
-    state = sa.Column(sa.JSON)
+    state_hash = sa.Column(sa.String)
     title = sa.Column(sa.String)
     left = sa.Column(sa.Integer)
     top = sa.Column(sa.Integer)
@@ -645,6 +1047,37 @@ class WindowEvent(db.Base):
 
     recording = sa.orm.relationship("Recording", back_populates="window_events")
     action_events = sa.orm.relationship("ActionEvent", back_populates="window_event")
+    window_state = sa.orm.relationship(
+        "WindowState",
+        primaryjoin="foreign(WindowEvent.state_hash) == WindowState.hash",
+        viewonly=True,
+    )
+
+    # include the state property (and not its hash) in asdict
+    dictalchemy_include = ["state"]
+    dictalchemy_exclude = ["state_hash"]
+
+    @property
+    def state(self) -> dict | None:
+        """Get the state of the window.
+
+        The state is loaded from the WindowState referenced by state_hash on first
+        access. Window events with identical states share the same WindowState, so
+        each distinct state is only deserialized once per session.
+        """
+        if "_state" not in self.__dict__:
+            window_state = self.window_state
+            self._state = window_state.state if window_state else None
+        return self._state
+
+    @state.setter
+    def state(self, state: dict | None) -> None:
+        """Set the state of the window.
+
+        The WindowState is inserted when the window event is flushed.
+        """
+        self._state = state
+        self.state_hash = None if state is None else compression.hash_json(state)
 
     @classmethod
     def get_active_window_event(
@@ -752,15 +1185,69 @@ class WindowEvent(db.Base):
         return window_dict
 
 
+class WindowState(db.Base):
+    """Class representing a distinct window state in the database.
+
+    Window states are content-addressed: window events reference their state by
+    its hash, so a state shared by many window events (e.g. consecutive events of
+    the same window) is stored once. Inserting an existing state is ignored.
+    """
+
+    __tablename__ = "window_state"
+    __table_args__ = (sa.PrimaryKeyConstraint("hash", sqlite_on_conflict="IGNORE"),)
+
+    hash = sa.Column(sa.String)
+    state = sa.Column(CompressedJSON("window_event.state"))
+
+
+class CompressionDictionary(db.Base):
+    """Class representing a zstd dictionary of a CompressedJSON column.
+
+    Values compressed with a dictionary are read with the dictionary whose dict_id
+    is stored in their zstd frame (see openadapt.db.compression).
+    """
+
+    __tablename__ = "compression_dictionary"
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    # the dictionary_name of the column, e.g. "window_event.state"
+    name = sa.Column(sa.String)
+    dict_id = sa.Column(sa.Integer, unique=True)
+    timestamp = sa.Column(ForceFloat)
+    data = sa.Column(sa.LargeBinary)
+
+
+@sa.event.listens_for(WindowEvent, "before_insert")
+@sa.event.listens_for(WindowEvent, "before_update")
+def insert_window_state(
+    mapper: sa.orm.Mapper,
+    connection: sa.engine.Connection,
+    window_event: WindowEvent,
+) -> None:
+    """Insert the state of a window event whose state was set in Python."""
+    state = window_event.__dict__.get("_state")
+    if state is not None:
+        connection.execute(
+            sa.insert(WindowState),
+            {"hash": window_event.state_hash, "state": state},
+        )
+
+
 class BrowserEvent(db.Base):
     """Class representing a browser event in the database."""
 
     __tablename__ = "browser_event"
+    # for reading the rows of a time range (e.g. a video segment) of a recording
+    __table_args__ = (
+        sa.Index(
+            "ix_browser_event_recording_id_timestamp", "recording_id", "timestamp"
+        ),
+    )
 
     id = sa.Column(sa.Integer, primary_key=True)
     recording_timestamp = sa.Column(ForceFloat)
     recording_id = sa.Column(sa.ForeignKey("recording.id"))
-    message = sa.Column(sa.JSON)
+    message = sa.Column(CompressedJSON("browser_event.message"))
     timestamp = sa.Column(ForceFloat)
 
     recording = sa.orm.relationship("Recording", back_populates="browser_events")
@@ -925,6 +1412,13 @@ class Screenshot(db.Base):
     """Class representing a screenshot in the database."""
 
     __tablename__ = "screenshot"
+    # for reading the rows of a time range (e.g. a video segment) of a recording
+    __table_args__ = (
+        sa.Index("ix_screenshot_recording_id_timestamp", "recording_id", "timestamp"),
+    )
+    # distance in pixels from the diff up to which the diff distance field is
+    # computed, beyond which distances are infinite (see get_diff_distances)
+    MAX_DIFF_DISTANCE = 255
 
     id = sa.Column(sa.Integer, primary_key=True)
     recording_timestamp = sa.Column(ForceFloat)
@@ -933,6 +1427,16 @@ class Screenshot(db.Base):
     png_data = sa.Column(sa.LargeBinary)
     png_diff_data = sa.Column(sa.LargeBinary, nullable=True)
     png_diff_mask_data = sa.Column(sa.LargeBinary, nullable=True)
+    # codec of the image data columns (see openadapt.db.image_codec); NULL for PNG
+    image_codec = sa.Column(sa.String)
+    # hashes of the tiles of the image, if stored as tiles (see openadapt.db.tiles)
+    tile_grid = sa.Column(sa.LargeBinary)
+    # summary of the image, for reading its size or comparing it without decoding
+    # it (see openadapt.db.image_hash)
+    width = sa.Column(sa.Integer)
+    height = sa.Column(sa.Integer)
+    image_hash = sa.Column(sa.BigInteger)
+    thumbnail_data = sa.Column(sa.LargeBinary)
     # cropped_png_data = sa.Column(sa.LargeBinary, nullable=True)
 
     recording = sa.orm.relationship("Recording", back_populates="screenshots")
@@ -952,12 +1456,25 @@ class Screenshot(db.Base):
     def scrub(self, scrubber: ScrubbingProvider) -> None:
         """Scrub the screenshot."""
 
-        def save_scrubbed_image(image: Image, setattr_name: str) -> None:
+        def save_scrubbed_image(image: Image, setattr_name: str) -> Image.Image:
             """Save the scrubbed image."""
             scrubbed_image = scrubber.scrub_image(image)
             setattr(self, setattr_name, self.convert_png_to_binary(scrubbed_image))
-
-        save_scrubbed_image(self.image, "png_data")
+            return scrubbed_image
+
+        image = self.image
+        # the scrubbed images are stored as PNG
+        self.image_codec = image_codec.PNG
+        scrubbed_image = save_scrubbed_image(image, "png_data")
+        # the tiles, the thumbnail and the hash are of the unscrubbed image
+        self.tile_grid = None
+        if self.thumbnail_data or self.image_hash is not None:
+            for name, value in image_hash.get_image_summary(scrubbed_image).items():
+                setattr(self, name, value)
+        self._image = scrubbed_image
+        self._cropped_image = None
+        self._thumbnail = None
+        self._base64 = None
         if self.png_diff_data:
             save_scrubbed_image(self.diff, "png_diff_data")
         if self.png_diff_mask_data:
@@ -973,7 +1490,9 @@ class Screenshot(db.Base):
         self._cropped_image = None
         self._diff = None
         self._diff_mask = None
+        self._diff_distance_field = None
         self._base64 = None
+        self._thumbnail = None
 
     @property
     def image(self) -> Image.Image:
@@ -981,29 +1500,104 @@ class Screenshot(db.Base):
         if not self._image:
             if self.png_data:
                 self._image = self.convert_binary_to_png(self.png_data)
+            elif self.tile_grid:
+                self._image = tiles.assemble_image(self.tile_grid, self.load_tiles)
             else:
                 # avoid circular import
                 from openadapt import video
 
-                video_file_path = video.get_video_file_path(self.recording_timestamp)
+                segment_idx, segment_start_time = self.recording.get_video_segment(
+                    self.timestamp
+                )
+                video_file_path = video.get_video_file_path(
+                    self.recording_timestamp, segment_idx
+                )
                 if FrameCache.ENABLED:
                     if video_file_path not in frame_cache.frames:
+                        # only decode the frames of this segment
+                        start_time, end_time = (
+                            self.recording.get_video_segment_time_range(segment_idx)
+                        )
                         screenshot_timestamps = [
-                            screenshot.timestamp - self.recording.video_start_time
+                            screenshot.timestamp - segment_start_time
                             for screenshot in self.recording.screenshots
+                            if (segment_idx == 0 or screenshot.timestamp >= start_time)
+                            and (end_time is None or screenshot.timestamp < end_time)
                         ]
                         frame_cache.cache_frames(video_file_path, screenshot_timestamps)
                     self._image = frame_cache.get_frame(
                         video_file_path,
-                        self.timestamp - self.recording.video_start_time,
+                        self.timestamp - segment_start_time,
                     )
                 else:
                     self._image = video.extract_frames(
                         video_file_path,
-                        [self.timestamp - self.recording.video_start_time],
+                        [self.timestamp - segment_start_time],
                     )[0]
         return self._image
 
+    @property
+    def size(self) -> tuple[int, int]:
+        """Get the width and height of the image, without decoding it if stored."""
+        if self.width is not None and self.height is not None:
+            return self.width, self.height
+        return self.image.size
+
+    @property
+    def thumbnail(self) -> Image.Image:
+        """Get a thumbnail of the image, without decoding the image if stored."""
+        if not self._thumbnail:
+            if self.thumbnail_data:
+                self._thumbnail = self.convert_binary_to_png(self.thumbnail_data)
+            else:
+                self._thumbnail = image_hash.get_thumbnail(self.image)
+        return self._thumbnail
+
+    def get_hash_distance(self, other: "Screenshot") -> int:
+        """Get the distance between the image hashes of two screenshots.
+
+        Args:
+            other (Screenshot): The other screenshot.
+
+        Returns:
+            int: The number of bits in which the hashes differ, from 0 (the images
+                look alike) to 64.
+        """
+        hashes = [
+            (
+                screenshot.image_hash
+                if screenshot.image_hash is not None
+                else image_hash.get_dhash(screenshot.thumbnail)
+            )
+            for screenshot in (self, other)
+        ]
+        return image_hash.get_hash_distance(*hashes)
+
+    def load_tiles(self, tile_hashes: list[str]) -> dict[str, bytes]:
+        """Load tiles of the recording of the screenshot.
+
+        Args:
+            tile_hashes (list[str]): The hashes of the tiles.
+
+        Returns:
+            dict[str, bytes]: The compressed tiles by hash.
+        """
+        session = sa.orm.object_session(self)
+        assert session, "Loading tiles requires a session"
+        tile_data_by_hash = {}
+        # stay below SQLite's limit on the number of parameters
+        for offset in range(0, len(tile_hashes), ScreenshotTile.MAX_QUERY_HASHES):
+            rows = session.execute(
+                sa.select(ScreenshotTile.hash, ScreenshotTile.data).where(
+                    ScreenshotTile.recording_id == self.recording_id,
+                    ScreenshotTile.hash.in_(
+                        tile_hashes[offset : offset + ScreenshotTile.MAX_QUERY_HASHES]
+                    ),
+                )
+            )
+            tile_data_by_hash.update(rows.tuples().all())
+        return tile_data_by_hash
+
     @property
     def cropped_image(self) -> Image.Image:
         """Return screenshot image cropped to corresponding action's active window."""
@@ -1030,23 +1624,95 @@ class Screenshot(db.Base):
     @property
     def diff(self) -> Image.Image:
         """Get the difference between the current and previous screenshot."""
-        if self.png_diff_data:
-            return self.convert_binary_to_png(self.png_diff_data)
-
-        assert self.prev, "Attempted to compute diff before setting prev"
-        self._diff = ImageChops.difference(self.image, self.prev.image)
+        if not self._diff:
+            if self.png_diff_data:
+                self._diff = self.convert_binary_to_png(self.png_diff_data)
+            else:
+                assert self.prev, "Attempted to compute diff before setting prev"
+                self._diff = ImageChops.difference(self.image, self.prev.image)
         return self._diff
 
     @property
     def diff_mask(self) -> Image.Image:
         """Get the difference mask between the current and previous screenshot."""
-        if self.png_diff_mask_data:
-            return self.convert_binary_to_png(self.png_diff_mask_data)
-
-        if self.diff:
-            self._diff_mask = self.diff.convert("1")
+        if not self._diff_mask:
+            if self.png_diff_mask_data:
+                self._diff_mask = self.convert_binary_to_png(self.png_diff_mask_data)
+            elif self.diff:
+                self._diff_mask = self.diff.convert("1")
         return self._diff_mask
 
+    @property
+    def diff_distance_field(self) -> tuple[int, int, np.ndarray] | None:
+        """Get the squared distance of the pixels around the diff to the diff.
+
+        The distance field is computed once, over the bounding box of the diff mask
+        extended by MAX_DIFF_DISTANCE, since the diff is the only source of
+        distances. Squared Euclidean distances between pixels are integers, and
+        stored as uint16.
+
+        Returns:
+            tuple[int, int, np.ndarray] | None: The left and top of the field in
+                the image, and the squared distances of its pixels, capped at
+                MAX_DIFF_DISTANCE ** 2; or None if the diff is empty.
+        """
+        if self._diff_distance_field is None:
+            diff_mask = self.diff_mask
+            bbox = diff_mask.getbbox()
+            if not bbox:
+                self._diff_distance_field = False
+            else:
+                left, top, right, bottom = bbox
+                width, height = diff_mask.size
+                left = max(left - self.MAX_DIFF_DISTANCE, 0)
+                top = max(top - self.MAX_DIFF_DISTANCE, 0)
+                right = min(right + self.MAX_DIFF_DISTANCE, width)
+                bottom = min(bottom + self.MAX_DIFF_DISTANCE, height)
+                mask = np.array(diff_mask.crop((left, top, right, bottom)), dtype=bool)
+                # distances of the pixels to the nearest pixel of the diff
+                squared_distances = np.rint(ndimage.distance_transform_edt(~mask) ** 2)
+                self._diff_distance_field = (
+                    left,
+                    top,
+                    np.minimum(squared_distances, self.MAX_DIFF_DISTANCE**2).astype(
+                        np.uint16
+                    ),
+                )
+        # False if the diff is empty
+        return self._diff_distance_field or None
+
+    def get_diff_distances(self, positions: np.ndarray) -> np.ndarray:
+        """Get the distances from positions in the image to the nearest diff pixel.
+
+        Args:
+            positions (np.ndarray): The (x, y) positions in the image, of shape
+                (N, 2), rounded to the nearest pixel.
+
+        Returns:
+            np.ndarray: The distance of each position, or inf if the diff is empty,
+                farther than MAX_DIFF_DISTANCE or the position is outside the
+                image.
+        """
+        positions = np.rint(np.asarray(positions, dtype=float).reshape(-1, 2))
+        distances = np.full(len(positions), np.inf)
+        diff_distance_field = self.diff_distance_field
+        if diff_distance_field is None:
+            return distances
+        left, top, squared_distances = diff_distance_field
+        xs = positions[:, 0].astype(int) - left
+        ys = positions[:, 1].astype(int) - top
+        height, width = squared_distances.shape
+        is_inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        inside_squared_distances = squared_distances[
+            ys[is_inside], xs[is_inside]
+        ].astype(float)
+        distances[is_inside] = np.where(
+            inside_squared_distances < self.MAX_DIFF_DISTANCE**2,
+            np.sqrt(inside_squared_distances),
+            np.inf,
+        )
+        return distances
+
     @property
     def array(self) -> np.ndarray:
         """Get the NumPy array representation of the image."""
@@ -1074,29 +1740,54 @@ class Screenshot(db.Base):
         return cropped_image
 
     def convert_binary_to_png(self, image_binary: bytes) -> Image.Image:
-        """Convert a binary image to a PNG image.
+        """Convert binary image data to an image.
 
         Args:
-            image_binary (bytes): The binary image data.
+            image_binary (bytes): The binary image data, in any codec.
 
         Returns:
-            Image: The PNG image.
+            Image: The image.
         """
-        buffer = io.BytesIO(image_binary)
-        return Image.open(buffer)
+        return image_codec.decode_image(image_binary)
 
     def convert_png_to_binary(self, image: Image.Image) -> bytes:
-        """Convert a PNG image to binary image data.
+        """Convert an image to binary image data.
+
+        The image is encoded with the codec of the screenshot, which defaults to
+        config.SCREENSHOT_IMAGE_CODEC for screenshots without image data.
 
         Args:
-            image (Image): The PNG image.
+            image (Image): The image.
 
         Returns:
             bytes: The binary image data.
         """
-        buffer = io.BytesIO()
-        image.save(buffer, format="PNG")
-        return buffer.getvalue()
+        if self.image_codec is None and not self.png_data:
+            self.image_codec = image_codec.validate_codec(config.SCREENSHOT_IMAGE_CODEC)
+        return image_codec.encode_image(image, self.image_codec or image_codec.PNG)
+
+
+class ScreenshotTile(db.Base):
+    """Class representing a distinct tile of the screenshots of a recording.
+
+    Tiles are content-addressed within a recording: screenshots reference their
+    tiles by hash (see Screenshot.tile_grid), so a tile shared by many screenshots
+    (e.g. an unchanged region of the screen) is stored once. Inserting an existing
+    tile is ignored.
+    """
+
+    __tablename__ = "screenshot_tile"
+    __table_args__ = (
+        sa.UniqueConstraint("recording_id", "hash", sqlite_on_conflict="IGNORE"),
+    )
+    MAX_QUERY_HASHES = 500
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    recording_timestamp = sa.Column(ForceFloat)
+    recording_id = sa.Column(sa.ForeignKey("recording.id"))
+    hash = sa.Column(sa.String)
+    # pixels of the tile, compressed with compression.compress_bytes
+    data = sa.Column(sa.LargeBinary)
 
 
 class AudioInfo(db.Base):
@@ -1128,6 +1819,9 @@ class PerformanceStat(db.Base):
     start_time = sa.Column(sa.Integer)
     end_time = sa.Column(sa.Integer)
     window_id = sa.Column(sa.String)
+    # statistics of SQL operations (see openadapt.db.instrumentation)
+    num_statements = sa.Column(sa.Integer)
+    num_rows = sa.Column(sa.Integer)
 
 
 class MemoryStat(db.Base):
@@ -1175,6 +1869,55 @@ class ScrubbedRecording(db.Base):
         }
 
 
+class RecordingSummary(db.Base):
+    """Class representing aggregate statistics of a finished recording.
+
+    Maintained at write time by crud.update_recording_summary so that listing
+    recordings does not require loading their events.
+    """
+
+    __tablename__ = "recording_summary"
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    recording_id = sa.Column(sa.ForeignKey("recording.id"), unique=True)
+    num_action_events = sa.Column(sa.Integer)
+    num_screenshots = sa.Column(sa.Integer)
+    num_window_events = sa.Column(sa.Integer)
+    num_browser_events = sa.Column(sa.Integer)
+    # seconds between the first and last event of any type
+    duration = sa.Column(ForceFloat)
+    # total size of the recording's binary and JSON columns
+    db_bytes = sa.Column(sa.Integer)
+    video_bytes = sa.Column(sa.Integer)
+    scrubbed = sa.Column(sa.Boolean, default=False)
+    updated_timestamp = sa.Column(ForceFloat)
+
+    recording = sa.orm.relationship("Recording", back_populates="summary")
+
+
+class ProcessedEvents(db.Base):
+    """Class representing the processed action events of a recording.
+
+    Written by openadapt.db.events_cache when events.get_events processes the
+    events of a recording, and read instead of processing them again while the
+    cache key (see events_cache.get_cache_key) is unchanged.
+    """
+
+    __tablename__ = "processed_events"
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    recording_id = sa.Column(sa.ForeignKey("recording.id"), unique=True)
+    # hash of the reducers, their settings and the ids of the raw action events
+    cache_key = sa.Column(sa.String)
+    timestamp = sa.Column(ForceFloat)
+    # the meta of events.get_events
+    meta = sa.Column(sa.JSON)
+    # the event trees (see events_cache.dump_events)
+    data = sa.Column(CompressedJSON())
+
+    recording = sa.orm.relationship("Recording", back_populates="processed_events")
+
+
 class Replay(db.Base):
     """Class representing a replay in the database."""
 
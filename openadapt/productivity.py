@@ -16,11 +16,13 @@ import string
 from bokeh.io import output_file, show
 from bokeh.layouts import layout, row
 from bokeh.models.widgets import Div
+from sqlalchemy.orm import Session as SaSession
 
+from openadapt import event_views
 from openadapt.custom_logger import logger
 from openadapt.db import crud
 from openadapt.events import get_events
-from openadapt.models import ActionEvent, WindowEvent
+from openadapt.models import ActionEvent, Recording, WindowEvent
 from openadapt.plotting import display_event
 from openadapt.utils import configure_logging, image2utf8, row2dict, rows2dicts
 from openadapt.visualize import IMG_WIDTH_PCT, MAX_EVENTS, dict2html
@@ -425,33 +427,23 @@ def find_num_window_tab_changes(window_events: list[WindowEvent]) -> int:
     return num_window_tab_changes - 1
 
 
-def calculate_productivity() -> None:
-    """A function to calculate productivity metrics.
-
-    Calculate any relevant information
-    about the productivity of a user in the latest recording.
-    Display this information in an HTML page and open the page.
+def get_productivity_info(
+    action_events: list[ActionEvent], window_events: list[WindowEvent]
+) -> Tuple[dict, list[ActionEvent], list[ActionEvent], int]:
+    """Calculate the overall productivity metrics of a recording.
 
     Args:
-        None
+        action_events (list[ActionEvent]): The action events of the recording.
+        window_events (list[WindowEvent]): The window events of the recording.
 
     Returns:
-        None
+        dict: The metrics, by description.
+        list[ActionEvent]: The task identified by the search algorithm.
+        list[ActionEvent]: The final verified task.
+        int: The number of repetitions of the task.
     """
-    configure_logging(logger, LOG_LEVEL)
-
-    session = crud.get_new_session(read_only=True)
-
-    recording = crud.get_latest_recording(session)
-    logger.debug(f"{recording=}")
-
-    action_events = get_events(session, recording, process=PROCESS_EVENTS)
-    event_dicts = rows2dicts(action_events)
-    logger.info(f"event_dicts=\n{pformat(event_dicts)}")
-    window_events = crud.get_window_events(session, recording)
     filtered_action_events = filter_move_release(action_events)
 
-    # overall info first
     gaps, time_in_gaps = find_gaps(action_events)
     num_clicks = find_clicks(action_events)
     num_key_presses = find_key_presses(action_events)
@@ -481,6 +473,60 @@ def calculate_productivity() -> None:
         "Average time spent per repetitive task": ave_task_time,
         # "Number of errors": errors
     }
+    return prod_info, task, final_task, num_tasks
+
+
+def get_metrics(session: SaSession, recording: Recording) -> dict:
+    """Calculate the overall productivity metrics of a recording.
+
+    Used to calculate the metrics of many recordings with openadapt.batch, e.g.:
+
+        batch.process_recordings(recording_ids, process_fn=productivity.get_metrics)
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+
+    Returns:
+        dict: The metrics, by description.
+    """
+    if PROCESS_EVENTS:
+        action_events = get_events(session, recording)
+    else:
+        # the metrics only read the events
+        action_events = event_views.get_action_events(session, recording)
+    window_events = event_views.get_window_events(session, recording)
+    prod_info, _, _, _ = get_productivity_info(action_events, window_events)
+    return prod_info
+
+
+def calculate_productivity() -> None:
+    """A function to calculate productivity metrics.
+
+    Calculate any relevant information
+    about the productivity of a user in the latest recording.
+    Display this information in an HTML page and open the page.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    configure_logging(logger, LOG_LEVEL)
+
+    session = crud.get_new_session(read_only=True)
+
+    recording = crud.get_latest_recording(session)
+    logger.debug(f"{recording=}")
+
+    action_events = get_events(session, recording, process=PROCESS_EVENTS)
+    event_dicts = rows2dicts(action_events)
+    logger.info(f"event_dicts=\n{pformat(event_dicts)}")
+    window_events = crud.get_window_events(session, recording)
+    prod_info, task, final_task, num_tasks = get_productivity_info(
+        action_events, window_events
+    )
 
     rows = [
         row(
@@ -41,7 +41,7 @@ import whisper
 
 from openadapt import plotting, utils, video, window
 from openadapt.config import config
-from openadapt.db import crud
+from openadapt.db import crud, image_codec, image_hash, tiles
 from openadapt.extensions import synchronized_queue as sq
 from openadapt.models import ActionEvent
 
@@ -314,13 +314,18 @@ def write_screen_event(
     """
     assert event.type == "screen", event
     image = event.data
-    if config.RECORD_IMAGES:
-        with io.BytesIO() as output:
-            image.save(output, format="PNG")
-            png_data = output.getvalue()
-        event_data = {"png_data": png_data}
+    if config.RECORD_IMAGES and config.RECORD_IMAGE_TILES:
+        tile_grid, image_tiles = tiles.split_image(image)
+        event_data = {"tile_grid": tile_grid, "tiles": image_tiles}
+    elif config.RECORD_IMAGES:
+        codec = image_codec.validate_codec(config.SCREENSHOT_IMAGE_CODEC)
+        event_data = {
+            "png_data": image_codec.encode_image(image, codec),
+            "image_codec": codec,
+        }
     else:
         event_data = {}
+    event_data.update(image_hash.get_image_summary(image))
     crud.insert_screenshot(db, recording, event.timestamp, event_data)
     perf_q.put((event.type, event.timestamp, utils.get_timestamp()))
 
@@ -428,6 +433,7 @@ def write_events(
         try:
             event = write_q.get_nowait()
         except queue.Empty:
+            crud.flush_inserts(stale_only=True)
             continue
         assert event.type == event_type, (event_type, event)
         state = write_fn(session, recording, event, perf_q, **(state or {}))
@@ -440,6 +446,7 @@ def write_events(
                     progress.refresh()
                 progress.update()
         logger.debug(f"{event_type=} written")
+    crud.flush_inserts()
 
     if post_callback:
         post_callback(state)
@@ -464,12 +471,14 @@ def video_pre_callback(db: crud.SaSession, recording: Recording) -> dict[str, An
         video.initialize_video_writer(video_file_path, monitor_width, monitor_height)
     )
     crud.update_video_start_time(db, recording, video_start_timestamp)
+    crud.add_video_segment(db, recording, video_start_timestamp)
     return {
         "video_container": video_container,
         "video_stream": video_stream,
         "video_start_timestamp": video_start_timestamp,
         "last_pts": 0,
         "video_file_path": video_file_path,
+        "video_segment_idx": 0,
     }
 
 
@@ -492,21 +501,26 @@ def video_post_callback(state: dict) -> None:
 
 def write_video_event(
     db: crud.SaSession,
-    recording_timestamp: float,
+    recording: Recording,
     event: Event,
     perf_q: sq.SynchronizedQueue,
     video_container: av.container.OutputContainer,
     video_stream: av.stream.Stream,
     video_start_timestamp: float,
+    video_file_path: str,
+    video_segment_idx: int = 0,
     last_pts: int = 0,
     num_copies: int = 2,
     **kwargs: dict,
 ) -> dict[str, Any]:
     """Write a screen event to the video file and update the performance queue.
 
+    Once the current video file spans config.VIDEO_SEGMENT_DURATION seconds, it is
+    finalized and the event is written to the video file of a new segment.
+
     Args:
         db: The database session.
-        recording_timestamp: The timestamp of the recording.
+        recording: The recording object.
         event: A screen event to be written.
         perf_q: A queue for collecting performance data.
         video_container (av.container.OutputContainer): The output container to which
@@ -514,6 +528,8 @@ def write_video_event(
         video_stream (av.stream.Stream): The video stream within the container.
         video_start_timestamp (float): The base timestamp from which the video
             recording started.
+        video_file_path (str): The path of the video file of the current segment.
+        video_segment_idx (int): The index of the current video segment.
         last_pts: The last presentation timestamp.
         num_copies: The number of times to write the frame.
 
@@ -523,6 +539,32 @@ def write_video_event(
     assert event.type == "screen/video"
     screenshot_image = event.data
     screenshot_timestamp = event.timestamp
+    if (
+        config.VIDEO_SEGMENT_DURATION
+        and last_pts != 0
+        and screenshot_timestamp - video_start_timestamp
+        >= config.VIDEO_SEGMENT_DURATION
+    ):
+        video_post_callback(
+            {
+                **kwargs,
+                "video_container": video_container,
+                "video_stream": video_stream,
+                "video_start_timestamp": video_start_timestamp,
+                "last_pts": last_pts,
+                "video_file_path": video_file_path,
+            }
+        )
+        video_segment_idx += 1
+        video_file_path = video.get_video_file_path(
+            recording.timestamp, video_segment_idx
+        )
+        video_container, video_stream, _ = video.initialize_video_writer(
+            video_file_path, monitor_width, monitor_height
+        )
+        video_start_timestamp = screenshot_timestamp
+        last_pts = 0
+        crud.add_video_segment(db, recording, video_start_timestamp)
     force_key_frame = last_pts == 0
     # ensure that the first frame is available (otherwise occasionally it is not)
     # TODO: why isn't force_key_frame sufficient?
@@ -545,6 +587,8 @@ def write_video_event(
             "video_container": video_container,
             "video_stream": video_stream,
             "video_start_timestamp": video_start_timestamp,
+            "video_file_path": video_file_path,
+            "video_segment_idx": video_segment_idx,
             "last_frame": screenshot_image,
             "last_frame_timestamp": screenshot_timestamp,
             "last_pts": last_pts,
@@ -817,6 +861,7 @@ def performance_stats_writer(
         try:
             event_type, start_time, end_time = perf_q.get_nowait()
         except queue.Empty:
+            crud.flush_inserts(stale_only=True)
             continue
 
         crud.insert_perf_stat(
@@ -826,6 +871,7 @@ def performance_stats_writer(
             start_time,
             end_time,
         )
+    crud.flush_inserts()
     logger.info("Performance stats writer done")
 
 
@@ -882,6 +928,7 @@ def memory_writer(
             rss,
             timestamp,
         )
+    crud.flush_inserts()
     logger.info("Memory writer done")
 
 
@@ -1293,6 +1340,9 @@ def record(
         config.RECORD_VIDEO,
         config.RECORD_IMAGES,
     )
+    if config.RECORD_IMAGES and not config.RECORD_IMAGE_TILES:
+        # warn about an unavailable codec before recording
+        image_codec.validate_codec(config.SCREENSHOT_IMAGE_CODEC)
 
     if not crud.acquire_db_lock():
         logger.error("Failed to acquire DB lock")
@@ -1632,6 +1682,7 @@ def record(
 
     with crud.get_new_session(read_and_write=True) as session:
         crud.post_process_events(session, recording)
+        crud.update_recording_summary(session, recording)
 
     if terminate_recording is not None:
         terminate_recording.set()
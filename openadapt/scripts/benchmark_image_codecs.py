@@ -0,0 +1,88 @@
+"""Benchmark the image codecs on recorded screenshots.
+
+The screenshots of a recording are encoded with each available codec (see
+openadapt.db.image_codec), and the resulting size, size ratio (relative to the
+raw pixels) and encode/decode throughput (in MB/s of raw pixels) are reported.
+
+Usage:
+    $ python -m openadapt.scripts.benchmark_image_codecs \
+        [--recording_id=<int>] [--max_screenshots=<int>]
+"""
+
+from typing import Any, Callable
+import time
+
+from PIL import Image
+import fire
+
+from openadapt.db import crud, image_codec
+
+
+def time_fn(fn: Callable[[Any], Any], values: list[Any]) -> tuple[list[Any], float]:
+    """Apply fn to each value.
+
+    Args:
+        fn (Callable): The function to apply.
+        values (list): The values.
+
+    Returns:
+        tuple[list, float]: The results and the duration in seconds.
+    """
+    start_time = time.perf_counter()
+    results = [fn(value) for value in values]
+    return results, time.perf_counter() - start_time
+
+
+def decode(data: bytes) -> Image.Image:
+    """Decode an image, including its pixel data (which PIL loads lazily).
+
+    Args:
+        data (bytes): The encoded image.
+
+    Returns:
+        Image.Image: The image.
+    """
+    image = image_codec.decode_image(data)
+    image.load()
+    return image
+
+
+def main(recording_id: int | None = None, max_screenshots: int = 50) -> None:
+    """Print the size ratio and throughput of each image codec.
+
+    Args:
+        recording_id (int): The id of the recording. Defaults to the latest.
+        max_screenshots (int): The maximum number of screenshots to encode.
+    """
+    with crud.get_new_session(read_only=True) as session:
+        if recording_id is None:
+            recording = crud.get_latest_recording(session)
+        else:
+            recording = crud.get_recording_by_id(session, recording_id)
+        screenshots = crud.get_screenshots(session, recording)[:max_screenshots]
+        images = [screenshot.image.convert("RGB") for screenshot in screenshots]
+        stored_bytes = sum(
+            len(screenshot.png_data or b"") for screenshot in screenshots
+        )
+    raw_bytes = sum(len(image.tobytes()) for image in images)
+    print(f"{len(images)} screenshots, {raw_bytes} raw bytes, {stored_bytes} stored")
+    print(f"{'codec':<8}{'bytes':>14}{'ratio':>10}{'write MB/s':>12}{'read MB/s':>12}")
+    for codec in image_codec.get_available_codecs():
+        encoded_images, encode_duration = time_fn(
+            lambda image: image_codec.encode_image(image, codec), images
+        )
+        decoded_images, decode_duration = time_fn(decode, encoded_images)
+        assert all(
+            decoded_image.tobytes() == image.tobytes()
+            for decoded_image, image in zip(decoded_images, images)
+        ), codec
+        encoded_bytes = sum(len(encoded_image) for encoded_image in encoded_images)
+        print(
+            f"{codec:<8}{encoded_bytes:>14}{raw_bytes / encoded_bytes:>10.2f}"
+            f"{raw_bytes / encode_duration / 1e6:>12.1f}"
+            f"{raw_bytes / decode_duration / 1e6:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
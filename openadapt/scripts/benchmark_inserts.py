@@ -0,0 +1,112 @@
+"""Benchmark the throughput of the buffered event inserts in openadapt.db.crud.
+
+Each event type is inserted into a fresh temporary SQLite database using the same
+crud.insert_* functions as openadapt.record.
+
+Usage:
+    $ python -m openadapt.scripts.benchmark_inserts [--num_events=<int>] \
+        [--batch_sizes=<list[int]>]
+
+Example:
+    $ python -m openadapt.scripts.benchmark_inserts --num_events=10000 \
+        --batch_sizes=[1,100]
+"""
+
+from typing import Any, Callable
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+import fire
+import sqlalchemy as sa
+
+from openadapt.db import crud
+from openadapt.db.db import Base
+
+# event type -> (insert function, function returning the event data for an index)
+EVENT_TYPES: dict[str, tuple[Callable, Callable[[int], dict[str, Any]]]] = {
+    "action": (
+        crud.insert_action_event,
+        lambda idx: {
+            "name": "move",
+            "mouse_x": float(idx % 1920),
+            "mouse_y": float(idx % 1080),
+        },
+    ),
+    "screen": (crud.insert_screenshot, lambda idx: {}),
+    "window": (
+        crud.insert_window_event,
+        lambda idx: {
+            "title": f"Window {idx % 10}",
+            "left": 0,
+            "top": 0,
+            "width": 1920,
+            "height": 1080,
+            "window_id": str(idx % 10),
+            "state": {"title": f"Window {idx % 10}", "data": {"idx": idx}},
+        },
+    ),
+    "browser": (
+        crud.insert_browser_event,
+        lambda idx: {"message": {"type": "USER_EVENT", "idx": idx}},
+    ),
+}
+
+
+def benchmark_event_type(
+    event_type: str,
+    num_events: int,
+    batch_size: int,
+) -> float:
+    """Insert events of one type into a temporary database.
+
+    Args:
+        event_type (str): One of EVENT_TYPES.
+        num_events (int): The number of events to insert.
+        batch_size (int): The batch size of the insert buffers of crud.
+
+    Returns:
+        float: The number of events inserted per second.
+    """
+    insert_fn, get_event_data = EVENT_TYPES[event_type]
+    with tempfile.TemporaryDirectory() as tmp_dir_path:
+        engine = sa.create_engine(f"sqlite:///{tmp_dir_path}/benchmark.db")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        recording = crud.insert_recording(session, {"timestamp": time.time()})
+
+        prev_batch_sizes = [buffer.batch_size for buffer in crud.insert_buffers]
+        for buffer in crud.insert_buffers:
+            buffer.batch_size = batch_size
+        try:
+            start_time = time.perf_counter()
+            for idx in range(num_events):
+                insert_fn(session, recording, float(idx), get_event_data(idx))
+            crud.flush_inserts()
+            duration = time.perf_counter() - start_time
+        finally:
+            for buffer, prev_batch_size in zip(crud.insert_buffers, prev_batch_sizes):
+                buffer.batch_size = prev_batch_size
+            session.close()
+            engine.dispose()
+    return num_events / duration
+
+
+def main(num_events: int = 10000, batch_sizes: list[int] | None = None) -> None:
+    """Print insert throughput per event type and batch size.
+
+    Args:
+        num_events (int): The number of events to insert per event type.
+        batch_sizes (list[int]): The batch sizes to compare. Defaults to
+            [1, crud.BATCH_SIZE].
+    """
+    batch_sizes = batch_sizes or [1, crud.BATCH_SIZE]
+    print(f"{'event_type':<12}{'batch_size':>12}{'events/s':>14}")
+    for event_type in EVENT_TYPES:
+        for batch_size in batch_sizes:
+            events_per_second = benchmark_event_type(event_type, num_events, batch_size)
+            print(f"{event_type:<12}{batch_size:>12}{events_per_second:>14.0f}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
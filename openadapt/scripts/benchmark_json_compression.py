@@ -0,0 +1,170 @@
+"""Benchmark the compression of JSON columns on recorded data.
+
+For each compressed JSON column, the values of a recording are re-encoded as plain
+JSON, zlib, zstd, and zstd with a dictionary trained on the values of the
+recording, and the resulting size and (de)compression throughput are reported.
+
+Usage:
+    $ python -m openadapt.scripts.benchmark_json_compression \
+        [--recording_id=<int>] [--train_dictionaries]
+
+Passing --train_dictionaries stores the dictionaries trained on the recording in
+the database, so that they are used for all subsequently recorded values.
+"""
+
+from typing import Any, Callable
+import time
+import zlib
+
+import fire
+import orjson
+import sqlalchemy as sa
+import zstandard
+
+from openadapt.db import compression, crud
+from openadapt.models import (
+    ActionEvent,
+    BrowserEvent,
+    CompressedJSON,
+    WindowEvent,
+    WindowState,
+)
+
+COLUMNS = (
+    ActionEvent.element_state,
+    WindowState.state,
+    BrowserEvent.message,
+)
+MIN_DICTIONARY_SAMPLES = 10
+ZLIB_LEVEL = 6
+
+
+def time_fn(fn: Callable[[Any], Any], values: list[Any]) -> tuple[list[Any], float]:
+    """Apply fn to each value.
+
+    Args:
+        fn (Callable): The function to apply.
+        values (list): The values.
+
+    Returns:
+        tuple[list, float]: The results and the duration in seconds.
+    """
+    start_time = time.perf_counter()
+    results = [fn(value) for value in values]
+    return results, time.perf_counter() - start_time
+
+
+def get_recording_filter(
+    column: sa.orm.InstrumentedAttribute,
+    recording_id: int,
+) -> sa.ColumnElement:
+    """Get the filter selecting the values of a column in a recording.
+
+    Args:
+        column (sa.orm.InstrumentedAttribute): The column.
+        recording_id (int): The id of the recording.
+
+    Returns:
+        sa.ColumnElement: The filter.
+    """
+    if column.class_ is WindowState:
+        return WindowState.hash.in_(
+            sa.select(WindowEvent.state_hash).where(
+                WindowEvent.recording_id == recording_id
+            )
+        )
+    return column.class_.recording_id == recording_id
+
+
+def benchmark_column(
+    column: sa.orm.InstrumentedAttribute,
+    recording_id: int,
+    train_dictionaries: bool,
+) -> None:
+    """Print the size and throughput of each codec for one column.
+
+    Args:
+        column (sa.orm.InstrumentedAttribute): The column.
+        recording_id (int): The id of the recording.
+        train_dictionaries (bool): Whether to save the trained dictionary.
+    """
+    column_name = column.type.dictionary_name
+    with crud.get_new_session(read_only=True) as session:
+        stored_values = (
+            session.execute(
+                sa.select(sa.type_coerce(column, sa.LargeBinary)).where(
+                    get_recording_filter(column, recording_id),
+                    column.is_not(None),
+                )
+            )
+            .scalars()
+            .all()
+        )
+    if not stored_values:
+        print(f"{column_name:<28}{'no values':>12}")
+        return
+    values = [compression.decompress_json(value) for value in stored_values]
+    json_values = [orjson.dumps(value) for value in values]
+    json_bytes = sum(len(json_value) for json_value in json_values)
+    stored_bytes = sum(len(stored_value) for stored_value in stored_values)
+    print(f"{column_name:<28}{'stored':>12}{stored_bytes:>14}")
+
+    codecs = {
+        "json": (orjson.dumps, orjson.loads),
+        "zlib": (
+            lambda value: zlib.compress(orjson.dumps(value), ZLIB_LEVEL),
+            compression.decompress_json,
+        ),
+        "zstd": (
+            lambda value: compression.compress_json(value),
+            compression.decompress_json,
+        ),
+    }
+    if len(values) >= MIN_DICTIONARY_SAMPLES:
+        try:
+            dictionary = compression.train_dictionary(
+                column_name, values, save=train_dictionaries
+            )
+        except Exception as exc:
+            print(f"{column_name:<28}{'zstd+dict':>12} failed to train: {exc}")
+        else:
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            codecs["zstd+dict"] = (
+                lambda value: compression.compress_json(value, dictionary=dictionary),
+                lambda data: orjson.loads(decompressor.decompress(data)),
+            )
+
+    for codec_name, (encode_fn, decode_fn) in codecs.items():
+        encoded_values, encode_duration = time_fn(encode_fn, values)
+        _, decode_duration = time_fn(decode_fn, encoded_values)
+        encoded_bytes = sum(len(encoded_value) for encoded_value in encoded_values)
+        print(
+            f"{column_name:<28}{codec_name:>12}{encoded_bytes:>14}"
+            f"{json_bytes / encoded_bytes:>10.2f}"
+            f"{json_bytes / encode_duration / 1e6:>12.1f}"
+            f"{json_bytes / decode_duration / 1e6:>12.1f}"
+        )
+
+
+def main(recording_id: int | None = None, train_dictionaries: bool = False) -> None:
+    """Print the compression ratio and throughput of each JSON column.
+
+    Args:
+        recording_id (int): The id of the recording. Defaults to the latest.
+        train_dictionaries (bool): Whether to save dictionaries trained on the
+            recording for use in subsequent recordings.
+    """
+    assert all(isinstance(column.type, CompressedJSON) for column in COLUMNS)
+    if recording_id is None:
+        with crud.get_new_session(read_only=True) as session:
+            recording_id = crud.get_latest_recording(session).id
+    print(
+        f"{'column':<28}{'codec':>12}{'bytes':>14}{'ratio':>10}"
+        f"{'write MB/s':>12}{'read MB/s':>12}"
+    )
+    for column in COLUMNS:
+        benchmark_column(column, recording_id, train_dictionaries)
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
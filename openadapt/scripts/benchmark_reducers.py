@@ -0,0 +1,108 @@
+"""Benchmark the engines applying the action event reducers of events.get_events.
+
+The raw action events of a recording are reduced with events.PROCESS_FNS by each
+engine (see events.REDUCER_ENGINE): the list reducers of events.py applied in
+turn, openadapt.columnar_events and openadapt.streaming_events. The events are
+reloaded in a new session for each engine, since reducing events changes them,
+and the reduced events are checked to be the same.
+
+Usage:
+    $ python -m openadapt.scripts.benchmark_reducers [--recording_id=<int>] \
+        [--num_repeats=<int>]
+"""
+
+from typing import Callable
+import time
+
+import fire
+
+from openadapt import columnar_events, events, models, streaming_events
+from openadapt.db import crud
+
+# engine name -> function applying reducers to action events
+ENGINES: dict[str, Callable] = {
+    "list": lambda action_events, process_fns: [
+        action_events := process_fn(action_events) for process_fn in process_fns
+    ][-1],
+    "columnar": columnar_events.reduce_events,
+    "streaming": streaming_events.reduce_events,
+}
+
+
+def get_signature(event: models.ActionEvent) -> tuple:
+    """Get the attributes of a reduced event and its descendants, for comparison.
+
+    Args:
+        event (models.ActionEvent): The event.
+
+    Returns:
+        tuple: The attributes of the event, ending with those of its children.
+    """
+    return (
+        event.id,
+        event.name,
+        event.timestamp,
+        sorted(event.reducer_names),
+        [get_signature(child) for child in event.children],
+    )
+
+
+def benchmark_engine(engine: str, recording_id: int) -> tuple[int, list[tuple], float]:
+    """Reduce the action events of a recording with an engine.
+
+    Args:
+        engine (str): One of ENGINES.
+        recording_id (int): The id of the recording.
+
+    Returns:
+        tuple[int, list[tuple], float]: The number of raw action events, the
+            signatures of the reduced events and the duration in seconds.
+    """
+    with crud.get_new_session(read_only=True) as session:
+        recording = crud.get_recording_by_id(session, recording_id)
+        action_events = crud.get_action_events(session, recording)
+        num_action_events = len(action_events)
+        start_time = time.perf_counter()
+        action_events = ENGINES[engine](action_events, events.PROCESS_FNS)
+        duration = time.perf_counter() - start_time
+        return (
+            num_action_events,
+            [get_signature(event) for event in action_events],
+            duration,
+        )
+
+
+def main(recording_id: int | None = None, num_repeats: int = 3) -> None:
+    """Print the duration of reducing the action events of a recording by engine.
+
+    Args:
+        recording_id (int): The id of the recording. Defaults to the latest.
+        num_repeats (int): The number of times to reduce the events with each
+            engine; the fastest is reported.
+    """
+    if recording_id is None:
+        with crud.get_new_session(read_only=True) as session:
+            recording_id = crud.get_latest_recording(session).id
+    expected_signatures = None
+    list_duration = None
+    print(f"{'engine':<12}{'events':>10}{'reduced':>10}{'seconds':>10}{'speedup':>10}")
+    for engine in ENGINES:
+        durations = []
+        for _ in range(num_repeats):
+            num_action_events, signatures, duration = benchmark_engine(
+                engine, recording_id
+            )
+            durations.append(duration)
+        if expected_signatures is None:
+            expected_signatures = signatures
+        assert signatures == expected_signatures, engine
+        duration = min(durations)
+        list_duration = list_duration or duration
+        print(
+            f"{engine:<12}{num_action_events:>10}{len(signatures):>10}"
+            f"{duration:>10.3f}{list_duration / duration:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
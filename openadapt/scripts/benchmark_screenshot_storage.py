@@ -0,0 +1,187 @@
+"""Benchmark the storage of recorded screenshots.
+
+The screenshots of a recording are stored as PNG images, as deduplicated tiles
+(see openadapt.db.tiles) and as a video (see openadapt.video), and the stored size
+and the latency of reconstructing the images (all of them, and a single one) are
+reported for each.
+
+Usage:
+    $ python -m openadapt.scripts.benchmark_screenshot_storage \
+        [--recording_id=<int>] [--max_screenshots=<int>]
+"""
+
+from typing import Callable
+import os
+import tempfile
+import time
+
+from PIL import Image
+import fire
+
+from openadapt import video
+from openadapt.db import crud, image_codec, tiles
+
+
+def time_fn(fn: Callable[[], list[Image.Image]]) -> tuple[list[Image.Image], float]:
+    """Call fn and load the pixel data of the images it returns.
+
+    Args:
+        fn (Callable): The function returning the images.
+
+    Returns:
+        tuple[list[Image.Image], float]: The images and the duration in seconds.
+    """
+    start_time = time.perf_counter()
+    images = fn()
+    for image in images:
+        image.load()
+    return images, time.perf_counter() - start_time
+
+
+def store_png(
+    images: list[Image.Image], timestamps: list[float]
+) -> tuple[int, Callable[[list[int]], list[Image.Image]]]:
+    """Store images as PNG.
+
+    Args:
+        images (list[Image.Image]): The images.
+        timestamps (list[float]): The timestamps of the images, in seconds.
+
+    Returns:
+        tuple: The stored size in bytes, and a function reading the images at the
+            given indices.
+    """
+    png_datas = [image_codec.encode_image(image) for image in images]
+    return sum(len(png_data) for png_data in png_datas), lambda idxs: [
+        image_codec.decode_image(png_datas[idx]) for idx in idxs
+    ]
+
+
+def store_tiles(
+    images: list[Image.Image], timestamps: list[float]
+) -> tuple[int, Callable[[list[int]], list[Image.Image]]]:
+    """Store images as deduplicated tiles.
+
+    Args:
+        images (list[Image.Image]): The images.
+        timestamps (list[float]): The timestamps of the images, in seconds.
+
+    Returns:
+        tuple: The stored size in bytes, and a function reading the images at the
+            given indices.
+    """
+    tile_grids = []
+    compressed_tiles = {}
+    for image in images:
+        tile_grid, image_tiles = tiles.split_image(image)
+        tile_grids.append(tile_grid)
+        for tile_hash, tile in image_tiles.items():
+            if tile_hash not in compressed_tiles:
+                compressed_tiles[tile_hash] = tiles.compress_tile(tile)
+    num_bytes = sum(len(tile_grid) for tile_grid in tile_grids) + sum(
+        len(compressed_tile) for compressed_tile in compressed_tiles.values()
+    )
+
+    def read_images(idxs: list[int]) -> list[Image.Image]:
+        tiles._tile_cache.clear()
+        return [
+            tiles.assemble_image(
+                tile_grids[idx],
+                lambda tile_hashes: {
+                    tile_hash: compressed_tiles[tile_hash] for tile_hash in tile_hashes
+                },
+            )
+            for idx in idxs
+        ]
+
+    return num_bytes, read_images
+
+
+def store_video(
+    images: list[Image.Image], timestamps: list[float]
+) -> tuple[int, Callable[[list[int]], list[Image.Image]]]:
+    """Store images as a video.
+
+    Args:
+        images (list[Image.Image]): The images.
+        timestamps (list[float]): The timestamps of the images, in seconds.
+
+    Returns:
+        tuple: The stored size in bytes, and a function reading the images at the
+            given indices.
+    """
+    video_file_path = os.path.join(tempfile.mkdtemp(), "screenshots.mp4")
+    width, height = images[0].size
+    video_container, video_stream, _ = video.initialize_video_writer(
+        video_file_path, width, height
+    )
+    last_pts = 0
+    for idx, (image, timestamp) in enumerate(zip(images, timestamps)):
+        last_pts = video.write_video_frame(
+            video_container,
+            video_stream,
+            image,
+            timestamp,
+            0,
+            last_pts,
+            force_key_frame=idx == 0,
+        )
+    video.finalize_video_writer(
+        video_container,
+        video_stream,
+        0,
+        images[-1],
+        timestamps[-1],
+        last_pts,
+        video_file_path,
+    )
+    return os.path.getsize(video_file_path), lambda idxs: video.extract_frames(
+        video_file_path, [timestamps[idx] for idx in idxs]
+    )
+
+
+def main(recording_id: int | None = None, max_screenshots: int = 50) -> None:
+    """Print the stored size and reconstruction latency of each storage.
+
+    Args:
+        recording_id (int): The id of the recording. Defaults to the latest.
+        max_screenshots (int): The maximum number of screenshots to store.
+    """
+    with crud.get_new_session(read_only=True) as session:
+        if recording_id is None:
+            recording = crud.get_latest_recording(session)
+        else:
+            recording = crud.get_recording_by_id(session, recording_id)
+        screenshots = crud.get_screenshots(session, recording)[:max_screenshots]
+        images = [screenshot.image.convert("RGB") for screenshot in screenshots]
+        timestamps = [
+            screenshot.timestamp - screenshots[0].timestamp
+            for screenshot in screenshots
+        ]
+    raw_bytes = sum(len(image.tobytes()) for image in images)
+    print(f"{len(images)} screenshots, {raw_bytes} raw bytes")
+    print(f"{'storage':<8}{'bytes':>14}{'ratio':>10}{'all ms/img':>12}{'one ms':>10}")
+    for name, store_fn in (
+        ("png", store_png),
+        ("tiles", store_tiles),
+        ("video", store_video),
+    ):
+        num_bytes, read_images = store_fn(images, timestamps)
+        all_images, all_duration = time_fn(
+            lambda: read_images(list(range(len(images))))
+        )
+        # video frames are not lossless unless encoded in yuv444p with crf 0
+        if name != "video":
+            assert all(
+                read_image.tobytes() == image.tobytes()
+                for read_image, image in zip(all_images, images)
+            ), name
+        _, one_duration = time_fn(lambda: read_images([len(images) // 2]))
+        print(
+            f"{name:<8}{num_bytes:>14}{raw_bytes / num_bytes:>10.2f}"
+            f"{all_duration / len(images) * 1000:>12.2f}{one_duration * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
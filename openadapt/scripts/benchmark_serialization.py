@@ -0,0 +1,164 @@
+"""Benchmark serializing processed action events to JSON, as the dashboard does.
+
+The processed action events of a recording are converted to dicts and encoded to
+JSON by each serializer: "dictalchemy", the implementation replaced by
+openadapt.db.serialization (DictableModel.asdict, converting keys to strings, and
+json), and "serialization", openadapt.db.serialization (precompiled extractors
+and orjson). The events are those of a synthetic recording (see
+openadapt.synthetic) in a temporary database, or of a recording in the database.
+
+Usage:
+    $ python -m openadapt.scripts.benchmark_serialization \
+        [--num_action_events=<int>] [--recording_id=<int>] [--num_repeats=<int>]
+"""
+
+from typing import Callable
+import json
+import tempfile
+import time
+
+import fire
+import orjson
+import sqlalchemy as sa
+
+from openadapt import events, models, synthetic
+from openadapt.db import crud, serialization
+
+
+def dictalchemy_row2dict(row: models.ActionEvent) -> dict:
+    """Convert an action event to a dict, as utils.row2dict did with dictalchemy.
+
+    Args:
+        row (models.ActionEvent): The action event.
+
+    Returns:
+        dict: The action event and its children, with keys converted to strings.
+    """
+    to_follow = {"children": {}}
+    to_follow["children"]["follow"] = to_follow
+    to_include = [
+        attr_name
+        for attr_name in serialization.INCLUDED_ATTR_NAMES
+        if hasattr(row, attr_name)
+    ]
+    row_dict = row.asdict(follow=to_follow, include=to_include)
+
+    def convert_to_str(event_dict: dict) -> None:
+        """Convert the keys to strings, as the dashboard did."""
+        if "key" in event_dict:
+            event_dict["key"] = str(event_dict["key"])
+        if "canonical_key" in event_dict:
+            event_dict["canonical_key"] = str(event_dict["canonical_key"])
+        if "reducer_names" in event_dict:
+            # sorted (rather than in set order) to compare the serializers
+            event_dict["reducer_names"] = sorted(event_dict["reducer_names"])
+        for child_dict in event_dict.get("children", []):
+            convert_to_str(child_dict)
+
+    convert_to_str(row_dict)
+    return row_dict
+
+
+def load_event_dict(payload: bytes) -> dict:
+    """Load the dict of an action event serialized by a serializer, to compare them.
+
+    Args:
+        payload (bytes): The JSON of the action event.
+
+    Returns:
+        dict: The dict of the action event, with missing keys as None (which the
+            dictalchemy serializer converted to "None").
+    """
+
+    def convert_none(event_dict: dict) -> dict:
+        for attr_name in ("key", "canonical_key"):
+            if event_dict.get(attr_name) == "None":
+                event_dict[attr_name] = None
+        for child_dict in event_dict.get("children", []):
+            convert_none(child_dict)
+        return event_dict
+
+    return convert_none(orjson.loads(payload)["value"])
+
+
+# serializer name -> function serializing an action event to JSON
+SERIALIZERS: dict[str, Callable[[models.ActionEvent], bytes]] = {
+    "dictalchemy": lambda action_event: json.dumps(
+        {"type": "action_event", "value": dictalchemy_row2dict(action_event)}
+    ).encode(),
+    "serialization": lambda action_event: serialization.dumps(
+        {
+            "type": "action_event",
+            "value": serialization.row2dict(action_event, jsonable=True),
+        }
+    ),
+}
+
+
+def benchmark_serializers(
+    session: sa.orm.Session, recording: models.Recording, num_repeats: int
+) -> None:
+    """Print the duration of serializing the processed events of a recording.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (models.Recording): The recording.
+        num_repeats (int): The number of times to serialize the events with each
+            serializer; the fastest is reported.
+    """
+    action_events = events.get_events(session, recording, use_cache=False)
+    expected_values = None
+    baseline_duration = None
+    print(
+        f"{'serializer':<16}{'events':>10}{'bytes':>12}{'seconds':>10}{'speedup':>10}"
+    )
+    for name, serialize in SERIALIZERS.items():
+        durations = []
+        for _ in range(num_repeats):
+            start_time = time.perf_counter()
+            payloads = [serialize(action_event) for action_event in action_events]
+            durations.append(time.perf_counter() - start_time)
+        values = [load_event_dict(payload) for payload in payloads]
+        if expected_values is None:
+            expected_values = values
+        assert values == expected_values, name
+        duration = min(durations)
+        baseline_duration = baseline_duration or duration
+        print(
+            f"{name:<16}{len(action_events):>10}{sum(map(len, payloads)):>12}"
+            f"{duration:>10.3f}{baseline_duration / duration:>10.2f}"
+        )
+
+
+def main(
+    num_action_events: int = 1000,
+    recording_id: int | None = None,
+    num_repeats: int = 3,
+) -> None:
+    """Print the duration of serializing processed action events by serializer.
+
+    Args:
+        num_action_events (int): The number of raw action events of the synthetic
+            recording.
+        recording_id (int): The id of a recording in the database to serialize
+            instead of a synthetic recording.
+        num_repeats (int): The number of times to serialize the events with each
+            serializer; the fastest is reported.
+    """
+    if recording_id is not None:
+        with crud.get_new_session(read_only=True) as session:
+            recording = crud.get_recording_by_id(session, recording_id)
+            benchmark_serializers(session, recording, num_repeats)
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir_path:
+        engine = synthetic.create_database(f"{tmp_dir_path}/synthetic.db")
+        try:
+            with sa.orm.Session(bind=engine) as session:
+                recording = synthetic.insert_recording(session, num_action_events)
+                benchmark_serializers(session, recording, num_repeats)
+        finally:
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -19,7 +19,7 @@ with redirect_stdout_stderr():
 from openadapt import db, utils
 from openadapt.config import RECORDING_DIR_PATH
 from openadapt.db import crud
-from openadapt.video import get_video_file_path
+from openadapt.video import get_video_file_paths
 
 LOG_LEVEL = "INFO"
 utils.configure_logging(logger, LOG_LEVEL)
@@ -65,8 +65,7 @@ def export_recording_to_folder(recording_id: int) -> None:
         )
         logger.info(f"added {performance_plot_path=}")
 
-    video_file_path = get_video_file_path(recording_timestamp)
-    if os.path.exists(video_file_path):
+    for video_file_path in get_video_file_paths(recording_timestamp):
         zipfile.write(video_file_path, arcname=os.path.basename(video_file_path))
         logger.info(f"added {video_file_path=}")
 
@@ -12,6 +12,7 @@ import numpy as np
 
 from openadapt import adapters, common, models, plotting, strategies, utils, vision
 from openadapt.custom_logger import logger
+from openadapt.db import image_hash
 
 DEBUG = True
 DEBUG_REPLAY = False
@@ -39,6 +40,8 @@ class Segmentation:
             the position and size of the box.
         centroids: A list of tuples, each containing the x and y coordinates of the
             centroid of each segmented region.
+        screenshot: The screenshot of the original image, whose stored image hash
+            is compared before the image itself (see find_similar_image_segmentation).
     """
 
     image: Image.Image
@@ -47,6 +50,7 @@ class Segmentation:
     descriptions: list[str]
     bounding_boxes: list[dict[str, float]]  # "top", "left", "height", "width"
     centroids: list[tuple[float, float]]
+    screenshot: models.Screenshot | None = None
 
 
 def add_active_segment_descriptions(action_events: list[models.ActionEvent]) -> None:
@@ -310,6 +314,8 @@ def get_active_segment(
 def find_similar_image_segmentation(
     image: Image.Image,
     min_ssim: float = MIN_SCREENSHOT_SSIM,
+    screenshot: models.Screenshot | None = None,
+    max_hash_distance: int = image_hash.MAX_SIMILAR_HASH_DISTANCE,
 ) -> tuple[Segmentation, np.ndarray] | tuple[None, None]:
     """Identify a similar image in the cache based on the SSIM comparison.
 
@@ -317,10 +323,15 @@ def find_similar_image_segmentation(
     comparing each against a given image using the SSIM index calculated by
     get_image_similarity.
     It logs and updates the best match found above a specified SSIM threshold.
+    Segmentations of screenshots whose image hashes differ too much from that of
+    the given screenshot are skipped without computing the SSIM.
 
     Args:
         image (Image.Image): The image to compare against the cache.
         min_ssim (float): The minimum SSIM threshold for considering a match.
+        screenshot (models.Screenshot | None): The screenshot of the image, if any.
+        max_hash_distance (int): The maximum distance between the image hashes of
+            the screenshots (see Screenshot.get_hash_distance) for a match.
 
     Returns:
         tuple[Segmentation, np.ndarray] | tuple[None, None]: The best matching
@@ -331,6 +342,13 @@ def find_similar_image_segmentation(
     similar_segmentation_diff = None
 
     for segmentation in SEGMENTATIONS:
+        if (
+            screenshot is not None
+            and segmentation.screenshot is not None
+            and screenshot.get_hash_distance(segmentation.screenshot)
+            > max_hash_distance
+        ):
+            continue
         similarity_index, ssim_image = vision.get_image_similarity(
             image,
             segmentation.image,
@@ -371,7 +389,7 @@ def get_window_segmentation(
 
     if return_similar_segmentation and not exceptions:
         similar_segmentation, similar_segmentation_diff = (
-            find_similar_image_segmentation(original_image)
+            find_similar_image_segmentation(original_image, screenshot=screenshot)
         )
         if similar_segmentation:
             # TODO XXX: create copy of similar_segmentation, but overwrite with segments
@@ -419,6 +437,7 @@ def get_window_segmentation(
             masked_images,
             MIN_SEGMENT_SSIM,
             MIN_SEGMENT_SIZE_SIM,
+            max_hash_distance=image_hash.MAX_SIMILAR_HASH_DISTANCE,
         )
         # TODO XXX: handle similar image groups
         raise ValueError("Currently unsupported.")
@@ -446,6 +465,7 @@ def get_window_segmentation(
         descriptions,
         bounding_boxes,
         centroids,
+        screenshot,
     )
     if DEBUG:
         plotting.display_images_table_with_titles(masked_images, descriptions)
@@ -523,7 +543,7 @@ def get_dom_masks(
                 continue
 
             # Create a binary mask for the element
-            mask_img = Image.new("L", action_event.screenshot.image.size, color=0)
+            mask_img = Image.new("L", action_event.screenshot.size, color=0)
             draw = ImageDraw.Draw(mask_img)
 
             # Get the element's top, left, bottom, right in window coordinates
@@ -0,0 +1,580 @@
+"""Streaming implementation of the action event reducers in events.py.
+
+The reducers in events.py each walk the whole list of events and build a new
+list, so applying PROCESS_FNS takes one full pass (and one list of intermediate
+events) per reducer. Here each reducer is instead a generator: a state machine
+that reads events one at a time and yields each event as soon as no later event
+can change it. Chaining the generators fuses the reducers into a single pass
+over the events, in which each event goes through every reducer before the next
+one is read.
+
+A reducer only holds back the run of consecutive target events it is merging
+(and the redundant mouse moves, one event of lookahead), so the events buffered
+at any time are bounded by the length of the current runs rather than the
+recording.
+
+The output is identical to that of the list reducers applied in turn: the same
+events, with the same timestamps, children and reducer_names.
+
+Usage:
+
+    action_events = streaming_events.reduce_events(
+        action_events, events.PROCESS_FNS
+    )
+
+Module: streaming_events.py
+"""
+
+from typing import Any, Callable, Iterable, Iterator
+
+from pynput import keyboard
+
+from openadapt import events, models, utils
+from openadapt.columnar_events import INVALID_KEY_CHAR, get_recording_attr
+from openadapt.custom_logger import logger
+
+CLICK_NAMES = ("move", "click", "singleclick", "doubleclick")
+KEYBOARD_NAMES = ("press", "release")
+
+
+def merge_runs(
+    name: str,
+    action_events: Iterable[models.ActionEvent],
+    is_target_event: Callable[[models.ActionEvent], bool],
+    get_merged_events: Callable[..., list[models.ActionEvent]],
+) -> Iterator[models.ActionEvent]:
+    """Merge runs of consecutive target events, as they are read.
+
+    See events.merge_consecutive_action_events: each run is merged once the next
+    non-target event (or the end of the events) is read, and the time removed by
+    merging (the "dt" of the state) is removed from the timestamps of all
+    following events.
+
+    Args:
+        name (str): The name of the reducer, added to the merged events.
+        action_events (Iterable[models.ActionEvent]): The events.
+        is_target_event (Callable[[models.ActionEvent], bool]): Whether an event
+            is merged with consecutive target events.
+        get_merged_events (Callable[..., list[models.ActionEvent]]): Merges a run
+            of target events, given the run and the state.
+
+    Yields:
+        models.ActionEvent: The reduced events.
+    """
+    state = {"dt": 0}
+    to_merge = []
+    num_events_before = 0
+    num_events_after = 0
+    for event in action_events:
+        num_events_before += 1
+        if is_target_event(event):
+            to_merge.append(event)
+            continue
+        if to_merge:
+            merged_events = get_merged_events(to_merge, state)
+            for merged_event in merged_events:
+                merged_event.reducer_names.add(name)
+            num_events_after += len(merged_events)
+            yield from merged_events
+            to_merge = []
+        event.timestamp -= state["dt"]
+        num_events_after += 1
+        yield event
+    if to_merge:
+        merged_events = get_merged_events(to_merge, state)
+        for merged_event in merged_events:
+            merged_event.reducer_names.add(name)
+        num_events_after += len(merged_events)
+        yield from merged_events
+    num_events_removed = num_events_before - num_events_after
+    logger.info(f"{name=} {num_events_removed=}")
+
+
+def merge_into_parents(
+    to_merge: list[models.ActionEvent],
+    state: dict[str, Any],
+    group_idx_tups: list[tuple[int, int]],
+    parent_name: str,
+    get_parent_attrs: Callable[..., dict[str, Any]] | None = None,
+) -> list[models.ActionEvent]:
+    """Merge groups of a run into parent events, keeping single events as is.
+
+    Args:
+        to_merge (list[models.ActionEvent]): The run of target events.
+        state (dict[str, Any]): The state of merge_runs.
+        group_idx_tups (list[tuple[int, int]]): The start and end index
+            (exclusive) of each group; events outside of groups are discarded.
+        parent_name (str): The name of the parent events.
+        get_parent_attrs (Callable[..., dict[str, Any]] | None): Gets the
+            attributes of a parent from its children, if any.
+
+    Returns:
+        list[models.ActionEvent]: The merged events.
+    """
+    merged_events = []
+    for start_idx, end_idx in group_idx_tups:
+        children = to_merge[start_idx:end_idx]
+        if len(children) == 1:
+            merged_event = children[0]
+            merged_event.timestamp -= state["dt"]
+        else:
+            first_child = children[0]
+            last_child = children[-1]
+            merged_event = events.make_parent_event(
+                first_child,
+                {
+                    "name": parent_name,
+                    **(get_parent_attrs(children) if get_parent_attrs else {}),
+                    "timestamp": first_child.timestamp - state["dt"],
+                    "children": children,
+                },
+            )
+            state["dt"] += last_child.timestamp - first_child.timestamp
+        merged_events.append(merged_event)
+    return merged_events
+
+
+def remove_invalid_keyboard_events(
+    action_events: Iterable[models.ActionEvent],
+) -> Iterator[models.ActionEvent]:
+    """Remove invalid keyboard events (see events.remove_invalid_keyboard_events).
+
+    Args:
+        action_events (Iterable[models.ActionEvent]): The events.
+
+    Yields:
+        models.ActionEvent: The valid events.
+    """
+    for event in action_events:
+        if event.key_name or not (
+            event.key_char == INVALID_KEY_CHAR
+            if event.key_char
+            else bool(event.key_vk) and int(event.key_vk) == 0
+        ):
+            yield event
+
+
+def merge_consecutive_mouse_move_events(
+    action_events: Iterable[models.ActionEvent],
+) -> Iterator[models.ActionEvent]:
+    """Merge consecutive mouse move events into a single move event.
+
+    See events.merge_consecutive_mouse_move_events (without by_diff_distance).
+
+    Args:
+        action_events (Iterable[models.ActionEvent]): The events.
+
+    Yields:
+        models.ActionEvent: The reduced events.
+    """
+
+    def get_merged_events(
+        to_merge: list[models.ActionEvent], state: dict[str, Any]
+    ) -> list[models.ActionEvent]:
+        return merge_into_parents(
+            to_merge,
+            state,
+            [(0, len(to_merge))],
+            "move",
+            lambda children: {
+                "mouse_x": children[-1].mouse_x,
+                "mouse_y": children[-1].mouse_y,
+            },
+        )
+
+    return merge_runs(
+        "mouse_move",
+        action_events,
+        lambda event: event.name == "move",
+        get_merged_events,
+    )
+
+
+def merge_consecutive_mouse_scroll_events(
+    action_events: Iterable[models.ActionEvent],
+) -> Iterator[models.ActionEvent]:
+    """Merge consecutive mouse scroll events into a single scroll event.
+
+    See events.merge_consecutive_mouse_scroll_events.
+
+    Args:
+        action_events (Iterable[models.ActionEvent]): The events.
+
+    Yields:
+        models.ActionEvent: The reduced events.
+    """
+
+    def get_merged_events(
+        to_merge: list[models.ActionEvent], state: dict[str, Any]
+    ) -> list[models.ActionEvent]:
+        first_child = to_merge[0]
+        last_child = to_merge[-1]
+        merged_event = events.make_parent_event(
+            first_child,
+            {
+                "name": "scroll",
+                "mouse_x": first_child.mouse_x,
+                "mouse_y": first_child.mouse_y,
+                "mouse_dx": sum(event.mouse_dx for event in to_merge),
+                "mouse_dy": sum(event.mouse_dy for event in to_merge),
+                "timestamp": first_child.timestamp - state["dt"],
+                "children": to_merge,
+            },
+        )
+        state["dt"] += last_child.timestamp - first_child.timestamp
+        return [merged_event]
+
+    return merge_runs(
+        "mouse_scroll",
+        action_events,
+        lambda event: event.name == "scroll",
+        get_merged_events,
+    )
+
+
+def merge_consecutive_mouse_click_events(
+    action_events: Iterable[models.ActionEvent],
+) -> Iterator[models.ActionEvent]:
+    """Merge consecutive mouse click events into single and double clicks.
+
+    See events.merge_consecutive_mouse_click_events: presses and releases are
+    paired by timestamp within each run of left button clicks.
+
+    Args:
+        action_events (Iterable[models.ActionEvent]): The events.
+
+    Yields:
+        models.ActionEvent: The reduced events.
+    """
+
+    def get_merged_events(
+        to_merge: list[models.ActionEvent], state: dict[str, Any]
+    ) -> list[models.ActionEvent]:
+        double_click_distance = get_recording_attr(
+            to_merge[0],
+            "double_click_distance_pixels",
+            utils.get_double_click_distance_pixels,
+        )
+        double_click_interval = get_recording_attr(
+            to_merge[0],
+            "double_click_interval_seconds",
+            utils.get_double_click_interval_seconds,
+        )
+        press_to_press_t = {}
+        press_to_release_t = {}
+        prev_pressed_event = None
+        for event in to_merge:
+            if event.mouse_pressed:
+                if (
+                    prev_pressed_event
+                    and event.timestamp - prev_pressed_event.timestamp
+                    <= double_click_interval
+                    and abs(event.mouse_x - prev_pressed_event.mouse_x)
+                    <= double_click_distance
+                    and abs(event.mouse_y - prev_pressed_event.mouse_y)
+                    <= double_click_distance
+                ):
+                    press_to_press_t[prev_pressed_event.timestamp] = event.timestamp
+                prev_pressed_event = event
+            elif prev_pressed_event:
+                press_to_release_t[prev_pressed_event.timestamp] = event.timestamp
+
+        t_to_event = {event.timestamp: event for event in to_merge}
+        merged_events = []
+        skip_timestamps = set()
+        for event in to_merge:
+            if event.timestamp in skip_timestamps:
+                continue
+            if event.timestamp in press_to_press_t:
+                release_t = press_to_release_t[event.timestamp]
+                next_press_t = press_to_press_t[event.timestamp]
+                next_release_t = press_to_release_t[next_press_t]
+                skip_timestamps.update((release_t, next_press_t, next_release_t))
+                state["dt"] += next_release_t - event.timestamp
+                event = events.make_parent_event(
+                    event,
+                    {
+                        "name": "doubleclick",
+                        "timestamp": next_release_t,
+                        "mouse_x": event.mouse_x,
+                        "mouse_y": event.mouse_y,
+                        "mouse_button_name": event.mouse_button_name,
+                        "children": [
+                            event,
+                            t_to_event[release_t],
+                            t_to_event[next_press_t],
+                            t_to_event[next_release_t],
+                        ],
+                    },
+                )
+            elif event.timestamp in press_to_release_t:
+                release_t = press_to_release_t[event.timestamp]
+                skip_timestamps.add(release_t)
+                state["dt"] += release_t - event.timestamp
+                event = events.make_parent_event(
+                    event,
+                    {
+                        "name": "singleclick",
+                        "timestamp": release_t,
+                        "mouse_x": event.mouse_x,
+                        "mouse_y": event.mouse_y,
+                        "mouse_button_name": event.mouse_button_name,
+                        "children": [event, t_to_event[release_t]],
+                    },
+                )
+            event.timestamp -= state["dt"]
+            merged_events.append(event)
+        return merged_events
+
+    return merge_runs(
+        "mouse_click",
+        action_events,
+        lambda event: event.name == "click" and event.mouse_button_name == "left",
+        get_merged_events,
+    )
+
+
+def get_keyboard_groups(to_merge: list[models.ActionEvent]) -> list[tuple[int, int]]:
+    """Split a run of keyboard events into groups in which named keys are pressed.
+
+    See get_group_idx_tups in events.merge_consecutive_keyboard_events.
+
+    Args:
+        to_merge (list[models.ActionEvent]): The run of keyboard events.
+
+    Returns:
+        list[tuple[int, int]]: The start and end index (exclusive) of each group.
+    """
+    pressed_keys = set()
+    was_pressed = False
+    start_idx = 0
+    group_idx_tups = []
+    for event_idx, event in enumerate(to_merge):
+        assert event.name in KEYBOARD_NAMES, event
+        if event.key_name:
+            # keys rather than key names, which may be aliases of the same key
+            key = keyboard.Key[event.key_name]
+            if event.name == "press":
+                pressed_keys.add(key)
+            else:
+                pressed_keys.discard(key)
+        is_pressed = bool(pressed_keys)
+        if is_pressed != was_pressed:
+            end_idx = event_idx + int(was_pressed)
+            if end_idx > start_idx:
+                group_idx_tups.append((start_idx, end_idx))
+            start_idx = end_idx
+        was_pressed = is_pressed
+    if start_idx < len(to_merge) - 1:
+        group_idx_tups.append((start_idx, len(to_merge)))
+    return group_idx_tups
+
+
+def merge_consecutive_keyboard_events(
+    action_events: Iterable[models.ActionEvent],
+    group_named_keys: bool = events.KEYBOARD_EVENTS_MERGE_GROUP_NAMED_KEYS,
+) -> Iterator[models.ActionEvent]:
+    """Merge consecutive keyboard events into type events.
+
+    See events.merge_consecutive_keyboard_events.
+
+    Args:
+        action_events (Iterable[models.ActionEvent]): The events.
+        group_named_keys (bool): Whether to split runs into groups in which named
+            keys are pressed.
+
+    Yields:
+        models.ActionEvent: The reduced events.
+    """
+
+    def get_merged_events(
+        to_merge: list[models.ActionEvent], state: dict[str, Any]
+    ) -> list[models.ActionEvent]:
+        if group_named_keys:
+            group_idx_tups = get_keyboard_groups(to_merge)
+        else:
+            group_idx_tups = [(0, len(to_merge))]
+        return merge_into_parents(to_merge, state, group_idx_tups, "type")
+
+    return merge_runs(
+        "keyboard",
+        action_events,
+        lambda event: bool(event.key_name or event.key_char or event.key_vk),
+        get_merged_events,
+    )
+
+
+def remove_mouse_move_events(
+    name: str,
+    action_events: Iterable[models.ActionEvent],
+    target_names: tuple[str, ...],
+    should_discard: Callable[..., bool],
+) -> Iterator[models.ActionEvent]:
+    """Remove mouse move events from runs of mouse events.
+
+    See remove_redundant_mouse_move_events and remove_move_before_click in
+    events.py: the discarded events of a run become the children of the next kept
+    event, and the time between a discarded event and the previous one (or the
+    next one, for the first event of the run) is removed.
+
+    Args:
+        name (str): The name of the reducer.
+        action_events (Iterable[models.ActionEvent]): The events.
+        target_names (tuple[str, ...]): The names of the events of runs.
+        should_discard (Callable[..., bool]): Whether to discard an event, given
+            the event and the previous and next events of the run (or None).
+
+    Yields:
+        models.ActionEvent: The reduced events.
+    """
+
+    def get_merged_events(
+        to_merge: list[models.ActionEvent], state: dict[str, Any]
+    ) -> list[models.ActionEvent]:
+        to_merge = [None, *to_merge, None]
+        merged_events = []
+        dts = []
+        children = []
+        for prev_event, event, next_event in zip(to_merge, to_merge[1:], to_merge[2:]):
+            if should_discard(event, prev_event, next_event):
+                if prev_event:
+                    state["dt"] += event.timestamp - prev_event.timestamp
+                else:
+                    state["dt"] += next_event.timestamp - event.timestamp
+                children.append(event)
+            else:
+                dts.append(state["dt"])
+                if children:
+                    event.children = children
+                    children = []
+                merged_events.append(event)
+        for event, dt in zip(merged_events, dts):
+            event.timestamp -= dt
+        return merged_events
+
+    return merge_runs(
+        name,
+        action_events,
+        lambda event: event.name in target_names,
+        get_merged_events,
+    )
+
+
+def remove_redundant_mouse_move_events(
+    action_events: Iterable[models.ActionEvent],
+) -> Iterator[models.ActionEvent]:
+    """Remove mouse move events that don't change the mouse position.
+
+    See events.remove_redundant_mouse_move_events.
+
+    Args:
+        action_events (Iterable[models.ActionEvent]): The events.
+
+    Yields:
+        models.ActionEvent: The reduced events.
+    """
+
+    def is_same_pos(
+        event: models.ActionEvent, other_event: models.ActionEvent | None
+    ) -> bool:
+        return (
+            other_event is not None
+            and event.mouse_x == other_event.mouse_x
+            and event.mouse_y == other_event.mouse_y
+        )
+
+    return remove_mouse_move_events(
+        "redundant_mouse_move",
+        action_events,
+        ("move", "click"),
+        lambda event, prev_event, next_event: event.name == "move"
+        and (is_same_pos(event, prev_event) or is_same_pos(event, next_event)),
+    )
+
+
+def remove_move_before_click(
+    action_events: Iterable[models.ActionEvent],
+) -> Iterator[models.ActionEvent]:
+    """Remove mouse move events followed by a click in the same location.
+
+    See events.remove_move_before_click.
+
+    Args:
+        action_events (Iterable[models.ActionEvent]): The events.
+
+    Yields:
+        models.ActionEvent: The reduced events.
+    """
+    max_distance = events.MOUSE_MOVE_EVENT_MERGE_CLICK_DISTANCE_THRESHOLD
+
+    return remove_mouse_move_events(
+        "remove_move_before_click",
+        action_events,
+        CLICK_NAMES,
+        lambda event, prev_event, next_event: event.name == "move"
+        and next_event is not None
+        and abs(event.mouse_x - next_event.mouse_x) <= max_distance
+        and abs(event.mouse_y - next_event.mouse_y) <= max_distance,
+    )
+
+
+# the streaming reducer of each list reducer in events.py
+REDUCERS = {
+    events.remove_invalid_keyboard_events: remove_invalid_keyboard_events,
+    events.remove_redundant_mouse_move_events: remove_redundant_mouse_move_events,
+    events.merge_consecutive_keyboard_events: merge_consecutive_keyboard_events,
+    events.merge_consecutive_mouse_move_events: merge_consecutive_mouse_move_events,
+    events.merge_consecutive_mouse_scroll_events: (
+        merge_consecutive_mouse_scroll_events
+    ),
+    events.merge_consecutive_mouse_click_events: merge_consecutive_mouse_click_events,
+    events.remove_move_before_click: remove_move_before_click,
+}
+
+
+def is_supported(process_fns: list[Callable]) -> bool:
+    """Whether all list reducers have a streaming reducer.
+
+    Args:
+        process_fns (list[Callable]): The list reducers, from events.py.
+
+    Returns:
+        bool: Whether reduce_events supports the reducers.
+    """
+    return not events.USE_SCREENSHOT_DIFFS and all(
+        process_fn in REDUCERS for process_fn in process_fns
+    )
+
+
+def iter_events(
+    action_events: Iterable[models.ActionEvent], process_fns: list[Callable]
+) -> Iterator[models.ActionEvent]:
+    """Fuse the streaming equivalent of list reducers into a single pass.
+
+    Args:
+        action_events (Iterable[models.ActionEvent]): The action events.
+        process_fns (list[Callable]): The list reducers, from events.py.
+
+    Returns:
+        Iterator[models.ActionEvent]: The reduced events, as they are reduced.
+    """
+    assert is_supported(process_fns), process_fns
+    for process_fn in process_fns:
+        action_events = REDUCERS[process_fn](action_events)
+    return iter(action_events)
+
+
+def reduce_events(
+    action_events: list[models.ActionEvent], process_fns: list[Callable]
+) -> list[models.ActionEvent]:
+    """Apply the streaming equivalent of list reducers to action events.
+
+    Args:
+        action_events (list[models.ActionEvent]): The action events.
+        process_fns (list[Callable]): The list reducers, from events.py.
+
+    Returns:
+        list[models.ActionEvent]: The reduced events, as returned by applying the
+            list reducers in turn.
+    """
+    return list(iter_events(action_events, process_fns))
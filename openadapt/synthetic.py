@@ -0,0 +1,494 @@
+"""Generates synthetic recordings, e.g. for benchmarking the events pipeline.
+
+The events of a recording are generated deterministically from a seed, as a
+sequence of user activities separated by pauses: bursts of mouse moves, single,
+double and right clicks, runs of typing (with shifted characters and
+backspaces), hotkeys, scrolls and switches between windows. Screenshots are taken
+every SCREENSHOT_INTERVAL_SECONDS, and a window event is written whenever the
+active window changes. Browser events (as written by the browser extension) may
+be added for the clicks, key presses and scrolls in the browser window.
+
+The events are written with the same crud.insert_* functions as openadapt.record,
+and post-processed as when a recording stops.
+
+Usage:
+    $ python -m openadapt.synthetic --db_file_path=<str> \
+        [--num_action_events=<int>] [--seed=<int>] [--browser_events]
+
+Example:
+    $ python -m openadapt.synthetic --db_file_path=/tmp/synthetic.db \
+        --num_action_events=100000
+"""
+
+from typing import Any, Callable, Iterator
+import functools
+import random
+import string
+
+from PIL import Image
+from sqlalchemy.orm import Session as SaSession
+import fire
+import sqlalchemy as sa
+
+from openadapt import browser
+from openadapt.custom_logger import logger
+from openadapt.db import crud, image_codec, image_hash
+from openadapt.db.db import Base
+from openadapt.models import Recording
+
+START_TIMESTAMP = 1700000000.0
+MONITOR_WIDTH = 1920
+MONITOR_HEIGHT = 1080
+SCREENSHOT_INTERVAL_SECONDS = 0.5
+# screenshots are small solid images, one per window, to keep databases small
+SCREENSHOT_SIZE = (192, 108)
+MOUSE_MOVE_INTERVAL_SECONDS = 1 / 60
+# title, left, top, width, height, color of the windows, the first a browser
+WINDOWS = (
+    ("Example Domain - Chrome", 0, 0, 1920, 1080, (66, 133, 244)),
+    ("Untitled - Notepad", 100, 100, 1200, 800, (255, 255, 255)),
+    ("Book1 - Excel", 0, 0, 1920, 1040, (33, 115, 70)),
+    ("Calculator", 1400, 200, 320, 500, (32, 32, 32)),
+    ("Terminal", 200, 300, 1000, 600, (0, 0, 0)),
+    # e.g. a notification, which get_events replaces with the previous window
+    ("Notification", 1700, 950, 10, 10, (200, 200, 200)),
+)
+# relative frequency of each activity
+ACTIVITY_WEIGHTS = {
+    "move": 30,
+    "click": 12,
+    "double_click": 3,
+    "right_click": 2,
+    "type_text": 12,
+    "hotkey": 3,
+    "scroll": 6,
+    "switch_window": 2,
+}
+HOTKEYS = (("ctrl", "c"), ("ctrl", "v"), ("ctrl", "s"), ("alt", "tab"))
+# the events of a synthetic recording: event type, timestamp, data
+SyntheticEvent = tuple[str, float, dict[str, Any]]
+
+
+@functools.lru_cache()
+def get_screenshot_data(window_idx: int) -> dict[str, Any]:
+    """Get the data of a screenshot of a window.
+
+    Args:
+        window_idx (int): The index of the window in WINDOWS.
+
+    Returns:
+        dict[str, Any]: The data of the screenshot, for crud.insert_screenshot.
+    """
+    image = Image.new("RGB", SCREENSHOT_SIZE, WINDOWS[window_idx][-1])
+    return {
+        "png_data": image_codec.encode_image(image, image_codec.PNG),
+        "image_codec": image_codec.PNG,
+        **image_hash.get_image_summary(image),
+    }
+
+
+class EventGenerator:
+    """Generates the events of a synthetic recording.
+
+    Attributes:
+        rng (random.Random): The random number generator.
+        browser_events (bool): Whether to generate browser events.
+        timestamp (float): The timestamp of the latest event.
+        mouse_x (int): The x position of the mouse.
+        mouse_y (int): The y position of the mouse.
+        window_idx (int): The index of the active window in WINDOWS.
+        window_event_timestamp (float): The timestamp of the latest window event.
+        screenshot_timestamp (float): The timestamp of the latest screenshot.
+        events (list[SyntheticEvent]): The events generated by the current
+            activity.
+    """
+
+    def __init__(self, seed: int = 0, browser_events: bool = False) -> None:
+        """Initialize the generator.
+
+        Args:
+            seed (int): The random seed.
+            browser_events (bool): Whether to generate browser events.
+        """
+        self.rng = random.Random(seed)
+        self.browser_events = browser_events
+        self.timestamp = START_TIMESTAMP
+        self.mouse_x = MONITOR_WIDTH // 2
+        self.mouse_y = MONITOR_HEIGHT // 2
+        self.window_idx = None
+        self.window_event_timestamp = None
+        self.screenshot_timestamp = None
+        self.events = []
+
+    def generate(self, num_action_events: int) -> Iterator[SyntheticEvent]:
+        """Generate events, in order of timestamp.
+
+        Args:
+            num_action_events (int): The number of action events to generate; the
+                last activity is cut short.
+
+        Yields:
+            SyntheticEvent: The events.
+        """
+        activities = list(ACTIVITY_WEIGHTS)
+        weights = list(ACTIVITY_WEIGHTS.values())
+        # the browser
+        self.switch_window(0)
+        num_generated = 0
+        while True:
+            for event in self.events:
+                if event[0] == "action":
+                    if num_generated == num_action_events:
+                        return
+                    num_generated += 1
+                yield event
+            self.events = []
+            # a pause between activities
+            self.timestamp += self.rng.uniform(0.2, 2)
+            activity = self.rng.choices(activities, weights)[0]
+            getattr(self, activity)()
+
+    def add_event(self, event_type: str, data: dict[str, Any]) -> None:
+        """Add an event at the current timestamp.
+
+        Args:
+            event_type (str): The type of the event, one of INSERT_FNS.
+            data (dict[str, Any]): The data of the event.
+        """
+        self.events.append((event_type, self.timestamp, data))
+
+    def add_action_event(
+        self,
+        data: dict[str, Any],
+        seconds: float,
+        browser_data: dict[str, Any] | None = None,
+    ) -> None:
+        """Add an action event after a delay, preceded by a screenshot if due.
+
+        Args:
+            data (dict[str, Any]): The data of the action event.
+            seconds (float): The delay since the latest event.
+            browser_data (dict[str, Any] | None): The data of the browser event
+                of the action event in the browser window, if any.
+        """
+        self.timestamp += seconds
+        if self.timestamp - self.screenshot_timestamp >= SCREENSHOT_INTERVAL_SECONDS:
+            self.add_screenshot()
+            self.timestamp += 0.001
+        self.add_event(
+            "action",
+            {
+                **data,
+                "window_event_timestamp": self.window_event_timestamp,
+                "screenshot_timestamp": self.screenshot_timestamp,
+            },
+        )
+        if browser_data is not None and self.browser_events and self.window_idx == 0:
+            self.add_browser_event(browser_data)
+
+    def add_screenshot(self) -> None:
+        """Add a screenshot of the active window."""
+        self.screenshot_timestamp = self.timestamp
+        self.add_event("screen", dict(get_screenshot_data(self.window_idx)))
+
+    def add_browser_event(self, data: dict[str, Any]) -> None:
+        """Add a browser event shortly after the latest event.
+
+        Args:
+            data (dict[str, Any]): The attributes of the event in the message.
+        """
+        title, left, top, width, height, _ = WINDOWS[self.window_idx]
+        client_x = self.mouse_x - left
+        client_y = self.mouse_y - top
+        # the element under the mouse, in client coordinates
+        tlbr = f"{client_y - 10},{client_x - 50},{client_y + 10},{client_x + 50}"
+        timestamp = self.timestamp + 0.005
+        self.events.append(
+            (
+                "browser",
+                timestamp,
+                {
+                    "message": {
+                        "type": "USER_EVENT",
+                        "timestamp": timestamp,
+                        "url": "https://example.com/",
+                        "title": title,
+                        "clientX": client_x,
+                        "clientY": client_y,
+                        "screenX": self.mouse_x,
+                        "screenY": self.mouse_y,
+                        "coordMappings": {
+                            "x": {"client": [0, width], "screen": [left, left + width]},
+                            "y": {"client": [0, height], "screen": [top, top + height]},
+                        },
+                        "visibleHTMLString": (
+                            f'<html><body><div data-id="1" data-tlbr-client="{tlbr}">'
+                            "</div></body></html>"
+                        ),
+                        "targetId": "1",
+                        **data,
+                    }
+                },
+            )
+        )
+
+    def move(self, num_moves: int | None = None) -> None:
+        """Move the mouse towards a random position.
+
+        Args:
+            num_moves (int | None): The number of move events. Defaults to a random
+                number.
+        """
+        num_moves = num_moves or self.rng.randint(5, 60)
+        _, left, top, width, height, _ = WINDOWS[self.window_idx]
+        target_x = self.rng.randint(left, left + width - 1)
+        target_y = self.rng.randint(top, top + height - 1)
+        start_x, start_y = self.mouse_x, self.mouse_y
+        for idx in range(1, num_moves + 1):
+            self.mouse_x = start_x + (target_x - start_x) * idx // num_moves
+            self.mouse_y = start_y + (target_y - start_y) * idx // num_moves
+            self.add_action_event(
+                {"name": "move", "mouse_x": self.mouse_x, "mouse_y": self.mouse_y},
+                MOUSE_MOVE_INTERVAL_SECONDS * self.rng.uniform(0.8, 1.5),
+            )
+
+    def add_click(self, button_name: str = "left") -> None:
+        """Add the press and release of a mouse button.
+
+        Args:
+            button_name (str): The name of the mouse button.
+        """
+        for pressed, seconds in ((True, 0.01), (False, self.rng.uniform(0.05, 0.12))):
+            self.add_action_event(
+                {
+                    "name": "click",
+                    "mouse_x": self.mouse_x,
+                    "mouse_y": self.mouse_y,
+                    "mouse_button_name": button_name,
+                    "mouse_pressed": pressed,
+                },
+                seconds,
+                (
+                    None
+                    if pressed
+                    else {
+                        "eventType": browser.EVENT_TYPE_MAPPING["click"],
+                        "button": browser.MOUSE_BUTTON_MAPPING[button_name],
+                    }
+                ),
+            )
+
+    def click(self) -> None:
+        """Move the mouse and click."""
+        self.move()
+        self.add_click()
+
+    def double_click(self) -> None:
+        """Move the mouse and double click."""
+        self.move()
+        self.add_click()
+        self.add_click()
+
+    def right_click(self) -> None:
+        """Move the mouse and click the right button."""
+        self.move()
+        self.add_click("right")
+
+    def add_key(self, name: str, key: str, is_named: bool = False) -> None:
+        """Add the press or release of a key.
+
+        Args:
+            name (str): "press" or "release".
+            key (str): The character, or the name of a named key.
+            is_named (bool): Whether the key is a named key.
+        """
+        if is_named:
+            key_attrs = {"key_name": key, "canonical_key_name": key}
+        else:
+            key_attrs = {"key_char": key, "canonical_key_char": key.lower()}
+        self.add_action_event(
+            {"name": name, **key_attrs},
+            self.rng.uniform(0.03, 0.15),
+            {"eventType": "keydown" if name == "press" else "keyup", "key": key},
+        )
+
+    def type_text(self) -> None:
+        """Type a run of characters, with some shifted and some deleted."""
+        for _ in range(self.rng.randint(3, 40)):
+            if self.rng.random() < 0.05:
+                self.add_key("press", "backspace", True)
+                self.add_key("release", "backspace", True)
+            elif self.rng.random() < 0.1:
+                self.add_key("press", "shift", True)
+                char = self.rng.choice(string.ascii_uppercase)
+                self.add_key("press", char)
+                self.add_key("release", char)
+                self.add_key("release", "shift", True)
+            else:
+                char = self.rng.choice(string.ascii_lowercase + " ")
+                self.add_key("press", char)
+                self.add_key("release", char)
+
+    def hotkey(self) -> None:
+        """Press a hotkey, e.g. ctrl+c."""
+        modifier, char = self.rng.choice(HOTKEYS)
+        self.add_key("press", modifier, True)
+        is_named = char == "tab"
+        self.add_key("press", char, is_named)
+        self.add_key("release", char, is_named)
+        self.add_key("release", modifier, True)
+        if char == "tab":
+            self.switch_window()
+
+    def scroll(self) -> None:
+        """Move the mouse a little and scroll."""
+        self.move(self.rng.randint(1, 5))
+        mouse_dy = self.rng.choice((-1, 1))
+        for _ in range(self.rng.randint(3, 20)):
+            self.add_action_event(
+                {
+                    "name": "scroll",
+                    "mouse_x": self.mouse_x,
+                    "mouse_y": self.mouse_y,
+                    "mouse_dx": 0,
+                    "mouse_dy": mouse_dy * self.rng.randint(1, 3),
+                },
+                self.rng.uniform(0.01, 0.05),
+                {"eventType": "scroll", "scrollDeltaX": 0, "scrollDeltaY": mouse_dy},
+            )
+
+    def switch_window(self, window_idx: int | None = None) -> None:
+        """Activate another window.
+
+        Args:
+            window_idx (int | None): The index of the window in WINDOWS. Defaults
+                to a random other window.
+        """
+        if window_idx is None:
+            window_idx = self.rng.choice(
+                [idx for idx in range(len(WINDOWS)) if idx != self.window_idx]
+            )
+        self.window_idx = window_idx
+        title, left, top, width, height, _ = WINDOWS[self.window_idx]
+        self.window_event_timestamp = self.timestamp
+        self.add_event(
+            "window",
+            {
+                "title": title,
+                "left": left,
+                "top": top,
+                "width": width,
+                "height": height,
+                "window_id": str(self.window_idx),
+                "state": {
+                    "title": title,
+                    "meta": {"pid": 1000 + self.window_idx},
+                    "data": {"children": [{"role": "window", "title": title}]},
+                },
+            },
+        )
+        self.add_screenshot()
+
+
+# event type -> function inserting an event of the type
+INSERT_FNS: dict[str, Callable] = {
+    "action": crud.insert_action_event,
+    "screen": crud.insert_screenshot,
+    "window": crud.insert_window_event,
+    "browser": crud.insert_browser_event,
+}
+
+
+def generate_events(
+    num_action_events: int, seed: int = 0, browser_events: bool = False
+) -> Iterator[SyntheticEvent]:
+    """Generate the events of a synthetic recording.
+
+    Args:
+        num_action_events (int): The number of action events.
+        seed (int): The random seed.
+        browser_events (bool): Whether to generate browser events.
+
+    Returns:
+        Iterator[SyntheticEvent]: The events, in order of timestamp.
+    """
+    return EventGenerator(seed, browser_events).generate(num_action_events)
+
+
+def insert_recording(
+    session: SaSession,
+    num_action_events: int,
+    seed: int = 0,
+    browser_events: bool = False,
+) -> Recording:
+    """Insert a synthetic recording, as openadapt.record would.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        num_action_events (int): The number of action events.
+        seed (int): The random seed.
+        browser_events (bool): Whether to generate browser events.
+
+    Returns:
+        Recording: The recording.
+    """
+    recording = crud.insert_recording(
+        session,
+        {
+            # distinct recordings of different seeds
+            "timestamp": START_TIMESTAMP - seed,
+            "monitor_width": MONITOR_WIDTH,
+            "monitor_height": MONITOR_HEIGHT,
+            "double_click_interval_seconds": 0.5,
+            "double_click_distance_pixels": 5,
+            "platform": "synthetic",
+            "task_description": f"synthetic recording {seed=} {num_action_events=}",
+        },
+    )
+    for event_type, timestamp, data in generate_events(
+        num_action_events, seed, browser_events
+    ):
+        INSERT_FNS[event_type](session, recording, timestamp, data)
+    crud.flush_inserts()
+    crud.post_process_events(session, recording)
+    crud.update_recording_summary(session, recording)
+    return recording
+
+
+def create_database(db_file_path: str) -> sa.engine.Engine:
+    """Create a database with the tables of the models.
+
+    Args:
+        db_file_path (str): The path of the SQLite database file.
+
+    Returns:
+        sa.engine.Engine: The database engine.
+    """
+    engine = sa.create_engine(f"sqlite:///{db_file_path}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def main(
+    db_file_path: str,
+    num_action_events: int = 10000,
+    seed: int = 0,
+    browser_events: bool = False,
+) -> None:
+    """Write a synthetic recording to a database.
+
+    Args:
+        db_file_path (str): The path of the SQLite database file, created if needed.
+        num_action_events (int): The number of action events.
+        seed (int): The random seed.
+        browser_events (bool): Whether to generate browser events.
+    """
+    engine = create_database(db_file_path)
+    with sa.orm.Session(bind=engine) as session:
+        recording = insert_recording(session, num_action_events, seed, browser_events)
+        logger.info(f"{recording.id=} {recording.timestamp=}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
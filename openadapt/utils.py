@@ -49,7 +49,7 @@ from openadapt.config import (
     config,
 )
 from openadapt.custom_logger import filter_log_messages
-from openadapt.db import db
+from openadapt.db import db, image_codec, serialization
 from openadapt.models import ActionEvent
 
 # TODO: move to constants.py
@@ -109,28 +109,7 @@ def row2dict(row: dict | db.BaseModel, follow: bool = True) -> dict:
     Returns:
         dict: The row object converted to a dictionary.
     """
-    if not row:
-        return {}
-    if isinstance(row, dict):
-        return row
-    try_follow = ["children"] if follow else []
-    to_follow = [key for key in try_follow if hasattr(row, key)]
-
-    # follow children recursively
-    if "children" in to_follow:
-        to_follow = {key: {} for key in to_follow}
-        to_follow["children"]["follow"] = to_follow
-
-    try_include = [
-        "key",
-        "text",
-        "canonical_key",
-        "canonical_text",
-        "reducer_names",
-    ]
-    to_include = [key for key in try_include if hasattr(row, key)]
-    row_dict = row.asdict(follow=to_follow, include=to_include)
-    return row_dict
+    return serialization.row2dict(row, follow)
 
 
 def round_timestamps(events: list[ActionEvent], num_digits: int) -> None:
@@ -348,12 +327,13 @@ def get_scale_ratios(
         recording = action_event.recording
         monitor_width = recording.monitor_width
         monitor_height = recording.monitor_height
-        image = action_event.screenshot.image
+        # stored with the screenshot, avoiding decoding the image
+        image_width, image_height = action_event.screenshot.size
     else:
-        image = take_screenshot()
+        image_width, image_height = take_screenshot().size
         monitor_width, monitor_height = get_monitor_dims()
-    width_ratio = image.width / monitor_width
-    height_ratio = image.height / monitor_height
+    width_ratio = image_width / monitor_width
+    height_ratio = image_height / monitor_height
     return width_ratio, height_ratio
 
 
@@ -362,18 +342,22 @@ def image2utf8(image: Image.Image, image_format: str = "JPEG") -> str:
 
     Args:
         image (PIL.Image.Image): The image to convert.
-        image_format (str): The format of the image ("JPEG" or "PNG").
+        image_format (str): The format of the image ("JPEG", "PNG" or "WEBP").
+            WEBP is lossless, and smaller and faster to encode than PNG.
 
     Returns:
         str: The UTF-8 encoded image.
     """
-    KNOWN_FORMATS = ("JPEG", "PNG")
+    KNOWN_FORMATS = ("JPEG", "PNG", "WEBP")
     assert image_format in KNOWN_FORMATS, (image_format, KNOWN_FORMATS)
     if not image:
         return ""
     image = image.convert("RGB")
     buffered = BytesIO()
-    image.save(buffered, format=image_format.upper())
+    if image_format == "WEBP":
+        buffered.write(image_codec.encode_image(image, image_codec.WEBP))
+    else:
+        image.save(buffered, format=image_format.upper())
     image_str = base64.b64encode(buffered.getvalue())
     fmt = image_format.lower()
     base64_prefix = bytes(f"data:image/{fmt};base64,", encoding="utf-8")
@@ -1,7 +1,11 @@
 """Module for recording and manipulating video recordings."""
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from fractions import Fraction
 from pprint import pformat
+from typing import TYPE_CHECKING
+import itertools
 import os
 import subprocess
 import tempfile
@@ -14,34 +18,62 @@ from openadapt import utils
 from openadapt.config import config
 from openadapt.custom_logger import logger
 
+if TYPE_CHECKING:
+    from openadapt.models import Recording
 
-def get_video_file_path(recording_timestamp: float) -> str:
+
+def get_video_file_path(recording_timestamp: float, segment_idx: int = 0) -> str:
     """Generates a file path for a video recording based on a timestamp.
 
     Args:
         recording_timestamp (float): The timestamp of the recording.
+        segment_idx (int): The index of the video segment (see
+            Recording.video_segments). The first segment has the same path as
+            unsegmented recordings.
 
     Returns:
         str: The generated file name for the video recording.
     """
     os.makedirs(config.VIDEO_DIR_PATH, exist_ok=True)
+    segment_suffix = f"-{segment_idx}" if segment_idx else ""
     return os.path.join(
-        config.VIDEO_DIR_PATH, f"oa_recording-{recording_timestamp}.mp4"
+        config.VIDEO_DIR_PATH,
+        f"oa_recording-{recording_timestamp}{segment_suffix}.mp4",
     )
 
 
+def get_video_file_paths(recording_timestamp: float) -> list[str]:
+    """Get the paths of the existing video files of a recording, in segment order.
+
+    Args:
+        recording_timestamp (float): The timestamp of the recording.
+
+    Returns:
+        list[str]: The paths of the video files.
+    """
+    video_file_paths = []
+    for segment_idx in itertools.count():
+        video_file_path = get_video_file_path(recording_timestamp, segment_idx)
+        if not os.path.exists(video_file_path):
+            break
+        video_file_paths.append(video_file_path)
+    return video_file_paths
+
+
 def delete_video_file(recording_timestamp: float) -> None:
-    """Deletes the video file corresponding to the given recording timestamp.
+    """Deletes the video files corresponding to the given recording timestamp.
 
     Args:
         recording_timestamp (float): The timestamp of the recording to delete.
     """
-    video_file_path = get_video_file_path(recording_timestamp)
-    if os.path.exists(video_file_path):
+    video_file_paths = get_video_file_paths(recording_timestamp)
+    for video_file_path in video_file_paths:
         os.remove(video_file_path)
         logger.info(f"Deleted video file: {video_file_path}")
-    else:
-        logger.error(f"Video file not found: {video_file_path}")
+    if not video_file_paths:
+        logger.error(
+            f"Video file not found: {get_video_file_path(recording_timestamp)}"
+        )
 
 
 def initialize_video_writer(
@@ -337,3 +369,48 @@ def extract_frames(
     extracted_frames = [frame_by_timestamp[t].to_image() for t in timestamps]
 
     return extracted_frames
+
+
+def extract_recording_frames(
+    recording: "Recording",
+    timestamps: list[float],
+    tolerance: float = 0.1,
+) -> list[Image.Image]:
+    """Extracts frames of a recording at the specified timestamps.
+
+    Only the video segments containing the timestamps are decoded, concurrently.
+
+    Args:
+        recording (Recording): The recording.
+        timestamps (list[float]): The timestamps of the frames, e.g. of screenshots
+            (i.e. not relative to the start of the video).
+        tolerance (float, optional): See extract_frames. Defaults to 0.1.
+
+    Returns:
+        list[Image.Image]: The extracted frames, in the order of timestamps.
+    """
+    segment_idxs = []
+    offsets_by_segment_idx = defaultdict(list)
+    for timestamp in timestamps:
+        segment_idx, segment_start_time = recording.get_video_segment(timestamp)
+        segment_idxs.append(segment_idx)
+        offsets_by_segment_idx[segment_idx].append(timestamp - segment_start_time)
+
+    def extract_segment_frames(segment_idx: int) -> list[Image.Image]:
+        video_file_path = get_video_file_path(recording.timestamp, segment_idx)
+        return extract_frames(
+            video_file_path, offsets_by_segment_idx[segment_idx], tolerance
+        )
+
+    with ThreadPoolExecutor() as executor:
+        frames_by_segment_idx = dict(
+            zip(
+                offsets_by_segment_idx,
+                executor.map(extract_segment_frames, offsets_by_segment_idx),
+            )
+        )
+    frame_iters = {
+        segment_idx: iter(frames)
+        for segment_idx, frames in frames_by_segment_idx.items()
+    }
+    return [next(frame_iters[segment_idx]) for segment_idx in segment_idxs]
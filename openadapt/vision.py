@@ -10,6 +10,7 @@ import numpy as np
 
 from openadapt import cache
 from openadapt.custom_logger import logger
+from openadapt.db import image_hash
 
 
 @cache.cache()
@@ -369,6 +370,7 @@ def get_similar_image_idxs(
     min_ssim: float,
     min_size_sim: float,
     short_circuit_ssim: bool = True,
+    max_hash_distance: int | None = None,
 ) -> tuple[list[list[int]], list[int], list[list[float]], list[list[float]]]:
     """Get images having Structural Similarity Index Measure (SSIM) above a threshold.
 
@@ -384,6 +386,9 @@ def get_similar_image_idxs(
             (e.g., 0.9 for 90% similarity required).
         short_circuit_ssim: If True, skips SSIM calculation when size similarity is
             below the threshold.
+        max_hash_distance: If set, skips SSIM calculation when the difference hashes
+            of the images differ in more bits (see image_hash.get_hash_distance),
+            e.g. image_hash.MAX_SIMILAR_HASH_DISTANCE.
 
     Returns:
         A tuple containing four elements:
@@ -399,6 +404,8 @@ def get_similar_image_idxs(
     ssim_matrix = [[0.0] * num_images for _ in range(num_images)]
     size_similarity_matrix = [[0.0] * num_images for _ in range(num_images)]
     all_indices = set(range(num_images))
+    if max_hash_distance is not None:
+        image_hashes = [image_hash.get_dhash(image) for image in images]
 
     for i in range(num_images):
         ssim_matrix[i][i] = 1.0
@@ -407,7 +414,11 @@ def get_similar_image_idxs(
             size_sim = get_size_similarity(images[i], images[j])
             size_similarity_matrix[i][j] = size_similarity_matrix[j][i] = size_sim
 
-            if not short_circuit_ssim or size_sim >= min_size_sim:
+            if (not short_circuit_ssim or size_sim >= min_size_sim) and (
+                max_hash_distance is None
+                or image_hash.get_hash_distance(image_hashes[i], image_hashes[j])
+                <= max_hash_distance
+            ):
                 s_ssim, _ = get_image_similarity(images[i], images[j])
                 ssim_matrix[i][j] = ssim_matrix[j][i] = s_ssim
             else:
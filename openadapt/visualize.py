@@ -287,12 +287,10 @@ def main(
     logger.info(f"{len(action_events)=}")
 
     if diff_video:
-        video_file_path = video.get_video_file_path(recording.timestamp)
         timestamps = [
-            action_event.screenshot.timestamp - recording.video_start_time
-            for action_event in action_events
+            action_event.screenshot.timestamp for action_event in action_events
         ]
-        frames = video.extract_frames(video_file_path, timestamps)
+        frames = video.extract_recording_frames(recording, timestamps)
 
     num_events = (
         min(MAX_EVENTS, len(action_events))
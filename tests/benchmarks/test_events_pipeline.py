@@ -0,0 +1,165 @@
+"""Benchmarks of the events pipeline on a synthetic recording (see openadapt.synthetic).
+
+Each reducer, events.get_events end to end and the crud loaders of get_events are
+timed with pytest-benchmark (a dev dependency), and skipped if it is not
+installed. The number of action events of the recording is
+OPENADAPT_BENCHMARK_NUM_ACTION_EVENTS (10000 by default, e.g. 1000000 for a long
+recording).
+
+Usage:
+    $ pytest tests/benchmarks --benchmark-autosave
+    $ pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Results are saved in .benchmarks, and compared with the latest saved results.
+Other tests may be run without the benchmarks with --benchmark-skip.
+"""
+
+from functools import partial
+from typing import Callable
+import os
+
+import pytest
+import sqlalchemy as sa
+
+from openadapt import columnar_events, events, streaming_events
+from openadapt.db import crud
+from openadapt.models import Recording
+
+pytest.importorskip("pytest_benchmark")
+
+NUM_ACTION_EVENTS = int(os.getenv("OPENADAPT_BENCHMARK_NUM_ACTION_EVENTS", 10000))
+NUM_ROUNDS = 3
+
+
+pytestmark = pytest.mark.parametrize(
+    "synthetic_engine",
+    [[{"num_action_events": NUM_ACTION_EVENTS, "browser_events": True}]],
+    ids=["synthetic"],
+    indirect=True,
+)
+
+
+def get_session_and_recording(
+    synthetic_engine: sa.engine.Engine,
+) -> tuple[sa.orm.Session, Recording]:
+    """Get a new session and the synthetic recording in it.
+
+    Args:
+        synthetic_engine (sa.engine.Engine): The database engine.
+
+    Returns:
+        tuple[sa.orm.Session, Recording]: The session and the recording.
+    """
+    session = sa.orm.sessionmaker(bind=synthetic_engine, autoflush=False)()
+    return session, session.query(Recording).one()
+
+
+def get_action_events(synthetic_engine: sa.engine.Engine) -> tuple[tuple, dict]:
+    """Get the raw action events of the synthetic recording in a new session.
+
+    Args:
+        synthetic_engine (sa.engine.Engine): The database engine.
+
+    Returns:
+        tuple[tuple, dict]: The arguments of a reducer: the action events.
+    """
+    session, recording = get_session_and_recording(synthetic_engine)
+    return (crud.get_action_events(session, recording),), {}
+
+
+@pytest.mark.parametrize(
+    "process_fn", events.PROCESS_FNS, ids=lambda process_fn: process_fn.__name__
+)
+def test_reducer(
+    benchmark: Callable, synthetic_engine: sa.engine.Engine, process_fn: Callable
+) -> None:
+    """Benchmark each reducer of events.merge_events on the raw action events.
+
+    Args:
+        benchmark (Callable): The pytest-benchmark fixture.
+        synthetic_engine (sa.engine.Engine): The database engine.
+        process_fn (Callable): The list reducer.
+    """
+    benchmark.group = "reducer"
+    benchmark.pedantic(
+        process_fn,
+        setup=partial(get_action_events, synthetic_engine),
+        rounds=NUM_ROUNDS,
+    )
+
+
+@pytest.mark.parametrize("engine", ["list", "columnar", "streaming"])
+def test_reducer_engine(
+    benchmark: Callable, synthetic_engine: sa.engine.Engine, engine: str
+) -> None:
+    """Benchmark applying all reducers with each engine (see events.REDUCER_ENGINE).
+
+    Args:
+        benchmark (Callable): The pytest-benchmark fixture.
+        synthetic_engine (sa.engine.Engine): The database engine.
+        engine (str): The name of the engine.
+    """
+
+    def reduce_events(action_events: list) -> list:
+        if engine == "columnar":
+            return columnar_events.reduce_events(action_events, events.PROCESS_FNS)
+        if engine == "streaming":
+            return streaming_events.reduce_events(action_events, events.PROCESS_FNS)
+        for process_fn in events.PROCESS_FNS:
+            action_events = process_fn(action_events)
+        return action_events
+
+    benchmark.group = "reducer_engine"
+    benchmark.pedantic(
+        reduce_events,
+        setup=partial(get_action_events, synthetic_engine),
+        rounds=NUM_ROUNDS,
+    )
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_get_events(
+    benchmark: Callable, synthetic_engine: sa.engine.Engine, use_cache: bool
+) -> None:
+    """Benchmark events.get_events, from a new session.
+
+    Args:
+        benchmark (Callable): The pytest-benchmark fixture.
+        synthetic_engine (sa.engine.Engine): The database engine.
+        use_cache (bool): Whether to read the stored processed events, which are
+            stored by the first round if needed.
+    """
+    benchmark.group = "get_events"
+    benchmark.pedantic(
+        partial(events.get_events, use_cache=use_cache),
+        setup=lambda: (get_session_and_recording(synthetic_engine), {}),
+        rounds=NUM_ROUNDS,
+    )
+
+
+@pytest.mark.parametrize(
+    "get_fn",
+    [
+        crud.get_action_events,
+        crud.get_window_events,
+        crud.get_screenshots,
+        crud.get_browser_events,
+    ],
+    ids=lambda get_fn: get_fn.__name__,
+)
+def test_crud_loader(
+    benchmark: Callable, synthetic_engine: sa.engine.Engine, get_fn: Callable
+) -> None:
+    """Benchmark the crud loaders of events.get_events, from a new session.
+
+    Args:
+        benchmark (Callable): The pytest-benchmark fixture.
+        synthetic_engine (sa.engine.Engine): The database engine.
+        get_fn (Callable): The crud loader.
+    """
+    benchmark.group = "crud_loader"
+    benchmark.pedantic(
+        get_fn,
+        setup=lambda: (get_session_and_recording(synthetic_engine), {}),
+        rounds=NUM_ROUNDS,
+    )
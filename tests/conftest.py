@@ -1,11 +1,14 @@
 """This module contains fixtures and setup for testing."""
 
+from typing import Iterator
 import os
 
 from PIL import Image
 from sqlalchemy import create_engine, engine, text
+from sqlalchemy.orm import Session
 import pytest
 
+from openadapt import synthetic
 from openadapt.config import (
     DATA_DIR_PATH,
     PARENT_DIR_PATH,
@@ -81,6 +84,39 @@ def db_engine(request: pytest.FixtureRequest) -> engine:
     return engine
 
 
+@pytest.fixture(scope="module")
+def synthetic_engine(
+    request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory
+) -> Iterator[engine.Engine]:
+    """Get the engine of a database with synthetic recordings.
+
+    The recordings are parametrized indirectly, by the keyword arguments of
+    synthetic.insert_recording for each recording, e.g.:
+
+        pytestmark = pytest.mark.parametrize(
+            "synthetic_engine",
+            [[{"num_action_events": 100, "seed": 1}]],
+            ids=["synthetic"],
+            indirect=True,
+        )
+
+    Args:
+        request (pytest.FixtureRequest): The request, with the parameter.
+        tmp_path_factory (pytest.TempPathFactory): The temporary path factory.
+
+    Yields:
+        engine.Engine: The database engine, with the recordings in order of their
+            parameters.
+    """
+    db_file_path = tmp_path_factory.mktemp("synthetic") / "synthetic.db"
+    synthetic_db_engine = synthetic.create_database(db_file_path)
+    with Session(bind=synthetic_db_engine) as session:
+        for insert_kwargs in request.param:
+            synthetic.insert_recording(session, **insert_kwargs)
+    yield synthetic_db_engine
+    synthetic_db_engine.dispose()
+
+
 def load_image(filename: str) -> Image.Image:
     """Load an image from a path."""
     image_file_path = PARENT_DIR_PATH / "tests" / "assets" / filename
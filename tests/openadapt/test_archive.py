@@ -0,0 +1,244 @@
+"""Tests for the openadapt.db.archive module."""
+
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator
+from unittest.mock import patch
+import os
+import threading
+import time
+
+import pytest
+import sqlalchemy as sa
+
+from openadapt import video
+from openadapt.db import archive, crud
+from openadapt.db.db import Base
+from openadapt.models import (
+    ActionEvent,
+    CompressionDictionary,
+    Recording,
+    Screenshot,
+    WindowEvent,
+    WindowState,
+)
+
+DAY = archive.SECONDS_PER_DAY
+
+
+@pytest.fixture
+def session(tmp_path: Path) -> Iterator[sa.orm.Session]:
+    """Return a session of an empty database, with files under tmp_path.
+
+    Args:
+        tmp_path (Path): A temporary directory.
+    """
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        # present in databases created by alembic, and copied into archives
+        connection.execute(
+            sa.text("CREATE TABLE alembic_version (version_num VARCHAR(32))")
+        )
+    session = sa.orm.sessionmaker(bind=engine)()
+    video_config = SimpleNamespace(VIDEO_DIR_PATH=str(tmp_path / "videos"))
+    with (
+        patch("openadapt.video.config", video_config),
+        patch.object(archive, "ARCHIVE_DIR_PATH", str(tmp_path / "archive")),
+        patch.object(crud, "DATABASE_LOCK_FILE_PATH", str(tmp_path / "db.lock")),
+    ):
+        yield session
+    session.close()
+    engine.dispose()
+
+
+def create_recording(session: sa.orm.Session, timestamp: float) -> Recording:
+    """Create a finished recording with events, screenshots and a video.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        timestamp (float): The timestamp of the recording.
+
+    Returns:
+        Recording: The recording.
+    """
+    recording = crud.insert_recording(session, {"timestamp": timestamp})
+    crud.insert_screenshot(session, recording, timestamp, {"png_data": b"1"})
+    crud.insert_window_event(
+        session, recording, timestamp, {"state": {"timestamp": timestamp}}
+    )
+    crud.flush_inserts()
+    screenshot = (
+        session.query(Screenshot).filter(Screenshot.recording_id == recording.id).one()
+    )
+    crud.insert_action_event(
+        session,
+        recording,
+        timestamp,
+        {
+            "name": "click",
+            "screenshot_id": screenshot.id,
+            "element_state": {"role": "button"},
+        },
+    )
+    crud.flush_inserts()
+    with open(video.get_video_file_path(timestamp), "wb") as video_file:
+        video_file.write(b"0" * 100)
+    crud.update_recording_summary(session, recording)
+    return recording
+
+
+def test_archive_and_rehydrate(session: sa.orm.Session) -> None:
+    """Test that an archived recording is restored when it is requested.
+
+    Args:
+        session (sa.orm.Session): The database session.
+    """
+    now = time.time()
+    old = create_recording(session, now - 30 * DAY)
+    old_id, old_timestamp = old.id, old.timestamp
+    assert archive.select_recordings(session, min_age_days=20, now=now) == [old]
+
+    archive_path = archive.archive_recording(session, old)
+    assert os.path.exists(archive_path)
+    assert len(archive.get_archived_video_file_paths(old_timestamp)) == 1
+    assert not os.path.exists(video.get_video_file_path(old_timestamp))
+    assert old.summary.num_action_events == 1
+    for table in archive.ARCHIVED_TABLES:
+        assert session.query(table).filter(table.recording_id == old_id).count() == 0
+    assert session.query(WindowState).count() == 0
+    assert archive.select_recordings(session, min_age_days=20, now=now) == []
+
+    # ids of the archived rows are reused in the meantime
+    new = create_recording(session, now)
+
+    recording = crud.get_recording(session, old_timestamp)
+    assert recording.archive_path is None
+    assert not os.path.exists(archive_path)
+    assert os.path.exists(video.get_video_file_path(old_timestamp))
+
+    action_event = (
+        session.query(ActionEvent).filter(ActionEvent.recording_id == old_id).one()
+    )
+    assert action_event.element_state == {"role": "button"}
+    assert action_event.screenshot.recording_id == old_id
+    window_event = (
+        session.query(WindowEvent).filter(WindowEvent.recording_id == old_id).one()
+    )
+    assert window_event.state == {"timestamp": old_timestamp}
+    assert new.action_events[0].screenshot.recording_id == new.id
+
+
+def test_rehydrate_from_event_getters(session: sa.orm.Session) -> None:
+    """Test that the rows of an archived recording are restored when queried.
+
+    Args:
+        session (sa.orm.Session): The database session.
+    """
+    recording = create_recording(session, time.time() - 30 * DAY)
+    recording_id = recording.id
+    archive.archive_recording(session, recording)
+    session.expunge_all()
+
+    # e.g. obtained without the recording getters
+    (recording,) = crud.get_all_recordings(session)
+    assert session.get(Recording, recording_id) is recording
+    num_lock_attempts = crud.get_db_lock_stats()["num_attempts"]
+    action_events = crud.get_action_events(session, recording)
+    assert [action_event.recording_id for action_event in action_events] == [
+        recording_id
+    ]
+    assert recording.archive_path is None
+    assert crud.get_db_lock_stats()["num_attempts"] == num_lock_attempts + 1
+    assert not crud.is_db_lock_held()
+    assert len(crud.get_window_events(session, recording)) == 1
+
+
+def test_rehydrate_db_lock_held(session: sa.orm.Session) -> None:
+    """Test that rehydration waits for the database lock held by another thread.
+
+    Args:
+        session (sa.orm.Session): The database session.
+    """
+    recording = create_recording(session, time.time() - 30 * DAY)
+    archive.archive_recording(session, recording)
+
+    lock_acquired = threading.Event()
+    lock_released = threading.Event()
+
+    def hold_lock() -> None:
+        """Hold the database lock until lock_released is set."""
+        assert crud.acquire_db_lock()
+        lock_acquired.set()
+        lock_released.wait()
+        crud.release_db_lock()
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    lock_acquired.wait()
+    try:
+        assert not crud.is_db_lock_held()
+        acquire_db_lock = partial(crud.acquire_db_lock, timeout=0.05)
+        with (
+            patch.object(crud, "acquire_db_lock", acquire_db_lock),
+            pytest.raises(RuntimeError),
+        ):
+            crud.get_screenshots(session, recording)
+        assert recording.archive_path
+    finally:
+        lock_released.set()
+        thread.join()
+
+    # the lock is not acquired again by the thread holding it
+    assert crud.acquire_db_lock()
+    try:
+        num_lock_attempts = crud.get_db_lock_stats()["num_attempts"]
+        assert len(crud.get_screenshots(session, recording)) == 1
+        assert crud.get_db_lock_stats()["num_attempts"] == num_lock_attempts
+    finally:
+        crud.release_db_lock()
+    assert recording.archive_path is None
+
+
+def test_archive_compression_dictionaries(session: sa.orm.Session) -> None:
+    """Test that compression dictionaries are archived and restored.
+
+    Args:
+        session (sa.orm.Session): The database session.
+    """
+    dictionary = {"name": "window_event.state", "dict_id": 123, "data": b"dict"}
+    session.execute(sa.insert(CompressionDictionary), dictionary)
+    session.commit()
+    recording = create_recording(session, time.time() - 30 * DAY)
+    recording_timestamp = recording.timestamp
+    archive_path = archive.archive_recording(session, recording)
+
+    archive_engine = sa.create_engine(f"sqlite:///{archive_path}")
+    with sa.orm.Session(bind=archive_engine) as archive_session:
+        archived_dictionary = archive_session.query(CompressionDictionary).one()
+        assert archived_dictionary.data == dictionary["data"]
+    archive_engine.dispose()
+
+    # e.g. the archive is restored into another database
+    session.query(CompressionDictionary).delete()
+    session.commit()
+    crud.get_recording(session, recording_timestamp)
+    restored_dictionary = session.query(CompressionDictionary).one()
+    assert (restored_dictionary.dict_id, restored_dictionary.data) == (123, b"dict")
+
+
+def test_delete_archived_recording(session: sa.orm.Session) -> None:
+    """Test that deleting an archived recording deletes its archive.
+
+    Args:
+        session (sa.orm.Session): The database session.
+    """
+    recording = create_recording(session, time.time() - 30 * DAY)
+    recording_timestamp = recording.timestamp
+    archive_path = archive.archive_recording(session, recording)
+
+    crud.delete_recording(session, recording)
+    assert session.query(Recording).count() == 0
+    assert not os.path.exists(archive_path)
+    assert archive.get_archived_video_file_paths(recording_timestamp) == []
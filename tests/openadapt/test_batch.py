@@ -0,0 +1,145 @@
+"""Tests for the openadapt.batch module."""
+
+from sqlalchemy.orm import Session as SaSession
+import pytest
+import sqlalchemy as sa
+
+from openadapt import batch
+from openadapt.models import Recording
+
+NUM_ACTION_EVENTS = 300
+SEEDS = [4, 5, 6]
+
+
+def get_num_action_events(session: SaSession, recording: Recording) -> int:
+    """Get the number of raw action events of a recording.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+
+    Returns:
+        int: The number of action events.
+    """
+    return len(recording.action_events)
+
+
+def allocate_memory(session: SaSession, recording: Recording) -> int:
+    """Allocate more memory than the workers of test_memory_limit may.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        recording (Recording): The recording.
+
+    Returns:
+        int: The size of the allocated memory.
+    """
+    return len(bytearray(2 * 1024**3))
+
+
+pytestmark = pytest.mark.parametrize(
+    "synthetic_engine",
+    [[{"num_action_events": NUM_ACTION_EVENTS, "seed": seed} for seed in SEEDS]],
+    ids=["synthetic"],
+    indirect=True,
+)
+
+
+@pytest.fixture(scope="module")
+def synthetic_db(synthetic_engine: sa.engine.Engine) -> tuple:
+    """Get the URL of a database with synthetic recordings and their ids.
+
+    Args:
+        synthetic_engine (sa.engine.Engine): The database engine.
+
+    Returns:
+        tuple[str, list[int]]: The URL of the database and the recording ids.
+    """
+    with SaSession(bind=synthetic_engine) as session:
+        recording_ids = session.scalars(
+            sa.select(Recording.id).order_by(Recording.id)
+        ).all()
+    return synthetic_engine.url.render_as_string(hide_password=False), recording_ids
+
+
+def test_process_recordings(synthetic_db: tuple) -> None:
+    """Test that recordings are processed as in a single process, in order.
+
+    Args:
+        synthetic_db (tuple): The URL of the database and the recording ids.
+    """
+    db_url, recording_ids = synthetic_db
+    recording_ids = list(reversed(recording_ids))
+    engine = sa.create_engine(db_url)
+    expected_results = []
+    for recording_id in recording_ids:
+        with sa.orm.Session(bind=engine) as session:
+            recording = session.get(Recording, recording_id)
+            num_action_events = get_num_action_events(session, recording)
+            expected_results.append(
+                (batch.get_event_dicts(session, recording), num_action_events)
+            )
+    engine.dispose()
+
+    event_dicts_results = list(
+        batch.process_recordings(
+            recording_ids,
+            num_workers=2,
+            max_recordings_per_worker=1,
+            db_url=db_url,
+            show_progress=False,
+        )
+    )
+    num_action_events_results = list(
+        batch.process_recordings(
+            recording_ids,
+            process_fn=get_num_action_events,
+            num_workers=2,
+            db_url=db_url,
+            show_progress=False,
+        )
+    )
+    assert [recording_id for recording_id, _ in event_dicts_results] == recording_ids
+    assert [
+        (event_dicts, num_action_events)
+        for (_, event_dicts), (_, num_action_events) in zip(
+            event_dicts_results, num_action_events_results
+        )
+    ] == expected_results
+
+
+def test_errors(synthetic_db: tuple) -> None:
+    """Test that errors are returned as the results of their recordings.
+
+    Args:
+        synthetic_db (tuple): The URL of the database and the recording ids.
+    """
+    db_url, recording_ids = synthetic_db
+    results = dict(
+        batch.process_recordings(
+            [recording_ids[0], -1],
+            process_fn=get_num_action_events,
+            db_url=db_url,
+            show_progress=False,
+        )
+    )
+    assert results[recording_ids[0]] == NUM_ACTION_EVENTS
+    assert isinstance(results[-1], ValueError)
+
+
+@pytest.mark.skipif(batch.resource is None, reason="requires the resource module")
+def test_memory_limit(synthetic_db: tuple) -> None:
+    """Test that the memory of workers is limited.
+
+    Args:
+        synthetic_db (tuple): The URL of the database and the recording ids.
+    """
+    db_url, recording_ids = synthetic_db
+    ((_, result),) = batch.process_recordings(
+        recording_ids[:1],
+        process_fn=allocate_memory,
+        max_memory_bytes=256 * 1024**2,
+        db_url=db_url,
+        show_progress=False,
+    )
+    assert isinstance(result, MemoryError)
@@ -0,0 +1,192 @@
+"""Golden tests of openadapt.columnar_events against the reducers in events.py."""
+
+from typing import Any, Callable
+import random
+
+import pytest
+
+from openadapt import columnar_events, events
+from openadapt.models import ActionEvent, Recording
+
+NUM_EVENTS = 400
+NAMED_KEYS = ("shift", "ctrl", "alt", "enter", "backspace")
+
+
+def make_event_dicts(seed: int, num_events: int = NUM_EVENTS) -> list[dict]:
+    """Make a random sequence of raw action events.
+
+    Args:
+        seed (int): The random seed.
+        num_events (int): The approximate number of events.
+
+    Returns:
+        list[dict]: The attributes of the events.
+    """
+    rng = random.Random(seed)
+    event_dicts = []
+    timestamp = 0.0
+    x, y = 100, 100
+
+    def add(**event_dict: Any) -> None:
+        nonlocal timestamp
+        timestamp += rng.choice((0.01, 0.05, 0.1, 0.3, 1.0)) * rng.random()
+        event_dicts.append({"timestamp": timestamp, **event_dict})
+
+    while len(event_dicts) < num_events:
+        kind = rng.choice(("move", "move", "click", "scroll", "type", "hotkey"))
+        if kind == "move":
+            for _ in range(rng.randint(1, 10)):
+                if rng.random() < 0.6:
+                    x += rng.randint(-3, 3)
+                    y += rng.randint(-3, 3)
+                add(name="move", mouse_x=x, mouse_y=y)
+        elif kind == "click":
+            button = rng.choice(("left", "left", "left", "right"))
+            for _ in range(rng.choice((1, 1, 2, 3))):
+                for pressed in (True, False):
+                    add(
+                        name="click",
+                        mouse_x=x + rng.choice((0, 0, 1, 10)),
+                        mouse_y=y,
+                        mouse_button_name=button,
+                        mouse_pressed=pressed,
+                    )
+        elif kind == "scroll":
+            for _ in range(rng.randint(1, 4)):
+                add(
+                    name="scroll",
+                    mouse_x=x,
+                    mouse_y=y,
+                    mouse_dx=rng.randint(-2, 2),
+                    mouse_dy=rng.randint(-5, 5),
+                )
+        elif kind == "type":
+            for _ in range(rng.randint(1, 8)):
+                key = rng.choice(("key_char", "key_char", "key_char", "key_vk"))
+                value = (
+                    rng.choice("abc<")
+                    if key == "key_char"
+                    else rng.choice(("0", "65", "0"))
+                )
+                for name in ("press", "release"):
+                    add(name=name, **{key: value})
+        else:
+            # overlapping (and unbalanced) named keys, with characters between
+            named_keys = rng.sample(NAMED_KEYS, rng.randint(1, 3))
+            for key_name in named_keys:
+                add(name="press", key_name=key_name)
+            if rng.random() < 0.7:
+                add(name="press", key_char="v")
+                add(name="release", key_char="v")
+            for key_name in rng.sample(named_keys, len(named_keys)):
+                if rng.random() < 0.9:
+                    add(name="release", key_name=key_name)
+                if rng.random() < 0.1:
+                    add(name="press", key_name=key_name)
+    return event_dicts
+
+
+def make_events(event_dicts: list[dict]) -> list[ActionEvent]:
+    """Make action events of a recording.
+
+    Args:
+        event_dicts (list[dict]): The attributes of the events.
+
+    Returns:
+        list[ActionEvent]: The action events.
+    """
+    recording = Recording(
+        timestamp=0,
+        double_click_interval_seconds=0.5,
+        double_click_distance_pixels=5,
+    )
+    return [
+        ActionEvent(recording=recording, **event_dict) for event_dict in event_dicts
+    ]
+
+
+def get_tree(event: ActionEvent) -> tuple:
+    """Get the attributes of an event and its descendants.
+
+    Args:
+        event (ActionEvent): The event.
+
+    Returns:
+        tuple: The attributes of the event, ending with those of its children.
+    """
+    return (
+        event.name,
+        event.timestamp,
+        event.mouse_x,
+        event.mouse_y,
+        event.mouse_dx,
+        event.mouse_dy,
+        event.mouse_button_name,
+        event.mouse_pressed,
+        event.key_name,
+        event.key_char,
+        event.key_vk,
+        sorted(event.reducer_names),
+        [get_tree(child) for child in event.children],
+    )
+
+
+def assert_same_output(process_fns: list[Callable], seed: int) -> None:
+    """Assert that the list and columnar reducers reduce events identically.
+
+    Args:
+        process_fns (list[Callable]): The list reducers, from events.py.
+        seed (int): The random seed of the events.
+    """
+    event_dicts = make_event_dicts(seed)
+    expected_events = make_events(event_dicts)
+    for process_fn in process_fns:
+        expected_events = process_fn(expected_events)
+    action_events = columnar_events.reduce_events(make_events(event_dicts), process_fns)
+    assert [get_tree(event) for event in action_events] == [
+        get_tree(event) for event in expected_events
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize(
+    "process_fn", list(columnar_events.REDUCERS), ids=lambda fn: fn.__name__
+)
+def test_reducer(process_fn: Callable, seed: int) -> None:
+    """Test that each columnar reducer matches its list reducer.
+
+    Args:
+        process_fn (Callable): The list reducer.
+        seed (int): The random seed of the events.
+    """
+    if process_fn == events.merge_consecutive_keyboard_events:
+        # the list reducer expects keyboard events to be valid
+        assert_same_output([events.remove_invalid_keyboard_events, process_fn], seed)
+    else:
+        assert_same_output([process_fn], seed)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_process_fns(seed: int) -> None:
+    """Test that the reducers of merge_events match in sequence.
+
+    Args:
+        seed (int): The random seed of the events.
+    """
+    assert_same_output(events.PROCESS_FNS, seed)
+    assert_same_output(events.PROCESS_FNS + [events.remove_move_before_click], seed)
+
+
+def test_keyboard_events_ungrouped() -> None:
+    """Test merging keyboard events without grouping named keys."""
+    event_dicts = make_event_dicts(seed=0)
+    expected_events = events.merge_consecutive_keyboard_events(
+        events.remove_invalid_keyboard_events(make_events(event_dicts)),
+        group_named_keys=False,
+    )
+    table = columnar_events.EventTable(make_events(event_dicts))
+    columnar_events.remove_invalid_keyboard_events(table)
+    columnar_events.merge_consecutive_keyboard_events(table, group_named_keys=False)
+    assert [get_tree(event) for event in table.materialize()] == [
+        get_tree(event) for event in expected_events
+    ]
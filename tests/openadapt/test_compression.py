@@ -0,0 +1,135 @@
+"""Tests for the openadapt.db.compression module."""
+
+from unittest.mock import patch
+import threading
+import zlib
+
+import pytest
+import sqlalchemy as sa
+import zstandard
+
+from openadapt.db import compression, crud
+from openadapt.models import CompressionDictionary, WindowEvent, WindowState
+
+STATE = {
+    "title": "Untitled - Notepad",
+    "meta": {"rect": [0, 0, 1920, 1080]},
+    "data": [{"name": "Edit", "children": []}] * 10,
+}
+
+
+def test_compress_json_round_trip() -> None:
+    """Test that compressed values are decompressed to the original value."""
+    data = compression.compress_json(STATE)
+    assert data.startswith(compression.ZSTD_MAGIC)
+    assert len(data) < len(str(STATE))
+    assert compression.decompress_json(data) == STATE
+
+
+def test_decompress_json_legacy_formats() -> None:
+    """Test that uncompressed JSON and zlib-compressed values are read."""
+    json_str = '{"title": "x", "data": [1, 2]}'
+    expected = {"title": "x", "data": [1, 2]}
+    assert compression.decompress_json(json_str) == expected
+    assert compression.decompress_json(json_str.encode()) == expected
+    assert compression.decompress_json(zlib.compress(json_str.encode())) == expected
+    assert compression.decompress_json(b"null") is None
+
+
+def test_compress_json_dictionary(db_engine: sa.engine.Engine) -> None:
+    """Test that a trained dictionary is stored and used for compression.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    samples = [
+        {**STATE, "title": f"Window {idx}", "idx": idx, "data": [idx] * (idx % 7)}
+        for idx in range(1000)
+    ]
+    with (
+        patch.object(compression, "_dictionaries_by_name", {}),
+        patch.object(compression, "_dictionaries_by_id", {}),
+        patch.object(compression, "_dictionaries_loaded", True),
+        patch.object(compression, "_local", threading.local()),
+    ):
+        dictionary = compression.train_dictionary(
+            "test.state", samples, 4096, engine=db_engine
+        )
+        with db_engine.connect() as connection:
+            stored_dict_id = connection.execute(
+                sa.select(CompressionDictionary.dict_id).where(
+                    CompressionDictionary.name == "test.state"
+                )
+            ).scalar_one()
+        assert stored_dict_id == dictionary.dict_id()
+
+        data = compression.compress_json(samples[0], "test.state")
+        assert zstandard.get_frame_parameters(data).dict_id == dictionary.dict_id()
+        assert len(data) < len(compression.compress_json(samples[0]))
+        assert compression.decompress_json(data) == samples[0]
+
+        # e.g. in another process, reading a copy of the database
+        compression._dictionaries_by_name.clear()
+        compression._dictionaries_by_id.clear()
+        compression._local.__dict__.clear()
+        with patch.object(compression.db, "engine", db_engine):
+            assert compression.decompress_json(data) == samples[0]
+
+
+def test_compressed_json_column(db_engine: sa.engine.Engine) -> None:
+    """Test that CompressedJSON columns are stored compressed.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 1})
+    crud.insert_window_event(session, recording, 2, {"state": STATE})
+    crud.insert_window_event(session, recording, 3, {"state": None})
+    crud.flush_inserts()
+
+    stored_value = session.execute(
+        sa.select(sa.type_coerce(WindowState.state, sa.LargeBinary)).where(
+            WindowState.hash == compression.hash_json(STATE)
+        )
+    ).scalar_one()
+    assert stored_value.startswith(compression.ZSTD_MAGIC)
+
+    window_events = (
+        session.query(WindowEvent)
+        .filter(WindowEvent.recording_id == recording.id)
+        .order_by(WindowEvent.timestamp)
+        .all()
+    )
+    assert [window_event.state for window_event in window_events] == [STATE, None]
+
+
+@pytest.mark.parametrize("value", ['{"a": 1}', None])
+def test_compressed_json_legacy_rows(db_engine: sa.engine.Engine, value: str) -> None:
+    """Test that values written as plain JSON before compression are still read.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+        value (str): The stored JSON text.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 1})
+    state_hash = f"legacy {value}"
+    session.execute(
+        sa.text("INSERT INTO window_state (hash, state) VALUES (:hash, :state)"),
+        {"hash": state_hash, "state": value},
+    )
+    session.execute(
+        sa.text(
+            "INSERT INTO window_event (recording_id, timestamp, state_hash)"
+            " VALUES (:recording_id, 2, :state_hash)"
+        ),
+        {"recording_id": recording.id, "state_hash": state_hash},
+    )
+    session.commit()
+    window_event = (
+        session.query(WindowEvent)
+        .filter(WindowEvent.recording_id == recording.id)
+        .one()
+    )
+    assert window_event.state == (value and {"a": 1})
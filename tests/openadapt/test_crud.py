@@ -1,12 +1,28 @@
 """Tests for the CRUD operations in the openadapt.db.crud module."""
 
+from pathlib import Path
+from typing import Any, Iterator
 from unittest.mock import patch
+import os
+import sys
+import threading
+import time
 
 import pytest
 import sqlalchemy as sa
 
-from openadapt.db import crud, db
-from openadapt.models import Recording
+from openadapt.db import crud, db, instrumentation
+from openadapt.models import (
+    ActionEvent,
+    BrowserEvent,
+    Recording,
+    Screenshot,
+    WindowEvent,
+    WindowState,
+)
+
+if sys.platform != "win32":
+    import fcntl
 
 
 def test_get_new_session_read_only(db_engine: sa.engine.Engine) -> None:
@@ -38,3 +54,454 @@ def test_get_new_session_read_only(db_engine: sa.engine.Engine) -> None:
             session.flush()
         with pytest.raises(PermissionError):
             session.delete(recording)
+
+
+@pytest.fixture
+def db_lock_file_path(tmp_path: Path) -> Iterator[Path]:
+    """Point the database lock at a temporary file.
+
+    Args:
+        tmp_path (Path): The pytest temporary directory.
+
+    Yields:
+        Path: The path of the temporary lock file.
+    """
+    lock_file_path = tmp_path / "openadapt.db.lock"
+    with patch("openadapt.db.crud.DATABASE_LOCK_FILE_PATH", lock_file_path):
+        yield lock_file_path
+    crud.release_db_lock(raise_exception=False)
+
+
+def _hold_lock(lock_file_path: Path, operation: int) -> int:
+    """Hold a lock on the lock file through a separate file description.
+
+    Args:
+        lock_file_path (Path): The path of the lock file.
+        operation (int): The flock operation, e.g. fcntl.LOCK_EX.
+
+    Returns:
+        int: The file descriptor holding the lock.
+    """
+    fd = os.open(lock_file_path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, operation)
+    return fd
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires fcntl")
+def test_db_lock_acquire_release(db_lock_file_path: Path) -> None:
+    """Test that a free lock is acquired without polling and can be re-acquired."""
+    start = time.perf_counter()
+    assert crud.acquire_db_lock()
+    assert time.perf_counter() - start < 0.5
+    crud.release_db_lock()
+    assert crud.acquire_db_lock()
+    crud.release_db_lock()
+    with pytest.raises(RuntimeError):
+        crud.release_db_lock()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires fcntl")
+def test_db_lock_timeout(db_lock_file_path: Path) -> None:
+    """Test that acquiring a held lock times out and is counted as contended."""
+    stats_before = crud.get_db_lock_stats()
+    fd = _hold_lock(db_lock_file_path, fcntl.LOCK_EX)
+    try:
+        assert not crud.acquire_db_lock(timeout=0.05)
+    finally:
+        os.close(fd)
+    stats_after = crud.get_db_lock_stats()
+    assert stats_after["num_contended"] == stats_before["num_contended"] + 1
+    assert stats_after["num_timeouts"] == stats_before["num_timeouts"] + 1
+
+    # the lock is released when the holder's file is closed
+    assert crud.acquire_db_lock(timeout=0.05)
+    crud.release_db_lock()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires fcntl")
+def test_db_lock_shared(db_lock_file_path: Path) -> None:
+    """Test that readers share the lock while writers are excluded."""
+    fd = _hold_lock(db_lock_file_path, fcntl.LOCK_SH)
+    try:
+        assert crud.acquire_db_lock(timeout=0.05, shared=True)
+        crud.release_db_lock()
+        assert not crud.acquire_db_lock(timeout=0.05)
+    finally:
+        os.close(fd)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires fcntl")
+def test_db_lock_shared_reentrant(db_lock_file_path: Path) -> None:
+    """Test that each shared acquisition in a process is released separately."""
+    assert crud.acquire_db_lock(timeout=0.05, shared=True)
+    thread_acquired = []
+    thread = threading.Thread(
+        target=lambda: thread_acquired.append(
+            crud.acquire_db_lock(timeout=0.05, shared=True)
+        )
+    )
+    thread.start()
+    thread.join()
+    assert thread_acquired == [True]
+    assert crud.acquire_db_lock(timeout=0.05, shared=True)
+    for _ in range(3):
+        crud.release_db_lock()
+    with pytest.raises(RuntimeError):
+        crud.release_db_lock()
+
+    # no file description of this process still holds the lock
+    fd = os.open(db_lock_file_path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    finally:
+        os.close(fd)
+
+
+def test_insert_buffering(db_engine: sa.engine.Engine) -> None:
+    """Test that buffered inserts are flushed by size, by age and explicitly.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 0})
+
+    def num_action_events() -> int:
+        return session.query(ActionEvent).filter_by(recording_id=recording.id).count()
+
+    with patch.object(crud, "BATCH_SIZE", 3), patch.object(
+        crud, "BATCH_MAX_DELAY_SECONDS", 60
+    ):
+        for timestamp in range(2):
+            crud.insert_action_event(session, recording, timestamp, {"name": "move"})
+        assert num_action_events() == 0
+        crud.insert_action_event(session, recording, 2, {"name": "move"})
+        assert num_action_events() == 3
+
+        crud.insert_action_event(session, recording, 3, {"name": "move"})
+        crud.flush_inserts(stale_only=True)
+        assert num_action_events() == 3
+        crud.flush_inserts()
+        assert num_action_events() == 4
+
+    with patch.object(crud, "BATCH_MAX_DELAY_SECONDS", 0):
+        crud.insert_action_event(session, recording, 4, {"name": "move"})
+        assert num_action_events() == 5
+
+    with pytest.raises(AssertionError):
+        crud.insert_action_event(session, recording, 5, {"not_a_column": None})
+
+    # screenshots are buffered in smaller batches
+    def num_screenshots() -> int:
+        return session.query(Screenshot).filter_by(recording_id=recording.id).count()
+
+    with patch.object(crud, "BATCH_MAX_DELAY_SECONDS", 60):
+        for timestamp in range(crud.SCREENSHOT_BATCH_SIZE - 1):
+            crud.insert_screenshot(session, recording, timestamp, {"png_data": b"1"})
+            crud.insert_action_event(session, recording, timestamp, {"name": "move"})
+        assert num_screenshots() == 0
+        crud.insert_screenshot(
+            session, recording, crud.SCREENSHOT_BATCH_SIZE, {"png_data": b"1"}
+        )
+        assert num_screenshots() == crud.SCREENSHOT_BATCH_SIZE
+        assert num_action_events() == 5
+        crud.flush_inserts()
+
+
+def test_update_recording_summary(db_engine: sa.engine.Engine) -> None:
+    """Test that the recording summary reflects the recording's events.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 1})
+    for timestamp in (2, 3, 5):
+        crud.insert_action_event(session, recording, timestamp, {"name": "move"})
+    crud.insert_screenshot(session, recording, 4, {"png_data": b"1234"})
+    crud.flush_inserts()
+
+    summary = crud.update_recording_summary(session, recording)
+    assert summary.num_action_events == 3
+    assert summary.num_screenshots == 1
+    assert summary.num_window_events == 0
+    assert summary.duration == 3
+    assert summary.db_bytes >= len(b"1234")
+    assert not summary.scrubbed
+
+    crud.insert_action_event(session, recording, 6, {"name": "move"})
+    crud.flush_inserts()
+    assert crud.update_recording_summary(session, recording).id == summary.id
+    assert summary.num_action_events == 4
+
+    recordings = crud.get_all_recordings(session)
+    (recording,) = [
+        _recording for _recording in recordings if _recording.id == recording.id
+    ]
+    assert recording.summary.num_action_events == 4
+
+
+def test_window_state_deduplication(db_engine: sa.engine.Engine) -> None:
+    """Test that identical window states are stored once.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 1})
+    states = [
+        {"title": "a", "data": {"children": [1, 2]}},
+        {"data": {"children": [1, 2]}, "title": "a"},
+        {"title": "b", "data": {}},
+        None,
+    ]
+    for timestamp, state in enumerate(states):
+        crud.insert_window_event(session, recording, timestamp, {"state": state})
+    crud.flush_inserts()
+
+    window_events = crud.get_window_events(session, recording)
+    assert [window_event.state for window_event in window_events] == states
+    state_hashes = {window_event.state_hash for window_event in window_events}
+    assert len(state_hashes - {None}) == 2
+    assert (
+        session.query(WindowState).filter(WindowState.hash.in_(state_hashes)).count()
+        == 2
+    )
+    # identical states share the same deserialized value
+    assert window_events[0].state is window_events[1].state
+
+    # states set in python are inserted when the window event is flushed
+    window_event = WindowEvent(
+        recording_id=recording.id,
+        timestamp=len(states),
+        state={"title": "c"},
+    )
+    session.add(window_event)
+    session.commit()
+    session.expire_all()
+    assert window_event.state == {"title": "c"}
+    assert "state" in window_event.asdict()
+    assert "state_hash" not in window_event.asdict()
+
+
+def test_delete_recording(db_engine: sa.engine.Engine) -> None:
+    """Test that deleting a recording deletes its rows in all tables.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recordings = [
+        crud.insert_recording(session, {"timestamp": timestamp})
+        for timestamp in (100, 101)
+    ]
+    for recording in recordings:
+        crud.insert_action_event(session, recording, 1, {"name": "move"})
+        crud.insert_screenshot(session, recording, 1, {"png_data": b"1234"})
+        crud.insert_window_event(session, recording, 1, {"state": {"shared": True}})
+        crud.insert_window_event(
+            session, recording, 2, {"state": {"recording_id": recording.id}}
+        )
+        crud.insert_browser_event(session, recording, 1, {"message": {}})
+    crud.flush_inserts()
+    recording, other_recording = recordings
+    copy = crud.insert_recording(
+        session, {"timestamp": 102, "original_recording_id": recording.id}
+    )
+    crud.update_recording_summary(session, recording)
+
+    num_deleted_rows = crud.delete_recording(session, recording)
+    assert num_deleted_rows == {
+        "action_event": 1,
+        "screenshot": 1,
+        "screenshot_tile": 0,
+        "window_event": 2,
+        "browser_event": 1,
+        "audio_info": 0,
+        "performance_stat": 0,
+        "memory_stat": 0,
+        "scrubbed_recording": 0,
+        "recording_summary": 1,
+        "processed_events": 0,
+        "window_state": 1,
+        "recording_search": 0,
+        "recording": 1,
+    }
+    for table in crud.RECORDING_TABLES:
+        assert (
+            session.query(table).filter(table.recording_id == recording.id).count() == 0
+        )
+    assert session.get(Recording, recording.id) is None
+    assert session.get(Recording, copy.id).original_recording_id is None
+    # the state shared with the other recording is kept
+    assert [
+        window_event.state
+        for window_event in crud.get_window_events(session, other_recording)
+    ] == [{"shared": True}, {"recording_id": other_recording.id}]
+    # deleted states are inserted again
+    new_recording = crud.insert_recording(session, {"timestamp": 103})
+    crud.insert_window_event(
+        session, new_recording, 1, {"state": {"recording_id": recording.id}}
+    )
+    crud.flush_inserts()
+    assert [
+        window_event.state
+        for window_event in crud.get_window_events(session, new_recording)
+    ] == [{"recording_id": recording.id}]
+
+
+def test_delete_recording_bound_parameters(db_engine: sa.engine.Engine) -> None:
+    """Test that the number of parameters does not grow with the recording.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 103})
+    num_states = 1000
+    for timestamp in range(num_states):
+        crud.insert_window_event(session, recording, timestamp, {"state": timestamp})
+    crud.flush_inserts()
+
+    num_parameters = []
+
+    def count_parameters(
+        connection: sa.engine.Connection,
+        cursor: Any,
+        statement: str,
+        parameters: tuple,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        num_parameters.append(len(parameters))
+
+    sa.event.listen(db_engine, "before_cursor_execute", count_parameters)
+    try:
+        num_deleted_rows = crud.delete_recording(session, recording)
+    finally:
+        sa.event.remove(db_engine, "before_cursor_execute", count_parameters)
+    assert num_deleted_rows["window_state"] == num_states
+    assert max(num_parameters) < 10
+
+
+def test_video_segment_time_range(db_engine: sa.engine.Engine) -> None:
+    """Test that the rows of a video segment are read by time range.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 200})
+    for start_time in (200, 500):
+        crud.add_video_segment(session, recording, start_time)
+    for timestamp in (200, 499, 500, 800):
+        crud.insert_screenshot(session, recording, timestamp, {"png_data": b"1"})
+        crud.insert_action_event(session, recording, timestamp, {"name": "move"})
+    crud.flush_inserts()
+    session.refresh(recording)
+
+    assert recording.video_segments == [{"start_time": 200}, {"start_time": 500}]
+    start_time, end_time = recording.get_video_segment_time_range(0)
+    screenshots = crud.get_screenshots(
+        session, recording, start_time=start_time, end_time=end_time
+    )
+    assert [screenshot.timestamp for screenshot in screenshots] == [200, 499]
+    start_time, end_time = recording.get_video_segment_time_range(1)
+    action_events = crud.get_action_events(
+        session, recording, start_time=start_time, end_time=end_time
+    )
+    assert [action_event.timestamp for action_event in action_events] == [500, 800]
+
+
+def create_large_recording(session: sa.orm.Session, num_action_events: int) -> int:
+    """Create a recording whose window and browser events have many action events.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        num_action_events (int): The number of top-level action events.
+
+    Returns:
+        int: The id of the recording.
+    """
+    recording = Recording(timestamp=1000 + num_action_events)
+    session.add(recording)
+    window_events = [
+        WindowEvent(recording=recording, timestamp=idx, state={"idx": idx % 3})
+        for idx in range(num_action_events // 10)
+    ]
+    browser_events = [
+        BrowserEvent(recording=recording, timestamp=idx, message={})
+        for idx in range(num_action_events // 20)
+    ]
+    for idx in range(num_action_events):
+        action_event = ActionEvent(
+            recording=recording,
+            name="type" if idx % 10 == 0 else "move",
+            timestamp=idx,
+            screenshot=Screenshot(recording=recording, timestamp=idx, width=1),
+            window_event=window_events[idx // 10],
+            browser_event=browser_events[idx // 20],
+        )
+        if action_event.name == "type":
+            action_event.children = [
+                ActionEvent(recording=recording, name=name, timestamp=idx)
+                for name in ("press", "release")
+            ]
+        session.add(action_event)
+    session.commit()
+    return recording.id
+
+
+@pytest.mark.parametrize(
+    "load_profile, loaded_attr_names",
+    [
+        ("events", ["screenshot", "window_event", "browser_event", "children"]),
+        ("dashboard", ["screenshot", "window_event", "children"]),
+        ("replay", ["screenshot", "window_event", "browser_event", "children"]),
+    ],
+)
+def test_get_action_events_load_profile(
+    db_engine: sa.engine.Engine, load_profile: str, loaded_attr_names: list[str]
+) -> None:
+    """Test that load profiles load their relationships in a bounded number of queries.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+        load_profile (str): The name of the load profile.
+        loaded_attr_names (list[str]): The relationships used by the consumer.
+    """
+    num_statements = {}
+    for num_action_events in (40, 400):
+        recording_id = create_large_recording(
+            sa.orm.sessionmaker(bind=db_engine)(), num_action_events
+        )
+        session = sa.orm.sessionmaker(bind=db_engine)()
+        recording = session.get(Recording, recording_id)
+        num_children = num_action_events // 10 * 2
+        with instrumentation.query_budget(
+            max_statements=5, max_repeats=2, engine=db_engine
+        ) as query_stats:
+            action_events = crud.get_action_events(
+                session, recording, load_profile=load_profile
+            )
+        num_statements[num_action_events] = query_stats.num_statements
+
+        # the action events are only loaded once
+        assert len(action_events) == num_action_events + num_children
+        assert query_stats.num_rows <= (
+            (num_action_events + num_children) * 2  # action events, screenshots
+            + num_action_events // 10  # window events
+            + num_action_events // 20  # browser events
+        )
+        with instrumentation.query_budget(max_statements=0, engine=db_engine):
+            for action_event in action_events:
+                for attr_name in loaded_attr_names:
+                    getattr(action_event, attr_name)
+                if action_event.window_event:
+                    assert "action_events" in (
+                        sa.inspect(action_event.window_event).unloaded
+                    )
+                    if load_profile == "replay":
+                        action_event.window_event.state
+    # the number of statements does not depend on the number of events
+    assert num_statements[40] == num_statements[400]
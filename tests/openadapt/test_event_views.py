@@ -0,0 +1,136 @@
+"""Tests for the openadapt.event_views module."""
+
+from dataclasses import FrozenInstanceError
+import pickle
+
+import pytest
+import sqlalchemy as sa
+
+from openadapt import event_views, events
+from openadapt.db import crud
+from openadapt.models import ActionEvent, Recording
+
+NUM_ACTION_EVENTS = 500
+# attributes of the views compared with those of the models
+ATTR_NAMES = [
+    "id",
+    "name",
+    "timestamp",
+    "mouse_x",
+    "mouse_y",
+    "mouse_pressed",
+    "key",
+    "canonical_key",
+    "text",
+    "canonical_text",
+    "raw_text",
+]
+
+
+pytestmark = pytest.mark.parametrize(
+    "synthetic_engine",
+    [[{"num_action_events": NUM_ACTION_EVENTS, "seed": 7}]],
+    ids=["synthetic"],
+    indirect=True,
+)
+
+
+def assert_same_events(views: list, action_events: list[ActionEvent]) -> None:
+    """Assert that views have the attributes of action events and their children.
+
+    Args:
+        views (list): The views of the action events.
+        action_events (list[ActionEvent]): The action events.
+    """
+    assert len(views) == len(action_events)
+    for view, action_event in zip(views, action_events):
+        for attr_name in ATTR_NAMES:
+            assert getattr(view, attr_name) == getattr(action_event, attr_name)
+        assert view.window_event.title == action_event.window_event.title
+        assert view.screenshot.id == action_event.screenshot.id
+        assert_same_events(view.children, action_event.children)
+
+
+def test_get_events(synthetic_engine: sa.engine.Engine) -> None:
+    """Test that views of raw events have the attributes of the models.
+
+    Args:
+        synthetic_engine (sa.engine.Engine): The database engine.
+    """
+    with sa.orm.Session(bind=synthetic_engine) as session:
+        recording = session.query(Recording).one()
+        action_events = crud.get_action_events(session, recording)
+        views = event_views.get_action_events(session, recording)
+        assert_same_events(views, action_events)
+
+        window_events = crud.get_window_events(session, recording)
+        window_event_views = event_views.get_window_events(session, recording)
+        assert [window_event.title for window_event in window_event_views] == [
+            window_event.title for window_event in window_events
+        ]
+
+        start_time, end_time = (
+            action_events[10].timestamp,
+            action_events[-10].timestamp,
+        )
+        assert [
+            view.id
+            for view in event_views.get_action_events(
+                session, recording, start_time, end_time
+            )
+        ] == [
+            action_event.id
+            for action_event in crud.get_action_events(
+                session, recording, start_time, end_time
+            )
+        ]
+
+
+def test_from_event(synthetic_engine: sa.engine.Engine) -> None:
+    """Test views of processed events, and that views are immutable and picklable.
+
+    Args:
+        synthetic_engine (sa.engine.Engine): The database engine.
+    """
+    with sa.orm.Session(bind=synthetic_engine) as session:
+        recording = session.query(Recording).one()
+        action_events = events.get_events(session, recording, use_cache=False)
+        views = [
+            event_views.ActionEventView.from_event(action_event)
+            for action_event in action_events
+        ]
+        assert_same_events(views, action_events)
+    assert any(view.children for view in views)
+    assert any(view.name == "type" and view.text for view in views)
+
+    assert pickle.loads(pickle.dumps(views)) == views
+    with pytest.raises(FrozenInstanceError):
+        views[0].name = "click"
+    assert not hasattr(views[0], "__dict__")
+
+
+def test_get_children(synthetic_engine: sa.engine.Engine) -> None:
+    """Test that stored children are nested in their parent events.
+
+    Args:
+        synthetic_engine (sa.engine.Engine): The database engine.
+    """
+    with sa.orm.Session(bind=synthetic_engine) as session:
+        recording = session.query(Recording).one()
+        copy = Recording(timestamp=recording.timestamp + 1)
+        children = [
+            ActionEvent(name=name, key_char="a", timestamp=timestamp, recording=copy)
+            for name, timestamp in [("press", 1), ("release", 2)]
+        ]
+        parent = ActionEvent(
+            name="type", timestamp=1, recording=copy, children=children
+        )
+        session.add(copy)
+        session.commit()
+
+        (view,) = event_views.get_action_events(session, copy)
+        assert view.id == parent.id
+        assert [child.name for child in view.children] == ["press", "release"]
+        assert view.text == parent.text == "a"
+        session.delete(copy)
+        session.commit()
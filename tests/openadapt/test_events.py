@@ -6,18 +6,21 @@ from typing import Callable, Optional
 import itertools
 
 from deepdiff import DeepDiff
+from PIL import Image
+import numpy as np
 import pytest
 
 from openadapt.custom_logger import logger
 from openadapt.events import (
     discard_unused_events,
+    get_diff_distances,
     merge_consecutive_keyboard_events,
     merge_consecutive_mouse_click_events,
     merge_consecutive_mouse_move_events,
     merge_consecutive_mouse_scroll_events,
     remove_redundant_mouse_move_events,
 )
-from openadapt.models import ActionEvent, WindowEvent
+from openadapt.models import ActionEvent, Recording, Screenshot, WindowEvent
 from openadapt.utils import (
     get_double_click_interval_seconds,
     override_double_click_interval_seconds,
@@ -792,3 +795,29 @@ def test_discard_unused_events() -> None:
         )
     )
     assert expected_filtered_window_events == actual_filtered_window_events
+
+
+def test_get_diff_distances() -> None:
+    """Test the distances from the cursor to the diff of the screenshot of events."""
+    recording = Recording(monitor_width=100, monitor_height=75)
+    screenshots = []
+    for diff_position in [(10, 10), (100, 50)]:
+        image = Image.new("RGB", (200, 150))
+        image.putpixel(diff_position, (255, 255, 255))
+        screenshot = Screenshot(image=image)
+        screenshot.prev = Screenshot(image=Image.new("RGB", (200, 150)))
+        screenshots.append(screenshot)
+    mouse_positions = [(5, 5), (50, 25), (53, 29), (5, 8)]
+    action_events = [
+        ActionEvent(
+            name="move",
+            mouse_x=mouse_x,
+            mouse_y=mouse_y,
+            recording=recording,
+            screenshot=screenshots[idx % 2],
+        )
+        for idx, (mouse_x, mouse_y) in enumerate(mouse_positions)
+    ]
+    # positions in the screenshots are twice those on the monitor
+    distances = get_diff_distances(action_events)
+    np.testing.assert_allclose(distances, [0, 0, np.hypot(96, 48), np.hypot(90, 34)])
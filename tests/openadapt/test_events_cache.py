@@ -0,0 +1,265 @@
+"""Tests for the openadapt.db.events_cache module."""
+
+from typing import Any
+import threading
+
+import pytest
+import sqlalchemy as sa
+
+from openadapt import events
+from openadapt.db import crud, events_cache
+from openadapt.models import ActionEvent, ProcessedEvents, Recording
+
+# name, mouse_x, key_char of the raw action events, one per timestamp
+EVENTS = (
+    ("move", 10, None),
+    ("move", 11, None),
+    ("move", 12, None),
+    ("click", 12, None),
+    ("click", 12, None),
+    ("click", 12, None),
+    ("click", 12, None),
+    ("press", None, "a"),
+    ("release", None, "a"),
+    ("press", None, "b"),
+    ("release", None, "b"),
+    ("move", 20, None),
+)
+
+
+def insert_recording(session: sa.orm.Session, timestamp: int) -> Recording:
+    """Insert a recording with a few action events of each kind.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        timestamp (int): The timestamp of the recording.
+
+    Returns:
+        Recording: The recording.
+    """
+    recording = crud.insert_recording(
+        session,
+        {
+            "timestamp": timestamp,
+            "double_click_interval_seconds": 0.5,
+            "double_click_distance_pixels": 5,
+        },
+    )
+    for window_timestamp, width in ((timestamp, 800), (timestamp + 0.05, 10)):
+        crud.insert_window_event(
+            session,
+            recording,
+            window_timestamp,
+            {"title": "window", "width": width, "height": 600},
+        )
+    crud.insert_screenshot(session, recording, timestamp, {"png_data": b"1"})
+    for idx, (name, mouse_x, key_char) in enumerate(EVENTS):
+        crud.insert_action_event(
+            session,
+            recording,
+            timestamp + 0.1 * (idx + 1),
+            {
+                "name": name,
+                "mouse_x": mouse_x,
+                "mouse_y": mouse_x,
+                "mouse_button_name": "left" if name == "click" else None,
+                "mouse_pressed": idx in (3, 5) if name == "click" else None,
+                "key_char": key_char,
+                "window_event_timestamp": timestamp + 0.05 * (idx % 2),
+                "screenshot_timestamp": timestamp,
+            },
+        )
+    crud.flush_inserts()
+    crud.post_process_events(session, recording)
+    return recording
+
+
+def get_tree(event: ActionEvent) -> tuple:
+    """Get the attributes of an event and its descendants.
+
+    Args:
+        event (ActionEvent): The event.
+
+    Returns:
+        tuple: The attributes of the event, ending with those of its children.
+    """
+    return (
+        event.id,
+        event.name,
+        event.timestamp,
+        event.mouse_x,
+        event.key_char,
+        event.window_event_timestamp,
+        event.window_event.id,
+        event.screenshot.id,
+        event.recording.id,
+        sorted(event.reducer_names),
+        [get_tree(child) for child in event.children],
+    )
+
+
+def get_events(
+    db_engine: sa.engine.Engine, recording_id: int, **kwargs: Any
+) -> tuple[list[tuple], dict]:
+    """Get the processed events of a recording in a new read-only session.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+        recording_id (int): The id of the recording.
+        **kwargs: Keyword arguments for events.get_events.
+
+    Returns:
+        tuple[list[tuple], dict]: The trees of the events and the meta.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine, autoflush=False)()
+    recording = session.get(Recording, recording_id)
+    meta = {}
+    action_events = events.get_events(session, recording, meta=meta, **kwargs)
+    trees = [get_tree(event) for event in action_events]
+    session.close()
+    return trees, meta
+
+
+def test_processed_events_cache(
+    db_engine: sa.engine.Engine, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that processed events are stored, read and invalidated.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+        monkeypatch (pytest.MonkeyPatch): The monkeypatch fixture.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = insert_recording(session, 800)
+    processed_events_query = session.query(ProcessedEvents).filter(
+        ProcessedEvents.recording_id == recording.id
+    )
+
+    expected_trees, expected_meta = get_events(db_engine, recording.id, use_cache=False)
+    assert processed_events_query.count() == 0
+    trees, meta = get_events(db_engine, recording.id)
+    assert (trees, meta) == (expected_trees, expected_meta)
+    # the move, the double click and the typed text, with the invalid window event
+    # replaced by the previous one
+    assert [tree[1] for tree in trees] == ["move", "doubleclick", "type", "move"]
+    assert {tree[6] for tree in trees} == {trees[0][6]}
+    cache_key = processed_events_query.one().cache_key
+
+    # read without processing
+    with monkeypatch.context() as patch:
+        patch.setattr(events, "merge_events", None)
+        assert get_events(db_engine, recording.id) == (expected_trees, expected_meta)
+
+    # disabling an event changes the cache key
+    crud.disable_action_event(session, trees[-1][0])
+    trees, meta = get_events(db_engine, recording.id)
+    assert [tree[1] for tree in trees] == ["move", "doubleclick", "type"]
+    session.expire_all()
+    assert processed_events_query.one().cache_key != cache_key
+
+    # so does changing the code or settings processing events
+    cache_key = events_cache.get_cache_key(recording, [])
+    events_cache.get_events_version.cache_clear()
+    monkeypatch.setattr(events, "KEYBOARD_EVENTS_MERGE_GROUP_NAMED_KEYS", False)
+    assert events_cache.get_cache_key(recording, []) != cache_key
+    events_cache.get_events_version.cache_clear()
+
+    # and post-processing the events deletes them
+    crud.post_process_events(session, recording)
+    assert processed_events_query.count() == 0
+
+
+def test_processed_events_cache_missing_ids(db_engine: sa.engine.Engine) -> None:
+    """Test that processed events referencing missing events are not used.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = insert_recording(session, 900)
+    expected_trees, _ = get_events(db_engine, recording.id)
+    processed_events = (
+        session.query(ProcessedEvents)
+        .filter(ProcessedEvents.recording_id == recording.id)
+        .one()
+    )
+    cache_key = processed_events.cache_key
+
+    # e.g. the window events were restored from an archive with other ids
+    data = processed_events.data
+    for node in data["nodes"]:
+        node[2][0] = 10**6
+    session.execute(
+        sa.update(ProcessedEvents)
+        .where(ProcessedEvents.id == processed_events.id)
+        .values(data=data)
+    )
+    session.commit()
+
+    read_session = sa.orm.sessionmaker(bind=db_engine, autoflush=False)()
+    read_recording = read_session.get(Recording, recording.id)
+    action_events = crud.get_action_events(read_session, read_recording)
+    assert (
+        events_cache.get_events(read_session, read_recording, action_events, cache_key)
+        is None
+    )
+    read_session.close()
+    assert session.query(ProcessedEvents).count() == 0
+
+    # the events are processed and stored again
+    assert get_events(db_engine, recording.id)[0] == expected_trees
+    session.expire_all()
+    assert (
+        session.query(ProcessedEvents).one().data["nodes"][0][2][0]
+        == expected_trees[0][6]
+    )
+
+
+def test_processed_events_cache_db_lock(
+    db_engine: sa.engine.Engine, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that processed events are only written holding the database lock.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+        monkeypatch (pytest.MonkeyPatch): The monkeypatch fixture.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = insert_recording(session, 1000)
+    processed_events_query = session.query(ProcessedEvents).filter(
+        ProcessedEvents.recording_id == recording.id
+    )
+    monkeypatch.setattr(events_cache, "DB_LOCK_TIMEOUT", 0.05)
+
+    lock_acquired = threading.Event()
+    lock_released = threading.Event()
+
+    def hold_lock() -> None:
+        """Hold the database lock until lock_released is set."""
+        assert crud.acquire_db_lock()
+        lock_acquired.set()
+        lock_released.wait()
+        crud.release_db_lock()
+
+    # e.g. openadapt.record holds the lock
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    lock_acquired.wait()
+    try:
+        expected_trees, _ = get_events(db_engine, recording.id)
+        assert processed_events_query.count() == 0
+    finally:
+        lock_released.set()
+        thread.join()
+
+    # the lock is not acquired again by the thread holding it
+    assert crud.acquire_db_lock()
+    try:
+        assert get_events(db_engine, recording.id)[0] == expected_trees
+        assert processed_events_query.count() == 1
+        assert crud.is_db_lock_held()
+    finally:
+        crud.release_db_lock()
+    assert events_cache.delete_events(session, recording)
+    assert processed_events_query.count() == 0
+    assert not crud.is_db_lock_held()
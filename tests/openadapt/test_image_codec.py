@@ -0,0 +1,93 @@
+"""Tests for the openadapt.db.image_codec module."""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from PIL import Image
+import numpy as np
+import pytest
+import sqlalchemy as sa
+
+from openadapt.db import crud, image_codec
+from openadapt.models import Screenshot
+
+
+def create_image(mode: str) -> Image.Image:
+    """Create an image with varied pixels.
+
+    Args:
+        mode (str): The mode of the image.
+
+    Returns:
+        Image.Image: The image.
+    """
+    pixels = np.random.default_rng(0).integers(0, 256, (30, 40, 4), dtype=np.uint8)
+    return Image.fromarray(pixels, "RGBA").convert(mode)
+
+
+@pytest.mark.parametrize("codec", image_codec.get_available_codecs())
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L", "1"])
+def test_encode_image_round_trip(codec: str, mode: str) -> None:
+    """Test that images are decoded to the original pixels.
+
+    Args:
+        codec (str): The name of the codec.
+        mode (str): The mode of the image.
+    """
+    image = create_image(mode)
+    data = image_codec.encode_image(image, codec)
+    expected_codec = codec if mode in image_codec.RGB_MODES else image_codec.RAW
+    if codec == image_codec.PNG:
+        expected_codec = codec
+    assert image_codec.get_codec(data) == expected_codec
+    decoded_image = image_codec.decode_image(data)
+    assert decoded_image.mode == mode
+    assert decoded_image.size == image.size
+    assert decoded_image.tobytes() == image.tobytes()
+
+
+def test_screenshot_image_codec(db_engine: sa.engine.Engine) -> None:
+    """Test that screenshot images and diffs use the codec of the screenshot.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 300})
+    image = create_image("RGB")
+    for timestamp, codec in ((1, image_codec.RAW), (2, None)):
+        png_data = image_codec.encode_image(image, codec or image_codec.PNG)
+        crud.insert_screenshot(
+            session,
+            recording,
+            timestamp,
+            {"png_data": png_data, "image_codec": codec},
+        )
+    crud.flush_inserts()
+
+    screenshots = crud.get_screenshots(session, recording, save_diff=True)
+    raw_screenshot, png_screenshot = screenshots
+    assert raw_screenshot.image.tobytes() == image.tobytes()
+    assert png_screenshot.image.tobytes() == image.tobytes()
+    assert image_codec.get_codec(raw_screenshot.png_diff_data) == image_codec.RAW
+    assert image_codec.get_codec(png_screenshot.png_diff_data) == image_codec.PNG
+
+    screenshot = Screenshot(recording_id=recording.id, timestamp=3)
+    # screenshots without image data use the configured codec
+    models_config = SimpleNamespace(SCREENSHOT_IMAGE_CODEC=image_codec.WEBP)
+    with patch("openadapt.models.config", models_config):
+        data = screenshot.convert_png_to_binary(image)
+    assert screenshot.image_codec == image_codec.WEBP
+    assert image_codec.get_codec(data) == image_codec.WEBP
+
+
+def test_validate_codec() -> None:
+    """Test that unavailable codecs fall back to png."""
+    assert image_codec.validate_codec(image_codec.WEBP) == image_codec.WEBP
+    assert image_codec.validate_codec("jpeg") == image_codec.PNG
+    with patch.object(image_codec, "qoi", None):
+        image_codec.validate_codec.cache_clear()
+        try:
+            assert image_codec.validate_codec(image_codec.QOI) == image_codec.PNG
+        finally:
+            image_codec.validate_codec.cache_clear()
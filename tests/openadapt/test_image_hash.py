@@ -0,0 +1,102 @@
+"""Tests for the openadapt.db.image_hash module."""
+
+from types import SimpleNamespace
+from unittest.mock import PropertyMock, patch
+
+from PIL import Image
+import numpy as np
+import sqlalchemy as sa
+
+from openadapt.db import crud, image_codec, image_hash
+from openadapt.models import Screenshot
+
+
+def create_image(seed: int) -> Image.Image:
+    """Create an image with varied pixels.
+
+    Args:
+        seed (int): The seed of the pixels.
+
+    Returns:
+        Image.Image: The image.
+    """
+    pixels = np.random.default_rng(seed).integers(0, 256, (90, 160, 3), dtype=np.uint8)
+    return Image.fromarray(pixels, "RGB")
+
+
+def test_get_hash_distance() -> None:
+    """Test that images that look alike have close hashes."""
+    image = create_image(0)
+    similar_image = image.copy()
+    similar_image.paste((0, 0, 0), (0, 0, 2, 2))
+    image_hashes = [
+        image_hash.get_dhash(image_hash.get_thumbnail(each_image))
+        for each_image in (image, similar_image, create_image(1))
+    ]
+    assert all(-(1 << 63) <= each_hash < 1 << 63 for each_hash in image_hashes)
+    assert image_hash.get_hash_distance(image_hashes[0], image_hashes[0]) == 0
+    assert (
+        image_hash.get_hash_distance(image_hashes[0], image_hashes[1])
+        <= image_hash.MAX_SIMILAR_HASH_DISTANCE
+    )
+    assert (
+        image_hash.get_hash_distance(image_hashes[0], image_hashes[2])
+        > image_hash.MAX_SIMILAR_HASH_DISTANCE
+    )
+
+
+def test_screenshot_image_summary(db_engine: sa.engine.Engine) -> None:
+    """Test that screenshot summaries are read without decoding the image.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 500})
+    images = [create_image(0), create_image(0), create_image(1)]
+    for timestamp, image in enumerate(images):
+        crud.insert_screenshot(
+            session,
+            recording,
+            timestamp,
+            {
+                "png_data": image_codec.encode_image(image),
+                **image_hash.get_image_summary(image),
+            },
+        )
+    crud.flush_inserts()
+
+    screenshots = crud.get_screenshots(session, recording)
+    with patch.object(Screenshot, "image", new_callable=PropertyMock) as image_property:
+        assert [screenshot.size for screenshot in screenshots] == [(160, 90)] * 3
+        assert screenshots[0].thumbnail.size == (128, 72)
+        assert screenshots[0].get_hash_distance(screenshots[1]) == 0
+        assert screenshots[0].get_hash_distance(screenshots[2]) > 0
+        image_property.assert_not_called()
+
+
+def test_scrub_screenshot_image_summary() -> None:
+    """Test that the summary of a scrubbed screenshot is of the scrubbed image."""
+    image = create_image(0)
+    screenshot = Screenshot(
+        png_data=image_codec.encode_image(image, image_codec.WEBP),
+        image_codec=image_codec.WEBP,
+        **image_hash.get_image_summary(image),
+    )
+    # cache the unscrubbed image and thumbnail
+    assert screenshot.image.tobytes() == image.tobytes()
+    assert screenshot.thumbnail.size == (128, 72)
+
+    scrubbed_image = create_image(1)
+    scrubber = SimpleNamespace(scrub_image=lambda image: scrubbed_image)
+    screenshot.scrub(scrubber)
+    assert screenshot.image_codec == image_codec.PNG
+    assert image_codec.get_codec(screenshot.png_data) == image_codec.PNG
+    summary = image_hash.get_image_summary(scrubbed_image)
+    assert screenshot.thumbnail_data == summary["thumbnail_data"]
+    assert screenshot.image_hash == summary["image_hash"]
+    assert screenshot.image.tobytes() == scrubbed_image.tobytes()
+    assert (
+        screenshot.thumbnail.tobytes()
+        == image_hash.get_thumbnail(scrubbed_image).tobytes()
+    )
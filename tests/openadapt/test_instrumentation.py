@@ -0,0 +1,66 @@
+"""Tests for the openadapt.db.instrumentation module."""
+
+import pytest
+import sqlalchemy as sa
+
+from openadapt.db import crud, instrumentation
+from openadapt.models import ActionEvent, PerformanceStat
+
+
+def test_instrument_n_plus_one(db_engine: sa.engine.Engine) -> None:
+    """Test that lazy loads in a loop are reported as N+1 suspects.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 600})
+    num_events = instrumentation.N_PLUS_ONE_MIN_REPEATS
+    for timestamp in range(num_events):
+        crud.insert_screenshot(session, recording, timestamp, {})
+        crud.insert_action_event(
+            session,
+            recording,
+            timestamp,
+            {"name": "click", "screenshot_timestamp": timestamp},
+        )
+    crud.flush_inserts()
+    crud.post_process_events(session, recording)
+    session.expire_all()
+    recording_id = recording.id
+
+    with instrumentation.instrument("lazy", engine=db_engine) as query_stats:
+        action_events = (
+            session.query(ActionEvent).filter_by(recording_id=recording_id).all()
+        )
+        for action_event in action_events:
+            action_event.screenshot
+    assert query_stats.num_statements == num_events + 1
+    assert query_stats.num_rows == num_events * 2
+    (suspect,) = query_stats.get_n_plus_one_suspects()
+    assert suspect.num_executions == num_events
+    assert "FROM screenshot" in suspect.shape
+
+    with pytest.raises(AssertionError, match="over budget of 1 repeats"):
+        with instrumentation.query_budget(10**6, max_repeats=1, engine=db_engine):
+            session.expire_all()
+            for action_event in action_events:
+                action_event.screenshot
+
+    crud.insert_query_stats(session, recording, query_stats)
+    crud.flush_inserts()
+    (perf_stat,) = crud.get_perf_stats(session, recording)
+    assert perf_stat.event_type == "sql:lazy"
+    assert (perf_stat.num_statements, perf_stat.num_rows) == (
+        num_events + 1,
+        num_events * 2,
+    )
+    session.query(PerformanceStat).filter_by(recording_id=recording.id).delete()
+    session.commit()
+
+
+def test_get_statement_shape() -> None:
+    """Test that statements differing in IN list lengths have the same shape."""
+    assert instrumentation.get_statement_shape(
+        "SELECT *\n  FROM a WHERE id IN (?, ?, ?)"
+    ) == instrumentation.get_statement_shape("SELECT * FROM a WHERE id IN (?, ?)")
@@ -0,0 +1,149 @@
+"""Tests for the openadapt.live_events module."""
+
+import random
+
+from test_columnar_events import get_tree, make_event_dicts, make_events
+import pytest
+import sqlalchemy as sa
+
+from openadapt import columnar_events, events, live_events
+from openadapt.db import crud
+from openadapt.models import ActionEvent, Recording
+
+NUM_EVENTS = 1000
+# the tail holds the events of the last seconds, not those of the recording
+MAX_TAIL_SIZE = 100
+
+
+def round_timestamps(tree: tuple) -> tuple:
+    """Round the timestamps of a tree of get_tree, which depend on summation order.
+
+    Args:
+        tree (tuple): The attributes of an event and its descendants.
+
+    Returns:
+        tuple: The attributes, with rounded timestamps.
+    """
+    return (
+        *tree[:1],
+        round(tree[1], live_events.NUM_TIMESTAMP_DIGITS),
+        *tree[2:-1],
+        [round_timestamps(child) for child in tree[-1]],
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_live_events(seed: int) -> None:
+    """Test that events reduced as they are added are those of the recording.
+
+    Args:
+        seed (int): The random seed of the events.
+    """
+    event_dicts = make_event_dicts(seed, NUM_EVENTS)
+    expected_events = columnar_events.reduce_events(
+        make_events(event_dicts), events.PROCESS_FNS
+    )
+
+    action_events = make_events(event_dicts)
+    live = live_events.LiveEvents(action_events[0].recording)
+    rng = random.Random(seed)
+    final_events = []
+    idx = 0
+    while idx < len(action_events):
+        num_events = rng.randint(1, 30)
+        final_events += live.add(action_events[idx : idx + num_events])
+        idx += num_events
+        assert len(live.tail) < MAX_TAIL_SIZE
+    assert len(final_events) > len(expected_events) - MAX_TAIL_SIZE
+    final_events += live.finish()
+    assert final_events == live.action_events
+    assert [round_timestamps(get_tree(event)) for event in final_events] == [
+        round_timestamps(get_tree(event)) for event in expected_events
+    ]
+
+
+def test_update(db_engine: sa.engine.Engine) -> None:
+    """Test that events are read from the database as they are written.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(
+        session,
+        {
+            "timestamp": 810,
+            "double_click_interval_seconds": 0.5,
+            "double_click_distance_pixels": 5,
+        },
+    )
+    read_session = sa.orm.sessionmaker(bind=db_engine, autoflush=False)()
+    live = live_events.LiveEvents(
+        read_session.get(Recording, recording.id), delay_seconds=0.5
+    )
+    crud.insert_window_event(
+        session, recording, 810, {"title": "window", "width": 800, "height": 600}
+    )
+    crud.insert_screenshot(session, recording, 810, {"png_data": b"1"})
+    for timestamp, name, key_char, window_event_timestamp in (
+        (811, "press", "a", 810),
+        (811.1, "release", "a", 810),
+        (812, "move", None, 810),
+        (812.1, "move", None, 810),
+        (813, "click", None, 810),
+        (813.1, "click", None, 810),
+        (816, "move", None, 815),
+        (819, "press", "b", 815),
+    ):
+        if timestamp == 816:
+            crud.insert_window_event(
+                session, recording, 815, {"title": "small", "width": 10, "height": 600}
+            )
+        crud.insert_action_event(
+            session,
+            recording,
+            timestamp,
+            {
+                "name": name,
+                "key_char": key_char,
+                "mouse_x": None if key_char else timestamp,
+                "mouse_y": None if key_char else 0,
+                "mouse_button_name": "left" if name == "click" else None,
+                "mouse_pressed": timestamp == 813 if name == "click" else None,
+                "window_event_timestamp": window_event_timestamp,
+                "screenshot_timestamp": 810,
+            },
+        )
+        if timestamp == 813:
+            crud.flush_inserts()
+            # the press of the click is pending
+            assert [event.name for event in live.update(read_session)] == ["type"]
+            assert [event.name for event in live.pending_action_events] == ["move"]
+    crud.flush_inserts()
+
+    assert [event.name for event in live.update(read_session)] == [
+        "move",
+        "singleclick",
+    ]
+    # a single key press is discarded
+    assert [event.name for event in live.finish()] == ["move"]
+    # window events and screenshots are assigned by timestamp, and the small window
+    # is replaced by the previous one
+    assert {event.window_event.title for event in live.action_events} == {"window"}
+    assert {event.screenshot.timestamp for event in live.action_events} == {810}
+    assert live.update(read_session) == []
+
+    crud.post_process_events(session, recording)
+    expected_events = events.get_events(
+        sa.orm.sessionmaker(bind=db_engine, autoflush=False)(),
+        session.get(Recording, recording.id),
+        use_cache=False,
+    )
+    assert [
+        (event.name, event.timestamp, event.window_event_timestamp)
+        for event in live.action_events
+    ] == [
+        (event.name, event.timestamp, event.window_event_timestamp)
+        for event in expected_events
+    ]
+    assert session.query(ActionEvent).filter_by(recording_id=recording.id).count() == 8
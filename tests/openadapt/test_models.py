@@ -1,5 +1,13 @@
 """Tests for openadapt.models."""
 
+from unittest.mock import patch
+import pickle
+
+from PIL import Image
+from scipy.spatial import distance
+import numpy as np
+import pytest
+
 from openadapt import models
 
 
@@ -49,3 +57,152 @@ def test_action_from_dict() -> None:
             print(f"{input_variation=}")
             action_event = models.ActionEvent.from_dict(action_dict)
             assert action_event.text == expected_output, action_event
+
+
+def make_diff_screenshot(
+    diff_positions: list[tuple[int, int]], size: tuple[int, int] = (200, 150)
+) -> models.Screenshot:
+    """Make a screenshot which differs from the previous one at positions.
+
+    Args:
+        diff_positions (list[tuple[int, int]]): The (x, y) positions of the diff.
+        size (tuple[int, int]): The width and height of the images.
+
+    Returns:
+        models.Screenshot: The screenshot, with its previous screenshot.
+    """
+    image = Image.new("RGB", size)
+    for position in diff_positions:
+        image.putpixel(position, (255, 255, 255))
+    screenshot = models.Screenshot(image=image)
+    screenshot.prev = models.Screenshot(image=Image.new("RGB", size))
+    return screenshot
+
+
+def test_screenshot_diff_distances(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test Screenshot.get_diff_distances against the distances to all diff pixels.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): The monkeypatch fixture.
+    """
+    monkeypatch.setattr(models.Screenshot, "MAX_DIFF_DISTANCE", 40)
+    rng = np.random.default_rng(0)
+    diff_positions = [(20, 30), (21, 30), (150, 100), (60, 140)]
+    screenshot = make_diff_screenshot(diff_positions)
+    assert screenshot.diff is screenshot.diff
+    assert screenshot.diff_mask is screenshot.diff_mask
+
+    positions = rng.uniform((0, 0), (199, 149), size=(1000, 2))
+    distances = screenshot.get_diff_distances(positions)
+    expected_distances = distance.cdist(np.rint(positions), diff_positions).min(axis=1)
+    expected_distances[expected_distances >= 40] = np.inf
+    np.testing.assert_allclose(distances, expected_distances)
+    assert np.isinf(distances).any() and np.isfinite(distances).any()
+    assert screenshot.get_diff_distances([(21.4, 29.6), (-1, 30)]).tolist() == [
+        0,
+        np.inf,
+    ]
+
+    screenshot = make_diff_screenshot([])
+    assert screenshot.diff_distance_field is None
+    assert np.isinf(screenshot.get_diff_distances(positions)).all()
+
+
+def make_processed_events() -> tuple[models.Recording, models.EventList]:
+    """Make a recording with raw action events and processed action events.
+
+    Returns:
+        tuple[models.Recording, models.EventList]: The recording and the processed
+            action events, of which the second is a type event with two children.
+    """
+    recording = models.Recording(timestamp=0)
+    children = [
+        models.ActionEvent(name=name, key_char="a", timestamp=timestamp)
+        for name, timestamp in [("press", 2), ("release", 3)]
+    ]
+    action_events = models.EventList(
+        [
+            models.ActionEvent(name="click", timestamp=1),
+            models.ActionEvent(name="type", timestamp=2, children=children),
+            models.ActionEvent(name="move", timestamp=4),
+            models.ActionEvent(name="click", timestamp=5),
+        ]
+    )
+    for action_event in [*action_events, *children]:
+        action_event.recording = recording
+    recording._processed_action_events = action_events
+    return recording, action_events
+
+
+def test_event_index() -> None:
+    """Test looking up the neighbors of processed events and their children."""
+    recording, action_events = make_processed_events()
+    click, type_event, move, last_click = action_events
+    press, release = type_event.children
+    assert [click.prev_event, click.next_event] == [None, type_event]
+    assert [move.prev_event, move.next_event] == [type_event, last_click]
+    assert last_click.next_event is None
+    assert [press.prev_event, press.next_event] == [None, release]
+    assert release.next_event is None
+    assert move.get_neighborhood(2, 2) == [click, type_event, move, last_click]
+    assert press.get_neighborhood(0, 5) == [press, release]
+
+    # events which are not processed are looked up in the raw action events
+    raw_event = models.ActionEvent(name="scroll", timestamp=6, recording=recording)
+    assert raw_event.prev_event is recording.action_events[-2]
+    assert raw_event.next_event is None
+    assert models.ActionEvent(name="scroll").next_event is None
+
+
+def test_event_index_invalidation() -> None:
+    """Test that the index stays valid when lists are changed or rebuilt."""
+    recording, action_events = make_processed_events()
+    click, type_event, move, last_click = action_events
+    press, release = type_event.children
+    event_index = action_events.event_index
+    assert event_index.get_next(click) is type_event
+
+    del action_events[1]
+    assert event_index.get_next(click) is move
+    assert event_index.get_position(press) is None
+    action_events.insert(1, type_event)
+    assert event_index.get_next(press) is release
+
+    # e.g. merged by a reducer
+    merged = models.ActionEvent(name="type", timestamp=2, children=[press])
+    type_event.children = [merged, release]
+    assert event_index.get_next(merged) is release
+    assert event_index.get_position(press) == ([press], 0)
+    action_events[1] = merged
+    assert event_index.get_prev(move) is merged
+    assert event_index.get_position(release) is None
+
+    # events which are not indexed do not rebuild the index until events change
+    dropped_events = [models.ActionEvent(name="move") for _ in range(3)]
+    with patch.object(event_index, "_build", wraps=event_index._build) as build:
+        for dropped_event in dropped_events:
+            assert event_index.get_position(dropped_event) is None
+        assert build.call_count == 0
+        move.children = [dropped_events[0]]
+        assert event_index.get_position(dropped_events[0]) == ([dropped_events[0]], 0)
+        assert event_index.get_position(dropped_events[1]) is None
+        action_events.append(dropped_events[1])
+        assert event_index.get_prev(dropped_events[1]) is last_click
+        assert build.call_count == 2
+        replaced = models.ActionEvent(name="move")
+        assert event_index.get_position(replaced) is None
+        action_events[2] = replaced
+        assert event_index.get_prev(replaced) is merged
+        assert event_index.get_next(replaced) is last_click
+        assert build.call_count == 3
+
+    # changes to other lists are not detected, so events which are not indexed
+    # rebuild the index
+    raw_event_index = models.EventIndex(list(recording.action_events))
+    assert raw_event_index.get_position(replaced) is None
+    raw_event_index.events[1] = replaced
+    assert raw_event_index.get_position(replaced) == (raw_event_index.events, 1)
+
+    loaded_events = pickle.loads(pickle.dumps(action_events))
+    assert isinstance(loaded_events, models.EventList)
+    assert loaded_events.event_index.get_next(loaded_events[0]) is loaded_events[1]
@@ -0,0 +1,167 @@
+"""Tests for the openadapt.db.retention module."""
+
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator
+from unittest.mock import patch
+import time
+
+import pytest
+import sqlalchemy as sa
+
+from openadapt import video
+from openadapt.db import crud, retention
+from openadapt.db.db import Base
+from openadapt.models import (
+    ActionEvent,
+    Recording,
+    RecordingSummary,
+    Screenshot,
+    ScrubbedRecording,
+    WindowEvent,
+    WindowState,
+)
+
+DAY = retention.SECONDS_PER_DAY
+
+
+@pytest.fixture
+def session(tmp_path: Path) -> Iterator[sa.orm.Session]:
+    """Return a session of an empty database, with video files under tmp_path.
+
+    Args:
+        tmp_path (Path): A temporary directory.
+    """
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'retention.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sa.orm.sessionmaker(bind=engine)()
+    video_config = SimpleNamespace(VIDEO_DIR_PATH=str(tmp_path / "videos"))
+    with (
+        patch("openadapt.video.config", video_config),
+        patch.object(retention, "config", video_config),
+        patch.object(retention, "PERFORMANCE_PLOTS_DIR_PATH", tmp_path / "plots"),
+    ):
+        yield session
+    session.close()
+    engine.dispose()
+
+
+def create_recording(session: sa.orm.Session, timestamp: float) -> Recording:
+    """Create a finished recording with an action event, screenshot and video.
+
+    Args:
+        session (sa.orm.Session): The database session.
+        timestamp (float): The timestamp of the recording.
+
+    Returns:
+        Recording: The recording.
+    """
+    recording = crud.insert_recording(session, {"timestamp": timestamp})
+    crud.insert_screenshot(session, recording, timestamp, {"png_data": b"1" * 100000})
+    crud.insert_screenshot(session, recording, timestamp + 1, {"png_data": b"2"})
+    crud.insert_window_event(
+        session, recording, timestamp, {"state": {"timestamp": timestamp}}
+    )
+    crud.flush_inserts()
+    screenshot = (
+        session.query(Screenshot)
+        .filter(Screenshot.recording_id == recording.id)
+        .order_by(Screenshot.timestamp)
+        .first()
+    )
+    crud.insert_action_event(
+        session,
+        recording,
+        timestamp,
+        {"name": "click", "screenshot_id": screenshot.id},
+    )
+    crud.flush_inserts()
+    with open(video.get_video_file_path(timestamp), "wb") as video_file:
+        video_file.write(b"0" * 100)
+    crud.update_recording_summary(session, recording)
+    return recording
+
+
+def test_select_recordings(session: sa.orm.Session) -> None:
+    """Test that each policy selects the expected recordings.
+
+    Args:
+        session (sa.orm.Session): The database session.
+    """
+    now = time.time()
+    old, middle, new = [
+        create_recording(session, now - num_days * DAY) for num_days in (30, 10, 1)
+    ]
+    session.add(ScrubbedRecording(recording_id=middle.id, scrubbed=True))
+    session.commit()
+
+    def select_ids(**kwargs: dict) -> list[int]:
+        recordings = retention.select_recordings(session, now=now, **kwargs)
+        return [recording.id for recording in recordings]
+
+    assert select_ids() == []
+    assert select_ids(max_age_days=20) == [old.id]
+    recording_size = retention.get_recording_size(session, new)
+    assert select_ids(max_total_bytes=int(recording_size * 2.5)) == [old.id]
+    assert select_ids(max_total_bytes=recording_size) == [old.id, middle.id]
+    assert select_ids(keep_scrubbed_only=True) == [old.id, new.id]
+
+
+def test_apply_retention(session: sa.orm.Session) -> None:
+    """Test that deleted recordings leave no rows or files behind.
+
+    Args:
+        session (sa.orm.Session): The database session.
+    """
+    now = time.time()
+    old = create_recording(session, now - 30 * DAY)
+    new = create_recording(session, now)
+    old_id = old.id
+
+    report = retention.apply_retention(session, max_age_days=20, dry_run=True)
+    assert [recording["id"] for recording in report["recordings"]] == [old_id]
+    assert session.query(Recording).count() == 2
+
+    report = retention.apply_retention(
+        session, max_age_days=20, prune_unreferenced=True, vacuum_mode="full"
+    )
+    assert report["deleted_rows"] == {
+        "recording": 1,
+        "action_event": 1,
+        # the unreferenced screenshot of the new recording is pruned
+        "screenshot": 3,
+        "window_event": 2,
+        "window_state": 2,
+        "recording_summary": 1,
+    }
+    assert list(report["deleted_files"].values()) == [100]
+    assert report["reclaimed_file_bytes"] > 0
+
+    assert session.query(Recording).one().id == new.id
+    for table in (ActionEvent, Screenshot, WindowEvent):
+        assert session.query(table).filter(table.recording_id == old_id).count() == 0
+    assert session.query(Screenshot).count() == 1
+    assert session.query(WindowState).count() == 0
+    assert new.summary.num_screenshots == 1
+
+
+def test_dry_run(session: sa.orm.Session) -> None:
+    """Test that a dry run does not store the missing summaries of recordings.
+
+    Args:
+        session (sa.orm.Session): The database session.
+    """
+    now = time.time()
+    old = create_recording(session, now - 30 * DAY)
+    new = create_recording(session, now)
+    recording_size = retention.get_recording_size(session, new)
+    session.query(RecordingSummary).delete()
+    session.commit()
+    session.expire_all()
+
+    report = retention.apply_retention(
+        session, max_total_bytes=int(recording_size * 1.5), dry_run=True
+    )
+    assert [recording["id"] for recording in report["recordings"]] == [old.id]
+    assert not session.new and not session.dirty
+    assert session.query(RecordingSummary).count() == 0
@@ -0,0 +1,101 @@
+"""Tests for the openadapt.db.search module."""
+
+import sqlalchemy as sa
+
+from openadapt.db import crud, search
+from openadapt.models import ActionEvent
+
+
+def test_get_typed_text_chunks() -> None:
+    """Test that key presses are reduced to chunks of typed text."""
+    action_events = [
+        ActionEvent(name="press", timestamp=1, key_char="h"),
+        ActionEvent(name="press", timestamp=2, key_char="i"),
+        ActionEvent(name="press", timestamp=3, key_char="x"),
+        ActionEvent(name="press", timestamp=4, key_name="backspace"),
+        ActionEvent(name="press", timestamp=5, key_name="space"),
+        ActionEvent(name="press", timestamp=6, key_char="u"),
+        ActionEvent(name="press", timestamp=7, key_name="enter"),
+        ActionEvent(name="press", timestamp=8, key_char="a"),
+        ActionEvent(name="click", timestamp=9),
+        ActionEvent(name="press", timestamp=10, key_char="b"),
+        ActionEvent(name="press", timestamp=11, key_char="c", window_event_timestamp=1),
+    ]
+    assert search.get_typed_text_chunks(action_events) == [
+        (1, "hi u"),
+        (8, "a"),
+        (10, "b"),
+        (11, "c"),
+    ]
+
+
+def test_get_match_query() -> None:
+    """Test that text is converted to an FTS5 query."""
+    assert search.get_match_query("") == ""
+    assert search.get_match_query('quarterly "repo') == '"quarterly" """repo"*'
+
+
+def test_search_recordings(db_engine: sa.engine.Engine) -> None:
+    """Test that recordings are indexed when post-processed, and deindexed.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(
+        session, {"timestamp": 700, "task_description": "file the zebrafish invoice"}
+    )
+    crud.insert_window_event(
+        session, recording, 700, {"title": "Zebrafish Accounting - Spreadsheet"}
+    )
+    crud.insert_window_event(
+        session, recording, 701, {"title": "Zebrafish Accounting - Spreadsheet"}
+    )
+    for timestamp, key_char in enumerate("okapi", 702):
+        crud.insert_action_event(
+            session,
+            recording,
+            timestamp,
+            {"name": "press", "key_char": key_char, "window_event_timestamp": 700},
+        )
+    crud.insert_browser_event(
+        session,
+        recording,
+        710,
+        {
+            "message": {
+                "url": "https://example.com/narwhal",
+                "visibleHTMLString": "<html><title>Narwhal Portal</title></html>",
+            }
+        },
+    )
+    crud.flush_inserts()
+    crud.post_process_events(session, recording)
+
+    results = crud.search_recordings(session, "zebrafish")
+    assert sorted(
+        (result["recording_id"], result["kind"], result["timestamp"])
+        for result in results
+    ) == [(recording.id, search.TASK, 700), (recording.id, search.WINDOW, 700)]
+    (result,) = crud.search_recordings(session, "zebrafish", kinds=(search.TASK,))
+    assert result["snippet"] == "file the [zebrafish] invoice"
+    (result,) = crud.search_recordings(session, "oka")
+    assert (result["kind"], result["content"], result["timestamp"]) == (
+        search.TEXT,
+        "okapi",
+        702,
+    )
+    (result,) = crud.search_recordings(session, "narwhal portal")
+    assert (result["kind"], result["content"]) == (
+        search.BROWSER,
+        "Narwhal Portal https://example.com/narwhal",
+    )
+    assert crud.search_recordings(session, "zebrafish okapi") == []
+
+    # reindexing replaces the documents
+    assert search.index_recording(session, recording) == 4
+    assert len(crud.search_recordings(session, "zebrafish")) == 2
+
+    num_deleted_rows = crud.delete_recording(session, recording)
+    assert num_deleted_rows[search.SEARCH_TABLE] == 4
+    assert crud.search_recordings(session, "zebrafish") == []
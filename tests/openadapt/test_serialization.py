@@ -0,0 +1,109 @@
+"""Tests for the openadapt.db.serialization module."""
+
+from datetime import datetime
+import json
+
+from pynput import keyboard
+import numpy as np
+
+from openadapt.db import serialization
+from openadapt.models import ActionEvent, Recording, Screenshot, WindowEvent
+
+
+def get_asdict(row: ActionEvent | WindowEvent, follow: bool = True) -> dict:
+    """Convert a row to a dict with dictalchemy, as utils.row2dict used to.
+
+    Args:
+        row (ActionEvent | WindowEvent): The row.
+        follow (bool): Whether to follow children.
+
+    Returns:
+        dict: The row as a dict.
+    """
+    to_follow = [key for key in (["children"] if follow else []) if hasattr(row, key)]
+    if "children" in to_follow:
+        to_follow = {key: {} for key in to_follow}
+        to_follow["children"]["follow"] = to_follow
+    to_include = [key for key in serialization.INCLUDED_ATTR_NAMES if hasattr(row, key)]
+    return row.asdict(follow=to_follow, include=to_include)
+
+
+def make_action_event() -> ActionEvent:
+    """Make a type event with nested children.
+
+    Returns:
+        ActionEvent: The event.
+    """
+    children = [
+        ActionEvent(name="press", key_char="a", timestamp=1),
+        ActionEvent(
+            name="type",
+            timestamp=2,
+            children=[
+                ActionEvent(name="press", key_char="b", timestamp=2),
+                ActionEvent(name="release", key_char="b", timestamp=3),
+            ],
+        ),
+        ActionEvent(name="release", key_char="a", timestamp=4),
+    ]
+    action_event = ActionEvent(
+        name="type",
+        timestamp=1,
+        children=children,
+        element_state={"role": "textbox"},
+        window_event=WindowEvent(title="window", state={"meta": {}}),
+    )
+    action_event.reducer_names.update(["keyboard", "mouse_move"])
+    return action_event
+
+
+def test_row2dict() -> None:
+    """Test that rows are converted to the dicts of dictalchemy."""
+    action_event = make_action_event()
+    assert serialization.row2dict(action_event) == get_asdict(action_event)
+    assert serialization.row2dict(action_event, follow=False) == get_asdict(
+        action_event, follow=False
+    )
+    window_event = action_event.window_event
+    assert serialization.row2dict(window_event) == get_asdict(window_event)
+    screenshot = Screenshot(timestamp=1, png_data=b"png")
+    assert serialization.row2dict(screenshot) == get_asdict(screenshot)
+    recording = Recording(timestamp=1, task_description="task")
+    assert serialization.row2dict(recording, follow=False) == get_asdict(
+        recording, follow=False
+    )
+    assert serialization.row2dict(None) == {}
+
+
+def test_dumps() -> None:
+    """Test serializing rows, keys, numpy arrays and datetimes."""
+    action_event = make_action_event()
+    value = {
+        "action_event": action_event,
+        "array": np.arange(3),
+        "datetime": datetime(2024, 1, 2, 3, 4, 5),
+        "key": keyboard.KeyCode.from_char("a"),
+        "data": b"data",
+    }
+    loaded_value = json.loads(serialization.dumps(value))
+    event_dict = loaded_value["action_event"]
+    assert event_dict["text"] == "a"
+    assert event_dict["key"] is None
+    assert event_dict["reducer_names"] == ["keyboard", "mouse_move"]
+    assert event_dict["element_state"] == {"role": "textbox"}
+    assert [child["name"] for child in event_dict["children"]] == [
+        "press",
+        "type",
+        "release",
+    ]
+    assert loaded_value["array"] == [0, 1, 2]
+    assert loaded_value["datetime"] == "2024-01-02T03:04:05"
+    assert loaded_value["key"] == "'a'"
+    assert loaded_value["data"] == "ZGF0YQ=="
+
+    event_dict = json.loads(
+        serialization.dumps(action_event, exclude=serialization.HEAVY_ATTR_NAMES)
+    )
+    assert "element_state" not in event_dict
+    assert "element_state" not in event_dict["children"][0]
+    assert event_dict["text"] == "a"
@@ -0,0 +1,112 @@
+"""Golden tests of openadapt.streaming_events against the reducers in events.py."""
+
+from typing import Callable, Iterator
+
+from test_columnar_events import get_tree, make_event_dicts, make_events
+import pytest
+
+from openadapt import events, streaming_events
+from openadapt.models import ActionEvent
+
+NUM_EVENTS = 4000
+# the events of a few runs, whatever the number of events
+MAX_LOOKAHEAD = 100
+
+
+def assert_same_output(process_fns: list[Callable], seed: int) -> None:
+    """Assert that the list and streaming reducers reduce events identically.
+
+    Args:
+        process_fns (list[Callable]): The list reducers, from events.py.
+        seed (int): The random seed of the events.
+    """
+    event_dicts = make_event_dicts(seed)
+    expected_events = make_events(event_dicts)
+    for process_fn in process_fns:
+        expected_events = process_fn(expected_events)
+    action_events = streaming_events.reduce_events(
+        make_events(event_dicts), process_fns
+    )
+    assert [get_tree(event) for event in action_events] == [
+        get_tree(event) for event in expected_events
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize(
+    "process_fn", list(streaming_events.REDUCERS), ids=lambda fn: fn.__name__
+)
+def test_reducer(process_fn: Callable, seed: int) -> None:
+    """Test that each streaming reducer matches its list reducer.
+
+    Args:
+        process_fn (Callable): The list reducer.
+        seed (int): The random seed of the events.
+    """
+    if process_fn == events.merge_consecutive_keyboard_events:
+        # the list reducer expects keyboard events to be valid
+        assert_same_output([events.remove_invalid_keyboard_events, process_fn], seed)
+    else:
+        assert_same_output([process_fn], seed)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_process_fns(seed: int) -> None:
+    """Test that the fused reducers match the reducers of merge_events in sequence.
+
+    Args:
+        seed (int): The random seed of the events.
+    """
+    assert_same_output(events.PROCESS_FNS, seed)
+    assert_same_output(events.PROCESS_FNS + [events.remove_move_before_click], seed)
+
+
+def test_keyboard_events_ungrouped() -> None:
+    """Test merging keyboard events without grouping named keys."""
+    event_dicts = make_event_dicts(seed=0)
+    expected_events = events.merge_consecutive_keyboard_events(
+        events.remove_invalid_keyboard_events(make_events(event_dicts)),
+        group_named_keys=False,
+    )
+    action_events = streaming_events.merge_consecutive_keyboard_events(
+        streaming_events.remove_invalid_keyboard_events(make_events(event_dicts)),
+        group_named_keys=False,
+    )
+    assert [get_tree(event) for event in action_events] == [
+        get_tree(event) for event in expected_events
+    ]
+
+
+def get_last_idx(event: ActionEvent, idxs: dict[int, int]) -> int:
+    """Get the index of the last raw event of an event and its descendants.
+
+    Args:
+        event (ActionEvent): The event.
+        idxs (dict[int, int]): The index of each raw event, by object id.
+
+    Returns:
+        int: The index.
+    """
+    return max(
+        [idxs.get(id(event), -1)]
+        + [get_last_idx(child, idxs) for child in event.children]
+    )
+
+
+def test_single_pass() -> None:
+    """Test that events are reduced as they are read, with bounded lookahead."""
+    action_events = make_events(make_event_dicts(seed=0, num_events=NUM_EVENTS))
+    idxs = {id(event): idx for idx, event in enumerate(action_events)}
+    num_read = 0
+
+    def read_events() -> Iterator[ActionEvent]:
+        nonlocal num_read
+        for event in action_events:
+            num_read += 1
+            yield event
+
+    reduced_events = streaming_events.iter_events(read_events(), events.PROCESS_FNS)
+    # the number of events read after the last raw event of each reduced event
+    lookaheads = [num_read - 1 - get_last_idx(event, idxs) for event in reduced_events]
+    assert num_read == len(action_events)
+    assert max(lookaheads) <= MAX_LOOKAHEAD
@@ -0,0 +1,50 @@
+"""Tests for the openadapt.synthetic module."""
+
+from collections import Counter
+
+import sqlalchemy as sa
+
+from openadapt import events, synthetic
+from openadapt.models import ActionEvent, BrowserEvent
+
+
+def test_generate_events() -> None:
+    """Test that events are generated deterministically, in order of timestamp."""
+    synthetic_events = list(synthetic.generate_events(2000, seed=1))
+    assert synthetic_events == list(synthetic.generate_events(2000, seed=1))
+    assert synthetic_events != list(synthetic.generate_events(2000, seed=2))
+
+    event_type_counts = Counter(event_type for event_type, _, _ in synthetic_events)
+    assert event_type_counts["action"] == 2000
+    assert event_type_counts["screen"] > 0
+    assert event_type_counts["window"] > 1
+    assert "browser" not in event_type_counts
+    timestamps = [timestamp for _, timestamp, _ in synthetic_events]
+    assert timestamps == sorted(timestamps)
+
+    # each action event refers to the previous window event and screenshot
+    timestamps_by_type = {"window": set(), "screen": set()}
+    for event_type, timestamp, data in synthetic_events:
+        if event_type in timestamps_by_type:
+            timestamps_by_type[event_type].add(timestamp)
+        elif event_type == "action":
+            assert data["window_event_timestamp"] in timestamps_by_type["window"]
+            assert data["screenshot_timestamp"] in timestamps_by_type["screen"]
+
+
+def test_insert_recording(db_engine: sa.engine.Engine) -> None:
+    """Test that a synthetic recording is inserted and processed.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = synthetic.insert_recording(session, 3000, seed=3, browser_events=True)
+    assert session.query(ActionEvent).filter_by(recording_id=recording.id).count() == (
+        3000
+    )
+    assert session.query(BrowserEvent).filter_by(recording_id=recording.id).count()
+
+    action_events = events.get_events(session, recording, use_cache=False)
+    names = {event.name for event in action_events}
+    assert {"move", "singleclick", "doubleclick", "type", "scroll"} <= names
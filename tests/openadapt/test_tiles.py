@@ -0,0 +1,165 @@
+"""Tests for the openadapt.db.tiles module."""
+
+from types import SimpleNamespace
+
+from PIL import Image
+import numpy as np
+import pytest
+import sqlalchemy as sa
+
+from openadapt.db import crud, tiles
+from openadapt.models import Recording, ScreenshotTile
+
+
+def create_image(mode: str, size: tuple[int, int] = (150, 100)) -> Image.Image:
+    """Create an image with varied pixels.
+
+    Args:
+        mode (str): The mode of the image.
+        size (tuple[int, int]): The width and height of the image.
+
+    Returns:
+        Image.Image: The image.
+    """
+    width, height = size
+    pixels = np.random.default_rng(0).integers(
+        0, 256, (height, width, 4), dtype=np.uint8
+    )
+    return Image.fromarray(pixels, "RGBA").convert(mode)
+
+
+@pytest.mark.parametrize("mode", list(tiles.CHANNELS_BY_MODE))
+def test_split_image_round_trip(mode: str) -> None:
+    """Test that images are reassembled from their tiles.
+
+    Args:
+        mode (str): The mode of the image.
+    """
+    image = create_image(mode)
+    tile_grid, image_tiles = tiles.split_image(image)
+    # 3 columns and 2 rows of tiles, the last ones padded
+    assert len(tiles.get_tile_hashes(tile_grid)) == 6
+    compressed_tiles = {
+        tile_hash: tiles.compress_tile(tile) for tile_hash, tile in image_tiles.items()
+    }
+    assembled_image = tiles.assemble_image(
+        tile_grid,
+        lambda tile_hashes: {
+            tile_hash: compressed_tiles[tile_hash] for tile_hash in tile_hashes
+        },
+    )
+    assert assembled_image.mode == mode
+    assert assembled_image.size == image.size
+    assert assembled_image.tobytes() == image.tobytes()
+
+
+def test_screenshot_tiles(db_engine: sa.engine.Engine) -> None:
+    """Test that the tiles of a recording's screenshots are stored once.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 400})
+    image = create_image("RGB", (128, 128))
+    changed_image = image.copy()
+    changed_image.paste((255, 0, 0), (0, 0, 10, 10))
+    for timestamp, screenshot_image in enumerate((image, changed_image, image)):
+        tile_grid, image_tiles = tiles.split_image(screenshot_image)
+        crud.insert_screenshot(
+            session,
+            recording,
+            timestamp,
+            {"tile_grid": tile_grid, "tiles": image_tiles},
+        )
+    crud.flush_inserts()
+
+    # 4 tiles, plus the changed one
+    assert (
+        session.query(ScreenshotTile)
+        .filter(ScreenshotTile.recording_id == recording.id)
+        .count()
+        == 5
+    )
+    session.expire_all()
+    tiles._tile_cache.clear()
+    screenshots = crud.get_screenshots(session, recording)
+    assert [screenshot.image.tobytes() for screenshot in screenshots] == [
+        image.tobytes(),
+        changed_image.tobytes(),
+        image.tobytes(),
+    ]
+
+    num_deleted_rows = crud.delete_recording(session, recording)
+    assert num_deleted_rows["screenshot_tile"] == 5
+
+
+def test_copy_recording_tiles(db_engine: sa.engine.Engine) -> None:
+    """Test that the screenshots of a copied recording can be decoded from tiles.
+
+    Args:
+        db_engine (sa.engine.Engine): The test database engine.
+    """
+    session = sa.orm.sessionmaker(bind=db_engine)()
+    recording = crud.insert_recording(session, {"timestamp": 410})
+    crud.insert_window_event(
+        session, recording, 410, {"title": "window", "width": 128, "height": 128}
+    )
+    images = [create_image("RGB", (128, 128)), create_image("RGB", (128, 128))]
+    images[1].paste((255, 0, 0), (0, 0, 10, 10))
+    for idx, image in enumerate(images):
+        tile_grid, image_tiles = tiles.split_image(image)
+        timestamp = 410 + idx
+        crud.insert_screenshot(
+            session,
+            recording,
+            timestamp,
+            {"tile_grid": tile_grid, "tiles": image_tiles},
+        )
+        crud.insert_action_event(
+            session,
+            recording,
+            timestamp + 0.5,
+            {
+                "name": "scroll",
+                "mouse_x": 1,
+                "mouse_y": 1,
+                "mouse_dx": 0,
+                "mouse_dy": 1,
+                "window_event_timestamp": 410,
+                "screenshot_timestamp": timestamp,
+            },
+        )
+    crud.flush_inserts()
+    crud.post_process_events(session, recording)
+
+    copy_id = crud.copy_recording(session, recording.id)
+    assert copy_id is not None
+    session.expire_all()
+    tiles._tile_cache.clear()
+    copy = session.get(Recording, copy_id)
+    screenshots = crud.get_screenshots(session, copy)
+    # the copy has the screenshots of the processed (i.e. merged) action events
+    assert screenshots
+    for screenshot in screenshots:
+        assert screenshot.tile_grid
+        image = images[int(screenshot.timestamp) - 410]
+        assert screenshot.image.tobytes() == image.tobytes()
+
+    # scrubbing the copy deletes its tiles, which hold the unscrubbed images
+    scrubbed_recording_id = crud.insert_scrubbed_recording(session, copy_id, "test")
+    scrubber = SimpleNamespace(scrub_image=lambda image: Image.new("RGB", image.size))
+    for screenshot in screenshots:
+        screenshot.scrub(scrubber)
+    session.commit()
+    crud.mark_scrubbing_complete(session, scrubbed_recording_id)
+    tile_counts = dict(
+        session.query(ScreenshotTile.recording_id, sa.func.count())
+        .group_by(ScreenshotTile.recording_id)
+        .all()
+    )
+    assert tile_counts == {recording.id: 5}
+    session.expire_all()
+    for screenshot in crud.get_screenshots(session, copy):
+        assert screenshot.tile_grid is None
+        assert not screenshot.image.getbbox()
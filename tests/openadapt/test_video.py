@@ -1,6 +1,56 @@
 """Module to test openadapt.video."""
 
-# from openadapt import models, video
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
 
+from openadapt import video
+from openadapt.models import Recording
 
 # TODO: compare diff shown in deprecated.visualize(diff_video=True)
+
+
+def test_extract_recording_frames(tmp_path: Path) -> None:
+    """Test that frames are extracted from the video segment of each timestamp.
+
+    Args:
+        tmp_path (Path): A temporary directory.
+    """
+    recording = Recording(
+        timestamp=1,
+        video_start_time=10,
+        video_segments=[{"start_time": 10}, {"start_time": 20}],
+    )
+    assert recording.get_video_segment(5) == (0, 10)
+    assert recording.get_video_segment(20.5) == (1, 20)
+    assert recording.get_video_segment_time_range(0) == (10, 20)
+    assert recording.get_video_segment_time_range(1) == (20, None)
+
+    def extract_frames(
+        video_file_path: str, timestamps: list[float], tolerance: float
+    ) -> list[tuple[str, float]]:
+        return [(video_file_path, timestamp) for timestamp in timestamps]
+
+    video_config = SimpleNamespace(VIDEO_DIR_PATH=str(tmp_path))
+    with (
+        patch("openadapt.video.config", video_config),
+        patch.object(video, "extract_frames", extract_frames),
+    ):
+        for segment_idx in range(2):
+            video_file_path = video.get_video_file_path(1, segment_idx)
+            with open(video_file_path, "wb") as video_file:
+                video_file.write(b"0")
+        video_file_paths = video.get_video_file_paths(1)
+        frames = video.extract_recording_frames(recording, [20.5, 10, 10.5, 25])
+
+    assert [Path(path).name for path in video_file_paths] == [
+        "oa_recording-1.mp4",
+        "oa_recording-1-1.mp4",
+    ]
+    first_path, second_path = video_file_paths
+    assert frames == [
+        (second_path, 0.5),
+        (first_path, 0),
+        (first_path, 0.5),
+        (second_path, 5),
+    ]